@@ -1,26 +1,71 @@
 #!/usr/bin/env python3
 import json
 import os
-from flask import Flask, jsonify, request, Response
+import time
+from pathlib import Path
+from flask import Flask, g, jsonify, request, Response
+
+from src.controllers.tools_controller import tools_bp
+from src.services.dashboard_snapshot import DashboardSnapshot, snapshot_target_ms
+from src.services.install_stream import InstallStream
+from src.models.jobs import JobTarget
+from src.services.job_queue import JobQueue
+from src.services.metrics import HTTP_REQUEST_SECONDS, REGISTRY
+from src.services.tools_installer_service import ToolsInstallerService
+from src.services.tools_store import open_tools_store
 
 app = Flask(__name__)
+REPO_ROOT = Path(__file__).resolve().parent
 
-# Simple file-backed store for instance tools
-TOOLS_STORE_PATH = os.path.join(os.path.dirname(__file__), 'state', 'tools_store.json')
-os.makedirs(os.path.join(os.path.dirname(__file__), 'state'), exist_ok=True)
+# Store for instance tools. JSON by default (state/tools_store.json, cached in
+# memory, journaled per-instance updates and a cross-process lock); set
+# NICS_TOOLS_STORE_BACKEND=sqlite to use state/tools_store.db instead.
+STATE_DIR = os.path.join(os.path.dirname(__file__), 'state')
+os.makedirs(STATE_DIR, exist_ok=True)
+tools_store = open_tools_store(STATE_DIR)
+app.config['TOOLS_STORE'] = tools_store
+app.register_blueprint(tools_bp)
+
+# Background install/uninstall jobs (state/jobs.json). At most one job runs per
+# instance at a time; jobs interrupted by a restart are requeued on startup.
+JOB_WORKERS = int(os.environ.get('NICS_JOB_WORKERS', '4'))
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    # Latency per route template (not per path, to keep label cardinality
+    # bounded); for SSE responses this is the time until streaming starts.
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=request.url_rule.rule if request.url_rule is not None else 'unmatched',
+            status=str(response.status_code),
+        )
+    return response
 
-def _read_tools_store():
-    if not os.path.exists(TOOLS_STORE_PATH):
-        return {}
-    try:
-        with open(TOOLS_STORE_PATH, 'r') as f:
-            return json.load(f)
-    except Exception:
-        return {}
 
-def _write_tools_store(data):
-    with open(TOOLS_STORE_PATH, 'w') as f:
-        json.dump(data, f, indent=2)
+# Under gunicorn every worker keeps its own registry; share_metrics() (called
+# from the post_fork hook) makes each worker dump it to state/metrics/ so that
+# /metrics answers with the sum over all workers, whichever one is scraped.
+METRICS_DIR = Path(STATE_DIR) / 'metrics'
+
+
+def share_metrics():
+    REGISTRY.share(METRICS_DIR)
+
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format (src/services/metrics.py): this process's registry,
+    # or the total of every gunicorn worker after share_metrics()
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/')
@@ -52,11 +97,51 @@ def api_instances():
     return jsonify({"instances": []})
 
 
+# Everything the tools page needs in one response (see api_dashboard_snapshot).
+dashboard_snapshot = DashboardSnapshot(REPO_ROOT / 'scenario' / 'state' / 'summary.json', tools_store)
+SNAPSHOT_TARGET_MS = snapshot_target_ms()
+
+
+@app.route('/api/dashboard/snapshot')
+def api_dashboard_snapshot():
+    # Instances plus assigned/installed tools and last-run status per instance.
+    # Unchanged state answers 304 to If-None-Match after a couple of stat()
+    # calls. Server-Timing reports the server time, which should stay below
+    # SNAPSHOT_TARGET_MS (50 ms by default for a 40-instance scenario).
+    started = time.perf_counter()
+    etag = dashboard_snapshot.etag()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        etag, body = dashboard_snapshot.body(etag)
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    response.headers['Server-Timing'] = f'snapshot;dur={elapsed_ms:.2f}'
+    if elapsed_ms > SNAPSHOT_TARGET_MS:
+        app.logger.warning('Dashboard snapshot took %.1f ms (target %.0f ms)', elapsed_ms, SNAPSHOT_TARGET_MS)
+    return response
+
+
+@app.route('/api/scenario/teardown_report')
+def api_teardown_report():
+    # Written by scenario_teardown_service.py (destroy_scenario.sh): per-resource
+    # outcome of the last teardown, including partial failures
+    report_path = os.path.join(os.path.dirname(__file__), 'scenario', 'state', 'teardown_report.json')
+    if not os.path.exists(report_path):
+        return jsonify({"status": "not_found"}), 404
+    try:
+        with open(report_path, 'r') as f:
+            return jsonify(json.load(f))
+    except (OSError, ValueError) as e:
+        return jsonify({"status": "error", "error": str(e)}), 500
+
+
 @app.route('/api/get_tools_for_instance')
 def api_get_tools_for_instance():
     instance = request.args.get('instance')
-    store = _read_tools_store()
-    tools = store.get(instance, {}).get('tools', []) if instance else []
+    tools = tools_store.get_instance(instance).get('tools', []) if instance else []
     return jsonify({"tools": tools})
 
 
@@ -67,45 +152,78 @@ def api_add_tool_to_instance():
     tools = payload.get('tools', [])
     if not instance:
         return jsonify({"status": "error", "msg": "instance required"}), 400
-    store = _read_tools_store()
-    entry = store.get(instance, {})
-    entry['tools'] = tools
-    store[instance] = entry
-    _write_tools_store(store)
+
+    def assign(entry):
+        entry['tools'] = tools
+
+    tools_store.update_instance(instance, assign)
     return jsonify({"status": "ok"})
 
 
+def _mark_installed(results):
+    """Record a finished run and mark successful tools as installed (one store write)."""
+    tools_store.record_results(results, kind='install')
+
+
+def _mark_uninstalled(results):
+    """Record a finished uninstall run and drop successfully removed tools (one store write)."""
+    tools_store.record_results(results, kind='uninstall')
+
+
+def _job_finished(job):
+    if job.kind == 'uninstall':
+        _mark_uninstalled(job.results)
+    else:
+        _mark_installed(job.results)
+
+
+# The dispatcher thread is not started on import (tests and benchmarks import
+# this module); start_job_queue() runs it from __main__ and from the gunicorn
+# post_fork hook in gunicorn.conf.py, once per worker process.
+job_queue = JobQueue.for_repo(REPO_ROOT, max_workers=JOB_WORKERS, on_complete=_job_finished)
+app.config['JOB_QUEUE'] = job_queue
+
+
+def start_job_queue():
+    return job_queue.start()
+
+
 @app.route('/api/install_tools', methods=['POST'])
 def api_install_tools():
-    # Minimal streaming endpoint that simulates installation progress
+    # Queues the install as a job (so it shares the per-instance limit and the
+    # worker pool with every other install) and streams that job's progress
+    # (tool_started / log / tool_finished / completed) as Server-Sent Events.
+    # The tools store is updated by _job_finished in whichever worker runs it.
     payload = request.get_json() or {}
     instance = payload.get('instance')
     tools = payload.get('tools', [])
+    if not instance or not tools:
+        return jsonify({"status": "error", "msg": "instance and tools required"}), 400
+
+    hints = {k: payload.get(k) for k in ('id', 'type', 'ip', 'ip_private', 'ip_floating', 'status')}
+    try:
+        ToolsInstallerService(repo_root=REPO_ROOT).build_plan(instance, tools, hints)
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+
+    job_id = job_queue.submit(
+        'install',
+        [JobTarget(instance=instance, tools=tools, hints=hints)],
+        {
+            'pipelined': bool(payload.get('pipelined')),
+            'force': bool(payload.get('force')),
+            'bundled': bool(payload.get('bundled')),
+            'dag': bool(payload.get('dag')),
+            'engine': payload.get('engine') or 'threads',
+        },
+    )
+    stream = InstallStream(lambda on_event: job_queue.follow(job_id, on_event)).start()
 
-    def generate():
-        yield 'data: Starting installation...\n\n'
-        for t in tools:
-            yield f'data: Installing {t}...\n\n'
-            # simulate work
-            import time
-            time.sleep(0.5)
-            yield f'data: {t} installed successfully\n\n'
-        # mark tools as installed
-        if instance:
-            store = _read_tools_store()
-            entry = store.get(instance, {})
-            installed = entry.get('installed', [])
-            for t in tools:
-                if t not in installed:
-                    installed.append(t)
-            entry['installed'] = installed
-            entry['tools'] = list(set(entry.get('tools', []) + tools))
-            store[instance] = entry
-            _write_tools_store(store)
-
-        yield 'data: Installation completed\n\n'
-
-    return Response(generate(), mimetype='text/event-stream')
+    return Response(
+        stream.sse(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Job-Id': job_id},
+    )
 
 
 @app.route('/api/uninstall_tool_from_instance', methods=['POST'])
@@ -115,20 +233,110 @@ def api_uninstall_tool_from_instance():
     tool = payload.get('tool')
     if not instance or not tool:
         return jsonify({"status": "error", "msg": "instance and tool required"}), 400
-    store = _read_tools_store()
-    entry = store.get(instance, {})
-    tools = entry.get('tools', [])
-    installed = entry.get('installed', [])
-    if tool in tools:
-        tools = [t for t in tools if t != tool]
-    if tool in installed:
-        installed = [t for t in installed if t != tool]
-    entry['tools'] = tools
-    entry['installed'] = installed
-    store[instance] = entry
-    _write_tools_store(store)
+
+    def remove(entry):
+        entry['tools'] = [t for t in entry.get('tools', []) if t != tool]
+        entry['installed'] = [t for t in entry.get('installed', []) if t != tool]
+
+    tools_store.update_instance(instance, remove)
     return jsonify({"status": "success", "exit_code": 0})
 
 
+def _bulk_operations(payload):
+    """Validate {"operations": [{"instance": ..., "tools": [...]}, ...]} and merge repeated instances."""
+    operations = payload.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("operations must be a non-empty list of {instance, tools}")
+    merged = {}
+    for op in operations:
+        if not isinstance(op, dict) or not op.get('instance'):
+            raise ValueError("every operation needs an instance")
+        tools = op.get('tools') or []
+        if not isinstance(tools, list) or not all(isinstance(t, str) and t for t in tools):
+            raise ValueError(f"tools for {op['instance']} must be a list of tool names")
+        entry = merged.setdefault(op['instance'], {'tools': [], 'hints': {}})
+        entry['tools'].extend(t for t in tools if t not in entry['tools'])
+        entry['hints'].update(op.get('hints') or {})
+    return merged
+
+
+def _submit_bulk_job(kind, merged, options):
+    targets = [
+        JobTarget(instance=instance, tools=op['tools'], hints=op['hints'])
+        for instance, op in merged.items() if op['tools']
+    ]
+    if not targets:
+        return None
+    return job_queue.submit(kind, targets, options)
+
+
+@app.route('/api/bulk/assign_tools', methods=['POST'])
+def api_bulk_assign_tools():
+    # Assign tools to many instances in one store transaction:
+    #   {"operations": [{"instance": "vm1", "tools": ["suricata", "wazuh"]}, ...],
+    #    "mode": "add" | "set",   # add to the current tools (default) or replace them
+    #    "install": true,         # optional: one combined background install job
+    #    "options": {...}}        # job options (max_workers, pipelined, bundled, dag, engine, deadline, force,
+    #                             #   parallel_probe, max_per_host, max_concurrency, phase_timeouts,
+    #                             #   golden_images)
+    payload = request.get_json(silent=True) or {}
+    mode = payload.get('mode', 'add')
+    if mode not in ('add', 'set'):
+        return jsonify({"status": "error", "msg": "mode must be add or set"}), 400
+    try:
+        merged = _bulk_operations(payload)
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+
+    with tools_store.transaction() as data:
+        for instance, op in merged.items():
+            entry = data.setdefault(instance, {})
+            if mode == 'set':
+                entry['tools'] = list(op['tools'])
+            else:
+                current = entry.setdefault('tools', [])
+                current.extend(t for t in op['tools'] if t not in current)
+
+    if payload.get('install'):
+        job_id = _submit_bulk_job('install', merged, payload.get('options'))
+        if job_id is None:
+            # the assignment was applied, but no operation has tools to install
+            return jsonify({"status": "noop", "instances": len(merged), "msg": "no tools to install"})
+        return jsonify({"status": "ok", "instances": len(merged), "job_id": job_id}), 202
+    return jsonify({"status": "ok", "instances": len(merged), "job_id": None})
+
+
+@app.route('/api/bulk/uninstall_tools', methods=['POST'])
+def api_bulk_uninstall_tools():
+    # Uninstall tools from many instances:
+    #   {"operations": [{"instance": "vm1", "tools": ["wazuh"]}, ...],
+    #    "run": true,      # optional: one combined background uninstall job
+    #    "options": {...}}
+    # Without run the tools are only removed from the store (one transaction),
+    # like /api/uninstall_tool_from_instance. With run the store is updated when
+    # the job finishes, and only for the tools that were really removed.
+    payload = request.get_json(silent=True) or {}
+    try:
+        merged = _bulk_operations(payload)
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+
+    if payload.get('run'):
+        job_id = _submit_bulk_job('uninstall', merged, payload.get('options'))
+        if job_id is None:
+            return jsonify({"status": "noop", "instances": len(merged), "msg": "no tools to uninstall"})
+        return jsonify({"status": "queued", "instances": len(merged), "job_id": job_id}), 202
+
+    with tools_store.transaction() as data:
+        for instance, op in merged.items():
+            if instance not in data:
+                continue
+            entry = data[instance]
+            entry['tools'] = [t for t in entry.get('tools', []) if t not in op['tools']]
+            entry['installed'] = [t for t in entry.get('installed', []) if t not in op['tools']]
+    return jsonify({"status": "success", "instances": len(merged)})
+
+
 if __name__ == '__main__':
+    start_job_queue()
     app.run(host='127.0.0.1', port=5001)
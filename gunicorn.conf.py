@@ -0,0 +1,29 @@
+# Loaded by start_dashboard.sh (gunicorn -c gunicorn.conf.py).
+from pathlib import Path
+
+METRICS_DIR = Path(__file__).resolve().parent / "state" / "metrics"
+
+
+def on_starting(server):
+    # Metric dumps of the previous dashboard run would otherwise be added to
+    # this run's totals (see MetricsRegistry.share).
+    from src.services.metrics import MetricsRegistry
+
+    MetricsRegistry.clear_shared(METRICS_DIR)
+
+
+def post_fork(server, worker):
+    # Each worker runs its own job dispatcher; jobs.json is shared under flock,
+    # so a job is only ever claimed by one worker. Each worker also dumps its
+    # metrics to state/metrics/ so /metrics reports the total of all workers.
+    import app
+
+    app.start_job_queue()
+    app.share_metrics()
+
+
+def worker_exit(server, worker):
+    # Keep the worker's final counters; its gauges stop counting.
+    from src.services.metrics import REGISTRY
+
+    REGISTRY.stop_sharing()
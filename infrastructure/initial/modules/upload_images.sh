@@ -5,6 +5,13 @@ SCRIPT_DIR="$(dirname "$0")"
 source "$SCRIPT_DIR/log_utils.sh"
 
 CONFIG="$1"
+REPO_ROOT="$(cd "$SCRIPT_DIR/../../.." && pwd -P)"
+
+# image engine: "python" (parallel, resumable and checksum-verified downloads
+# with uploads to Glance as each download finishes, src/services/image_pipeline.py)
+# or "bash" (sequential wget + openstack CLI). python falls back to bash when
+# there are no API credentials in the environment.
+IMAGE_ENGINE="${IMAGE_ENGINE:-python}"
 
 upload=$(jq -r '.images.upload' "$CONFIG")
 if [ "$upload" != "true" ]; then
@@ -17,30 +24,54 @@ log "Uploading images to Glance"
 IMAGE_DIR="$HOME/openstack_images"
 mkdir -p "$IMAGE_DIR"
 
-jq -r '.images.list | to_entries[] | "\(.key)=\(.value)"' "$CONFIG" |
-while IFS="=" read -r name url; do
-    FILE="$IMAGE_DIR/${name}.qcow2"
-    
-    if [ ! -f "$FILE" ]; then
-        log "Downloading $name from $url"
-        if ! wget -q -O "$FILE" "$url" 2>/dev/null; then
-            log "WARNING: Failed to download $name"
-            continue
+upload_images_bash() {
+    jq -r '.images.list | to_entries[] | "\(.key)=\(.value | if type == "object" then .url else . end)"' "$CONFIG" |
+    while IFS="=" read -r name url; do
+        FILE="$IMAGE_DIR/${name}.qcow2"
+
+        if [ ! -f "$FILE" ]; then
+            log "Downloading $name from $url"
+            # download to .part so an interrupted transfer is resumed, never cached
+            if ! wget -q -c -O "$FILE.part" "$url" 2>/dev/null; then
+                log "WARNING: Failed to download $name"
+                continue
+            fi
+            mv "$FILE.part" "$FILE"
+        else
+            log "Image file already cached: $name"
+        fi
+
+        if openstack image show "$name" >/dev/null 2>&1; then
+            log "Image already exists in Glance: $name"
+        else
+            log "Uploading $name to Glance"
+            openstack image create "$name" \
+              --disk-format qcow2 \
+              --container-format bare \
+              --file "$FILE" \
+              --public || log "WARNING: Failed to upload $name"
+        fi
+    done
+}
+
+case "$IMAGE_ENGINE" in
+    python)
+        rc=0
+        (cd "$REPO_ROOT" && python3 -m src.entrypoints.cli.upload_images_cli "$CONFIG" \
+            --image-dir "$IMAGE_DIR" 2> >(tee -a "$LOG_FILE" >&2) > "$LOG_DIR/upload_images_report.json") || rc=$?
+        if [ "$rc" -eq 3 ]; then
+            log "No API credentials for Glance, using the bash engine"
+            upload_images_bash
+        elif [ "$rc" -ne 0 ]; then
+            log "WARNING: Some images failed (see $LOG_DIR/upload_images_report.json)"
         fi
-    else
-        log "Image file already cached: $name"
-    fi
-
-    if openstack image show "$name" >/dev/null 2>&1; then
-        log "Image already exists in Glance: $name"
-    else
-        log "Uploading $name to Glance"
-        openstack image create "$name" \
-          --disk-format qcow2 \
-          --container-format bare \
-          --file "$FILE" \
-          --public || log "WARNING: Failed to upload $name"
-    fi
-done
+        ;;
+    bash)
+        upload_images_bash
+        ;;
+    *)
+        abort "Unknown image engine: $IMAGE_ENGINE (expected python or bash)"
+        ;;
+esac
 
 log "Image upload phase completed"
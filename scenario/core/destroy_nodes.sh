@@ -47,9 +47,14 @@ fi
 NODE_COUNT=$(jq '. | length' "$SUMMARY_JSON")
 log_info "Found $NODE_COUNT nodes to destroy"
 
+REPO_ROOT="$(cd "$BASE_DIR/.." && pwd -P)"
+DELETED_SERVERS=()
+PORTS=()
+
+# 1) floating IPs and servers of every node (server deletions run in parallel on Nova)
 while read -r node; do
-    id=$(echo "$node" | jq -r '.id')
     name=$(echo "$node" | jq -r '.name')
+    server_id=$(echo "$node" | jq -r '.server_id')
     fip=$(echo "$node" | jq -r '.floating_ip')
     port_name=$(echo "$node" | jq -r '.port_name')
 
@@ -63,34 +68,62 @@ while read -r node; do
         log_info "Floating IP already gone or not defined"
     fi
 
-    # Delete server
+    # Delete server (without waiting, see below)
     if openstack server show "$name" >/dev/null 2>&1; then
         log_info "Deleting server: $name"
-        openstack server delete "$name" 2>&1 || log_warn "Failed to delete server"
+        if openstack server delete "$name" 2>&1; then
+            if [ -n "$server_id" ] && [ "$server_id" != "null" ]; then
+                DELETED_SERVERS+=("$server_id")
+            else
+                DELETED_SERVERS+=("$name")
+            fi
+        else
+            log_warn "Failed to delete server"
+        fi
     else
         log_info "Server already deleted"
     fi
 
-    # Wait for server to be fully deleted
-    log_info "Waiting for server deletion to complete"
-    for i in {1..30}; do
-        if ! openstack server show "$name" >/dev/null 2>&1; then
-            log_info "Server fully deleted"
-            break
-        fi
-        sleep 2
-    done
+    if [ -n "$port_name" ] && [ "$port_name" != "null" ]; then
+        PORTS+=("$port_name")
+    fi
 
-    # Delete port
-    if [ -n "$port_name" ] && [ "$port_name" != "null" ] && openstack port show "$port_name" >/dev/null 2>&1; then
+done < <(jq -c '.[]' "$SUMMARY_JSON")
+
+# 2) wait for all deletions at once: one server list per tick instead of one
+#    server show per node every 2 seconds
+if [ ${#DELETED_SERVERS[@]} -gt 0 ]; then
+    log_section "Waiting for ${#DELETED_SERVERS[@]} server deletions to complete"
+    if command -v python3 >/dev/null 2>&1; then
+        (cd "$REPO_ROOT" && python3 -m src.entrypoints.cli.wait_servers_cli \
+            --until DELETED --fail "" --timeout 60 "${DELETED_SERVERS[@]}") > "$OUTDIR/destroy_wait.json" \
+            && log_info "Servers fully deleted" \
+            || log_warn "Some servers were still present after 60s (see $OUTDIR/destroy_wait.json)"
+    else
+        for i in {1..30}; do
+            remaining=0
+            for server in "${DELETED_SERVERS[@]}"; do
+                if openstack server show "$server" >/dev/null 2>&1; then
+                    remaining=$((remaining+1))
+                fi
+            done
+            if [ "$remaining" -eq 0 ]; then
+                log_info "Servers fully deleted"
+                break
+            fi
+            sleep 2
+        done
+    fi
+fi
+
+# 3) ports, once their servers are gone
+for port_name in ${PORTS[@]+"${PORTS[@]}"}; do
+    if openstack port show "$port_name" >/dev/null 2>&1; then
         log_info "Deleting port: $port_name"
         openstack port delete "$port_name" 2>&1 || log_warn "Failed to delete port"
     else
-        log_info "Port already deleted or not defined"
+        log_info "Port already deleted or not defined: $port_name"
     fi
-
-    log_info "Node $name destroyed"
-
-done < <(jq -c '.[]' "$SUMMARY_JSON")
+done
 
 log_info "All nodes processed"
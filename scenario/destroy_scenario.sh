@@ -6,6 +6,10 @@ BASE_DIR="$SCRIPT_DIR"
 CORE_DIR="$BASE_DIR/core"
 STATE_DIR_RAW="state"
 STATE_DIR="$(cd "$BASE_DIR" >/dev/null && echo "$BASE_DIR/$STATE_DIR_RAW")"
+REPO_ROOT="$(cd "$BASE_DIR/.." && pwd -P)"
+# python: parallel, dependency-ordered teardown (src/services/scenario_teardown_service.py)
+# bash:   sequential core/destroy_nodes.sh
+SCENARIO_ENGINE="${SCENARIO_ENGINE:-python}"
 
 mkdir -p "$STATE_DIR"
 
@@ -50,7 +54,29 @@ on_error() {
 
 trap on_error ERR
 
-if ! bash "$CORE_DIR/destroy_nodes.sh" "$STATE_DIR"; then
+destroy_nodes() {
+    case "$SCENARIO_ENGINE" in
+        python)
+            if [[ ! -f "$STATE_DIR/summary.json" ]]; then
+                log_warn "summary.json not found. Nothing to destroy."
+                return 0
+            fi
+            log_info "Destroying nodes in parallel (python engine)"
+            # the per-resource report is also written to $STATE_DIR/teardown_report.json
+            (cd "$REPO_ROOT" && python3 -m src.entrypoints.cli.teardown_scenario_cli \
+                "$STATE_DIR/summary.json" --state-dir "$STATE_DIR") > /dev/null
+            ;;
+        bash)
+            bash "$CORE_DIR/destroy_nodes.sh" "$STATE_DIR"
+            ;;
+        *)
+            log_error "Unknown scenario engine: $SCENARIO_ENGINE (expected python or bash)"
+            return 2
+            ;;
+    esac
+}
+
+if ! destroy_nodes; then
     write_status "error" "destroy_failed"
     log_error "Node destruction failed"
     exit 1
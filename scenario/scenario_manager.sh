@@ -29,6 +29,12 @@ resolve_path() {
 # defaults (can be overridden via flags)
 SCENARIO_JSON_RAW="configs/scenario_file.json"
 DRY_RUN=0
+# node creation engine: "python" (parallel, src/services/scenario_provisioning_service.py)
+# or "bash" (core/generate_nodes.sh, one node at a time)
+SCENARIO_ENGINE="${SCENARIO_ENGINE:-python}"
+# reconcile: only create/delete/replace the nodes that changed since the last deployment
+RECONCILE=0
+REPO_ROOT="$(cd "$BASE_DIR/.." && pwd -P)"
 
 usage() {
     cat <<EOF
@@ -39,6 +45,12 @@ Options:
   -n, --dry-run     Do not perform actions, validate only
   -s, --state DIR   State directory (default: $STATE_DIR)
   --log FILE        Log file path (default: state/logs/scenario_manager.log)
+  --engine NAME     Node creation engine: python (default) or bash
+  --reconcile       Apply only the changes against state/summary.json
+                    (with --dry-run, write the plan to state/reconcile_plan.json)
+
+Environment:
+  SCENARIO_ENGINE   Same as --engine
 
 SCENARIO_JSON can be a path to the scenario JSON (default: configs/scenario_file.json)
 EOF
@@ -63,6 +75,14 @@ while [[ $# -gt 0 ]]; do
             LOG_FILE="$2"
             shift 2
             ;;
+        --engine)
+            SCENARIO_ENGINE="$2"
+            shift 2
+            ;;
+        --reconcile)
+            RECONCILE=1
+            shift
+            ;;
         --)
             shift
             break
@@ -213,8 +233,53 @@ if ! bash "$CORE_DIR/validate_scenario.sh" "$SCENARIO_JSON"; then
     exit 1
 fi
 
-if [[ $DRY_RUN -eq 0 ]]; then
-    if ! bash "$CORE_DIR/generate_nodes.sh" "$SCENARIO_JSON" "$STATE_DIR"; then
+generate_nodes() {
+    case "$SCENARIO_ENGINE" in
+        python)
+            log_info "Creating nodes in parallel (python engine)"
+            (cd "$REPO_ROOT" && python3 -m src.entrypoints.cli.provision_scenario_cli "$SCENARIO_JSON" \
+                --state-dir "$STATE_DIR" \
+                --summary-file "$STATE_DIR/summary.tmp.json") > "$STATE_DIR/provisioning_report.json" || {
+                local rc=$?
+                # keep the nodes that were created so destroy_scenario.sh can remove them
+                if [[ -f "$STATE_DIR/summary.tmp.json" ]]; then
+                    mv -f "$STATE_DIR/summary.tmp.json" "$STATE_DIR/summary.json"
+                    log_warn "Partial summary kept for cleanup: $STATE_DIR/summary.json"
+                fi
+                return $rc
+            }
+            ;;
+        bash)
+            bash "$CORE_DIR/generate_nodes.sh" "$SCENARIO_JSON" "$STATE_DIR"
+            ;;
+        *)
+            log_error "Unknown scenario engine: $SCENARIO_ENGINE (expected python or bash)"
+            return 2
+            ;;
+    esac
+}
+
+reconcile_nodes() {
+    local mode=()
+    local output="$STATE_DIR/reconcile_report.json"
+    if [[ $DRY_RUN -eq 1 ]]; then
+        mode=(--dry-run)
+        output="$STATE_DIR/reconcile_plan.json"
+    fi
+    log_info "Reconciling scenario against $STATE_DIR/summary.json"
+    # the reconciler updates summary.json itself after each phase
+    (cd "$REPO_ROOT" && python3 -m src.entrypoints.cli.reconcile_scenario_cli "$SCENARIO_JSON" \
+        --state-dir "$STATE_DIR" ${mode[@]+"${mode[@]}"}) > "$output"
+}
+
+if [[ $RECONCILE -eq 1 ]]; then
+    if ! reconcile_nodes; then
+        write_deploy_status "error" "reconcile_failed"
+        log_error "Scenario reconcile failed (see $STATE_DIR/reconcile_report.json)"
+        exit 1
+    fi
+elif [[ $DRY_RUN -eq 0 ]]; then
+    if ! generate_nodes; then
         write_deploy_status "error" "generation_failed"
         log_error "Node generation failed"
         exit 1
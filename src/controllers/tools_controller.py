@@ -1,18 +1,132 @@
-from flask import Blueprint, jsonify
+import json
+from flask import Blueprint, Response, abort, current_app, jsonify, request
 from pathlib import Path
 
+from src.models.jobs import JobTarget
+from src.services.install_stream import InstallStream
+from src.services.metrics import SSE_STREAMS_OPEN
+from src.services.phase_timer import TimingsLog
 from src.services.tools_installer_service import ToolsInstallerService
 
 tools_bp = Blueprint("tools", __name__)
 
 
+def _record(results) -> None:
+    """Guarda los resultados (y las herramientas instaladas) en el almacén de la app, si hay uno."""
+    store = current_app.config.get("TOOLS_STORE")
+    if store is not None:
+        store.record_results(results, kind="install")
+
+
 @tools_bp.route("/api/tools/install", methods=["POST"])
 def install_tools():
     """
     Endpoint que recorre todos los *_tools.json en tools-installer-tmp
     y lanza la instalación de herramientas en las instancias.
+    Con {"force": true} se reinstalan también las ya instaladas.
     """
     repo_root = Path(__file__).resolve().parents[2]
     service = ToolsInstallerService(repo_root=repo_root)
-    results = service.run_all_plans()
+    force = bool((request.get_json(silent=True) or {}).get("force"))
+    results = service.run_all_plans(force=force)
+    _record(results)
     return jsonify(results), 200
+
+
+@tools_bp.route("/api/tools/install/stream", methods=["POST"])
+def install_tools_stream():
+    """
+    Igual que /api/tools/install, pero la instalación se encola como un
+    trabajo de la JobQueue y su progreso (inicio/fin por herramienta y líneas
+    de log) se envía como Server-Sent Events a medida que ocurre.
+    """
+    queue = _job_queue()
+    force = bool((request.get_json(silent=True) or {}).get("force"))
+    job_id = queue.submit("install", None, {"force": force})
+    stream = InstallStream(lambda on_event: queue.follow(job_id, on_event)).start()
+    return Response(
+        stream.sse(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Job-Id": job_id},
+    )
+
+
+@tools_bp.route("/api/tools/timings", methods=["GET"])
+def tools_timings():
+    """
+    p50/p95 por herramienta y por fase (state/timings.jsonl).
+    Parámetros opcionales: kind=install|uninstall y last=N (últimos N resultados).
+    """
+    repo_root = Path(__file__).resolve().parents[2]
+    kind = request.args.get("kind") or None
+    if kind not in (None, "install", "uninstall"):
+        return jsonify({"error": "kind debe ser install o uninstall"}), 400
+    last = request.args.get("last", type=int)
+    return jsonify(TimingsLog(repo_root / "state" / "timings.jsonl").summary(kind, last)), 200
+
+
+def _job_queue():
+    queue = current_app.config.get("JOB_QUEUE")
+    if queue is None:
+        abort(503, description="La cola de trabajos no está disponible")
+    return queue
+
+
+@tools_bp.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """
+    Encola una instalación o desinstalación y responde al momento con su id.
+
+    Cuerpo JSON:
+      {"kind": "install" | "uninstall",
+       "targets": [{"instance": "...", "tools": ["..."], "hints": {...}}],  # opcional
+       "options": {"max_workers": N, "pipelined": true, "force": true}}      # opcional
+
+    Sin targets se procesan todos los planes de tools-installer-tmp.
+    """
+    data = request.get_json(silent=True) or {}
+    targets = data.get("targets")
+    if targets is not None:
+        if not isinstance(targets, list) or not all(isinstance(t, dict) and t.get("instance") for t in targets):
+            return jsonify({"error": "targets debe ser una lista de {instance, tools}"}), 400
+        targets = [
+            JobTarget(instance=t["instance"], tools=list(t.get("tools") or []), hints=dict(t.get("hints") or {}))
+            for t in targets
+        ]
+    try:
+        job_id = _job_queue().submit(data.get("kind", "install"), targets, data.get("options"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+
+@tools_bp.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify(_job_queue().list()), 200
+
+
+@tools_bp.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = _job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job), 200
+
+
+@tools_bp.route("/api/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Resultados por herramienta y cambios de estado del trabajo como Server-Sent Events."""
+    queue = _job_queue()
+    if queue.get(job_id) is None:
+        return jsonify({"error": "job not found"}), 404
+
+    def generate():
+        with SSE_STREAMS_OPEN.track(stream="job"):
+            for event in queue.subscribe(job_id):
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,33 @@
+from pathlib import Path
+import argparse
+import json
+from dataclasses import asdict
+from src.services.golden_image_cache import GoldenImageCache
+from src.services.openstack_backend import load_openrc_env, open_openstack_backend
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Consulta y recorta la caché de golden images (state/golden_images.json)")
+    parser.add_argument("command", choices=("list", "stats", "evict"),
+                        help="list: entradas; stats: totales y aciertos; evict: aplica el presupuesto (LRU)")
+    parser.add_argument("--budget-gb", type=float,
+                        help="Presupuesto para evict (por defecto NICS_GOLDEN_BUDGET_GB o 100)")
+    parser.add_argument("--openrc", help="admin-openrc.sh a cargar (por defecto, el entorno actual)")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[3]
+    env = load_openrc_env(Path(args.openrc)) if args.openrc else None
+    cache = GoldenImageCache.for_repo(repo_root, open_openstack_backend(env))
+
+    if args.command == "list":
+        output = [asdict(e) for e in sorted(cache.entries(), key=lambda e: e.last_used_at, reverse=True)]
+    elif args.command == "stats":
+        output = cache.stats()
+    else:
+        budget = int(args.budget_gb * 1024 ** 3) if args.budget_gb is not None else None
+        output = {"evicted": [asdict(e) for e in cache.evict(budget)], "stats": cache.stats()}
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,146 @@
 from pathlib import Path
+import argparse
 import json
+import sys
+from src.models.tools import InstallerOptions
+from src.services.async_orchestrator import DEFAULT_MAX_CONCURRENCY, parse_phase_timeouts
+from src.services.job_queue import JobQueue
 from src.services.tools_installer_service import ToolsInstallerService
+from src.services.tools_store import open_tools_store
+
+
+def _log_event(event) -> None:
+    if event["event"] == "critical_path":
+        steps = " -> ".join(f"{s['instance']}/{s['tool']} ({s['seconds']}s)" for s in event["path"])
+        print(f"[INFO] Critical path ({event['seconds']}s of {event['makespan']}s): {steps or '-'}", file=sys.stderr)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Instala las herramientas definidas en tools-installer-tmp")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Número máximo de instancias procesadas en paralelo (por defecto 1, secuencial)",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Copia, ejecuta y valida cada herramienta en un único round-trip SSH",
+    )
+    parser.add_argument(
+        "--bundled",
+        action="store_true",
+        help="Envía a cada instancia un único paquete comprimido con todos sus instaladores y lo ejecuta en una orden",
+    )
+    parser.add_argument(
+        "--dag",
+        action="store_true",
+        help="Ordena las herramientas según los manifest.json de los instaladores (dependencias, también entre "
+             "instancias, y exclusividad) y las ejecuta en paralelo entre todas las instancias",
+    )
+    parser.add_argument(
+        "--parallel-probe",
+        action="store_true",
+        help="Prueba a la vez todos los usuarios SSH candidatos y usa el primero que responda",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("threads", "async"),
+        default="threads",
+        help="threads: un hilo por instancia; async: todas las instancias en un bucle asyncio con "
+             "--max-concurrency órdenes remotas en vuelo como máximo",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f"Órdenes remotas simultáneas en total con --engine async (por defecto {DEFAULT_MAX_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--max-per-host",
+        type=int,
+        default=1,
+        help="Órdenes remotas simultáneas por instancia con --engine async (por defecto 1)",
+    )
+    parser.add_argument(
+        "--phase-timeout",
+        action="append",
+        default=[],
+        metavar="FASE=SEGUNDOS",
+        help="Límite de una fase con --engine async (probe, precheck, upload, exec, validate, marker); repetible",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Límite en segundos de toda la ejecución con --engine async; lo pendiente queda como cancelled",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reinstala también las herramientas que ya están instaladas con el instalador actual",
+    )
+    parser.add_argument(
+        "--golden-images",
+        action="store_true",
+        help="Guarda como golden image cada instancia que termine bien (igual que NICS_GOLDEN_IMAGES=1)",
+    )
+    parser.add_argument(
+        "--submit",
+        action="store_true",
+        help="Encola la ejecución en la cola de trabajos del dashboard (state/jobs.json) y termina",
+    )
+    args = parser.parse_args()
+
     repo_root = Path(__file__).resolve().parents[3]  # sube desde src/entrypoints/cli
-    service = ToolsInstallerService(repo_root=repo_root)
-    results = service.run_all_plans()
+    try:
+        phase_timeouts = parse_phase_timeouts(args.phase_timeout)
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.submit:
+        # el trabajo lo ejecuta el dashboard: todas las opciones viajan en el trabajo
+        queue = JobQueue.for_repo(repo_root)
+        options = {
+            "max_workers": args.max_workers,
+            "pipelined": args.pipelined,
+            "bundled": args.bundled,
+            "dag": args.dag,
+            "force": args.force,
+            "engine": args.engine,
+            "deadline": args.deadline,
+            "parallel_probe": args.parallel_probe,
+            "max_per_host": args.max_per_host,
+            "max_concurrency": args.max_concurrency,
+            "phase_timeouts": phase_timeouts,
+            "golden_images": True if args.golden_images else None,
+        }
+        print(json.dumps({"job_id": queue.submit("install", options=options)}, indent=2))
+        return
+
+    try:
+        service = ToolsInstallerService(repo_root, InstallerOptions(
+            parallel_ssh_probe=args.parallel_probe,
+            max_per_host=args.max_per_host,
+            max_concurrency=args.max_concurrency,
+            phase_timeouts=phase_timeouts,
+            use_golden_images=True if args.golden_images else None,
+        ))
+        results = service.run_all_plans(
+            max_workers=args.max_workers,
+            pipelined=args.pipelined,
+            force=args.force,
+            bundled=args.bundled,
+            dag=args.dag,
+            engine=args.engine,
+            deadline=args.deadline,
+            on_event=_log_event,
+        )
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    # estado por herramienta e instaladas visibles desde el dashboard
+    open_tools_store(repo_root / "state").record_results(results, kind="install")
     print(json.dumps(results, indent=2))
 
 
@@ -0,0 +1,20 @@
+from pathlib import Path
+import argparse
+import json
+from src.services.tools_store_sqlite import SqliteToolsStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migra state/tools_store.json al backend SQLite")
+    parser.add_argument("--force", action="store_true", help="Vuelve a importar aunque ya se haya migrado")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[3]
+    state_dir = repo_root / "state"
+    store = SqliteToolsStore(state_dir / "tools_store.db")
+    imported = store.migrate_from_json(state_dir / "tools_store.json", only_once=not args.force)
+    print(json.dumps({"database": str(store.path), "imported_instances": imported}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
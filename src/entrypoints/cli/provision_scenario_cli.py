@@ -0,0 +1,67 @@
+from pathlib import Path
+import argparse
+import json
+import sys
+from src.services.golden_image_cache import GoldenImageCache
+from src.services.openstack_backend import load_openrc_env, open_openstack_backend
+from src.services.scenario_provisioning_service import (
+    ScenarioProvisioningError,
+    ScenarioProvisioningService,
+    provisioning_report,
+)
+
+
+def _log_event(event) -> None:
+    """Progreso en el mismo formato que scenario/core/log_utils.sh (por stderr)."""
+    kind = event["event"]
+    if kind == "node_created":
+        golden = f", golden image {event['golden_image']}" if event.get("golden_image") else ""
+        print(f"[INFO] Server created: {event['node']} ({event['server_id']}{golden})", file=sys.stderr)
+    elif kind == "node_status":
+        print(f"[INFO] {event['node']}: {event['status']}", file=sys.stderr)
+    elif kind == "node_active":
+        print(f"[INFO] Instance {event['node']} is ACTIVE after {event['seconds']}s", file=sys.stderr)
+    elif kind == "node_ready":
+        print(f"[INFO] Node {event['node']} ready at {event['floating_ip']}", file=sys.stderr)
+    elif kind == "node_failed":
+        print(f"[ERROR] Node {event['node']} failed: {event['error']}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Crea en paralelo los nodos de un escenario y escribe summary.json")
+    parser.add_argument("scenario", nargs="?", help="JSON del escenario (por defecto scenario/configs/scenario_file.json)")
+    parser.add_argument("--state-dir", help="Directorio de estado (por defecto scenario/state)")
+    parser.add_argument("--summary-file", help="Fichero de salida (por defecto <state-dir>/summary.json)")
+    parser.add_argument("--max-workers", type=int, default=8, help="Llamadas simultáneas a OpenStack (por defecto 8)")
+    parser.add_argument("--timeout", type=float, default=240.0, help="Segundos máximos esperando ACTIVE (por defecto 240)")
+    parser.add_argument("--openrc", help="admin-openrc.sh a cargar (por defecto, el entorno actual)")
+    parser.add_argument("--golden-images", action="store_true",
+                        help="Arranca de su golden image los nodos que la tengan (igual que NICS_GOLDEN_IMAGES=1)")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[3]
+    env = load_openrc_env(Path(args.openrc)) if args.openrc else None
+    state_dir = Path(args.state_dir) if args.state_dir else None
+    backend = open_openstack_backend(env)
+    service = ScenarioProvisioningService(
+        repo_root=repo_root,
+        backend=backend,
+        scenario_path=Path(args.scenario) if args.scenario else None,
+        state_dir=state_dir,
+        max_workers=args.max_workers,
+        active_timeout=args.timeout,
+        golden_images=GoldenImageCache.for_repo(repo_root, backend) if args.golden_images else None,
+    )
+    summary_file = Path(args.summary_file) if args.summary_file else None
+
+    try:
+        items = service.provision(summary_path=summary_file, on_event=_log_event)
+    except ScenarioProvisioningError as e:
+        print(json.dumps(provisioning_report(e.nodes), indent=2))
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(provisioning_report(items), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from pathlib import Path
+import argparse
+import json
+import sys
+from dataclasses import asdict
+from src.entrypoints.cli.provision_scenario_cli import _log_event as _log_provisioning_event
+from src.entrypoints.cli.teardown_scenario_cli import _log_event as _log_teardown_event
+from src.services.openstack_backend import load_openrc_env, open_openstack_backend
+from src.services.scenario_provisioning_service import ScenarioProvisioningService
+from src.services.scenario_reconcile_service import ScenarioReconcileService, plan_counts
+from src.services.scenario_teardown_service import ScenarioTeardownService
+
+
+def _log_event(event) -> None:
+    if event["event"].startswith("node_"):
+        _log_provisioning_event(event)
+    else:
+        _log_teardown_event(event)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Aplica solo los cambios del escenario respecto a summary.json (crear, borrar o recrear nodos)")
+    parser.add_argument("scenario", nargs="?", help="JSON del escenario (por defecto scenario/configs/scenario_file.json)")
+    parser.add_argument("--state-dir", help="Directorio de estado (por defecto scenario/state)")
+    parser.add_argument("--dry-run", action="store_true", help="Muestra el plan sin aplicarlo")
+    parser.add_argument("--max-workers", type=int, default=8, help="Llamadas simultáneas a OpenStack (por defecto 8)")
+    parser.add_argument("--timeout", type=float, default=240.0, help="Segundos máximos esperando ACTIVE (por defecto 240)")
+    parser.add_argument("--openrc", help="admin-openrc.sh a cargar (por defecto, el entorno actual)")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[3]
+    env = load_openrc_env(Path(args.openrc)) if args.openrc else None
+    backend = open_openstack_backend(env)
+    state_dir = Path(args.state_dir) if args.state_dir else repo_root / "scenario" / "state"
+    service = ScenarioReconcileService(
+        repo_root=repo_root,
+        backend=backend,
+        state_dir=state_dir,
+        provisioning=ScenarioProvisioningService(
+            repo_root,
+            backend=backend,
+            scenario_path=Path(args.scenario) if args.scenario else None,
+            state_dir=state_dir,
+            max_workers=args.max_workers,
+            active_timeout=args.timeout,
+        ),
+        teardown=ScenarioTeardownService(repo_root, backend=backend, state_dir=state_dir, max_workers=args.max_workers),
+    )
+
+    actions = service.plan()
+    counts = plan_counts(actions)
+    print(f"[INFO] Plan: {counts['create']} to create, {counts['replace']} to replace, "
+          f"{counts['delete']} to delete, {counts['unchanged']} unchanged", file=sys.stderr)
+    for action in actions:
+        if action.action != "unchanged":
+            print(f"[INFO]   {action.action} {action.name}: {action.reason}", file=sys.stderr)
+
+    if args.dry_run:
+        print(json.dumps({"plan": [asdict(a) for a in actions], "counts": counts}, indent=2))
+        return
+
+    report = service.apply(actions, on_event=_log_event)
+    print(json.dumps(report, indent=2))
+    if report["status"] != "completed":
+        print(f"[ERROR] Could not reconcile: {', '.join(report['failed'])}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
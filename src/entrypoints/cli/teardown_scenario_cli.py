@@ -0,0 +1,51 @@
+from pathlib import Path
+import argparse
+import json
+import sys
+from src.services.openstack_backend import load_openrc_env, open_openstack_backend
+from src.services.scenario_teardown_service import ScenarioTeardownService
+
+
+def _log_event(event) -> None:
+    """Progreso en el mismo formato que scenario/core/log_utils.sh (por stderr)."""
+    kind = event["event"]
+    if kind == "group_started":
+        print(f"[INFO] Deleting {event['count']} {event['group']} resource(s)", file=sys.stderr)
+    elif kind == "resource_deleted":
+        print(f"[INFO] {event['kind']} {event['ref']}: {event['status']} ({event['seconds']}s)", file=sys.stderr)
+    elif kind == "resource_failed":
+        print(f"[ERROR] {event['kind']} {event['ref']} failed: {event['error']}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Destruye en paralelo los recursos de summary.json (IPs flotantes, servidores y puertos)")
+    parser.add_argument("summary", nargs="?", help="summary.json a destruir (por defecto <state-dir>/summary.json)")
+    parser.add_argument("--state-dir", help="Directorio de estado (por defecto scenario/state)")
+    parser.add_argument("--max-workers", type=int, default=8, help="Borrados simultáneos (por defecto 8)")
+    parser.add_argument("--retries", type=int, default=5, help="Reintentos ante conflictos transitorios (por defecto 5)")
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="Segundos máximos esperando a que desaparezcan los servidores (por defecto 120)")
+    parser.add_argument("--openrc", help="admin-openrc.sh a cargar (por defecto, el entorno actual)")
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parents[3]
+    env = load_openrc_env(Path(args.openrc)) if args.openrc else None
+    service = ScenarioTeardownService(
+        repo_root=repo_root,
+        backend=open_openstack_backend(env),
+        state_dir=Path(args.state_dir) if args.state_dir else None,
+        max_workers=args.max_workers,
+        retries=args.retries,
+        delete_timeout=args.timeout,
+    )
+
+    report = service.teardown(Path(args.summary) if args.summary else None, on_event=_log_event)
+    print(json.dumps(report, indent=2))
+    if report["status"] != "completed":
+        print(f"[ERROR] {len(report['failed'])} resource(s) could not be deleted", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
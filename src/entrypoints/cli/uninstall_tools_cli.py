@@ -1,12 +1,110 @@
 from pathlib import Path
+import argparse
 import json
+import sys
+from src.models.tools import InstallerOptions
+from src.services.async_orchestrator import DEFAULT_MAX_CONCURRENCY, parse_phase_timeouts
+from src.services.job_queue import JobQueue
+from src.services.tools_store import open_tools_store
 from src.services.tools_uninstaller_service import ToolsUninstallerService
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Desinstala las herramientas definidas en tools-installer-tmp")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Número máximo de instancias procesadas en paralelo (por defecto 1, secuencial)",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Copia, ejecuta y valida cada herramienta en un único round-trip SSH",
+    )
+    parser.add_argument(
+        "--parallel-probe",
+        action="store_true",
+        help="Prueba a la vez todos los usuarios SSH candidatos y usa el primero que responda",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("threads", "async"),
+        default="threads",
+        help="threads: un hilo por instancia; async: todas las instancias en un bucle asyncio con "
+             "--max-concurrency órdenes remotas en vuelo como máximo",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f"Órdenes remotas simultáneas en total con --engine async (por defecto {DEFAULT_MAX_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--max-per-host",
+        type=int,
+        default=1,
+        help="Órdenes remotas simultáneas por instancia con --engine async (por defecto 1)",
+    )
+    parser.add_argument(
+        "--phase-timeout",
+        action="append",
+        default=[],
+        metavar="FASE=SEGUNDOS",
+        help="Límite de una fase con --engine async (probe, precheck, upload, exec, validate, marker); repetible",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Límite en segundos de toda la ejecución con --engine async; lo pendiente queda como cancelled",
+    )
+    parser.add_argument(
+        "--submit",
+        action="store_true",
+        help="Encola la ejecución en la cola de trabajos del dashboard (state/jobs.json) y termina",
+    )
+    args = parser.parse_args()
+
     repo_root = Path(__file__).resolve().parents[3]
-    service = ToolsUninstallerService(repo_root=repo_root)
-    results = service.run_all_uninstall_plans()
+    try:
+        phase_timeouts = parse_phase_timeouts(args.phase_timeout)
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    if args.submit:
+        # el trabajo lo ejecuta el dashboard: todas las opciones viajan en el trabajo
+        queue = JobQueue.for_repo(repo_root)
+        options = {
+            "max_workers": args.max_workers,
+            "pipelined": args.pipelined,
+            "engine": args.engine,
+            "deadline": args.deadline,
+            "parallel_probe": args.parallel_probe,
+            "max_per_host": args.max_per_host,
+            "max_concurrency": args.max_concurrency,
+            "phase_timeouts": phase_timeouts,
+        }
+        print(json.dumps({"job_id": queue.submit("uninstall", options=options)}, indent=2))
+        return
+
+    try:
+        service = ToolsUninstallerService(repo_root, InstallerOptions(
+            parallel_ssh_probe=args.parallel_probe,
+            max_per_host=args.max_per_host,
+            max_concurrency=args.max_concurrency,
+            phase_timeouts=phase_timeouts,
+        ))
+        results = service.run_all_uninstall_plans(
+            max_workers=args.max_workers,
+            pipelined=args.pipelined,
+            engine=args.engine,
+            deadline=args.deadline,
+        )
+    except ValueError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
+    # herramientas desinstaladas fuera de la lista de la instancia en el dashboard
+    open_tools_store(repo_root / "state").record_results(results, kind="uninstall")
     print(json.dumps(results, indent=2))
 
 
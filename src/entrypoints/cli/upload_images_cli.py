@@ -0,0 +1,80 @@
+from pathlib import Path
+import argparse
+import json
+import os
+import sys
+from src.services.image_pipeline import ImagePipelineService
+from src.services.openstack_backend import load_openrc_env, use_api_transport
+
+# Código de salida cuando no hay credenciales para la API de Glance
+# (upload_images.sh recurre entonces a la versión con wget + CLI)
+EXIT_NO_API = 3
+
+
+def _log_event(event) -> None:
+    """Progreso en el mismo formato que infrastructure/initial/modules/log_utils.sh (por stderr)."""
+    kind = event["event"]
+    if kind == "image_downloaded":
+        print(f"[INFO] {event['image']}: {event['download']} ({event['seconds']}s), uploading", file=sys.stderr)
+    elif kind == "image_uploaded":
+        print(f"[INFO] {event['image']}: uploaded to Glance as {event['glance_id']} ({event['seconds']}s)",
+              file=sys.stderr)
+    elif kind == "image_skipped":
+        detail = f" - {event['detail']}" if event.get("detail") else ""
+        print(f"[INFO] {event['image']}: {event['status']} (download {event['download']}, "
+              f"upload {event['upload']}){detail}", file=sys.stderr)
+    elif kind == "image_failed":
+        print(f"[ERROR] {event['image']}: {event['status']}: {event['error']}", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Descarga en paralelo (reanudable y verificada) las imágenes de initial_config.json y las sube a Glance")
+    parser.add_argument("config", help="initial_config.json con la sección images.list")
+    parser.add_argument("--image-dir", help="Directorio de descargas y manifest.json (por defecto ~/openstack_images)")
+    parser.add_argument("--only", help="Nombres de imagen separados por comas (por defecto, todas)")
+    parser.add_argument("--max-downloads", type=int, default=3, help="Descargas simultáneas (por defecto 3)")
+    parser.add_argument("--max-uploads", type=int, default=2, help="Subidas simultáneas a Glance (por defecto 2)")
+    parser.add_argument("--retries", type=int, default=3, help="Reintentos por descarga, reanudando (por defecto 3)")
+    parser.add_argument("--download-only", action="store_true", help="Solo descargar y verificar, sin Glance")
+    parser.add_argument("--replace", action="store_true",
+                        help="Sustituir imágenes de Glance con el mismo nombre y otro contenido")
+    parser.add_argument("--visibility", default="public", help="Visibilidad en Glance (por defecto public)")
+    parser.add_argument("--openrc", help="admin-openrc.sh a cargar (por defecto, el entorno actual)")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    sources = ImagePipelineService.sources_from_config(config)
+    if args.only:
+        wanted = {n.strip() for n in args.only.split(",") if n.strip()}
+        sources = [s for s in sources if s.name in wanted]
+
+    glance = None
+    if not args.download_only:
+        env = load_openrc_env(Path(args.openrc)) if args.openrc else dict(os.environ)
+        if not use_api_transport(env):
+            print("[ERROR] Glance upload needs API credentials (OS_AUTH_URL/OS_PASSWORD)", file=sys.stderr)
+            sys.exit(EXIT_NO_API)
+        from src.services.openstack_client import shared_client
+
+        glance = shared_client(env)
+
+    service = ImagePipelineService(
+        image_dir=Path(args.image_dir) if args.image_dir else Path.home() / "openstack_images",
+        glance=glance,
+        max_downloads=args.max_downloads,
+        max_uploads=args.max_uploads,
+        retries=args.retries,
+        visibility=args.visibility,
+        replace=args.replace,
+    )
+    report = service.run(sources, on_event=_log_event)
+    print(json.dumps(report, indent=2))
+    if report["status"] != "completed":
+        print(f"[ERROR] {len(report['failed'])} image(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
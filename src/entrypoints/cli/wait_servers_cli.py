@@ -0,0 +1,49 @@
+from dataclasses import asdict
+from pathlib import Path
+import argparse
+import json
+import sys
+from src.services.openstack_backend import load_openrc_env, open_openstack_backend
+from src.services.server_status_watcher import ServerStatusWatcher
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Espera a que varios servidores lleguen a un estado con un único listado por iteración")
+    parser.add_argument("servers", nargs="+", help="Ids o nombres de los servidores")
+    parser.add_argument("--until", default="ACTIVE",
+                        help="Estados esperados separados por comas (DELETED = ya no existe). Por defecto ACTIVE")
+    parser.add_argument("--fail", default="ERROR", help="Estados que cuentan como fallo (por defecto ERROR)")
+    parser.add_argument("--timeout", type=float, default=240.0, help="Segundos máximos de espera (por defecto 240)")
+    parser.add_argument("--min-interval", type=float, default=1.0, help="Intervalo mínimo entre listados")
+    parser.add_argument("--max-interval", type=float, default=10.0, help="Intervalo máximo entre listados")
+    parser.add_argument("--openrc", help="admin-openrc.sh a cargar (por defecto, el entorno actual)")
+    args = parser.parse_args()
+
+    env = load_openrc_env(Path(args.openrc)) if args.openrc else None
+    watcher = ServerStatusWatcher(
+        open_openstack_backend(env).list_servers,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+    )
+
+    def on_change(server, old, new):
+        print(f"[INFO] {server}: {old or '-'} -> {new}", file=sys.stderr)
+
+    results = watcher.wait(
+        args.servers,
+        until=[s for s in args.until.split(",") if s],
+        fail=[s for s in args.fail.split(",") if s],
+        timeout=args.timeout,
+        on_change=on_change,
+    )
+    print(json.dumps({
+        "list_calls": watcher.list_calls,
+        "servers": [asdict(r) for r in results.values()],
+    }, indent=2))
+    if not all(r.reached for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
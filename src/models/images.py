@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+
+@dataclass
+class ImageSource:
+    """Imagen de infrastructure/initial/configs/initial_config.json (images.list)."""
+    name: str
+    url: str
+    sha256: Optional[str] = None  # huella esperada; si falta, se calcula al descargar
+    disk_format: str = "qcow2"
+
+    @classmethod
+    def from_config(cls, name: str, value: Union[str, Dict]) -> "ImageSource":
+        """Acepta la forma corta ("nombre": "url") y la larga ("nombre": {"url", "sha256", "disk_format"})."""
+        if isinstance(value, str):
+            return cls(name=name, url=value)
+        return cls(
+            name=name,
+            url=str(value["url"]),
+            sha256=(value.get("sha256") or None),
+            disk_format=str(value.get("disk_format") or "qcow2"),
+        )
+
+
+@dataclass
+class ImageResult:
+    """Resultado de la descarga y subida a Glance de una imagen."""
+    name: str
+    status: str = "pending"  # uploaded | already_present | stale | downloaded | *_failed | checksum_mismatch
+    download: str = "pending"  # downloaded | resumed | cached | skipped | failed
+    upload: str = "pending"  # uploaded | present | skipped | failed
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    glance_id: Optional[str] = None
+    download_seconds: Optional[float] = None
+    upload_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class GoldenImage:
+    """Snapshot de una instancia con un conjunto de herramientas ya instalado (ver GoldenImageCache)."""
+    key: str
+    image_id: str
+    image_name: str
+    base_image: str
+    tools: List[str]
+    installers: Dict[str, str]  # herramienta -> sha256 del instalador
+    status: str = "saving"  # saving | active
+    size: Optional[int] = None  # bytes (se conoce cuando la imagen está active)
+    source_server: Optional[str] = None
+    created_at: float = 0.0
+    last_used_at: float = 0.0
+    hits: int = 0
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "GoldenImage":
+        return cls(**{k: raw[k] for k in cls.__dataclass_fields__ if k in raw})
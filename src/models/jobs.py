@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class JobTarget:
+    """Instancia y herramientas sobre las que actúa un trabajo."""
+    instance: str
+    tools: List[str]
+    hints: Dict = field(default_factory=dict)
+
+
+@dataclass
+class Job:
+    """Trabajo de instalación/desinstalación gestionado por JobQueue."""
+    id: str
+    kind: str  # "install" | "uninstall"
+    targets: Optional[List[JobTarget]]  # None = todos los planes de tools-installer-tmp
+    instances: List[str]
+    options: Dict
+    status: str = "queued"  # queued | running | completed | failed
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    owner_pid: Optional[int] = None
+    owner_token: Optional[str] = None  # identifica el proceso concreto (pid + arranque), ver JobQueue
+    attempts: int = 0
+    results: List[Dict] = field(default_factory=list)
+    started_tools: List[Dict] = field(default_factory=list)  # {"instance", "tool", "log_file"} por herramienta empezada
+    error: Optional[str] = None
+    on_complete_error: Optional[str] = None  # fallo de on_complete; no cambia status
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "Job":
+        targets = raw.get("targets")
+        return cls(
+            id=str(raw["id"]),
+            kind=str(raw.get("kind", "install")),
+            targets=None if targets is None else [
+                JobTarget(instance=t["instance"], tools=list(t.get("tools", [])), hints=dict(t.get("hints") or {}))
+                for t in targets
+            ],
+            instances=list(raw.get("instances", [])),
+            options=dict(raw.get("options") or {}),
+            status=str(raw.get("status", "queued")),
+            created_at=float(raw.get("created_at") or 0.0),
+            started_at=raw.get("started_at"),
+            finished_at=raw.get("finished_at"),
+            owner_pid=raw.get("owner_pid"),
+            owner_token=raw.get("owner_token"),
+            attempts=int(raw.get("attempts") or 0),
+            results=list(raw.get("results") or []),
+            started_tools=list(raw.get("started_tools") or []),
+            error=raw.get("error"),
+            on_complete_error=raw.get("on_complete_error"),
+        )
@@ -0,0 +1,94 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class ScenarioNode:
+    """Nodo de scenario/configs/scenario_file.json."""
+    id: str
+    name: str
+    type: str
+    os: str
+    image: str
+    flavor: str
+    network: str
+    subnetwork: str
+    security_group: str
+    ssh_key: str
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "ScenarioNode":
+        props = raw.get("properties") or {}
+        return cls(
+            id=str(raw.get("id")),
+            name=str(raw.get("name")),
+            type=str(raw.get("type") or ""),
+            os=str(props.get("os") or ""),
+            image=str(props.get("image") or ""),
+            flavor=str(props.get("flavor") or ""),
+            network=str(props.get("network") or ""),
+            subnetwork=str(props.get("subnetwork") or ""),
+            security_group=str(props.get("securityGroup") or ""),
+            ssh_key=str(props.get("sshKey") or ""),
+        )
+
+    @property
+    def port_name(self) -> str:
+        """
+        Mismo nombre que genera generate_nodes.sh (`echo "$id" | tr -c '[:alnum:]_' '_'`):
+        caracteres no alfanuméricos -> '_', incluido el salto de línea final de echo.
+        """
+        safe = "".join(c if c.isalnum() or c == "_" else "_" for c in self.id + "\n")
+        return f"{safe}-port"
+
+    @property
+    def spec_hash(self) -> str:
+        """Huella de la definición del nodo: si cambia, hay que recrearlo."""
+        spec = json.dumps(asdict(self), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(spec.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class NodeProvisioning:
+    """Estado de aprovisionamiento de un nodo mientras se crea el escenario."""
+    node: ScenarioNode
+    port_id: Optional[str] = None
+    server_id: Optional[str] = None
+    floating_ip: Optional[str] = None
+    status: str = "pending"  # pending | building | active | ready | failed
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    image: Optional[str] = None  # imagen con la que arranca (la base o su golden image)
+    golden_image: Optional[str] = None  # hit | miss (None sin golden images)
+
+
+@dataclass
+class ServerWaitResult:
+    """Resultado de esperar a un servidor con ServerStatusWatcher."""
+    server: str  # id o nombre por el que se esperaba
+    status: str  # último estado visto (DELETED si ya no aparece en el listado)
+    reached: bool  # ha llegado a uno de los estados esperados
+    seconds: Optional[float]  # tiempo hasta el estado final (None si no lo alcanzó)
+
+
+@dataclass
+class ResourceTeardown:
+    """Resultado del borrado de un recurso del escenario."""
+    kind: str  # floating_ip | server | port
+    ref: str  # dirección, id o nombre usado para borrarlo
+    node: str
+    status: str = "pending"  # deleted | already_gone | failed
+    attempts: int = 0
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class ReconcileAction:
+    """Paso del plan de reconciliación entre scenario_file.json y summary.json."""
+    node_id: str
+    name: str
+    action: str  # create | delete | replace | unchanged
+    reason: str
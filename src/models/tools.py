@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 @dataclass
@@ -21,3 +21,116 @@ class ToolInstallPlan:
     instance: InstanceTarget
     tools: List[str]
     source_json: Path
+
+
+@dataclass
+class InstallerOptions:
+    """
+    Ajustes de ToolsInstallerService y ToolsUninstallerService. Las rutas en
+    None toman su valor por defecto dentro de repo_root.
+    """
+    tools_json_dir: Optional[Path] = None
+    installers_dir: Optional[Path] = None
+    logs_dir: Optional[Path] = None
+    admin_openrc: Optional[Path] = None
+    metadata_cache_path: Optional[Path] = None
+    timings_path: Optional[Path] = None
+    bundles_dir: Optional[Path] = None
+    parallel_ssh_probe: bool = False  # probar todos los usuarios candidatos a la vez
+    max_per_host: int = 1  # motor async: órdenes a la vez por instancia
+    max_concurrency: int = 64  # motor async: órdenes a la vez en total (DEFAULT_MAX_CONCURRENCY)
+    phase_timeouts: Optional[Dict[str, float]] = None  # motor async: límite en segundos por fase
+    use_golden_images: Optional[bool] = None  # None = según NICS_GOLDEN_IMAGES
+
+    @classmethod
+    def from_job_options(cls, raw: Dict) -> "InstallerOptions":
+        """Ajustes a partir de las opciones de un Job (ver JobQueue.submit)."""
+        return cls(
+            parallel_ssh_probe=bool(raw.get("parallel_probe", False)),
+            max_per_host=int(raw.get("max_per_host", 1)),
+            max_concurrency=int(raw.get("max_concurrency", 64)),
+            phase_timeouts=raw.get("phase_timeouts") or None,
+            use_golden_images=raw.get("golden_images"),
+        )
+
+
+@dataclass
+class InstanceMetadata:
+    """Metadatos cacheados de un servidor OpenStack (ver InstanceMetadataResolver)."""
+    id: str
+    name: str
+    image_name: str
+    ips: List[str]
+    ssh_user: Optional[str]
+    fetched_at: float
+
+    @classmethod
+    def from_dict(cls, raw: Dict) -> "InstanceMetadata":
+        return cls(
+            id=str(raw.get("id")),
+            name=str(raw.get("name")),
+            image_name=str(raw.get("image_name") or ""),
+            ips=list(raw.get("ips") or []),
+            ssh_user=raw.get("ssh_user"),
+            fetched_at=float(raw.get("fetched_at") or 0.0),
+        )
+
+
+@dataclass
+class InstallerBundle:
+    """Paquete tar.gz con los instaladores de un conjunto de herramientas (ver InstallerBundleBuilder)."""
+    digest: str  # sha256 del propio .tar.gz: nombre local y remoto del paquete
+    path: Path
+    tools: List[str]
+    fingerprints: Dict[str, str]  # herramienta -> sha256 de su install.sh (marcador remoto)
+    size: int
+
+
+@dataclass(frozen=True)
+class ToolNode:
+    """Nodo del grafo de instalación: una herramienta en una instancia (ver ToolGraph)."""
+    instance: str
+    tool: str
+
+    def __str__(self) -> str:
+        return f"{self.instance}/{self.tool}"
+
+
+@dataclass
+class ToolDependency:
+    """Dependencia declarada en el manifest.json de una herramienta."""
+    tool: str
+    instance: Optional[str] = None  # None = misma instancia; "*" = el resto de instancias; o un nombre concreto
+
+
+@dataclass
+class ToolManifest:
+    """
+    tools-installer/installers/<tool>/manifest.json:
+
+        {"depends_on": ["suricata", {"tool": "wazuh", "instance": "*"}],
+         "exclusive": false,
+         "conflicts": ["snort"]}
+
+    exclusive (por defecto true) impide que otra herramienta se instale a la
+    vez en la misma instancia; con false solo se serializa con las de conflicts.
+    """
+    tool: str
+    depends_on: List[ToolDependency] = field(default_factory=list)
+    exclusive: bool = True
+    conflicts: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, tool: str, raw: Dict) -> "ToolManifest":
+        depends_on = []
+        for dep in raw.get("depends_on") or []:
+            if isinstance(dep, str):
+                depends_on.append(ToolDependency(tool=dep.lower()))
+            else:
+                depends_on.append(ToolDependency(tool=str(dep["tool"]).lower(), instance=dep.get("instance")))
+        return cls(
+            tool=tool.lower(),
+            depends_on=depends_on,
+            exclusive=bool(raw.get("exclusive", True)),
+            conflicts=[str(t).lower() for t in raw.get("conflicts") or []],
+        )
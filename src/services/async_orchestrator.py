@@ -0,0 +1,229 @@
+import asyncio
+import os
+import signal
+import subprocess
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from src.models.tools import ToolInstallPlan
+from src.services.ssh_session_pool import Runner, SshSession
+
+# Versión asíncrona de Runner: await runner(cmd, **kwargs) -> CompletedProcess,
+# con los mismos kwargs que subprocess.run (input, stdout, stderr, text).
+AsyncRunner = Callable[..., Awaitable[subprocess.CompletedProcess]]
+
+# run_plan(plan, results): instala/desinstala un plan añadiendo a results cada
+# resultado según termina, para no perderlos si la ejecución se cancela.
+PlanCoroutine = Callable[[ToolInstallPlan, List[Dict]], Awaitable[None]]
+
+# Órdenes remotas en vuelo por defecto entre todas las instancias
+DEFAULT_MAX_CONCURRENCY = 64
+
+# Límite por defecto (segundos) de cada fase de una orden remota
+DEFAULT_PHASE_TIMEOUTS: Dict[str, float] = {
+    "probe": 30.0,
+    "precheck": 60.0,
+    "upload": 300.0,
+    "exec": 3600.0,
+    "validate": 120.0,
+    "marker": 60.0,
+}
+
+
+class PhaseTimeout(Exception):
+    """Una orden remota superó el límite de su fase (el proceso ssh/scp se mata)."""
+
+    def __init__(self, phase: str, seconds: float) -> None:
+        super().__init__(f"la fase {phase} superó el límite de {seconds}s")
+        self.phase = phase
+        self.seconds = seconds
+
+
+async def subprocess_runner(cmd: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+    """
+    Ejecuta cmd con asyncio.create_subprocess_exec, sin ocupar un hilo mientras
+    espera. Si la corrutina se cancela (timeout de fase o cancelación de la
+    ejecución) se mata su grupo de procesos antes de propagar la cancelación,
+    para que ningún hijo siga reteniendo stdout/stderr. La conexión maestra
+    de ControlPersist crea su propia sesión y no se ve afectada.
+    """
+    data = kwargs.get("input")
+    text = kwargs.get("text", False) or isinstance(data, str)
+    stdout = kwargs.get("stdout", subprocess.PIPE)
+    stderr = kwargs.get("stderr", subprocess.PIPE)
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=subprocess.PIPE if data is not None else subprocess.DEVNULL,
+        stdout=stdout,
+        stderr=stderr,
+        start_new_session=True,
+    )
+    try:
+        out, err = await proc.communicate(data.encode("utf-8") if isinstance(data, str) else data)
+    except BaseException:
+        if proc.returncode is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+        raise
+    if text:
+        out = out.decode("utf-8", errors="replace") if out is not None else None
+        err = err.decode("utf-8", errors="replace") if err is not None else None
+    if kwargs.get("check") and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, out, err)
+    return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+
+def threaded_runner(runner: Runner) -> AsyncRunner:
+    """
+    Adapta un Runner síncrono (p. ej. un fake inyectado en el servicio) al
+    núcleo asíncrono ejecutándolo en el pool de hilos por defecto. Un timeout
+    deja de esperarlo pero no puede interrumpirlo.
+    """
+    async def run(cmd: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+        return await asyncio.to_thread(runner, cmd, **kwargs)
+
+    return run
+
+
+class AsyncOrchestrator:
+    """
+    Núcleo asíncrono de las órdenes remotas de instalación/desinstalación.
+
+    - Todas las instancias avanzan a la vez en un único hilo (bucle asyncio);
+      cada orden ssh/scp es un subproceso asíncrono sobre la sesión
+      multiplexada de SshSession (ControlMaster).
+    - Un semáforo global limita las órdenes en vuelo (max_concurrency) y uno
+      por host las de cada instancia (per_host).
+    - Cada orden tiene el límite de su fase (timeouts); al superarlo se mata
+      el proceso y se lanza PhaseTimeout.
+    - run_plans acepta un deadline para toda la ejecución: lo que no ha
+      terminado se cancela (matando sus procesos) y queda como "cancelled".
+    """
+
+    def __init__(
+        self,
+        runner: AsyncRunner,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        per_host: int = 1,
+        timeouts: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.runner = runner
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host = max(1, per_host)
+        self.timeouts = dict(DEFAULT_PHASE_TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        # se crean dentro del bucle (ver run_plans)
+        self._global: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    # ------------------------------------------------------------------
+    # Órdenes remotas
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def _slot(self, host: str) -> AsyncIterator[None]:
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        host_sem = self._hosts.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with host_sem, self._global:
+            yield
+
+    async def _limited(self, host: str, phase: str, cmd: List[str], **kwargs: Any) -> subprocess.CompletedProcess:
+        timeout = self.timeouts.get(phase)
+        async with self._slot(host):
+            try:
+                return await asyncio.wait_for(self.runner(cmd, **kwargs), timeout)
+            except asyncio.TimeoutError:
+                raise PhaseTimeout(phase, timeout) from None
+
+    async def run(
+        self,
+        session: SshSession,
+        phase: str,
+        remote_command: str,
+        check: bool = False,
+        batch_mode: bool = False,
+        **kwargs: Any,
+    ) -> subprocess.CompletedProcess:
+        """Equivalente asíncrono de SshSession.run (por defecto sin check)."""
+        kwargs.setdefault("stdout", subprocess.PIPE)
+        kwargs.setdefault("stderr", subprocess.PIPE)
+        kwargs.setdefault("text", True)
+        return await self._limited(
+            session.ip, phase, session.ssh_command(remote_command, batch_mode=batch_mode), check=check, **kwargs)
+
+    async def upload(self, session: SshSession, local_path: Path, remote_path: str) -> subprocess.CompletedProcess:
+        """Equivalente asíncrono de SshSession.upload (lanza CalledProcessError si falla)."""
+        return await self._limited(
+            session.ip, "upload", session.scp_command(local_path, remote_path),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True,
+        )
+
+    # ------------------------------------------------------------------
+    # Ejecución de planes
+    # ------------------------------------------------------------------
+
+    async def run_plans(
+        self,
+        plans: List[ToolInstallPlan],
+        run_plan: PlanCoroutine,
+        cancelled_result: Callable[[ToolInstallPlan, str], Dict],
+        deadline: Optional[float] = None,
+    ) -> List[Dict]:
+        """
+        Ejecuta run_plan para todos los planes a la vez y devuelve los
+        resultados en el orden de los planes. Con deadline (segundos), las
+        herramientas sin terminar al agotarse pasan a cancelled_result(plan, tool).
+        run_plan convierte en resultados los errores de su instancia; una
+        excepción que aun así escape cancela el resto y se propaga.
+        """
+        if not plans:
+            return []
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._hosts = {}
+        per_plan: List[List[Dict]] = [[] for _ in plans]
+        tasks = [asyncio.create_task(run_plan(plan, out)) for plan, out in zip(plans, per_plan)]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=deadline, return_when=asyncio.FIRST_EXCEPTION)
+        except asyncio.CancelledError:
+            await self._cancel(tasks)
+            raise
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                await self._cancel(tasks)
+                raise task.exception()
+        await self._cancel(pending)
+
+        results: List[Dict] = []
+        for plan, out in zip(plans, per_plan):
+            finished = {r["tool"] for r in out}
+            results.extend(out)
+            results.extend(cancelled_result(plan, tool) for tool in plan.tools if tool not in finished)
+        return results
+
+    @staticmethod
+    async def _cancel(tasks) -> None:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def parse_phase_timeouts(values: List[str]) -> Dict[str, float]:
+    """Convierte ["exec=600", "probe=10"] (opción --phase-timeout de los CLIs) en límites por fase."""
+    timeouts: Dict[str, float] = {}
+    for value in values:
+        phase, sep, seconds = value.partition("=")
+        if not sep or phase not in DEFAULT_PHASE_TIMEOUTS:
+            raise ValueError(f"límite de fase inválido: {value} (fases: {', '.join(DEFAULT_PHASE_TIMEOUTS)})")
+        timeouts[phase] = float(seconds)
+    return timeouts
+
+
+def run_sync(coro: Awaitable) -> Any:
+    """Envoltorio síncrono: ejecuta la corrutina en un bucle propio (para run_all_plans y los CLIs)."""
+    return asyncio.run(coro)
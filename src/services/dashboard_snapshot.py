@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class DashboardSnapshot:
+    """
+    Estado completo que necesita la página de herramientas en una sola
+    respuesta: instancias de scenario/state/summary.json y, por instancia,
+    herramientas asignadas, instaladas y el resultado de la última ejecución
+    (tools store).
+
+    etag() solo hace stat de los ficheros de estado (summary.json y el
+    tools store), así que una petición con If-None-Match que no ha cambiado
+    se resuelve sin leer ni parsear nada. El cuerpo JSON ya serializado se
+    guarda en memoria y se reutiliza mientras el ETag no cambie.
+    """
+
+    def __init__(self, summary_path: Path, tools_store) -> None:
+        self.summary_path = Path(summary_path)
+        self.tools_store = tools_store
+        self._cache: Optional[Tuple[str, bytes]] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Versión
+    # ------------------------------------------------------------------
+
+    def _summary_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.summary_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def etag(self) -> str:
+        """ETag (sin comillas) del estado actual."""
+        key = repr((self._summary_signature(), self.tools_store.version()))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+    # ------------------------------------------------------------------
+    # Contenido
+    # ------------------------------------------------------------------
+
+    def _read_instances(self) -> List[Dict]:
+        if not self.summary_path.is_file():
+            return []
+        try:
+            with self.summary_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return data if isinstance(data, list) else data.get("instances", [])
+
+    def build(self) -> Dict:
+        """Snapshot sin caché (instancias del summary con sus herramientas)."""
+        store = self.tools_store.read_all()
+        instances = []
+        for raw in self._read_instances():
+            instance = dict(raw)
+            # mismos nombres de campo que /api/openstack/instances
+            instance.setdefault("ip_floating", raw.get("floating_ip"))
+            entry = store.get(str(raw.get("name")), {})
+            instance["tools"] = entry.get("tools", [])
+            instance["installed"] = entry.get("installed", [])
+            instance["last_run"] = entry.get("last_run", {})
+            instances.append(instance)
+        return {"instances": instances, "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+
+    def body(self, etag: Optional[str] = None) -> Tuple[str, bytes]:
+        """
+        (etag, JSON serializado) del estado actual. etag, si se pasa, debe
+        haberse calculado antes de leer, de modo que nunca se asocia un ETag
+        nuevo a un contenido antiguo.
+        """
+        etag = etag or self.etag()
+        with self._lock:
+            if self._cache is not None and self._cache[0] == etag:
+                return self._cache
+        payload = self.build()
+        payload["etag"] = etag
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._cache = (etag, body)
+        return etag, body
+
+
+def snapshot_target_ms() -> float:
+    """Objetivo de latencia del endpoint (NICS_SNAPSHOT_TARGET_MS, 50 ms por defecto)."""
+    return float(os.environ.get("NICS_SNAPSHOT_TARGET_MS", "50"))
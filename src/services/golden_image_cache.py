@@ -0,0 +1,279 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.models.images import GoldenImage
+from src.services.openstack_backend import OpenStackBackend, ResourceNotFound
+
+# Prefijo del nombre de las imágenes en Glance: nics-golden-<imagen base>-<clave>
+GOLDEN_PREFIX = "nics-golden"
+
+# Presupuesto por defecto para todas las golden images (NICS_GOLDEN_BUDGET_GB)
+DEFAULT_BUDGET_GB = 100.0
+
+# Estados de Glance con los que un snapshot ya no va a llegar a active
+_DEAD_STATUSES = ("killed", "deleted", "pending_delete", "deactivated")
+
+
+def golden_images_enabled() -> bool:
+    """Golden images activadas para instalador y aprovisionamiento (NICS_GOLDEN_IMAGES=1)."""
+    return os.environ.get("NICS_GOLDEN_IMAGES", "").lower() in ("1", "true", "yes")
+
+
+def golden_budget_bytes() -> int:
+    return int(float(os.environ.get("NICS_GOLDEN_BUDGET_GB", DEFAULT_BUDGET_GB)) * 1024 ** 3)
+
+
+def normalize_tools(tools: Iterable[str]) -> List[str]:
+    return sorted({t.lower() for t in tools})
+
+
+def installer_fingerprints(installers_dir: Path, tools: Iterable[str]) -> Dict[str, str]:
+    """
+    sha256 de <installers_dir>/<tool>/install.sh por herramienta (la misma
+    huella que ToolsInstallerService deja en el marcador remoto). Lanza
+    FileNotFoundError si falta algún instalador.
+    """
+    return {
+        tool: hashlib.sha256((installers_dir / tool / "install.sh").read_bytes()).hexdigest()
+        for tool in normalize_tools(tools)
+    }
+
+
+def golden_key(base_image: str, tools: Iterable[str], installers: Dict[str, str]) -> str:
+    """Clave de la combinación (imagen base, herramientas ordenadas, huellas de los instaladores)."""
+    names = normalize_tools(tools)
+    spec = {
+        "base_image": base_image,
+        "tools": names,
+        "installers": {t: installers[t] for t in names},
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()[:16]
+
+
+class GoldenImageCache:
+    """
+    Catálogo de golden images: snapshots de instancias que han instalado y
+    validado un conjunto de herramientas, indexados por golden_key.
+
+    - capture() pide el snapshot de una instancia recién instalada (una
+      sola vez por clave, aunque varias instancias terminen a la vez).
+    - lookup() devuelve la imagen lista (active) para una combinación, que el
+      aprovisionamiento usa en lugar de la imagen base. Cuenta aciertos y
+      fallos.
+    - evict() borra de Glance las imágenes usadas hace más tiempo (LRU)
+      hasta que el total cabe en budget_bytes; nunca las que usan los
+      servidores de summary.json.
+
+    El catálogo (state/golden_images.json) se comparte entre procesos
+    (dashboard, CLIs) con flock sobre <catálogo>.lock.
+    """
+
+    def __init__(
+        self,
+        catalog_path: Path,
+        backend: OpenStackBackend,
+        budget_bytes: Optional[int] = None,
+        summary_path: Optional[Path] = None,
+    ) -> None:
+        self.catalog_path = catalog_path
+        self.lock_path = catalog_path.with_name(catalog_path.name + ".lock")
+        self.backend = backend
+        self.budget_bytes = budget_bytes if budget_bytes is not None else golden_budget_bytes()
+        self.summary_path = summary_path
+
+    @classmethod
+    def for_repo(cls, repo_root: Path, backend: OpenStackBackend, **kwargs) -> "GoldenImageCache":
+        return cls(
+            repo_root / "state" / "golden_images.json",
+            backend,
+            summary_path=repo_root / "scenario" / "state" / "summary.json",
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------------
+    # Catálogo en disco
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict]:
+        """Catálogo bloqueado en exclusiva; se guarda al salir del bloque."""
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                catalog = self._read()
+                yield catalog
+                self._write(catalog)
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read(self) -> Dict:
+        catalog: Dict = {}
+        if self.catalog_path.is_file():
+            try:
+                with self.catalog_path.open("r", encoding="utf-8") as f:
+                    catalog = json.load(f)
+            except (OSError, ValueError):
+                catalog = {}
+        catalog.setdefault("images", {})
+        catalog.setdefault("stats", {"hits": 0, "misses": 0})
+        return catalog
+
+    def _write(self, catalog: Dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=str(self.catalog_path.parent), prefix=".golden_images.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(catalog, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.catalog_path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _refresh_entry(self, images: Dict[str, Dict], key: str) -> Optional[GoldenImage]:
+        """Actualiza estado y tamaño de un snapshot en curso; lo quita del catálogo si ha desaparecido."""
+        entry = GoldenImage.from_dict(images[key])
+        if entry.status == "active" and entry.size is not None:
+            return entry
+        try:
+            info = self.backend.image_info(entry.image_id)
+        except ResourceNotFound:
+            del images[key]
+            return None
+        if info.get("status") in _DEAD_STATUSES:
+            del images[key]
+            return None
+        entry.status = "active" if info.get("status") == "active" else "saving"
+        entry.size = info.get("size")
+        images[key] = asdict(entry)
+        return entry
+
+    def _in_use(self) -> Set[str]:
+        """Imágenes (id o nombre) con las que arrancaron los servidores de summary.json."""
+        if self.summary_path is None or not self.summary_path.is_file():
+            return set()
+        try:
+            with self.summary_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        nodes = data if isinstance(data, list) else data.get("instances", [])
+        return {str(n["image"]) for n in nodes if isinstance(n, dict) and n.get("image")}
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def lookup(self, base_image: str, tools: Iterable[str], installers: Dict[str, str]) -> Optional[GoldenImage]:
+        """Golden image lista para arrancar con esa combinación, o None (fallo de caché)."""
+        key = golden_key(base_image, tools, installers)
+        with self._locked() as catalog:
+            entry = self._refresh_entry(catalog["images"], key) if key in catalog["images"] else None
+            if entry is None or entry.status != "active":
+                catalog["stats"]["misses"] += 1
+                return None
+            entry.hits += 1
+            entry.last_used_at = time.time()
+            catalog["images"][key] = asdict(entry)
+            catalog["stats"]["hits"] += 1
+            return entry
+
+    def find_by_image(self, image: str) -> Optional[GoldenImage]:
+        """Golden image con ese id o nombre de Glance (p. ej. la imagen de un servidor)."""
+        if not image or not self.catalog_path.is_file():
+            return None
+        for raw in self._read()["images"].values():
+            if image in (raw.get("image_id"), raw.get("image_name")):
+                return GoldenImage.from_dict(raw)
+        return None
+
+    def entries(self) -> List[GoldenImage]:
+        return [GoldenImage.from_dict(raw) for raw in self._read()["images"].values()]
+
+    def stats(self) -> Dict:
+        catalog = self._read()
+        entries = [GoldenImage.from_dict(raw) for raw in catalog["images"].values()]
+        return {
+            "entries": len(entries),
+            "active": sum(1 for e in entries if e.status == "active"),
+            "saving": sum(1 for e in entries if e.status != "active"),
+            "total_bytes": sum(e.size or 0 for e in entries),
+            "budget_bytes": self.budget_bytes,
+            "hits": catalog["stats"]["hits"],
+            "misses": catalog["stats"]["misses"],
+        }
+
+    # ------------------------------------------------------------------
+    # Alta y expulsión
+    # ------------------------------------------------------------------
+
+    def capture(
+        self,
+        server_id: str,
+        base_image: str,
+        tools: Iterable[str],
+        installers: Dict[str, str],
+    ) -> Tuple[GoldenImage, bool]:
+        """
+        Snapshot de server_id para la combinación dada. Si la clave ya está en
+        el catálogo no se crea otro. Devuelve (entrada, creada).
+        """
+        names = normalize_tools(tools)
+        key = golden_key(base_image, names, installers)
+        with self._locked() as catalog:
+            images = catalog["images"]
+            existing = self._refresh_entry(images, key) if key in images else None
+            if existing is not None:
+                return existing, False
+            image_name = f"{GOLDEN_PREFIX}-{base_image}-{key}"
+            image_id = self.backend.snapshot_server(server_id, image_name, {
+                "nics_golden_key": key,
+                "nics_base_image": base_image,
+                "nics_tools": ",".join(names),
+            })
+            now = time.time()
+            entry = GoldenImage(
+                key=key, image_id=image_id, image_name=image_name, base_image=base_image,
+                tools=names, installers={t: installers[t] for t in names},
+                source_server=server_id, created_at=now, last_used_at=now,
+            )
+            images[key] = asdict(entry)
+        self.evict()
+        return entry, True
+
+    def evict(self, budget_bytes: Optional[int] = None) -> List[GoldenImage]:
+        """
+        Borra golden images por orden de último uso hasta que el total cabe en
+        el presupuesto. Los snapshots aún en curso (tamaño desconocido) y las
+        imágenes en uso por el escenario actual no se tocan.
+        """
+        budget = self.budget_bytes if budget_bytes is None else budget_bytes
+        in_use = self._in_use()
+        evicted: List[GoldenImage] = []
+        with self._locked() as catalog:
+            images = catalog["images"]
+            entries = [e for e in (self._refresh_entry(images, k) for k in list(images)) if e is not None]
+            total = sum(e.size or 0 for e in entries)
+            for entry in sorted(entries, key=lambda e: e.last_used_at):
+                if total <= budget:
+                    break
+                if entry.status != "active" or {entry.image_id, entry.image_name} & in_use:
+                    continue
+                try:
+                    self.backend.delete_image(entry.image_id)
+                except ResourceNotFound:
+                    pass
+                except Exception:
+                    continue
+                del images[entry.key]
+                total -= entry.size or 0
+                evicted.append(entry)
+        return evicted
@@ -0,0 +1,461 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.models.images import ImageResult, ImageSource
+from src.services.openstack_backend import error_text
+from src.services.openstack_client import OpenStackApiError, OpenStackClient
+
+# Recibe eventos de progreso: {"event": "image_downloaded" | "image_uploaded" | "image_skipped" | "image_failed", ...}
+ImageCallback = Callable[[Dict], None]
+
+# Propiedades de Glance con las que se reconoce una imagen ya subida por el pipeline
+SHA256_PROPERTY = "nics_sha256"
+SOURCE_PROPERTY = "nics_source_url"
+
+CHUNK_SIZE = 256 * 1024
+
+
+class ImageDownloadError(RuntimeError):
+    pass
+
+
+class ChecksumMismatch(ImageDownloadError):
+    pass
+
+
+class ImageManifest:
+    """
+    manifest.json del directorio de imágenes: por imagen, la URL de origen,
+    sha256/md5 del contenido, tamaño, ETag/Last-Modified del servidor, mtime
+    del fichero local y el id en Glance. Permite saltarse la descarga (y la
+    subida) de una imagen que no ha cambiado sin volver a leer varios GB.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path.is_file():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, name: str) -> Dict:
+        with self._lock:
+            return dict(self._entries.get(name) or {})
+
+    def update(self, name: str, **fields) -> None:
+        with self._lock:
+            self._entries.setdefault(name, {}).update(fields)
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=".manifest.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+class ImagePipelineService:
+    """
+    Descarga las imágenes de initial_config.json y las sube a Glance.
+
+    - Las descargas van en paralelo (max_downloads a la vez) a <nombre>.<formato>.part
+      y se reanudan con cabeceras Range/If-Range tras un corte o un reintento;
+      el fichero final solo aparece cuando la descarga está completa y su
+      sha256 coincide con el esperado (si la configuración lo indica).
+    - Cada imagen se sube a Glance en cuanto termina su descarga (max_uploads
+      a la vez), mientras el resto sigue descargándose.
+    - El manifiesto (ImageManifest) evita repetir trabajo: si la URL no ha
+      cambiado (mismo ETag/tamaño) y Glance ya tiene una imagen con ese
+      contenido, no se descarga ni se sube nada.
+
+    glance es un OpenStackClient (o un objeto con find_images, create_image,
+    upload_image_data y delete_image); sin él solo se descarga.
+    """
+
+    def __init__(
+        self,
+        image_dir: Path,
+        glance: Optional[OpenStackClient] = None,
+        session: Optional[requests.Session] = None,
+        max_downloads: int = 3,
+        max_uploads: int = 2,
+        retries: int = 3,
+        retry_delay: float = 2.0,
+        timeout: float = 60.0,
+        visibility: str = "public",
+        replace: bool = False,
+    ) -> None:
+        self.image_dir = image_dir
+        self.glance = glance
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_downloads, pool_maxsize=max_downloads)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.max_downloads = max_downloads
+        self.max_uploads = max_uploads
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.visibility = visibility
+        # subir aunque Glance ya tenga una imagen con ese nombre y otro contenido
+        # (la nueva sustituye a la antigua cuando termina de subirse)
+        self.replace = replace
+        self.manifest = ImageManifest(image_dir / "manifest.json")
+
+    @staticmethod
+    def sources_from_config(config: Dict) -> List[ImageSource]:
+        """Imágenes de la sección images.list de initial_config.json."""
+        images = (config.get("images") or {}).get("list") or {}
+        return [ImageSource.from_config(name, value) for name, value in images.items()]
+
+    def image_path(self, source: ImageSource) -> Path:
+        return self.image_dir / f"{source.name}.{source.disk_format}"
+
+    # ------------------------------------------------------------------
+    # Descarga
+    # ------------------------------------------------------------------
+
+    def _remote_info(self, url: str) -> Dict:
+        """ETag, Last-Modified y tamaño anunciados por el servidor ({} si no responde al HEAD)."""
+        try:
+            resp = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        except requests.RequestException:
+            return {}
+        if resp.status_code != 200:
+            return {}
+        length = resp.headers.get("Content-Length")
+        return {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "size": int(length) if length and length.isdigit() else None,
+        }
+
+    @staticmethod
+    def _unchanged(source: ImageSource, entry: Dict, remote: Dict) -> bool:
+        """El manifiesto describe el contenido actual de la URL."""
+        if not entry.get("sha256") or entry.get("url") != source.url:
+            return False
+        if source.sha256:
+            return entry["sha256"] == source.sha256.lower()
+        for key in ("etag", "size"):
+            if remote.get(key) is not None and entry.get(key) is not None and remote[key] != entry[key]:
+                return False
+        return True
+
+    @staticmethod
+    def _local_matches(path: Path, entry: Dict) -> bool:
+        """El fichero local es el del manifiesto (mismo tamaño y mtime): no hace falta volver a leerlo."""
+        try:
+            st = path.stat()
+        except OSError:
+            return False
+        return st.st_size == entry.get("size") and st.st_mtime == entry.get("mtime")
+
+    @staticmethod
+    def _if_range(remote: Dict) -> Optional[str]:
+        """Validador para If-Range: ETag fuerte o, si no hay, Last-Modified."""
+        etag = remote.get("etag")
+        if etag and not etag.startswith("W/"):
+            return etag
+        return remote.get("last_modified")
+
+    @staticmethod
+    def _hash_existing(path: Path, hashers: Tuple) -> int:
+        size = 0
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                for h in hashers:
+                    h.update(chunk)
+                size += len(chunk)
+        return size
+
+    def _fetch(self, source: ImageSource, part: Path, remote: Dict) -> Tuple[str, str, int, bool]:
+        """
+        Un intento de descarga sobre part, continuando desde su tamaño actual
+        si el validador guardado junto al .part sigue siendo el del servidor.
+        Devuelve (sha256, md5, tamaño, reanudada).
+        """
+        meta_path = part.with_name(part.name + ".json")
+        validator = self._if_range(remote)
+        offset = 0
+        if part.exists():
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                meta = {}
+            if meta.get("url") == source.url and meta.get("validator") == validator:
+                offset = part.stat().st_size
+
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if validator:
+                headers["If-Range"] = validator
+
+        with self.session.get(source.url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            if resp.status_code == 416 and offset and remote.get("size") == offset:
+                # el .part ya estaba completo
+                total = offset
+                resp_iter = iter(())
+                mode = "ab"
+            elif resp.status_code == 206 and offset:
+                start = resp.headers.get("Content-Range", "").split(" ")[-1].split("-")[0]
+                if start != str(offset):
+                    raise ImageDownloadError(f"Content-Range inesperado: {resp.headers.get('Content-Range')}")
+                total_text = resp.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+                total = int(total_text) if total_text.isdigit() else None
+                resp_iter = resp.iter_content(CHUNK_SIZE)
+                mode = "ab"
+            elif resp.status_code == 200:
+                # sin soporte de Range o el recurso ha cambiado: se empieza de cero
+                offset = 0
+                length = resp.headers.get("Content-Length")
+                total = int(length) if length and length.isdigit() else None
+                resp_iter = resp.iter_content(CHUNK_SIZE)
+                mode = "wb"
+                meta_path.write_text(json.dumps({"url": source.url, "validator": validator}))
+            else:
+                raise ImageDownloadError(f"GET {source.url} -> {resp.status_code}")
+
+            sha256, md5 = hashlib.sha256(), hashlib.md5()
+            size = self._hash_existing(part, (sha256, md5)) if mode == "ab" else 0
+            with part.open(mode) as f:
+                for chunk in resp_iter:
+                    f.write(chunk)
+                    sha256.update(chunk)
+                    md5.update(chunk)
+                    size += len(chunk)
+
+        if total is not None and size != total:
+            raise ImageDownloadError(f"descarga incompleta ({size} de {total} bytes)")
+        return sha256.hexdigest(), md5.hexdigest(), size, offset > 0
+
+    def _adopt(self, source: ImageSource, path: Path, remote: Dict, result: ImageResult) -> bool:
+        """
+        Fichero descargado antes de existir el manifiesto (script antiguo): se
+        acepta solo si está completo (tamaño del servidor) y, si se conoce, el
+        sha256 coincide. Leerlo es más barato que volver a descargarlo.
+        """
+        if not path.is_file() or remote.get("size") is None or path.stat().st_size != remote["size"]:
+            return False
+        sha256, md5 = hashlib.sha256(), hashlib.md5()
+        size = self._hash_existing(path, (sha256, md5))
+        if source.sha256 and sha256.hexdigest() != source.sha256.lower():
+            return False
+        self.manifest.update(
+            source.name,
+            url=source.url, file=path.name, sha256=sha256.hexdigest(), md5=md5.hexdigest(), size=size,
+            etag=remote.get("etag"), last_modified=remote.get("last_modified"),
+            mtime=path.stat().st_mtime, downloaded_at=None,
+        )
+        result.download = "cached"
+        result.sha256, result.size = sha256.hexdigest(), size
+        return True
+
+    def _download(self, source: ImageSource, remote: Dict, result: ImageResult) -> Path:
+        """Descarga con reintentos (cada uno reanuda el .part) y verificación del sha256."""
+        path = self.image_path(source)
+        part = path.with_name(path.name + ".part")
+        meta_path = part.with_name(part.name + ".json")
+        self.image_dir.mkdir(parents=True, exist_ok=True)
+
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.retry_delay * attempt)
+            try:
+                sha256, md5, size, resumed = self._fetch(source, part, remote)
+                break
+            except (requests.RequestException, OSError, ImageDownloadError) as e:
+                last_error = e
+        else:
+            raise ImageDownloadError(f"{source.name}: {error_text(last_error)}")
+
+        if source.sha256 and sha256 != source.sha256.lower():
+            part.unlink()
+            meta_path.unlink(missing_ok=True)
+            raise ChecksumMismatch(f"{source.name}: sha256 {sha256} != {source.sha256}")
+
+        os.replace(part, path)
+        meta_path.unlink(missing_ok=True)
+        self.manifest.update(
+            source.name,
+            url=source.url, file=path.name, sha256=sha256, md5=md5, size=size,
+            etag=remote.get("etag"), last_modified=remote.get("last_modified"),
+            mtime=path.stat().st_mtime, downloaded_at=time.time(),
+        )
+        result.download = "resumed" if resumed else "downloaded"
+        result.sha256, result.size = sha256, size
+        return path
+
+    # ------------------------------------------------------------------
+    # Glance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _same_content(image: Dict, entry: Dict) -> bool:
+        """Imagen de Glance con el contenido del manifiesto (subida por el pipeline o por el script antiguo)."""
+        if image.get(SHA256_PROPERTY):
+            return image[SHA256_PROPERTY] == entry.get("sha256")
+        return bool(image.get("checksum")) and image["checksum"] == entry.get("md5")
+
+    def _glance_match(self, source: ImageSource, entry: Dict) -> Tuple[Optional[Dict], List[Dict]]:
+        """(imagen activa con el mismo contenido, resto de imágenes con ese nombre)."""
+        images = self.glance.find_images(source.name)
+        for image in images:
+            if image.get("status") == "active" and self._same_content(image, entry):
+                return image, [i for i in images if i is not image]
+        return None, images
+
+    def _upload(self, source: ImageSource, path: Path, result: ImageResult) -> None:
+        started = time.monotonic()
+        entry = self.manifest.get(source.name)
+        try:
+            match, others = self._glance_match(source, entry)
+            if match is not None:
+                result.upload, result.status, result.glance_id = "present", "already_present", match["id"]
+                self.manifest.update(source.name, glance_id=match["id"])
+                return
+            if others and not self.replace:
+                result.upload, result.status = "skipped", "stale"
+                result.glance_id = others[0].get("id")
+                result.error = "Glance ya tiene una imagen con ese nombre y otro contenido (usa replace)"
+                return
+
+            image_id = self.glance.create_image(
+                source.name,
+                disk_format=source.disk_format,
+                visibility=self.visibility,
+                properties={SHA256_PROPERTY: entry["sha256"], SOURCE_PROPERTY: source.url},
+            )
+            try:
+                self.glance.upload_image_data(image_id, path)
+            except Exception:
+                try:
+                    self.glance.delete_image(image_id)
+                except OpenStackApiError:
+                    pass
+                raise
+            for old in others:
+                try:
+                    self.glance.delete_image(old["id"])
+                except OpenStackApiError:
+                    pass
+            result.upload, result.status, result.glance_id = "uploaded", "uploaded", image_id
+            self.manifest.update(source.name, glance_id=image_id, uploaded_at=time.time())
+        except (OpenStackApiError, requests.RequestException, OSError) as e:
+            result.upload, result.status, result.error = "failed", "upload_failed", error_text(e)
+        finally:
+            result.upload_seconds = round(time.monotonic() - started, 3)
+
+    # ------------------------------------------------------------------
+    # Pipeline
+    # ------------------------------------------------------------------
+
+    def _prepare(self, source: ImageSource, result: ImageResult) -> Optional[Path]:
+        """
+        Fase de descarga de una imagen. Devuelve el fichero a subir o None si
+        no hay que subir nada (ya está en Glance o la descarga ha fallado).
+        """
+        started = time.monotonic()
+        entry = self.manifest.get(source.name)
+        remote = self._remote_info(source.url)
+        path = self.image_path(source)
+        try:
+            if self._unchanged(source, entry, remote):
+                result.sha256, result.size = entry["sha256"], entry.get("size")
+                if self.glance is not None:
+                    match, _ = self._glance_match(source, entry)
+                    if match is not None:
+                        result.download, result.upload = "skipped", "present"
+                        result.status, result.glance_id = "already_present", match["id"]
+                        return None
+                if self._local_matches(path, entry):
+                    result.download = "cached"
+                    return path
+            elif not entry and self._adopt(source, path, remote, result):
+                return path
+            return self._download(source, remote, result)
+        except ChecksumMismatch as e:
+            result.download, result.status, result.error = "failed", "checksum_mismatch", error_text(e)
+        except (ImageDownloadError, OpenStackApiError, requests.RequestException, OSError) as e:
+            result.download, result.status, result.error = "failed", "download_failed", error_text(e)
+        finally:
+            result.download_seconds = round(time.monotonic() - started, 3)
+        return None
+
+    def run(self, sources: List[ImageSource], on_event: Optional[ImageCallback] = None) -> Dict:
+        """
+        Descarga y sube todas las imágenes. Las subidas empiezan en cuanto
+        termina cada descarga. Devuelve el informe con el resultado de cada una.
+        """
+        emit = on_event or (lambda event: None)
+        started_at = time.time()
+        results = {s.name: ImageResult(name=s.name) for s in sources}
+        by_name = {s.name: s for s in sources}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_downloads)) as downloads, \
+                ThreadPoolExecutor(max_workers=max(1, self.max_uploads)) as uploads:
+            pending: Dict[Future, Tuple[str, str]] = {
+                downloads.submit(self._prepare, s, results[s.name]): (s.name, "download") for s in sources
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, phase = pending.pop(future)
+                    result = results[name]
+                    if phase == "download":
+                        path = future.result()
+                        if path is not None and self.glance is not None:
+                            emit({"event": "image_downloaded", "image": name, "download": result.download,
+                                  "seconds": result.download_seconds})
+                            pending[uploads.submit(self._upload, by_name[name], path, result)] = (name, "upload")
+                            continue
+                        if path is not None:
+                            result.upload, result.status = "skipped", "downloaded"
+                    else:
+                        future.result()
+                    if result.error and result.status != "stale":
+                        emit({"event": "image_failed", "image": name, "status": result.status, "error": result.error})
+                    elif result.status == "uploaded":
+                        emit({"event": "image_uploaded", "image": name, "glance_id": result.glance_id,
+                              "seconds": result.upload_seconds})
+                    else:
+                        emit({"event": "image_skipped", "image": name, "status": result.status,
+                              "download": result.download, "upload": result.upload, "detail": result.error})
+
+        failed = [r.name for r in results.values() if r.status.endswith("_failed") or r.status == "checksum_mismatch"]
+        return {
+            "status": "completed" if not failed else "partial_failure",
+            "started_at": started_at,
+            "seconds": round(time.time() - started_at, 3),
+            "images": [asdict(results[s.name]) for s in sources],
+            "failed": failed,
+        }
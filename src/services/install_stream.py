@@ -0,0 +1,155 @@
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.services.metrics import SSE_STREAMS_OPEN
+from src.services.remote_pipeline import TRAILER_MARKER
+from src.services.tools_installer_service import ProgressCallback
+
+# run(on_event) -> resultados; normalmente un lambda sobre JobQueue.follow
+RunFunction = Callable[[ProgressCallback], List[Dict]]
+
+_DONE = object()
+
+
+class InstallStream:
+    """
+    Ejecuta una instalación en un hilo en segundo plano y expone su progreso
+    como una secuencia de eventos (y como Server-Sent Events):
+
+      - tool_started / tool_finished, emitidos por ToolsInstallerService
+      - log: cada línea nueva del log de las herramientas en curso (en el
+        modo bundled los logs por herramienta se escriben al terminar el
+        driver, así que sus líneas llegan justo antes de tool_finished)
+      - error: excepción que ha abortado la ejecución
+      - completed: resultados finales
+
+    El consumidor nunca bloquea la instalación: si el cliente se desconecta,
+    la instalación continúa y on_complete se ejecuta igualmente.
+    """
+
+    def __init__(
+        self,
+        run: RunFunction,
+        on_complete: Optional[Callable[[List[Dict]], None]] = None,
+        poll_interval: float = 0.5,
+        keepalive_seconds: float = 15.0,
+    ) -> None:
+        self._run = run
+        self._on_complete = on_complete
+        self.poll_interval = poll_interval
+        self.keepalive_seconds = keepalive_seconds
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.results: Optional[List[Dict]] = None
+        self.error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Ejecución en segundo plano
+    # ------------------------------------------------------------------
+
+    def start(self) -> "InstallStream":
+        self._thread = threading.Thread(target=self._worker, name="install-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def _worker(self) -> None:
+        try:
+            self.results = self._run(self._queue.put)
+            if self._on_complete is not None:
+                self._on_complete(self.results)
+            self._queue.put({"event": "completed", "results": self.results})
+        except Exception as e:  # se informa al cliente en lugar de perderse en el hilo
+            self.error = str(e)
+            self._queue.put({"event": "error", "error": self.error})
+        finally:
+            self._queue.put(_DONE)
+
+    # ------------------------------------------------------------------
+    # Consumo
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_new_lines(path: Path, offset: int) -> Tuple[List[str], int]:
+        """
+        Líneas completas añadidas al log desde offset. Si el log es más corto
+        que offset (se ha truncado o vuelto a crear) se lee desde el principio.
+        """
+        try:
+            with path.open("rb") as f:
+                if os.fstat(f.fileno()).st_size < offset:
+                    offset = 0
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], offset
+        complete = chunk.rfind(b"\n") + 1
+        lines = chunk[:complete].decode("utf-8", errors="replace").splitlines()
+        return lines, offset + complete
+
+    def events(self) -> Iterator[Dict]:
+        """
+        Eventos de progreso según ocurren. Cuando no hay eventos nuevos se
+        leen las líneas añadidas a los logs en curso; si pasa keepalive_seconds
+        sin nada que enviar se emite {"event": "keepalive"}.
+        """
+        tailing: Dict[Tuple[str, str], Tuple[Path, int]] = {}
+        last_sent = time.monotonic()
+
+        def drain(key: Tuple[str, str]) -> Iterator[Dict]:
+            path, offset = tailing[key]
+            lines, offset = self._read_new_lines(path, offset)
+            tailing[key] = (path, offset)
+            for line in lines:
+                if line.startswith(TRAILER_MARKER):
+                    # el trailer del modo pipelined es interno, no se muestra
+                    continue
+                yield {"event": "log", "instance": key[0], "tool": key[1], "line": line}
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                item = None
+
+            if item is _DONE:
+                return
+
+            if item is not None:
+                kind = item.get("event")
+                key = (item.get("instance"), item.get("tool"))
+                if kind == "tool_started" and item.get("log_file"):
+                    tailing[key] = (Path(item["log_file"]), 0)
+                    yield item
+                elif kind == "tool_finished" and key in tailing:
+                    yield from drain(key)
+                    del tailing[key]
+                    yield item
+                else:
+                    yield item
+                last_sent = time.monotonic()
+                continue
+
+            sent = False
+            for key in list(tailing):
+                for event in drain(key):
+                    sent = True
+                    yield event
+            if sent:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= self.keepalive_seconds:
+                last_sent = time.monotonic()
+                yield {"event": "keepalive"}
+
+    def sse(self) -> Iterator[str]:
+        """Los mismos eventos en formato text/event-stream."""
+        with SSE_STREAMS_OPEN.track(stream="install"):
+            for event in self.events():
+                if event["event"] == "keepalive":
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,230 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import shlex
+import tarfile
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.models.tools import InstallerBundle
+from src.services.remote_pipeline import (
+    CHECK_SKIPPED,
+    TRAILER_MARKER,
+    build_precheck_command,
+    build_write_marker_command,
+    marker_path_for,
+)
+
+# Línea con la que el driver abre la salida de cada herramienta en el log.
+TOOL_MARKER = "__NICSCYBERLAB_TOOL__"
+
+# Nombre del driver dentro del paquete.
+DRIVER_NAME = "driver.sh"
+
+# Copia remota del paquete; el nombre lleva el sha256 del .tar.gz.
+REMOTE_BUNDLE_TEMPLATE = "/tmp/nics_bundle_{digest}.tar.gz"
+
+
+def remote_bundle_path(digest: str) -> str:
+    return REMOTE_BUNDLE_TEMPLATE.format(digest=digest)
+
+
+def build_remote_check_command(digest: str) -> str:
+    """
+    Termina con 0 si el remoto ya tiene el paquete completo (mismo sha256),
+    así que una copia interrumpida se vuelve a subir.
+    """
+    path = remote_bundle_path(digest)
+    return f"printf '%s  %s\\n' {shlex.quote(digest)} {shlex.quote(path)} | sha256sum -c --status 2>/dev/null"
+
+
+def build_remote_run_command(digest: str, target_ip: str, force: bool = False) -> str:
+    """Desempaqueta el paquete en un directorio temporal y ejecuta su driver."""
+    return (
+        "d=$(mktemp -d /tmp/nics_bundle_XXXXXX) && "
+        f"tar -xzf {shlex.quote(remote_bundle_path(digest))} -C \"$d\" && "
+        f"bash \"$d/{DRIVER_NAME}\" {shlex.quote(target_ip)} {1 if force else 0}; "
+        "rc=$?; rm -rf \"$d\" 2>/dev/null; exit $rc"
+    )
+
+
+def build_driver_script(tools: List[str], fingerprints: Dict[str, str], check_commands: Dict[str, str]) -> str:
+    """
+    Driver que va dentro del paquete. Recibe la IP de la instancia y el flag
+    force, e instala en orden cada herramienta:
+
+      1. salvo con force, se la salta si valida bien y su marcador coincide
+         con la huella del instalador (la misma pre-comprobación que _is_current)
+      2. ejecuta su install.sh con sudo desde su propio directorio, de modo que
+         el instalador encuentra sus ficheros auxiliares
+      3. si ha terminado bien, valida; si la validación pasa, escribe el marcador
+      4. imprime un trailer por herramienta con los códigos de salida y la duración
+    """
+    blocks = []
+    for tool in tools:
+        quoted = shlex.quote(tool)
+        precheck = build_precheck_command(check_commands[tool], marker_path_for(tool), fingerprints[tool])
+        marker = build_write_marker_command(marker_path_for(tool), fingerprints[tool])
+        blocks.append(f"""nics_begin {quoted}
+if [ "$NICS_FORCE" != 1 ] && {{ {precheck}; }}; then
+    nics_end {quoted} 1 0 0
+else
+    (cd "$NICS_BUNDLE_DIR"/{quoted} && sudo bash ./install.sh "$NICS_TARGET_IP") </dev/null 2>&1
+    run_rc=$?
+    check_rc={CHECK_SKIPPED}
+    if [ "$run_rc" -eq 0 ]; then
+        ( {check_commands[tool]} ) </dev/null >/dev/null 2>&1
+        check_rc=$?
+    fi
+    if [ "$run_rc" -eq 0 ] && [ "$check_rc" -eq 0 ]; then
+        ( {marker} ) </dev/null >/dev/null 2>&1
+    fi
+    nics_end {quoted} 0 "$run_rc" "$check_rc"
+fi
+""")
+
+    return f"""#!/bin/bash
+# Generado por InstallerBundleBuilder (src/services/installer_bundle.py)
+set +e
+NICS_BUNDLE_DIR="$(cd "$(dirname "$0")" && pwd)"
+NICS_TARGET_IP="$1"
+NICS_FORCE="${{2:-0}}"
+
+nics_begin() {{
+    printf '%s %s\\n' '{TOOL_MARKER}' "$1"
+    nics_started=$(date +%s%N)
+}}
+
+nics_end() {{
+    printf '\\n%s {{"tool": "%s", "current": %d, "run_rc": %d, "check_rc": %d, "ms": %d}}\\n' \\
+        '{TRAILER_MARKER}' "$1" "$2" "$3" "$4" $(( ($(date +%s%N) - nics_started) / 1000000 ))
+}}
+
+{"".join(blocks)}"""
+
+
+def split_bundle_output(output: str) -> Dict[str, Dict]:
+    """
+    Separa la salida del driver por herramienta:
+    {tool: {"output": texto, "trailer": {"current", "run_rc", "check_rc", "ms"} | None}}.
+    Las herramientas sin trailer no llegaron a terminar (p. ej. se cortó la conexión).
+    """
+    sections: Dict[str, Dict] = {}
+    current: Optional[Dict] = None
+    for line in output.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith(TOOL_MARKER + " "):
+            current = sections.setdefault(stripped[len(TOOL_MARKER) + 1:], {"output": "", "trailer": None})
+            continue
+        if stripped.startswith(TRAILER_MARKER):
+            try:
+                data = json.loads(stripped[len(TRAILER_MARKER):])
+                section = sections.setdefault(str(data["tool"]), {"output": "", "trailer": None})
+                section["trailer"] = {k: int(data[k]) for k in ("current", "run_rc", "check_rc", "ms")}
+            except (ValueError, KeyError, TypeError):
+                pass
+            current = None
+            continue
+        if current is not None:
+            current["output"] += line
+    return sections
+
+
+class InstallerBundleBuilder:
+    """
+    Empaqueta en un único tar.gz los directorios de instaladores
+    (installers_dir/<tool>/, con todos sus ficheros auxiliares) que necesita
+    una instancia, junto con el driver que los ejecuta en remoto.
+
+    El paquete es reproducible (entradas ordenadas, fechas y propietarios a
+    cero, gzip sin fecha), así que su sha256 identifica el contenido: se
+    guarda en cache_dir/<sha256>.tar.gz, las instancias con el mismo
+    conjunto de herramientas comparten paquete y el remoto sabe si ya lo tiene.
+    Dentro de un proceso el paquete de cada conjunto se construye una sola
+    vez mientras los instaladores no cambien.
+    """
+
+    def __init__(
+        self,
+        installers_dir: Path,
+        cache_dir: Path,
+        check_command_for: Callable[[str], str],
+    ) -> None:
+        self.installers_dir = installers_dir
+        self.cache_dir = cache_dir
+        self.check_command_for = check_command_for
+        self._lock = threading.Lock()
+        self._built: Dict[Tuple, InstallerBundle] = {}
+
+    def _files_for(self, tool: str) -> List[Path]:
+        tool_dir = self.installers_dir / tool
+        if not (tool_dir / "install.sh").is_file():
+            raise FileNotFoundError(f"No se encontró instalador para '{tool}' en {tool_dir / 'install.sh'}")
+        return sorted(p for p in tool_dir.rglob("*") if p.is_file())
+
+    def _signature(self, tools: List[str]) -> Tuple:
+        """Identifica el conjunto y el estado de sus ficheros sin leerlos."""
+        entries = []
+        for tool in tools:
+            for path in self._files_for(tool):
+                st = path.stat()
+                entries.append((str(path), st.st_size, st.st_mtime_ns))
+        return tuple(tools), tuple(entries)
+
+    def build(self, tools: List[str]) -> InstallerBundle:
+        """Paquete de las herramientas dadas (en ese orden). Lanza FileNotFoundError si falta algún instalador."""
+        tools = [t.lower() for t in tools]
+        signature = self._signature(tools)
+        with self._lock:
+            bundle = self._built.get(signature)
+            if bundle is None or not bundle.path.is_file():
+                bundle = self._build(tools)
+                self._built[signature] = bundle
+            return bundle
+
+    def _build(self, tools: List[str]) -> InstallerBundle:
+        fingerprints = {
+            tool: hashlib.sha256((self.installers_dir / tool / "install.sh").read_bytes()).hexdigest()
+            for tool in tools
+        }
+        driver = build_driver_script(tools, fingerprints, {t: self.check_command_for(t) for t in tools})
+
+        raw = io.BytesIO()
+        with gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as gz:
+            with tarfile.open(fileobj=gz, mode="w", format=tarfile.GNU_FORMAT) as tar:
+                self._add(tar, DRIVER_NAME, driver.encode("utf-8"), 0o755)
+                for tool in tools:
+                    for path in self._files_for(tool):
+                        name = f"{tool}/{path.relative_to(self.installers_dir / tool).as_posix()}"
+                        mode = 0o755 if os.access(path, os.X_OK) else 0o644
+                        self._add(tar, name, path.read_bytes(), mode)
+        data = raw.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+
+        path = self.cache_dir / f"{digest}.tar.gz"
+        if not path.is_file():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(self.cache_dir), prefix=".bundle.")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        return InstallerBundle(digest=digest, path=path, tools=list(tools), fingerprints=fingerprints, size=len(data))
+
+    @staticmethod
+    def _add(tar: tarfile.TarFile, name: str, data: bytes, mode: int) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mode = mode
+        info.mtime = 0
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        tar.addfile(info, io.BytesIO(data))
@@ -0,0 +1,433 @@
+import fcntl
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.models.tools import InstanceMetadata
+
+# run(cmd, env) -> stdout, como ToolsInstallerService._run
+CommandRunner = Callable[[List[str], Optional[Dict[str, str]]], str]
+
+# server_rows(env) -> filas con las columnas de `openstack server list --long -f json`
+ServerRowsSource = Callable[[Dict[str, str]], List[Dict]]
+
+
+def _parse_networks(networks) -> List[str]:
+    """
+    Normaliza el campo Networks de `openstack server list -f json`, que según
+    la versión del cliente es un dict {"red": ["ip", ...]} o un texto
+    "red=ip1, ip2; otra=ip3".
+    """
+    ips: List[str] = []
+    if isinstance(networks, dict):
+        for addrs in networks.values():
+            if isinstance(addrs, str):
+                addrs = [addrs]
+            ips.extend(str(a).strip() for a in addrs)
+    elif isinstance(networks, str):
+        for chunk in networks.split(";"):
+            if "=" not in chunk:
+                continue
+            _, addrs = chunk.split("=", 1)
+            ips.extend(a.strip() for a in addrs.split(",") if a.strip())
+    return ips
+
+
+class InstanceMetadataResolver:
+    """
+    Resuelve imagen, IPs y usuario SSH de las instancias del escenario.
+
+    En lugar de un `openstack server show` por plan, hace un único listado
+    masivo (`openstack server list --long`) y guarda el resultado en una caché
+    en disco, con TTL y clave por id de servidor, compartida entre instalación
+    y desinstalación. El listado sale de server_rows (API de OpenStack, ver
+    openstack_client.server_listing_rows) si se indica, o del CLI si falla.
+    Si ninguno está disponible se usa scenario/state/summary.json como fuente.
+
+    Varios procesos (workers de gunicorn, CLIs) comparten el fichero: cada
+    escritura se hace bajo un flock sobre <caché>.lock, relee el fichero y
+    fusiona solo lo que este proceso ha cambiado desde la última escritura.
+    """
+
+    def __init__(
+        self,
+        cache_path: Path,
+        run: CommandRunner,
+        summary_path: Optional[Path] = None,
+        ttl_seconds: int = 900,
+        server_rows: Optional[ServerRowsSource] = None,
+        min_refresh_interval: float = 30.0,
+    ) -> None:
+        self.cache_path = cache_path
+        self.lock_path = cache_path.with_name(cache_path.name + ".lock")
+        self.server_rows = server_rows
+        self.summary_path = summary_path
+        self.ttl_seconds = ttl_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self._run = run
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, InstanceMetadata]] = None
+        # usuarios SSH que han funcionado, por id de instancia y por IP
+        self._ssh_users: Dict[str, str] = {}
+        # usuarios SSH que fallaron (forget_ssh_user), por id e IP; se
+        # persisten para que ningún proceso vuelva a probarlos primero
+        self._rejected_ssh_users: Dict[str, str] = {}
+        self._summary_users: Optional[Dict[str, str]] = None
+        # instante (monotonic) del último listado correcto; limita los refrescos
+        self._last_refresh: Optional[float] = None
+        # cambios de usuarios SSH pendientes de escribir (remember_ssh_user con save=False)
+        self._dirty = False
+        # cambios de este proceso aún no fusionados con el fichero (ver
+        # _save_cache): servidores refrescados y, por clave, el usuario SSH
+        # nuevo o None si se ha borrado
+        self._pending_servers: Dict[str, InstanceMetadata] = {}
+        self._pending_users: Dict[str, Dict[str, Optional[str]]] = {
+            "ssh_users": {}, "rejected_ssh_users": {}, "server_users": {},
+        }
+
+    # ------------------------------------------------------------------
+    # Caché en disco
+    # ------------------------------------------------------------------
+
+    def _read_cache_file(self) -> Tuple[Dict[str, InstanceMetadata], Dict[str, str], Dict[str, str]]:
+        """Servidores, usuarios SSH y usuarios rechazados guardados en disco."""
+        if not self.cache_path.is_file():
+            return {}, {}, {}
+        try:
+            with self.cache_path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+            servers = {sid: InstanceMetadata.from_dict(item) for sid, item in raw.get("servers", {}).items()}
+            return servers, dict(raw.get("ssh_users", {})), dict(raw.get("rejected_ssh_users", {}))
+        except (OSError, ValueError, AttributeError):
+            # caché corrupta: se reconstruye en el siguiente refresco
+            return {}, {}, {}
+
+    def _load_cache(self) -> Dict[str, InstanceMetadata]:
+        if self._entries is not None:
+            return self._entries
+        self._entries, self._ssh_users, self._rejected_ssh_users = self._read_cache_file()
+        return self._entries
+
+    def _set_user(self, table: str, key: str, user: Optional[str]) -> bool:
+        """
+        Cambia (user=None: borra) una entrada de ssh_users o
+        rejected_ssh_users y la anota para fusionarla en _save_cache.
+        Devuelve True si cambia la vista de este proceso.
+        """
+        users = self._ssh_users if table == "ssh_users" else self._rejected_ssh_users
+        self._pending_users[table][key] = user
+        if user is None:
+            return users.pop(key, None) is not None
+        changed = users.get(key) != user
+        users[key] = user
+        return changed
+
+    def _set_server_user(self, meta: InstanceMetadata, user: Optional[str]) -> None:
+        meta.ssh_user = user
+        self._pending_users["server_users"][meta.id] = user
+
+    def _merge_pending(
+        self,
+        servers: Dict[str, InstanceMetadata],
+        ssh_users: Dict[str, str],
+        rejected: Dict[str, str],
+    ) -> None:
+        """Aplica sobre lo leído del disco los cambios de este proceso."""
+        for server_id, meta in self._pending_servers.items():
+            current = servers.get(server_id)
+            if current is not None and current.ssh_user:
+                # el usuario detectado por otro proceso sobrevive a nuestro refresco
+                meta.ssh_user = current.ssh_user
+            servers[server_id] = meta
+        for server_id, user in self._pending_users["server_users"].items():
+            meta = servers.get(server_id) or (self._entries or {}).get(server_id)
+            if meta is not None:
+                meta.ssh_user = user
+                servers[server_id] = meta
+        for table, users in (("ssh_users", ssh_users), ("rejected_ssh_users", rejected)):
+            for key, user in self._pending_users[table].items():
+                if user is None:
+                    users.pop(key, None)
+                else:
+                    users[key] = user
+
+    def _save_cache(self) -> None:
+        """
+        Bajo un flock sobre lock_path: relee el fichero, fusiona los cambios
+        pendientes de este proceso (incluidos los borrados) y lo reescribe de
+        forma atómica (fichero temporal + rename). La memoria queda con el
+        resultado, que incluye lo que hayan guardado otros procesos.
+        """
+        self._load_cache()
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                servers, ssh_users, rejected = self._read_cache_file()
+                self._merge_pending(servers, ssh_users, rejected)
+                payload = {
+                    "servers": {sid: asdict(m) for sid, m in servers.items()},
+                    "ssh_users": ssh_users,
+                    "rejected_ssh_users": rejected,
+                }
+                fd, tmp = tempfile.mkstemp(dir=str(self.cache_path.parent), prefix=".instance_metadata.")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(payload, f)
+                    os.replace(tmp, self.cache_path)
+                except OSError:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+                    # los cambios siguen pendientes para la próxima escritura
+                    return
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+        self._pending_servers = {}
+        self._pending_users = {table: {} for table in self._pending_users}
+        # resolve() conserva la referencia a _entries: se actualiza en sitio
+        self._entries.clear()
+        self._entries.update(servers)
+        self._ssh_users = ssh_users
+        self._rejected_ssh_users = rejected
+
+    def _is_fresh(self, meta: InstanceMetadata) -> bool:
+        return (time.time() - meta.fetched_at) < self.ttl_seconds
+
+    def _refresh_allowed(self) -> bool:
+        if self._last_refresh is None:
+            return True
+        return (time.monotonic() - self._last_refresh) >= self.min_refresh_interval
+
+    def _find(self, entries: Dict[str, InstanceMetadata], key: str) -> Optional[InstanceMetadata]:
+        meta = entries.get(key)
+        if meta is not None:
+            return meta
+        for meta in entries.values():
+            if meta.name == key or key in meta.ips:
+                return meta
+        return None
+
+    # ------------------------------------------------------------------
+    # Fuentes
+    # ------------------------------------------------------------------
+
+    def _server_rows(self, env: Dict[str, str]) -> List[Dict]:
+        if self.server_rows is not None:
+            try:
+                return self.server_rows(env)
+            except Exception:
+                # API no disponible: se recurre al CLI
+                pass
+        return json.loads(self._run(["openstack", "server", "list", "--long", "-f", "json"], env))
+
+    def _list_servers(self, env: Dict[str, str]) -> List[InstanceMetadata]:
+        """Un único listado de servidores (API o `openstack server list --long`) para todas las instancias."""
+        now = time.time()
+        servers: List[InstanceMetadata] = []
+        for item in self._server_rows(env):
+            servers.append(InstanceMetadata(
+                id=str(item.get("ID")),
+                name=str(item.get("Name")),
+                image_name=str(item.get("Image Name") or ""),
+                ips=_parse_networks(item.get("Networks")),
+                ssh_user=None,
+                fetched_at=now,
+            ))
+        return servers
+
+    def _read_summary(self) -> List[Dict]:
+        if self.summary_path is None or not self.summary_path.is_file():
+            return []
+        try:
+            with self.summary_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return data if isinstance(data, list) else data.get("instances", [])
+
+    def _refresh(self, env: Dict[str, str]) -> None:
+        entries = self._load_cache()
+        try:
+            listed = self._list_servers(env)
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            listed = []
+        else:
+            self._last_refresh = time.monotonic()
+
+        now = time.time()
+        for meta in listed:
+            previous = entries.get(meta.id)
+            if previous is not None:
+                # el usuario SSH detectado sobrevive al refresco
+                meta.ssh_user = previous.ssh_user
+            entries[meta.id] = meta
+            self._pending_servers[meta.id] = meta
+
+        # summary.json completa lo que el listado no sabe (usuario SSH) o
+        # sustituye al listado si el CLI no está disponible
+        for node in self._read_summary():
+            server_id = str(node.get("server_id") or node.get("id") or "")
+            if not server_id:
+                continue
+            meta = entries.get(server_id)
+            if meta is None:
+                if listed:
+                    # el listado manda: el servidor ya no existe
+                    continue
+                meta = InstanceMetadata(
+                    id=server_id,
+                    name=str(node.get("name")),
+                    image_name=str(node.get("image") or node.get("image_name") or ""),
+                    ips=[],
+                    ssh_user=None,
+                    fetched_at=now,
+                )
+                entries[server_id] = meta
+            fip = node.get("floating_ip")
+            if fip and fip not in meta.ips:
+                meta.ips.append(fip)
+            user = node.get("ssh_user")
+            if not meta.ssh_user and user and not self._rejected(user, server_id, *meta.ips):
+                meta.ssh_user = user
+            self._pending_servers[meta.id] = meta
+
+        self._save_cache()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def resolve(self, name_or_id: str, env: Dict[str, str]) -> Optional[InstanceMetadata]:
+        """
+        Devuelve los metadatos de una instancia (por id, nombre o IP).
+        Solo se consulta OpenStack si la entrada falta o ha caducado, y como
+        mucho un listado cada min_refresh_interval segundos (un listado fallido
+        no cuenta: se reintenta en la siguiente consulta).
+        """
+        with self._lock:
+            entries = self._load_cache()
+            meta = self._find(entries, name_or_id)
+            if meta is not None and self._is_fresh(meta):
+                return meta
+            if self._refresh_allowed():
+                self._refresh(env)
+                meta = self._find(entries, name_or_id)
+            return meta
+
+    def image_name_for(self, name_or_id: str, env: Dict[str, str]) -> str:
+        meta = self.resolve(name_or_id, env)
+        return meta.image_name if meta is not None else ""
+
+    # ------------------------------------------------------------------
+    # Caché de usuarios SSH
+    # ------------------------------------------------------------------
+
+    def _summary_ssh_users(self) -> Dict[str, str]:
+        """Usuarios SSH declarados en summary.json, indexados por id, server_id, nombre e IP."""
+        if self._summary_users is None:
+            users: Dict[str, str] = {}
+            for node in self._read_summary():
+                user = node.get("ssh_user")
+                if not user:
+                    continue
+                for key in ("server_id", "id", "name", "floating_ip"):
+                    if node.get(key):
+                        users[str(node[key])] = str(user)
+            self._summary_users = users
+        return self._summary_users
+
+    def _rejected(self, user: str, *keys: str) -> bool:
+        return any(self._rejected_ssh_users.get(key) == user for key in keys)
+
+    def _known_ssh_user(self, instance_id: str, ip: str) -> Optional[str]:
+        entries = self._load_cache()
+        for key in (instance_id, ip):
+            if key in self._ssh_users:
+                return self._ssh_users[key]
+        for key in (instance_id, ip):
+            meta = self._find(entries, key)
+            if meta is not None and meta.ssh_user and not self._rejected(meta.ssh_user, instance_id, ip):
+                return meta.ssh_user
+        summary_users = self._summary_ssh_users()
+        for key in (instance_id, ip):
+            if key in summary_users and not self._rejected(summary_users[key], instance_id, ip):
+                return summary_users[key]
+        return None
+
+    def known_ssh_user(self, instance_id: str, ip: str) -> Optional[str]:
+        """
+        Usuario SSH que ya funcionó para la instancia (por id o IP), o el que
+        declara summary.json, salvo que se haya invalidado con
+        forget_ssh_user. None si no hay ninguno.
+        """
+        with self._lock:
+            return self._known_ssh_user(instance_id, ip)
+
+    def rejected_ssh_user(self, instance_id: str, ip: str) -> Optional[str]:
+        """Último usuario SSH invalidado con forget_ssh_user para la instancia, si lo hay."""
+        with self._lock:
+            self._load_cache()
+            for key in (instance_id, ip):
+                if key in self._rejected_ssh_users:
+                    return self._rejected_ssh_users[key]
+            return None
+
+    def remember_ssh_user(self, instance_id: str, ip: str, ssh_user: str, save: bool = True) -> None:
+        """
+        Guarda el usuario SSH que ha funcionado para la instancia. Con
+        save=False solo se actualiza la memoria hasta el siguiente flush()
+        (p. ej. cientos de instancias en el motor async: una sola escritura).
+        """
+        with self._lock:
+            entries = self._load_cache()
+            changed = False
+            for key in (instance_id, ip):
+                if not key:
+                    continue
+                changed = self._set_user("ssh_users", key, ssh_user) or changed
+                changed = self._set_user("rejected_ssh_users", key, None) or changed
+            for key in (instance_id, ip):
+                meta = self._find(entries, key)
+                if meta is not None and meta.ssh_user != ssh_user:
+                    self._set_server_user(meta, ssh_user)
+                    changed = True
+                    break
+            if changed and save:
+                self._save_cache()
+            elif changed:
+                self._dirty = True
+
+    def flush(self) -> None:
+        """Escribe los cambios pendientes de remember_ssh_user(save=False)."""
+        with self._lock:
+            if self._dirty:
+                self._save_cache()
+                self._dirty = False
+
+    def forget_ssh_user(self, instance_id: str, ip: str) -> None:
+        """
+        Invalida el usuario SSH conocido (p. ej. porque la autenticación ha
+        fallado). Queda anotado en la caché en disco, así que ni otro proceso
+        ni un refresco con summary.json lo vuelven a dar por bueno hasta que
+        remember_ssh_user guarde un usuario que funcione.
+        """
+        with self._lock:
+            entries = self._load_cache()
+            user = self._known_ssh_user(instance_id, ip)
+            for key in (instance_id, ip):
+                if not key:
+                    continue
+                self._set_user("ssh_users", key, None)
+                meta = self._find(entries, key)
+                if meta is not None:
+                    self._set_server_user(meta, None)
+                if user:
+                    self._set_user("rejected_ssh_users", key, user)
+            self._save_cache()
@@ -0,0 +1,499 @@
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.models.jobs import Job, JobTarget
+from src.models.tools import InstallerOptions
+from src.services.metrics import JOBS_IN_FLIGHT
+from src.services.tools_installer_service import ProgressCallback, ToolsInstallerService
+from src.services.tools_uninstaller_service import ToolsUninstallerService
+
+logger = logging.getLogger(__name__)
+
+# execute(job, on_event) -> resultados
+JobExecutor = Callable[[Job, ProgressCallback], List[Dict]]
+
+JOB_KINDS = ("install", "uninstall")
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_token(pid: Optional[int]) -> Optional[str]:
+    """
+    "<pid>:<arranque>" del proceso con ese pid (campo starttime de
+    /proc/<pid>/stat), o None si no existe o no hay /proc. Distingue un
+    proceso nuevo que reutiliza el pid de uno anterior (p. ej. el dashboard
+    reiniciado como pid 1 de un contenedor).
+    """
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat", "r", encoding="utf-8") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    fields = stat[stat.rfind(")") + 2:].split()
+    if len(fields) < 20:
+        return None
+    return f"{pid}:{fields[19]}"
+
+
+class ServiceJobExecutor:
+    """Ejecuta un Job con ToolsInstallerService / ToolsUninstallerService."""
+
+    def __init__(self, repo_root: Path) -> None:
+        self.repo_root = repo_root
+
+    def _service(self, kind: str, options: Optional[Dict] = None):
+        # golden_images None: como el dashboard (NICS_GOLDEN_IMAGES); True/False: lo pedido al encolar
+        settings = InstallerOptions.from_job_options(options or {})
+        if kind == "uninstall":
+            return ToolsUninstallerService(self.repo_root, settings)
+        return ToolsInstallerService(self.repo_root, settings)
+
+    def instances_for(self, kind: str, targets: Optional[List[JobTarget]]) -> List[str]:
+        """Instancias afectadas por un trabajo (para el límite por instancia)."""
+        if targets is not None:
+            return sorted({t.instance for t in targets})
+        return sorted({p.instance.name for p in self._service(kind)._load_tool_plans()})
+
+    def __call__(self, job: Job, on_event: ProgressCallback) -> List[Dict]:
+        service = self._service(job.kind, job.options)
+        plans = None
+        if job.targets is not None:
+            plans = [service.build_plan(t.instance, t.tools, t.hints) for t in job.targets]
+        options = {
+            "max_workers": int(job.options.get("max_workers", 1)),
+            "pipelined": bool(job.options.get("pipelined", False)),
+            "engine": str(job.options.get("engine") or "threads"),
+            "deadline": job.options.get("deadline"),
+        }
+        if job.kind == "uninstall":
+            return service.run_all_uninstall_plans(plans=plans, on_event=on_event, **options)
+        return service.run_all_plans(
+            plans=plans,
+            on_event=on_event,
+            force=bool(job.options.get("force", False)),
+            bundled=bool(job.options.get("bundled", False)),
+            dag=bool(job.options.get("dag", False)),
+            **options,
+        )
+
+
+class JobQueue:
+    """
+    Cola persistente de trabajos de instalación/desinstalación.
+
+    - submit() guarda el trabajo en state/jobs.json y devuelve su id al momento.
+    - Un hilo despachador reparte los trabajos en un pool de max_workers hilos,
+      sin superar per_instance_limit trabajos simultáneos sobre una instancia.
+    - Las herramientas empezadas y los resultados por herramienta se
+      persisten a medida que llegan (como mucho una escritura de jobs.json
+      cada results_flush_interval segundos), así que cualquier proceso
+      (p. ej. otro worker de gunicorn) puede consultarlos o seguirlos con
+      subscribe()/follow().
+    - Los trabajos que estaban en marcha cuando el dashboard se detuvo (su
+      proceso ya no existe, aunque otro proceso tenga ahora el mismo pid)
+      vuelven a la cola al arrancar.
+    - on_complete(job) se llama en el proceso que ejecutó el trabajo cuando
+      termina (p. ej. para actualizar el almacén de herramientas); si el
+      trabajo falló, con los resultados de las herramientas que llegaron a
+      terminar. Si on_complete falla, el error queda en job.on_complete_error
+      y el status del trabajo no cambia.
+
+    El fichero se protege con un flock, por lo que varios procesos pueden
+    compartir la misma cola sin ejecutar dos veces un trabajo.
+    """
+
+    def __init__(
+        self,
+        state_path: Path,
+        executor: JobExecutor,
+        instances_for: Callable[[str, Optional[List[JobTarget]]], List[str]],
+        max_workers: int = 4,
+        per_instance_limit: int = 1,
+        poll_interval: float = 1.0,
+        keep_finished: int = 200,
+        on_complete: Optional[Callable[[Job], None]] = None,
+        results_flush_interval: float = 1.0,
+    ) -> None:
+        self.state_path = Path(state_path)
+        self.lock_path = self.state_path.with_name(self.state_path.name + ".lock")
+        self._execute = executor
+        self._instances_for = instances_for
+        self.max_workers = max_workers
+        self.per_instance_limit = per_instance_limit
+        self.poll_interval = poll_interval
+        self.keep_finished = keep_finished
+        self._on_complete = on_complete
+        self.results_flush_interval = results_flush_interval
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._running_here = 0
+        self._mutex = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._dispatcher: Optional[threading.Thread] = None
+        # cambia en cada arranque aunque se repita el pid; sin /proc, uno aleatorio
+        self.owner_token = _process_token(os.getpid()) or f"{os.getpid()}:{uuid.uuid4().hex}"
+
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def for_repo(cls, repo_root: Path, **kwargs) -> "JobQueue":
+        executor = ServiceJobExecutor(repo_root)
+        return cls(
+            repo_root / "state" / "jobs.json",
+            executor=executor,
+            instances_for=executor.instances_for,
+            **kwargs,
+        )
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked_jobs(self, write: bool) -> Iterator[Dict[str, Job]]:
+        """Carga los trabajos bajo flock y, si write=True, los guarda al salir."""
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if write else fcntl.LOCK_SH)
+            try:
+                jobs = self._load()
+                yield jobs
+                if write:
+                    self._save(jobs)
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, Job]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with self.state_path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        jobs: Dict[str, Job] = {}
+        for item in raw.get("jobs", []) if isinstance(raw, dict) else []:
+            try:
+                job = Job.from_dict(item)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                # entrada mal formada o de un formato anterior: no se puede ejecutar
+                logger.warning("trabajo ilegible en %s descartado: %r", self.state_path, item)
+                continue
+            jobs[job.id] = job
+        return jobs
+
+    def _save(self, jobs: Dict[str, Job]) -> None:
+        ordered = sorted(jobs.values(), key=lambda j: j.created_at)
+        finished = [j for j in ordered if j.status not in ACTIVE_STATUSES]
+        drop = {j.id for j in finished[:max(0, len(finished) - self.keep_finished)]}
+        payload = {"jobs": [asdict(j) for j in ordered if j.id not in drop]}
+        fd, tmp = tempfile.mkstemp(dir=str(self.state_path.parent), prefix=".jobs.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp, self.state_path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        kind: str,
+        targets: Optional[List[JobTarget]] = None,
+        options: Optional[Dict] = None,
+    ) -> str:
+        """Encola un trabajo y devuelve su id sin esperar a que se ejecute."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        job = Job(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            targets=targets,
+            instances=self._instances_for(kind, targets),
+            options=dict(options or {}),
+            created_at=time.time(),
+        )
+        with self._locked_jobs(write=True) as jobs:
+            jobs[job.id] = job
+        self._wakeup.set()
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._locked_jobs(write=False) as jobs:
+            job = jobs.get(job_id)
+            return asdict(job) if job is not None else None
+
+    def list(self) -> List[Dict]:
+        with self._locked_jobs(write=False) as jobs:
+            return [asdict(j) for j in sorted(jobs.values(), key=lambda j: j.created_at, reverse=True)]
+
+    def subscribe(self, job_id: str, poll_interval: float = 0.5) -> Iterator[Dict]:
+        """
+        Eventos de un trabajo: {"event": "status"} en cada cambio de estado,
+        {"event": "tool_started"} por cada herramienta que empieza (con su
+        log_file) y {"event": "tool_finished"} por cada resultado nuevo.
+        Termina cuando el trabajo acaba. Funciona aunque el trabajo lo
+        ejecute otro proceso.
+        """
+        seen_started = 0
+        seen_results = 0
+        last_status = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                yield {"event": "error", "error": f"job {job_id} no encontrado"}
+                return
+            for tool in job["started_tools"][seen_started:]:
+                yield {"event": "tool_started", "job_id": job_id, **tool}
+            seen_started = len(job["started_tools"])
+            for result in job["results"][seen_results:]:
+                yield {
+                    "event": "tool_finished",
+                    "job_id": job_id,
+                    "instance": (result.get("instance") or {}).get("name"),
+                    "tool": result.get("tool"),
+                    "result": result,
+                }
+            seen_results = len(job["results"])
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield {"event": "status", "job_id": job_id, "status": last_status, "error": job["error"]}
+            if last_status not in ACTIVE_STATUSES:
+                return
+            time.sleep(poll_interval)
+
+    def follow(self, job_id: str, on_event: ProgressCallback, poll_interval: float = 0.5) -> List[Dict]:
+        """
+        Espera a que termine un trabajo reenviando a on_event sus eventos
+        tool_started / tool_finished (con la misma forma que los de
+        ToolsInstallerService) y devuelve sus resultados. Sirve de RunFunction
+        para InstallStream. Lanza RuntimeError si el trabajo falla o desaparece.
+        """
+        for event in self.subscribe(job_id, poll_interval):
+            kind = event["event"]
+            if kind in ("tool_started", "tool_finished"):
+                on_event(event)
+            elif kind == "error":
+                raise RuntimeError(event["error"])
+            elif event["status"] == "failed":
+                raise RuntimeError(event["error"] or f"job {job_id} fallido")
+        job = self.get(job_id)
+        return job["results"] if job is not None else []
+
+    # ------------------------------------------------------------------
+    # Despacho
+    # ------------------------------------------------------------------
+
+    def start(self) -> "JobQueue":
+        """Arranca el hilo despachador (idempotente)."""
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        self._pool.shutdown(wait=False)
+
+    def _dispatch_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                for job in self._claim_jobs():
+                    self._pool.submit(self._run_job, job)
+            except Exception:
+                # el despachador no debe morir: sin él los trabajos se quedan en
+                # queued para siempre; se reintenta en la siguiente vuelta
+                logger.exception("error despachando trabajos de %s", self.state_path)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim_jobs(self) -> List[Job]:
+        """Marca como running los trabajos que pueden empezar ya en este proceso."""
+        claimed: List[Job] = []
+        with self._mutex:
+            free = self.max_workers - self._running_here
+        if free <= 0:
+            return claimed
+
+        pid = os.getpid()
+        with self._locked_jobs(write=True) as jobs:
+            busy: Dict[str, int] = {}
+            for job in jobs.values():
+                if job.status == "running" and self._owner_gone(job):
+                    # el proceso que lo ejecutaba ya no existe: vuelve a la cola
+                    job.status = "queued"
+                    job.owner_pid = None
+                    job.owner_token = None
+                    job.results = []
+                    job.started_tools = []
+                if job.status == "running":
+                    for name in job.instances:
+                        busy[name] = busy.get(name, 0) + 1
+
+            for job in sorted(jobs.values(), key=lambda j: j.created_at):
+                if len(claimed) >= free:
+                    break
+                if job.status != "queued":
+                    continue
+                if any(busy.get(name, 0) >= self.per_instance_limit for name in job.instances):
+                    continue
+                job.status = "running"
+                job.owner_pid = pid
+                job.owner_token = self.owner_token
+                job.started_at = time.time()
+                job.attempts += 1
+                for name in job.instances:
+                    busy[name] = busy.get(name, 0) + 1
+                claimed.append(job)
+
+        with self._mutex:
+            self._running_here += len(claimed)
+        return claimed
+
+    def _owner_gone(self, job: Job) -> bool:
+        """True si el proceso que reclamó un trabajo running ya no existe."""
+        if job.owner_pid == os.getpid():
+            return job.owner_token != self.owner_token
+        current = _process_token(job.owner_pid)
+        if current is not None:
+            return current != job.owner_token
+        return not _pid_alive(job.owner_pid)
+
+    def _update_job(self, job_id: str, mutate: Callable[[Job], None]) -> None:
+        with self._locked_jobs(write=True) as jobs:
+            job = jobs.get(job_id)
+            if job is not None:
+                mutate(job)
+
+    def _run_job(self, job: Job) -> None:
+        # el progreso (herramientas empezadas y resultados) se acumula en memoria
+        # y jobs.json se reescribe como mucho una vez por results_flush_interval;
+        # lo que llega dentro del intervalo se escribe al vencer un temporizador,
+        # para no esperar al siguiente evento (que puede tardar minutos)
+        results: List[Dict] = []
+        started: List[Dict] = []
+        progress_lock = threading.Lock()  # protege las listas y el temporizador
+        flush_lock = threading.Lock()  # serializa las escrituras en jobs.json
+        last_flush = time.monotonic()
+        pending: Optional[threading.Timer] = None
+        done = False
+
+        def flush() -> None:
+            nonlocal last_flush, pending
+            with flush_lock:
+                if done:
+                    return
+                with progress_lock:
+                    pending = None
+                    last_flush = time.monotonic()
+                    partial, partial_started = list(results), list(started)
+
+                def store(j: Job) -> None:
+                    j.results = partial
+                    j.started_tools = partial_started
+
+                self._update_job(job.id, store)
+
+        def on_event(event: Dict) -> None:
+            nonlocal pending
+            kind = event.get("event")
+            with progress_lock:
+                if kind == "tool_finished":
+                    results.append(event["result"])
+                elif kind == "tool_started":
+                    started.append({k: event.get(k) for k in ("instance", "tool", "log_file")})
+                else:
+                    return
+                wait = self.results_flush_interval - (time.monotonic() - last_flush)
+                if wait > 0:
+                    if pending is None:
+                        pending = threading.Timer(wait, flush)
+                        pending.daemon = True
+                        pending.start()
+                    return
+            flush()
+
+        def finish_job(mutate: Callable[[Job], None]) -> List[Dict]:
+            # última escritura: ningún temporizador pendiente puede pisarla
+            nonlocal done
+            with flush_lock:
+                done = True
+                with progress_lock:
+                    if pending is not None:
+                        pending.cancel()
+                    partial_started = list(started)
+
+                def store(j: Job) -> None:
+                    j.started_tools = partial_started
+                    mutate(j)
+
+                self._update_job(job.id, store)
+
+        JOBS_IN_FLIGHT.inc(kind=job.kind)
+        try:
+            try:
+                final = self._execute(job, on_event)
+            except Exception as e:
+                with progress_lock:
+                    final = list(results)
+
+                def fail(j: Job, error: str = str(e)) -> None:
+                    j.results = final
+                    j.status = "failed"
+                    j.error = error
+                    j.finished_at = time.time()
+
+                finish_job(fail)
+            else:
+                def finish(j: Job) -> None:
+                    j.results = final
+                    j.status = "completed"
+                    j.finished_at = time.time()
+
+                finish_job(finish)
+
+            if self._on_complete is not None:
+                job.results = final
+                try:
+                    self._on_complete(job)
+                except Exception as e:
+                    # el trabajo ya terminó: el fallo se anota aparte, sin tocar status
+                    def note(j: Job, error: str = str(e)) -> None:
+                        j.on_complete_error = error
+
+                    self._update_job(job.id, note)
+        finally:
+            JOBS_IN_FLIGHT.dec(kind=job.kind)
+            with self._mutex:
+                self._running_here -= 1
+            self._wakeup.set()
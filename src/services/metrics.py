@@ -0,0 +1,411 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Buckets (segundos) para latencias de peticiones HTTP y operaciones locales
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Buckets (segundos) para instalaciones/desinstalaciones remotas
+INSTALL_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Base común: nombre, ayuda, etiquetas y un lock por métrica."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}, recibió {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels_text(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Líneas de muestras en formato de texto de Prometheus (sin HELP/TYPE)."""
+
+    @abstractmethod
+    def _dump(self) -> List:
+        """Valores por etiquetas serializables en JSON (ver MetricsRegistry.share)."""
+
+    @abstractmethod
+    def _merge(self, items: List) -> None:
+        """Suma a esta métrica los valores de un _dump (de este u otro proceso)."""
+
+    def _new(self) -> "_Metric":
+        """Métrica vacía con la misma definición."""
+        return type(self)(self.name, self.documentation, self.labelnames)
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Contador monótono."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels_text(k)} {_format_value(v)}" for k, v in items]
+
+    def _dump(self) -> List:
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    def _merge(self, items: List) -> None:
+        with self._lock:
+            for key, value in items:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja (p. ej. streams abiertos)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """Suma 1 mientras dura el bloque."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels_text(k)} {_format_value(v)}" for k, v in items]
+
+    def _dump(self) -> List:
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    def _merge(self, items: List) -> None:
+        with self._lock:
+            for key, value in items:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Histogram(_Metric):
+    """
+    Histograma con buckets fijos. observe() es un bisect y una suma bajo el
+    lock de la métrica; los acumulados por bucket se calculan al exportar.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # por etiquetas: [cuenta por bucket (+ el de +Inf), suma, total]
+        self._values: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._labels_text(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels_text(key)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{self._labels_text(key)} {count}")
+        return lines
+
+    def _dump(self) -> List:
+        with self._lock:
+            return [[list(k), list(v[0]), v[1], v[2]] for k, v in self._values.items()]
+
+    def _merge(self, items: List) -> None:
+        with self._lock:
+            for key, counts, total, count in items:
+                if len(counts) != len(self.buckets) + 1:
+                    continue
+                entry = self._values.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+    def _new(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets)
+
+
+class MetricsRegistry:
+    """
+    Registro en memoria del proceso.
+
+    Con varios workers de gunicorn detrás del mismo puerto, cada scrape llega
+    a un worker cualquiera, así que cada uno debe exponer el total de todos.
+    Para eso, share(directorio) hace que el proceso vuelque sus valores en
+    <directorio>/<pid>-<id>.json cada interval segundos, y render() suma los
+    volcados de todos los procesos:
+
+      - contadores e histogramas se suman, también los de workers ya
+        terminados, para que los totales nunca bajen (el último volcado de un
+        worker que muere se conserva);
+      - los gauges solo se suman de los procesos vivos (volcado de hace menos
+        de 3 * interval), porque describen el estado actual.
+
+    Los valores de otros workers llegan con hasta interval segundos de
+    retraso. El directorio se vacía al arrancar el master (clear_shared), ya
+    que los totales empiezan de cero con cada arranque del dashboard.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._shared_dir: Optional[Path] = None
+        self._shared_path: Optional[Path] = None
+        self._interval = 5.0
+        self._stop_sharing = threading.Event()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"La métrica {metric.name} ya está registrada con otra definición")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    # ------------------------------------------------------------------
+    # Varios procesos
+    # ------------------------------------------------------------------
+
+    def share(self, directory: Path, interval: float = 5.0) -> None:
+        """Vuelca los valores del proceso en directory cada interval segundos (idempotente)."""
+        if self._shared_dir is not None:
+            return
+        self._shared_dir = Path(directory)
+        self._shared_dir.mkdir(parents=True, exist_ok=True)
+        self._shared_path = self._shared_dir / f"{os.getpid()}-{uuid.uuid4().hex}.json"
+        self._interval = interval
+        self.write_snapshot()
+        threading.Thread(target=self._share_loop, name="metrics-share", daemon=True).start()
+
+    def stop_sharing(self) -> None:
+        """Último volcado al terminar el proceso: sin gauges, que dejan de contar al morir."""
+        if self._shared_dir is None:
+            return
+        self._stop_sharing.set()
+        self.write_snapshot(gauges=False)
+
+    @staticmethod
+    def clear_shared(directory: Path) -> None:
+        """Borra los volcados de una ejecución anterior (desde el master, antes de arrancar los workers)."""
+        for path in Path(directory).glob("*.json"):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _share_loop(self) -> None:
+        while not self._stop_sharing.wait(self._interval):
+            try:
+                self.write_snapshot()
+            except OSError:
+                # error transitorio de escritura: se reintenta en la siguiente vuelta
+                pass
+
+    def write_snapshot(self, gauges: bool = True) -> None:
+        """Escribe de forma atómica el volcado de este proceso (ver share)."""
+        if self._shared_path is None:
+            return
+        with self._lock:
+            metrics = list(self._metrics.values())
+        payload = {
+            "written_at": time.time(),
+            "metrics": {m.name: m._dump() for m in metrics if gauges or m.kind != "gauge"},
+        }
+        fd, tmp = tempfile.mkstemp(dir=str(self._shared_dir), prefix=".metrics.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp, self._shared_path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def _aggregated(self, metrics: List[_Metric]) -> List[_Metric]:
+        """Copias de metrics con la suma de los volcados de todos los procesos."""
+        self.write_snapshot()
+        merged = {m.name: m._new() for m in metrics}
+        live_after = time.time() - 3 * self._interval
+        for path in sorted(self._shared_dir.glob("*.json")):
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            live = payload.get("written_at", 0) >= live_after
+            for name, items in payload.get("metrics", {}).items():
+                metric = merged.get(name)
+                if metric is not None and (live or metric.kind != "gauge"):
+                    metric._merge(items)
+        return [merged[m.name] for m in metrics]
+
+    def render(self) -> str:
+        """
+        Formato de texto de Prometheus (text/plain; version=0.0.4): los
+        valores de este proceso o, tras share(), la suma de todos.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        if self._shared_dir is not None:
+            metrics = self._aggregated(metrics)
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Métricas compartidas por el dashboard y los servicios
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "nics_http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("method", "route", "status"))
+TOOLS_STORE_OPERATIONS = REGISTRY.histogram(
+    "nics_tools_store_operation_duration_seconds", "Duración de lecturas y escrituras del tools store",
+    ("operation", "mode"))
+SSE_STREAMS_OPEN = REGISTRY.gauge(
+    "nics_sse_streams_open", "Streams de Server-Sent Events abiertos", ("stream",))
+JOBS_IN_FLIGHT = REGISTRY.gauge(
+    "nics_jobs_in_flight",
+    "Instalaciones/desinstalaciones en curso (trabajos de la cola y streams SSE de instalación)", ("kind",))
+TOOL_RUN_SECONDS = REGISTRY.histogram(
+    "nics_tool_run_duration_seconds", "Duración de la instalación/desinstalación de cada herramienta",
+    ("kind", "tool", "status"), INSTALL_BUCKETS)
+TOOL_RUN_FAILURES = REGISTRY.counter(
+    "nics_tool_run_failures_total", "Instalaciones/desinstalaciones fallidas por herramienta y estado",
+    ("kind", "tool", "status"))
+
+
+def observe_tool_result(kind: str, result: Dict) -> None:
+    """Duración y, si no ha ido bien, fallo de un resultado de ToolsInstallerService/ToolsUninstallerService."""
+    tool = str(result.get("tool"))
+    status = str(result.get("status"))
+    started, finished = result.get("started_at"), result.get("finished_at")
+    if started is not None and finished is not None:
+        TOOL_RUN_SECONDS.observe(finished - started, kind=kind, tool=tool, status=status)
+    if status not in ("ok", "already_installed"):
+        TOOL_RUN_FAILURES.inc(kind=kind, tool=tool, status=status)
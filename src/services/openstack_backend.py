@@ -0,0 +1,230 @@
+import json
+import os
+import subprocess
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# run(cmd, env) -> stdout; lanza CalledProcessError si el comando falla
+CommandRunner = Callable[[List[str], Optional[Dict[str, str]]], str]
+
+
+def load_openrc_env(openrc: Path, base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Carga las variables OS_* de un admin-openrc.sh en un dict de entorno
+    (copia de base u os.environ). No ejecuta 'source': parsea las líneas
+    export OS_*=...
+    """
+    env = dict(os.environ if base is None else base)
+    if not openrc.is_file():
+        raise FileNotFoundError(f"No se encontró admin-openrc.sh en {openrc}")
+
+    with openrc.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith("export "):
+                continue
+            # ejemplo: export OS_AUTH_URL=http://...
+            try:
+                _, rest = line.split("export ", 1)
+                key, value = rest.split("=", 1)
+                env[key.strip()] = value.strip()
+            except ValueError:
+                # línea no estándar, se ignora
+                continue
+    return env
+
+
+class ResourceNotFound(RuntimeError):
+    """El recurso ya no existe (al borrar, cuenta como borrado)."""
+
+
+class ResourceConflict(RuntimeError):
+    """Conflicto transitorio (409, recurso en uso o en transición): se puede reintentar."""
+
+
+def error_text(exc: BaseException) -> str:
+    """
+    Texto de un error para informes y resultados: el stderr de un comando que
+    ha fallado, el mensaje de la excepción o, si está vacío, su tipo.
+    """
+    if isinstance(exc, subprocess.CalledProcessError) and exc.stderr:
+        return str(exc.stderr).strip()
+    return str(exc) or exc.__class__.__name__
+
+
+# Fragmentos de stderr del CLI `openstack` que identifican cada caso
+_CLI_NOT_FOUND = ("No Port found", "No Floating IP found", "No server with a name or ID",
+                  "Could not find", "HTTP 404", "Not Found")
+_CLI_CONFLICT = ("HTTP 409", "Conflict", "in use", "task_state")
+
+
+def use_api_transport(env: Dict[str, str], transport: Optional[str] = None) -> bool:
+    """
+    Decide si se habla con OpenStack por HTTP (OpenStackClient) o con el CLI.
+
+    transport (o NICS_OPENSTACK_TRANSPORT) puede ser "api", "cli" o "auto"
+    (por defecto): API si hay credenciales de usuario/contraseña en env.
+    """
+    transport = (transport or os.environ.get("NICS_OPENSTACK_TRANSPORT", "auto")).lower()
+    if transport == "cli":
+        return False
+    if transport == "api":
+        return True
+    if transport != "auto":
+        raise ValueError(f"Transporte de OpenStack desconocido: {transport}")
+    auth_type = env.get("OS_AUTH_TYPE", "password").lower()
+    return bool(env.get("OS_AUTH_URL") and env.get("OS_PASSWORD")) and auth_type in ("password", "v3password")
+
+
+def open_openstack_backend(env: Optional[Dict[str, str]] = None, transport: Optional[str] = None) -> "OpenStackBackend":
+    """Backend de OpenStack para env (os.environ por defecto) según use_api_transport."""
+    if use_api_transport(env if env is not None else dict(os.environ), transport):
+        from src.services.openstack_client import OpenStackApiBackend, shared_client
+
+        return OpenStackApiBackend(shared_client(env if env is not None else dict(os.environ)))
+    return OpenStackCliBackend(env)
+
+
+def _run_command(cmd: List[str], env: Optional[Dict[str, str]] = None) -> str:
+    result = subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+        env=env,
+    )
+    return result.stdout
+
+
+class OpenStackBackend(ABC):
+    """
+    Operaciones de OpenStack que necesita el aprovisionamiento de escenarios.
+    Las implementaciones deben poder llamarse desde varios hilos a la vez.
+    """
+
+    @abstractmethod
+    def create_port(self, name: str, network: str, security_group: str) -> str:
+        """Crea un puerto y devuelve su id."""
+
+    @abstractmethod
+    def create_server(self, name: str, image: str, flavor: str, key_name: str, port_id: str) -> str:
+        """Lanza un servidor sobre un puerto existente y devuelve su id (sin esperar a ACTIVE)."""
+
+    @abstractmethod
+    def list_servers(self) -> List[Dict[str, str]]:
+        """Todos los servidores del proyecto en una sola llamada: [{"id", "name", "status"}]."""
+
+    @abstractmethod
+    def create_floating_ip(self, external_network: str) -> str:
+        """Reserva una IP flotante y devuelve la dirección."""
+
+    @abstractmethod
+    def add_floating_ip(self, server_id: str, address: str) -> None:
+        """Asocia la IP flotante al servidor."""
+
+    # Borrados: lanzan ResourceNotFound si el recurso no existe y
+    # ResourceConflict si hay que reintentar más tarde.
+
+    @abstractmethod
+    def delete_floating_ip(self, address: str) -> None:
+        """Libera la IP flotante."""
+
+    @abstractmethod
+    def delete_server(self, name_or_id: str) -> None:
+        """Pide el borrado sin esperar a que termine (ver ServerStatusWatcher)."""
+
+    @abstractmethod
+    def delete_port(self, name_or_id: str) -> None:
+        """Borra el puerto."""
+
+    # Imágenes de servidores (golden images, ver GoldenImageCache)
+
+    @abstractmethod
+    def snapshot_server(self, server_id: str, image_name: str, metadata: Dict[str, str]) -> str:
+        """Pide un snapshot del servidor y devuelve el id de la imagen (sin esperar a active)."""
+
+    @abstractmethod
+    def image_info(self, image_id: str) -> Dict:
+        """{"id", "name", "status", "size"} de una imagen; ResourceNotFound si ya no existe."""
+
+    @abstractmethod
+    def delete_image(self, image_id: str) -> None:
+        """Borra la imagen."""
+
+
+class OpenStackCliBackend(OpenStackBackend):
+    """Backend sobre el CLI `openstack` (un proceso por operación)."""
+
+    def __init__(self, env: Optional[Dict[str, str]] = None, run: Optional[CommandRunner] = None) -> None:
+        self.env = env
+        self._run = run or _run_command
+
+    def _value(self, args: List[str], column: str) -> str:
+        out = self._run(["openstack", *args, "-f", "value", "-c", column], self.env).strip()
+        if not out:
+            raise RuntimeError(f"openstack {' '.join(args[:2])} no devolvió {column}")
+        return out
+
+    def create_port(self, name: str, network: str, security_group: str) -> str:
+        return self._value(["port", "create", name, "--network", network, "--security-group", security_group], "id")
+
+    def create_server(self, name: str, image: str, flavor: str, key_name: str, port_id: str) -> str:
+        return self._value(
+            ["server", "create", name, "--image", image, "--flavor", flavor,
+             "--key-name", key_name, "--nic", f"port-id={port_id}"],
+            "id",
+        )
+
+    def list_servers(self) -> List[Dict[str, str]]:
+        out = self._run(["openstack", "server", "list", "-f", "json", "-c", "ID", "-c", "Name", "-c", "Status"], self.env)
+        return [
+            {"id": str(s.get("ID")), "name": str(s.get("Name")), "status": str(s.get("Status"))}
+            for s in json.loads(out or "[]")
+        ]
+
+    def create_floating_ip(self, external_network: str) -> str:
+        return self._value(["floating", "ip", "create", external_network], "floating_ip_address")
+
+    def add_floating_ip(self, server_id: str, address: str) -> None:
+        self._run(["openstack", "server", "add", "floating", "ip", server_id, address], self.env)
+
+    def _delete(self, args: List[str]) -> None:
+        try:
+            self._run(["openstack", *args], self.env)
+        except subprocess.CalledProcessError as e:
+            stderr = str(e.stderr or "")
+            if any(marker in stderr for marker in _CLI_NOT_FOUND):
+                raise ResourceNotFound(stderr.strip()) from e
+            if any(marker in stderr for marker in _CLI_CONFLICT):
+                raise ResourceConflict(stderr.strip()) from e
+            raise
+
+    def delete_floating_ip(self, address: str) -> None:
+        self._delete(["floating", "ip", "delete", address])
+
+    def delete_server(self, name_or_id: str) -> None:
+        self._delete(["server", "delete", name_or_id])
+
+    def delete_port(self, name_or_id: str) -> None:
+        self._delete(["port", "delete", name_or_id])
+
+    def snapshot_server(self, server_id: str, image_name: str, metadata: Dict[str, str]) -> str:
+        properties = [arg for key, value in metadata.items() for arg in ("--property", f"{key}={value}")]
+        return self._value(["server", "image", "create", "--name", image_name, *properties, server_id], "id")
+
+    def image_info(self, image_id: str) -> Dict:
+        try:
+            out = self._run(["openstack", "image", "show", image_id, "-f", "json",
+                             "-c", "id", "-c", "name", "-c", "status", "-c", "size"], self.env)
+        except subprocess.CalledProcessError as e:
+            stderr = str(e.stderr or "")
+            if any(marker in stderr for marker in _CLI_NOT_FOUND):
+                raise ResourceNotFound(stderr.strip()) from e
+            raise
+        data = json.loads(out or "{}")
+        return {"id": data.get("id"), "name": data.get("name"), "status": data.get("status"), "size": data.get("size")}
+
+    def delete_image(self, image_id: str) -> None:
+        self._delete(["image", "delete", image_id])
@@ -0,0 +1,455 @@
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.openstack_backend import (
+    OpenStackBackend,
+    ResourceConflict,
+    ResourceNotFound,
+    load_openrc_env,
+)
+
+# Margen antes de la caducidad del token para pedir uno nuevo
+TOKEN_REFRESH_MARGIN = 60.0
+
+
+class OpenStackApiError(RuntimeError):
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _parse_expiry(value: Optional[str]) -> float:
+    """expires_at de Keystone ("2025-12-06T10:00:00.000000Z") a timestamp."""
+    if not value:
+        return time.time() + 3600
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time() + 3600
+
+
+class OpenStackClient:
+    """
+    Cliente REST mínimo de OpenStack con una única sesión autenticada.
+
+    - Las credenciales salen de las variables OS_* (admin-openrc.sh), igual
+      que en el CLI: OS_AUTH_URL, OS_USERNAME, OS_PASSWORD, OS_PROJECT_NAME,
+      OS_USER_DOMAIN_NAME, OS_PROJECT_DOMAIN_NAME, OS_REGION_NAME, OS_INTERFACE.
+    - El token de Keystone v3 y el catálogo se piden una vez y se reutilizan
+      hasta poco antes de caducar (o hasta un 401).
+    - Las conexiones HTTP se mantienen abiertas en un pool (requests.Session).
+
+    Solo cubre las operaciones que usa el proyecto: servidores (show, list,
+    create, delete), puertos (create, delete), IPs flotantes (create, attach,
+    delete) e imágenes (nombre por id, búsqueda, alta, subida y borrado).
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(
+        self,
+        env: Dict[str, str],
+        session: Optional[requests.Session] = None,
+        timeout: float = 30.0,
+        pool_size: int = 16,
+    ) -> None:
+        self.env = env
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        verify = env.get("OS_CACERT")
+        if env.get("OS_INSECURE", "").lower() in ("1", "true", "yes"):
+            self.session.verify = False
+        elif verify:
+            self.session.verify = verify
+
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._catalog: List[Dict] = []
+        self._image_names: Dict[str, str] = {}
+        self.auth_requests = 0
+
+    @classmethod
+    def from_openrc(cls, openrc: Path, **kwargs) -> "OpenStackClient":
+        return cls(load_openrc_env(openrc), **kwargs)
+
+    # ------------------------------------------------------------------
+    # Autenticación y catálogo
+    # ------------------------------------------------------------------
+
+    def _authenticate(self) -> None:
+        env = self.env
+        auth_url = env.get("OS_AUTH_URL", "").rstrip("/")
+        if not auth_url:
+            raise OpenStackApiError("OS_AUTH_URL no está definido")
+        if not auth_url.endswith("/v3"):
+            auth_url += "/v3"
+        body = {
+            "auth": {
+                "identity": {
+                    "methods": ["password"],
+                    "password": {
+                        "user": {
+                            "name": env.get("OS_USERNAME"),
+                            "domain": {"name": env.get("OS_USER_DOMAIN_NAME", "Default")},
+                            "password": env.get("OS_PASSWORD"),
+                        }
+                    },
+                },
+                "scope": {
+                    "project": {
+                        "name": env.get("OS_PROJECT_NAME") or env.get("OS_TENANT_NAME"),
+                        "domain": {"name": env.get("OS_PROJECT_DOMAIN_NAME", "Default")},
+                    }
+                },
+            }
+        }
+        resp = self.session.post(f"{auth_url}/auth/tokens", json=body, timeout=self.timeout)
+        self.auth_requests += 1
+        if resp.status_code != 201:
+            raise OpenStackApiError(f"Autenticación en Keystone fallida ({resp.status_code})", resp.status_code)
+        token = resp.json().get("token", {})
+        self._token = resp.headers.get("X-Subject-Token")
+        self._expires_at = _parse_expiry(token.get("expires_at"))
+        self._catalog = token.get("catalog", [])
+
+    def _ensure_token(self, force: bool = False) -> str:
+        with self._lock:
+            if force or self._token is None or time.time() >= self._expires_at - TOKEN_REFRESH_MARGIN:
+                self._authenticate()
+            return self._token
+
+    def endpoint(self, service_type: str) -> str:
+        self._ensure_token()
+        interface = self.env.get("OS_INTERFACE", "public").replace("URL", "")
+        region = self.env.get("OS_REGION_NAME")
+        for service in self._catalog:
+            if service.get("type") != service_type:
+                continue
+            for ep in service.get("endpoints", []):
+                if ep.get("interface") != interface:
+                    continue
+                if region and ep.get("region_id", ep.get("region")) not in (region, None):
+                    continue
+                return ep["url"].rstrip("/")
+        raise OpenStackApiError(f"No hay endpoint '{interface}' para {service_type} en el catálogo")
+
+    # ------------------------------------------------------------------
+    # Peticiones
+    # ------------------------------------------------------------------
+
+    def request(
+        self,
+        service_type: str,
+        method: str,
+        path: str,
+        expected: Tuple[int, ...] = (200,),
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Petición autenticada; si el token ha caducado (401) se renueva una vez.
+        Un cuerpo en streaming (fichero) se rebobina antes de repetirla.
+        """
+        url = f"{self.endpoint(service_type)}{path}"
+        headers = kwargs.pop("headers", None) or {}
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(2):
+            token = self._ensure_token(force=attempt > 0)
+            if attempt > 0 and hasattr(kwargs.get("data"), "seek"):
+                kwargs["data"].seek(0)
+            resp = self.session.request(
+                method, url, headers=dict(headers, **{"X-Auth-Token": token}), **kwargs)
+            if resp.status_code == 401 and attempt == 0:
+                continue
+            break
+        if resp.status_code not in expected:
+            detail = resp.text[:300] if resp.text else ""
+            raise OpenStackApiError(
+                f"{method} {service_type}{path} -> {resp.status_code} {detail}".strip(), resp.status_code)
+        return resp
+
+    def _find_id(self, service_type: str, path: str, key: str, name_or_id: str) -> str:
+        """Id de un recurso de Neutron/Glance a partir de su nombre (o el propio id)."""
+        resp = self.request(service_type, "GET", path, params={"name": name_or_id})
+        items = resp.json().get(key, [])
+        if items:
+            return items[0]["id"]
+        resp = self.request(service_type, "GET", path, params={"id": name_or_id})
+        items = resp.json().get(key, [])
+        if items:
+            return items[0]["id"]
+        raise OpenStackApiError(f"No se encontró {key[:-1]} '{name_or_id}'", 404)
+
+    # ------------------------------------------------------------------
+    # Servidores (Nova)
+    # ------------------------------------------------------------------
+
+    def list_servers(self) -> List[Dict]:
+        """Todos los servidores del proyecto con detalle (sigue la paginación)."""
+        servers: List[Dict] = []
+        params: Dict[str, str] = {}
+        while True:
+            data = self.request("compute", "GET", "/servers/detail", params=params).json()
+            batch = data.get("servers", [])
+            servers.extend(batch)
+            if not data.get("servers_links") or not batch:
+                return servers
+            params = {"marker": batch[-1]["id"]}
+
+    def get_server(self, name_or_id: str) -> Dict:
+        try:
+            return self.request("compute", "GET", f"/servers/{name_or_id}").json()["server"]
+        except OpenStackApiError as e:
+            if e.status_code != 404:
+                raise
+        for server in self.list_servers():
+            if server.get("name") == name_or_id:
+                return server
+        raise OpenStackApiError(f"No server with a name or ID of '{name_or_id}' exists.", 404)
+
+    def _flavor_id(self, name_or_id: str) -> str:
+        for flavor in self.request("compute", "GET", "/flavors").json().get("flavors", []):
+            if name_or_id in (flavor.get("id"), flavor.get("name")):
+                return flavor["id"]
+        raise OpenStackApiError(f"No se encontró flavor '{name_or_id}'", 404)
+
+    def create_server(self, name: str, image: str, flavor: str, key_name: str, port_id: str) -> str:
+        body = {
+            "server": {
+                "name": name,
+                "imageRef": self._find_id("image", "/v2/images", "images", image),
+                "flavorRef": self._flavor_id(flavor),
+                "key_name": key_name,
+                "networks": [{"port": port_id}],
+            }
+        }
+        return self.request("compute", "POST", "/servers", expected=(202,), json=body).json()["server"]["id"]
+
+    def delete_server(self, server_id: str) -> None:
+        self.request("compute", "DELETE", f"/servers/{server_id}", expected=(204,))
+
+    def create_server_image(self, server_id: str, name: str, metadata: Optional[Dict[str, str]] = None) -> str:
+        """Snapshot del servidor (acción createImage); devuelve el id de la imagen nueva."""
+        body = {"createImage": {"name": name, "metadata": metadata or {}}}
+        resp = self.request("compute", "POST", f"/servers/{server_id}/action", expected=(202,), json=body)
+        try:
+            image_id = (resp.json() or {}).get("image_id")
+        except ValueError:
+            image_id = None
+        # antes de la microversión 2.45 el id solo viene en la cabecera Location
+        return image_id or resp.headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1]
+
+    def image_name(self, image_id: str) -> str:
+        """Nombre de una imagen (cacheado; las imágenes no cambian de nombre durante una ejecución)."""
+        if image_id not in self._image_names:
+            try:
+                data = self.request("image", "GET", f"/v2/images/{image_id}").json()
+                self._image_names[image_id] = data.get("name") or ""
+            except OpenStackApiError:
+                self._image_names[image_id] = ""
+        return self._image_names[image_id]
+
+    # ------------------------------------------------------------------
+    # Imágenes (Glance)
+    # ------------------------------------------------------------------
+
+    def find_images(self, name: str) -> List[Dict]:
+        """Imágenes con ese nombre (Glance admite nombres repetidos)."""
+        return self.request("image", "GET", "/v2/images", params={"name": name}).json().get("images", [])
+
+    def create_image(
+        self,
+        name: str,
+        disk_format: str = "qcow2",
+        container_format: str = "bare",
+        visibility: str = "public",
+        properties: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Registra una imagen vacía (estado queued) y devuelve su id."""
+        body = {"name": name, "disk_format": disk_format, "container_format": container_format,
+                "visibility": visibility}
+        body.update(properties or {})
+        return self.request("image", "POST", "/v2/images", expected=(201,), json=body).json()["id"]
+
+    def upload_image_data(self, image_id: str, path: Path) -> None:
+        """Sube el contenido de la imagen en streaming (sin cargar el fichero en memoria)."""
+        with path.open("rb") as f:
+            self.request(
+                "image", "PUT", f"/v2/images/{image_id}/file", expected=(204,),
+                data=f, headers={"Content-Type": "application/octet-stream"},
+                timeout=None,
+            )
+
+    def get_image(self, image_id: str) -> Dict:
+        return self.request("image", "GET", f"/v2/images/{image_id}").json()
+
+    def delete_image(self, image_id: str) -> None:
+        self.request("image", "DELETE", f"/v2/images/{image_id}", expected=(204,))
+
+    # ------------------------------------------------------------------
+    # Red (Neutron)
+    # ------------------------------------------------------------------
+
+    def create_port(self, name: str, network: str, security_group: str) -> str:
+        body = {
+            "port": {
+                "name": name,
+                "network_id": self._find_id("network", "/v2.0/networks", "networks", network),
+                "security_groups": [
+                    self._find_id("network", "/v2.0/security-groups", "security_groups", security_group)
+                ],
+            }
+        }
+        return self.request("network", "POST", "/v2.0/ports", expected=(201,), json=body).json()["port"]["id"]
+
+    def delete_port(self, name_or_id: str) -> None:
+        port_id = self._find_id("network", "/v2.0/ports", "ports", name_or_id)
+        self.request("network", "DELETE", f"/v2.0/ports/{port_id}", expected=(204,))
+
+    def create_floating_ip(self, external_network: str) -> Dict:
+        body = {
+            "floatingip": {
+                "floating_network_id": self._find_id("network", "/v2.0/networks", "networks", external_network),
+            }
+        }
+        return self.request("network", "POST", "/v2.0/floatingips", expected=(201,), json=body).json()["floatingip"]
+
+    def _floating_ip(self, address_or_id: str) -> Dict:
+        for params in ({"floating_ip_address": address_or_id}, {"id": address_or_id}):
+            items = self.request("network", "GET", "/v2.0/floatingips", params=params).json().get("floatingips", [])
+            if items:
+                return items[0]
+        raise OpenStackApiError(f"No se encontró la IP flotante '{address_or_id}'", 404)
+
+    def add_floating_ip(self, server_id: str, address: str) -> None:
+        """Asocia la IP flotante al primer puerto del servidor (como `openstack server add floating ip`)."""
+        ports = self.request("network", "GET", "/v2.0/ports", params={"device_id": server_id}).json().get("ports", [])
+        if not ports:
+            raise OpenStackApiError(f"El servidor {server_id} no tiene puertos", 404)
+        fip = self._floating_ip(address)
+        self.request("network", "PUT", f"/v2.0/floatingips/{fip['id']}", json={"floatingip": {"port_id": ports[0]["id"]}})
+
+    def delete_floating_ip(self, address_or_id: str) -> None:
+        fip = self._floating_ip(address_or_id)
+        self.request("network", "DELETE", f"/v2.0/floatingips/{fip['id']}", expected=(204,))
+
+
+# ----------------------------------------------------------------------
+# Clientes compartidos por proceso
+# ----------------------------------------------------------------------
+
+_clients: Dict[Tuple, OpenStackClient] = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(env: Dict[str, str]) -> OpenStackClient:
+    """
+    Cliente reutilizable para unas credenciales: todos los servicios del
+    proceso (dashboard, CLIs) comparten token y conexiones.
+    """
+    key = tuple(env.get(k) for k in (
+        "OS_AUTH_URL", "OS_USERNAME", "OS_PASSWORD", "OS_PROJECT_NAME", "OS_REGION_NAME", "OS_INTERFACE"))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = OpenStackClient(env)
+        return client
+
+
+def server_listing_rows(client: OpenStackClient) -> List[Dict]:
+    """
+    Servidores con las mismas columnas que `openstack server list --long -f json`
+    (ID, Name, Status, Image Name, Networks), para InstanceMetadataResolver.
+    """
+    rows = []
+    for server in client.list_servers():
+        image = server.get("image") or {}
+        image_id = image.get("id") if isinstance(image, dict) else None
+        networks = {
+            net: [a.get("addr") for a in addrs if a.get("addr")]
+            for net, addrs in (server.get("addresses") or {}).items()
+        }
+        rows.append({
+            "ID": server.get("id"),
+            "Name": server.get("name"),
+            "Status": server.get("status"),
+            "Image Name": client.image_name(image_id) if image_id else "",
+            "Networks": networks,
+        })
+    return rows
+
+
+class OpenStackApiBackend(OpenStackBackend):
+    """OpenStackBackend sobre OpenStackClient (HTTP directo, sin procesos del CLI)."""
+
+    def __init__(self, client: OpenStackClient) -> None:
+        self.client = client
+
+    def create_port(self, name: str, network: str, security_group: str) -> str:
+        return self.client.create_port(name, network, security_group)
+
+    def create_server(self, name: str, image: str, flavor: str, key_name: str, port_id: str) -> str:
+        return self.client.create_server(name, image, flavor, key_name, port_id)
+
+    def list_servers(self) -> List[Dict[str, str]]:
+        return [
+            {"id": s.get("id"), "name": s.get("name"), "status": s.get("status")}
+            for s in self.client.list_servers()
+        ]
+
+    def create_floating_ip(self, external_network: str) -> str:
+        return self.client.create_floating_ip(external_network)["floating_ip_address"]
+
+    def add_floating_ip(self, server_id: str, address: str) -> None:
+        self.client.add_floating_ip(server_id, address)
+
+    def _delete(self, delete, ref: str) -> None:
+        try:
+            delete(ref)
+        except OpenStackApiError as e:
+            if e.status_code == 404:
+                raise ResourceNotFound(str(e)) from e
+            if e.status_code == 409:
+                raise ResourceConflict(str(e)) from e
+            raise
+
+    def delete_floating_ip(self, address: str) -> None:
+        self._delete(self.client.delete_floating_ip, address)
+
+    def delete_server(self, name_or_id: str) -> None:
+        self._delete(lambda ref: self.client.delete_server(self.client.get_server(ref)["id"]), name_or_id)
+
+    def delete_port(self, name_or_id: str) -> None:
+        self._delete(self.client.delete_port, name_or_id)
+
+    def snapshot_server(self, server_id: str, image_name: str, metadata: Dict[str, str]) -> str:
+        try:
+            return self.client.create_server_image(server_id, image_name, metadata)
+        except OpenStackApiError as e:
+            if e.status_code == 404:
+                raise ResourceNotFound(str(e)) from e
+            if e.status_code == 409:
+                raise ResourceConflict(str(e)) from e
+            raise
+
+    def image_info(self, image_id: str) -> Dict:
+        try:
+            data = self.client.get_image(image_id)
+        except OpenStackApiError as e:
+            if e.status_code == 404:
+                raise ResourceNotFound(str(e)) from e
+            raise
+        return {"id": data.get("id"), "name": data.get("name"), "status": data.get("status"), "size": data.get("size")}
+
+    def delete_image(self, image_id: str) -> None:
+        self._delete(self.client.delete_image, image_id)
@@ -0,0 +1,180 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Fases registradas por los servicios de instalación/desinstalación:
+#   run:      env_load, key_detection, plan_load
+#   instance: probe, image_lookup, golden (decisión y snapshot de golden image),
+#             bundle, upload, exec (modo bundled)
+#   tool:     precheck, upload, exec, validate, marker
+# En modo pipelined "exec" incluye subida, ejecución y validación (un solo round-trip).
+# En modo bundled la herramienta solo tiene "exec" (lo que tarda en el driver remoto);
+# la construcción, copia y ejecución del paquete se miden en la instancia.
+
+
+class PhaseTimer:
+    """Acumula la duración (segundos) de cada fase de una ejecución."""
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.timings[name] = round(self.timings.get(name, 0.0) + seconds, 4)
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.timings)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil q (0-100) con interpolación lineal; None si no hay valores."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100.0
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return round(ordered[low] + (ordered[high] - ordered[low]) * (pos - low), 4)
+
+
+def _stats(values: List[float]) -> Dict:
+    return {"count": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95)}
+
+
+class TimingsLog:
+    """
+    Tiempos por fase de cada herramienta instalada o desinstalada, como JSON
+    Lines (una línea por resultado) en state/timings.jsonl.
+
+    Varios procesos pueden añadir líneas a la vez (flock sobre <log>.lock).
+    Cuando el fichero supera max_bytes se rota a <log>.1.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 5 * 1024 * 1024) -> None:
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.max_bytes = max_bytes
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def record(kind: str, run_id: str, result: Dict) -> Dict:
+        """Línea del log para un resultado de run_all_plans / run_all_uninstall_plans."""
+        started, finished = result.get("started_at"), result.get("finished_at")
+        return {
+            "kind": kind,
+            "run_id": run_id,
+            "instance": (result.get("instance") or {}).get("name"),
+            "tool": result.get("tool"),
+            "status": result.get("status"),
+            "started_at": started,
+            "seconds": round(finished - started, 4) if started and finished else None,
+            "timings": result.get("timings") or {},
+        }
+
+    def append(self, kind: str, results: List[Dict]) -> None:
+        """
+        Añade los resultados de una ejecución. Un error de escritura no debe
+        hacer fallar una instalación que ya ha terminado, así que se ignora.
+        """
+        if not results:
+            return
+        run_id = uuid.uuid4().hex
+        lines = "".join(json.dumps(self.record(kind, run_id, r), separators=(",", ":")) + "\n" for r in results)
+        try:
+            with self._locked(exclusive=True):
+                if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                    os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(lines)
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Lectura y agregados
+    # ------------------------------------------------------------------
+
+    def read(self, kind: Optional[str] = None, last: Optional[int] = None) -> List[Dict]:
+        """Líneas del log (las last más recientes), opcionalmente de un solo tipo."""
+        if not self.path.exists():
+            return []
+        records = []
+        with self._locked(exclusive=False):
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if kind is None or record.get("kind") == kind:
+                        records.append(record)
+        return records[-last:] if last else records
+
+    def summary(self, kind: Optional[str] = None, last: Optional[int] = None) -> Dict:
+        """
+        p50/p95 por herramienta (duración total y por fase), por fase de
+        instancia (una muestra por instancia y ejecución) y por fase de
+        ejecución (una muestra por ejecución).
+        """
+        records = self.read(kind, last)
+        tools: Dict[str, Dict[str, List[float]]] = {}
+        instance_phases: Dict[str, List[float]] = {}
+        run_phases: Dict[str, List[float]] = {}
+        seen_instances = set()
+        seen_runs = set()
+
+        for record in records:
+            timings = record.get("timings") or {}
+            per_tool = tools.setdefault(str(record.get("tool")), {})
+            if record.get("seconds") is not None:
+                per_tool.setdefault("total", []).append(record["seconds"])
+            for name, seconds in (timings.get("tool") or {}).items():
+                per_tool.setdefault(name, []).append(seconds)
+
+            instance_key = (record.get("run_id"), record.get("instance"))
+            if instance_key not in seen_instances:
+                seen_instances.add(instance_key)
+                for name, seconds in (timings.get("instance") or {}).items():
+                    instance_phases.setdefault(name, []).append(seconds)
+            if record.get("run_id") not in seen_runs:
+                seen_runs.add(record.get("run_id"))
+                for name, seconds in (timings.get("run") or {}).items():
+                    run_phases.setdefault(name, []).append(seconds)
+
+        return {
+            "records": len(records),
+            "runs": len(seen_runs),
+            "tools": {
+                tool: {
+                    "total": _stats(phases.pop("total", [])),
+                    "phases": {name: _stats(values) for name, values in sorted(phases.items())},
+                }
+                for tool, phases in sorted(tools.items())
+            },
+            "instance_phases": {name: _stats(values) for name, values in sorted(instance_phases.items())},
+            "run_phases": {name: _stats(values) for name, values in sorted(run_phases.items())},
+        }
@@ -0,0 +1,119 @@
+import base64
+import json
+import shlex
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Línea final que emite el script remoto con los códigos de salida.
+TRAILER_MARKER = "__NICSCYBERLAB_RESULT__"
+
+# Código usado en el trailer cuando la comprobación no llega a ejecutarse.
+CHECK_SKIPPED = -1
+
+# Comando remoto que lee el pipeline desde stdin.
+PIPELINE_REMOTE_COMMAND = "bash -s"
+
+# Directorio remoto con la huella (sha256) del instalador aplicado por herramienta.
+MARKER_DIR = "/var/lib/nicscyberlab/markers"
+
+
+def marker_path_for(tool: str) -> str:
+    return f"{MARKER_DIR}/{tool.lower()}.sha256"
+
+
+def build_precheck_command(check_command: str, marker_path: str, fingerprint: str) -> str:
+    """
+    Comando remoto que termina con 0 solo si la herramienta valida bien y el
+    marcador coincide con la huella del instalador local (nada que hacer).
+    """
+    return (
+        f"( {check_command} ) </dev/null >/dev/null 2>&1 && "
+        f"[ \"$(cat {shlex.quote(marker_path)} 2>/dev/null)\" = {shlex.quote(fingerprint)} ]"
+    )
+
+
+def build_write_marker_command(marker_path: str, fingerprint: str) -> str:
+    directory = shlex.quote(marker_path.rsplit("/", 1)[0])
+    return (
+        f"sudo mkdir -p {directory} && "
+        f"printf '%s\\n' {shlex.quote(fingerprint)} | sudo tee {shlex.quote(marker_path)} >/dev/null"
+    )
+
+
+def build_remove_marker_command(marker_path: str) -> str:
+    return f"sudo rm -f {shlex.quote(marker_path)}"
+
+
+def build_pipeline_script(
+    script_text: str,
+    script_args: List[str],
+    check_command: str,
+    on_success: Optional[str] = None,
+) -> str:
+    """
+    Construye el script que se envía por stdin a `bash -s` para instalar (o
+    desinstalar) una herramienta en un único round-trip:
+
+      1. vuelca el script (codificado en base64) a un fichero temporal remoto
+      2. lo ejecuta con sudo
+      3. si ha terminado bien, ejecuta check_command
+      4. si ambos han ido bien, ejecuta on_success (p. ej. escribir el marcador)
+      5. imprime el trailer con ambos códigos de salida
+
+    Tanto el script como la comprobación leen stdin de /dev/null para no
+    consumir el resto del propio pipeline.
+    """
+    payload = base64.b64encode(script_text.encode("utf-8")).decode("ascii")
+    # líneas de 76 caracteres, como base64(1)
+    payload_lines = "\n".join(payload[i:i + 76] for i in range(0, len(payload), 76))
+    args = " ".join(shlex.quote(a) for a in script_args)
+    success_block = ""
+    if on_success:
+        success_block = f"""if [ "$__nics_run_rc" -eq 0 ] && [ "$__nics_check_rc" -eq 0 ]; then
+    ( {on_success} ) </dev/null >/dev/null 2>&1
+fi
+"""
+
+    return f"""set +e
+__nics_script=$(mktemp /tmp/nics_XXXXXX.sh)
+base64 -d > "$__nics_script" <<'__NICS_PAYLOAD__'
+{payload_lines}
+__NICS_PAYLOAD__
+chmod +x "$__nics_script"
+sudo bash "$__nics_script" {args} </dev/null 2>&1
+__nics_run_rc=$?
+__nics_check_rc={CHECK_SKIPPED}
+if [ "$__nics_run_rc" -eq 0 ]; then
+    ( {check_command} ) </dev/null >/dev/null 2>&1
+    __nics_check_rc=$?
+fi
+{success_block}rm -f "$__nics_script"
+printf '\\n%s {{"run_rc": %d, "check_rc": %d}}\\n' '{TRAILER_MARKER}' "$__nics_run_rc" "$__nics_check_rc"
+"""
+
+
+def parse_trailer(output: str) -> Optional[Dict[str, int]]:
+    """
+    Extrae el último trailer de la salida del pipeline.
+    Devuelve None si no aparece (p. ej. la conexión se cortó antes de terminar).
+    """
+    for line in reversed(output.splitlines()):
+        line = line.strip()
+        if not line.startswith(TRAILER_MARKER):
+            continue
+        try:
+            data = json.loads(line[len(TRAILER_MARKER):])
+            return {"run_rc": int(data["run_rc"]), "check_rc": int(data["check_rc"])}
+        except (ValueError, KeyError, TypeError):
+            return None
+    return None
+
+
+def read_trailer_from_log(log_path: Path, tail_bytes: int = 4096) -> Optional[Dict[str, int]]:
+    """Lee el trailer desde el final de un log local sin cargar el fichero completo."""
+    with log_path.open("rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(max(0, size - tail_bytes))
+        tail = f.read().decode("utf-8", errors="replace")
+    return parse_trailer(tail)
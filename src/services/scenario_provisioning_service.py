@@ -0,0 +1,311 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.models.scenario import NodeProvisioning, ScenarioNode
+from src.services.golden_image_cache import GoldenImageCache, golden_images_enabled, installer_fingerprints
+from src.services.openstack_backend import OpenStackBackend, error_text, open_openstack_backend
+from src.services.server_status_watcher import ServerStatusWatcher
+from src.services.tools_store import open_tools_store
+
+# Recibe eventos de progreso:
+# {"event": "node_created" | "node_status" | "node_active" | "node_ready" | "node_failed", ...}
+ProvisioningCallback = Callable[[Dict], None]
+
+DEFAULT_EXTERNAL_NET = "external-net"
+
+# Usuario SSH por defecto según el sistema operativo del nodo (como generate_nodes.sh)
+_SSH_USERS = (
+    ("ubuntu", "ubuntu"),
+    ("debian", "debian"),
+    ("kali", "kali"),
+    ("centos", "centos"),
+    ("fedora", "fedora"),
+)
+
+
+def ssh_user_for_os(os_name: str) -> str:
+    for prefix, user in _SSH_USERS:
+        if os_name.startswith(prefix):
+            return user
+    return "ubuntu"
+
+
+class ScenarioProvisioningError(RuntimeError):
+    """Algún nodo no ha llegado a estar listo; nodes contiene el estado de todos."""
+
+    def __init__(self, message: str, nodes: List[NodeProvisioning]) -> None:
+        super().__init__(message)
+        self.nodes = nodes
+
+
+class ScenarioProvisioningService:
+    """
+    Crea los nodos de scenario/configs/scenario_file.json en OpenStack.
+
+    A diferencia de generate_nodes.sh (nodo a nodo), trabaja por lotes:
+      1. crea puertos y servidores de todos los nodos a la vez
+      2. espera a que el lote completo esté ACTIVE (ServerStatusWatcher:
+         un listado de servidores por iteración, no uno por servidor)
+      3. reserva y asocia las IPs flotantes de todos los nodos a la vez
+      4. escribe scenario/state/summary.json con el formato de siempre
+
+    El acceso a OpenStack pasa por un OpenStackBackend (API REST o CLI según
+    open_openstack_backend; en los tests, tests/fakes/openstack_backend.py).
+
+    Con golden images (NICS_GOLDEN_IMAGES=1 o golden_images), un nodo cuyas
+    herramientas (properties.tools del escenario o las asignadas en el
+    dashboard) ya tienen snapshot para su imagen base arranca directamente
+    de ese snapshot.
+    """
+
+    def __init__(
+        self,
+        repo_root: Path,
+        backend: Optional[OpenStackBackend] = None,
+        scenario_path: Optional[Path] = None,
+        state_dir: Optional[Path] = None,
+        max_workers: int = 8,
+        active_timeout: float = 240.0,
+        watcher: Optional[ServerStatusWatcher] = None,
+        golden_images: Optional[GoldenImageCache] = None,
+    ) -> None:
+        self.repo_root = repo_root
+        self.backend = backend or open_openstack_backend()
+        self.scenario_path = scenario_path or repo_root / "scenario" / "configs" / "scenario_file.json"
+        self.state_dir = state_dir or repo_root / "scenario" / "state"
+        self.max_workers = max_workers
+        self.active_timeout = active_timeout
+        self.watcher = watcher or ServerStatusWatcher(self.backend.list_servers)
+        if golden_images is None and golden_images_enabled():
+            golden_images = GoldenImageCache.for_repo(repo_root, self.backend)
+        self.golden_images = golden_images
+        self.installers_dir = repo_root / "tools-installer" / "installers"
+
+    # ------------------------------------------------------------------
+    # Lectura del escenario
+    # ------------------------------------------------------------------
+
+    def _load_scenario(self) -> Dict:
+        with self.scenario_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_nodes(self) -> List[ScenarioNode]:
+        return [ScenarioNode.from_dict(raw) for raw in self._load_scenario().get("nodes", [])]
+
+    def external_network(self) -> str:
+        metadata = self._load_scenario().get("metadata") or {}
+        return metadata.get("external_network") or DEFAULT_EXTERNAL_NET
+
+    def node_tools(self, nodes: List[ScenarioNode]) -> Dict[str, List[str]]:
+        """
+        Herramientas de cada nodo (por id): properties.tools en el escenario
+        o, si no hay, las asignadas a la instancia en el dashboard.
+        """
+        declared: Dict[str, List[str]] = {}
+        if self.scenario_path.is_file():
+            for raw in self._load_scenario().get("nodes", []):
+                tools = (raw.get("properties") or {}).get("tools")
+                if tools:
+                    declared[str(raw.get("id"))] = [str(t) for t in tools]
+        store = open_tools_store(self.repo_root / "state")
+        return {
+            node.id: declared.get(node.id) or list(store.get_instance(node.name).get("tools") or [])
+            for node in nodes
+        }
+
+    def _resolve_images(self, items: List[NodeProvisioning]) -> None:
+        """Imagen de arranque de cada nodo: la golden image de su combinación si existe, o la base."""
+        tools_by_node = self.node_tools([i.node for i in items]) if self.golden_images is not None else {}
+        for item in items:
+            item.image = item.node.image
+            tools = tools_by_node.get(item.node.id)
+            if not tools:
+                continue
+            try:
+                installers = installer_fingerprints(self.installers_dir, tools)
+            except FileNotFoundError:
+                item.golden_image = "miss"
+                continue
+            entry = self.golden_images.lookup(item.node.image, tools, installers)
+            item.golden_image = "hit" if entry is not None else "miss"
+            if entry is not None:
+                item.image = entry.image_id
+
+    # ------------------------------------------------------------------
+    # Fases
+    # ------------------------------------------------------------------
+
+    def _create_node(self, item: NodeProvisioning) -> None:
+        """Fase 1: puerto + servidor (sin esperar a ACTIVE)."""
+        node = item.node
+        started = time.monotonic()
+        try:
+            item.port_id = self.backend.create_port(node.port_name, node.network, node.security_group)
+            item.server_id = self.backend.create_server(
+                node.name, item.image or node.image, node.flavor, node.ssh_key, item.port_id)
+            item.status = "building"
+        except Exception as e:
+            item.status = "failed"
+            item.error = error_text(e)
+        item.timings["create_seconds"] = round(time.monotonic() - started, 3)
+
+    def _wait_active(self, items: List[NodeProvisioning], notify: ProvisioningCallback) -> None:
+        """
+        Fase 2: espera a que todos los servidores del lote estén ACTIVE (o
+        fallen) con un único listado de servidores por iteración.
+        """
+        building = {i.server_id: i for i in items if i.status == "building"}
+        if not building:
+            return
+
+        def on_change(server_id: str, old: Optional[str], new: str) -> None:
+            notify({"event": "node_status", "node": building[server_id].node.name, "status": new})
+
+        results = self.watcher.wait(building, timeout=self.active_timeout, on_change=on_change)
+        for server_id, item in building.items():
+            result = results[server_id]
+            if result.reached:
+                item.status = "active"
+                item.timings["active_seconds"] = result.seconds
+                notify({"event": "node_active", "node": item.node.name, "server_id": server_id,
+                        "seconds": result.seconds})
+            elif result.seconds is not None:
+                item.status = "failed"
+                item.error = f"el servidor ha entrado en estado {result.status}"
+            else:
+                item.status = "failed"
+                item.error = f"timeout esperando ACTIVE ({int(self.active_timeout)}s, último estado {result.status})"
+
+    def _attach_floating_ip(self, item: NodeProvisioning, external_network: str) -> None:
+        """Fase 3: IP flotante reservada y asociada."""
+        started = time.monotonic()
+        try:
+            item.floating_ip = self.backend.create_floating_ip(external_network)
+            self.backend.add_floating_ip(item.server_id, item.floating_ip)
+            item.status = "ready"
+        except Exception as e:
+            item.status = "failed"
+            item.error = error_text(e)
+        item.timings["floating_ip_seconds"] = round(time.monotonic() - started, 3)
+
+    # ------------------------------------------------------------------
+    # Summary
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def summary_entry(item: NodeProvisioning, created_at: str) -> Dict:
+        """Entrada de summary.json, con los mismos campos que generaba generate_nodes.sh."""
+        return {
+            "id": item.node.id,
+            "name": item.node.name,
+            "server_id": item.server_id,
+            "floating_ip": item.floating_ip,
+            "ssh_user": ssh_user_for_os(item.node.os),
+            "port_name": item.node.port_name,
+            "spec_hash": item.node.spec_hash,
+            "image": item.image or item.node.image,
+            "golden_image": item.golden_image,
+            "created_at": created_at,
+        }
+
+    @staticmethod
+    def write_summary(entries: List[Dict], path: Path) -> None:
+        """Escritura atómica (fichero temporal + rename)."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".summary.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f, indent=2)
+                f.write("\n")
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def create_nodes(
+        self,
+        nodes: List[ScenarioNode],
+        on_event: Optional[ProvisioningCallback] = None,
+    ) -> List[NodeProvisioning]:
+        """
+        Ejecuta las tres fases para nodes y devuelve el estado de cada uno, sin
+        escribir summary.json ni lanzar excepciones por los nodos fallidos.
+        """
+        notify = on_event or (lambda event: None)
+        external_network = self.external_network()
+        items = [NodeProvisioning(node=node) for node in nodes]
+        if not items:
+            return items
+        self._resolve_images(items)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(items)))) as pool:
+            list(pool.map(self._create_node, items))
+            for item in items:
+                if item.status == "building":
+                    notify({"event": "node_created", "node": item.node.name, "server_id": item.server_id,
+                            "image": item.image, "golden_image": item.golden_image})
+
+            self._wait_active(items, notify)
+
+            active = [i for i in items if i.status == "active"]
+            list(pool.map(lambda i: self._attach_floating_ip(i, external_network), active))
+
+        for item in items:
+            if item.status == "ready":
+                notify({"event": "node_ready", "node": item.node.name, "floating_ip": item.floating_ip})
+            else:
+                notify({"event": "node_failed", "node": item.node.name, "error": item.error})
+        return items
+
+    def provision(
+        self,
+        nodes: Optional[List[ScenarioNode]] = None,
+        summary_path: Optional[Path] = None,
+        on_event: Optional[ProvisioningCallback] = None,
+    ) -> List[NodeProvisioning]:
+        """
+        Crea todos los nodos del escenario y escribe summary.json (o
+        summary_path). Devuelve el estado de cada nodo, con tiempos por fase.
+
+        Si algún nodo falla se lanza ScenarioProvisioningError, pero antes se
+        escribe el summary con todos los nodos que llegaron a crear recursos
+        (los fallidos con floating_ip null), para que destroy_nodes.sh pueda
+        limpiarlos.
+        """
+        if nodes is None:
+            nodes = self.load_nodes()
+        summary_path = summary_path or self.state_dir / "summary.json"
+        items = self.create_nodes(nodes, on_event)
+
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.write_summary(
+            [self.summary_entry(i, created_at) for i in items if i.port_id is not None],
+            summary_path,
+        )
+
+        failed = [i for i in items if i.status != "ready"]
+        if failed:
+            names = ", ".join(i.node.name for i in failed)
+            raise ScenarioProvisioningError(f"No se pudieron aprovisionar: {names}", items)
+        return items
+
+
+def provisioning_report(items: List[NodeProvisioning]) -> List[Dict]:
+    """Resumen serializable del aprovisionamiento (estado, ids y tiempos por nodo)."""
+    report = []
+    for item in items:
+        entry = asdict(item)
+        entry["node"] = item.node.name
+        report.append(entry)
+    return report
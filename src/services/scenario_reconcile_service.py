@@ -0,0 +1,198 @@
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.models.scenario import ReconcileAction
+from src.services.openstack_backend import OpenStackBackend, open_openstack_backend
+from src.services.scenario_provisioning_service import ScenarioProvisioningService, provisioning_report
+from src.services.scenario_teardown_service import ScenarioTeardownService
+
+# Recibe los eventos de ScenarioProvisioningService y ScenarioTeardownService
+ReconcileCallback = Callable[[Dict], None]
+
+# Estados de servidor con los que un nodo desplegado se considera roto
+_BROKEN_STATUSES = ("ERROR", "DELETED", "SOFT_DELETED", "SHELVED_OFFLOADED")
+
+
+class ScenarioReconcileService:
+    """
+    Lleva OpenStack al estado de scenario/configs/scenario_file.json tocando
+    solo lo que ha cambiado desde el último despliegue.
+
+    Compara el escenario con scenario/state/summary.json (spec_hash de cada
+    nodo) y con el listado de servidores en vivo, y clasifica cada nodo:
+
+      - create:    está en el escenario pero no desplegado
+      - delete:    está desplegado pero ya no en el escenario
+      - replace:   su definición ha cambiado o su servidor ha desaparecido o
+                   está en ERROR (se borra y se vuelve a crear)
+      - unchanged: no se toca
+
+    plan() solo calcula (dry run); apply() borra primero (delete y replace),
+    luego crea (create y replace) y actualiza summary.json tras cada fase.
+    """
+
+    def __init__(
+        self,
+        repo_root: Path,
+        backend: Optional[OpenStackBackend] = None,
+        scenario_path: Optional[Path] = None,
+        state_dir: Optional[Path] = None,
+        provisioning: Optional[ScenarioProvisioningService] = None,
+        teardown: Optional[ScenarioTeardownService] = None,
+    ) -> None:
+        self.repo_root = repo_root
+        self.backend = backend or open_openstack_backend()
+        self.state_dir = state_dir or repo_root / "scenario" / "state"
+        self.provisioning = provisioning or ScenarioProvisioningService(
+            repo_root, backend=self.backend, scenario_path=scenario_path, state_dir=self.state_dir)
+        self.teardown = teardown or ScenarioTeardownService(
+            repo_root, backend=self.backend, state_dir=self.state_dir)
+        self.summary_path = self.state_dir / "summary.json"
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    def _read_summary(self) -> List[Dict]:
+        if not self.summary_path.is_file():
+            return []
+        with self.summary_path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else data.get("instances", [])
+
+    @staticmethod
+    def _live_status(entry: Dict, servers: List[Dict[str, str]]) -> str:
+        """Estado del servidor de una entrada del summary (DELETED si no aparece)."""
+        for server in servers:
+            if entry.get("server_id") and server["id"] == entry["server_id"]:
+                return server["status"]
+        if not entry.get("server_id"):
+            for server in servers:
+                if server["name"] == entry.get("name"):
+                    return server["status"]
+        return "DELETED"
+
+    # ------------------------------------------------------------------
+    # Plan
+    # ------------------------------------------------------------------
+
+    def plan(self) -> List[ReconcileAction]:
+        """Acciones necesarias, en el orden del escenario (los borrados al final)."""
+        nodes = self.provisioning.load_nodes()
+        deployed = {str(entry.get("id")): entry for entry in self._read_summary()}
+        servers = self.backend.list_servers()
+        actions: List[ReconcileAction] = []
+
+        for node in nodes:
+            entry = deployed.get(node.id)
+            if entry is None:
+                actions.append(ReconcileAction(node.id, node.name, "create", "nuevo en el escenario"))
+                continue
+            status = self._live_status(entry, servers)
+            if status in _BROKEN_STATUSES:
+                actions.append(ReconcileAction(node.id, node.name, "replace", f"servidor en estado {status}"))
+            elif not entry.get("floating_ip"):
+                actions.append(ReconcileAction(node.id, node.name, "replace", "despliegue incompleto (sin IP flotante)"))
+            elif entry.get("spec_hash") and entry["spec_hash"] != node.spec_hash:
+                actions.append(ReconcileAction(node.id, node.name, "replace", "definición modificada"))
+            elif entry.get("name") != node.name:
+                actions.append(ReconcileAction(node.id, node.name, "replace", "nombre modificado"))
+            else:
+                actions.append(ReconcileAction(node.id, node.name, "unchanged", f"servidor {status}"))
+
+        scenario_ids = {node.id for node in nodes}
+        for node_id, entry in deployed.items():
+            if node_id not in scenario_ids:
+                actions.append(ReconcileAction(node_id, str(entry.get("name")), "delete", "eliminado del escenario"))
+        return actions
+
+    # ------------------------------------------------------------------
+    # Aplicación
+    # ------------------------------------------------------------------
+
+    def _write_json(self, data, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.stem}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def apply(
+        self,
+        actions: Optional[List[ReconcileAction]] = None,
+        on_event: Optional[ReconcileCallback] = None,
+    ) -> Dict:
+        """
+        Aplica el plan (o uno recién calculado) y devuelve el informe, que
+        también se guarda en state/reconcile_report.json:
+
+          {"status": "completed" | "partial_failure", "plan": [...],
+           "teardown": {...} | None, "provisioning": [...], "failed": [...]}
+
+        Los nodos cuyo borrado falla se quedan en summary.json (y no se
+        recrean); los que fallan al crearse entran con floating_ip null para
+        que el siguiente reconcile o destroy_scenario.sh los limpie.
+        """
+        if actions is None:
+            actions = self.plan()
+        started = time.monotonic()
+        summary = self._read_summary()
+        by_id = {str(entry.get("id")): entry for entry in summary}
+        failed: List[str] = []
+
+        # 1) borrados: nodos eliminados y nodos a recrear
+        to_remove = [a for a in actions if a.action in ("delete", "replace") and a.node_id in by_id]
+        teardown_report = None
+        if to_remove:
+            teardown_report = self.teardown.teardown_nodes([by_id[a.node_id] for a in to_remove], on_event)
+            broken = {r["node"] for r in teardown_report["failed"]}
+            for action in to_remove:
+                entry = by_id[action.node_id]
+                if str(entry.get("name") or entry.get("id")) in broken:
+                    failed.append(action.node_id)
+                else:
+                    del by_id[action.node_id]
+            summary = [entry for entry in summary if str(entry.get("id")) in by_id]
+            self.provisioning.write_summary(summary, self.summary_path)
+
+        # 2) altas: nodos nuevos y recreados cuyo borrado terminó bien
+        wanted = {a.node_id for a in actions if a.action in ("create", "replace") and a.node_id not in failed}
+        scenario_nodes = self.provisioning.load_nodes()
+        nodes = [node for node in scenario_nodes if node.id in wanted]
+        items = self.provisioning.create_nodes(nodes, on_event) if nodes else []
+        if items:
+            created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            summary += [self.provisioning.summary_entry(i, created_at) for i in items if i.port_id is not None]
+            order = {node.id: n for n, node in enumerate(scenario_nodes)}
+            summary.sort(key=lambda entry: order.get(str(entry.get("id")), len(order)))
+            self.provisioning.write_summary(summary, self.summary_path)
+            failed += [i.node.id for i in items if i.status != "ready"]
+
+        report = {
+            "status": "partial_failure" if failed else "completed",
+            "seconds": round(time.monotonic() - started, 3),
+            "plan": [asdict(a) for a in actions],
+            "teardown": teardown_report,
+            "provisioning": provisioning_report(items),
+            "failed": failed,
+        }
+        self._write_json(report, self.state_dir / "reconcile_report.json")
+        return report
+
+
+def plan_counts(actions: List[ReconcileAction]) -> Dict[str, int]:
+    """Número de nodos por acción, para mostrar el resumen del plan."""
+    counts = {"create": 0, "delete": 0, "replace": 0, "unchanged": 0}
+    for action in actions:
+        counts[action.action] += 1
+    return counts
@@ -0,0 +1,222 @@
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.models.scenario import ResourceTeardown
+from src.services.openstack_backend import (
+    OpenStackBackend,
+    ResourceConflict,
+    ResourceNotFound,
+    error_text,
+    open_openstack_backend,
+)
+from src.services.server_status_watcher import ServerStatusWatcher
+
+# Recibe eventos de progreso: {"event": "resource_deleted" | "resource_failed" | "group_started", ...}
+TeardownCallback = Callable[[Dict], None]
+
+# Orden de borrado: cada grupo depende de que el anterior haya terminado
+TEARDOWN_GROUPS = ("floating_ip", "server", "port")
+
+
+class ScenarioTeardownService:
+    """
+    Destruye los recursos de scenario/state/summary.json por grupos de
+    dependencia: IPs flotantes, luego servidores y luego puertos.
+
+    - Dentro de cada grupo los borrados se lanzan en paralelo (como mucho
+      max_workers a la vez).
+    - Los servidores se esperan como lote (ServerStatusWatcher) antes de
+      borrar los puertos.
+    - Los conflictos transitorios (409, puerto aún en uso) se reintentan
+      con espera creciente; un recurso que ya no existe cuenta como borrado.
+    - Se escribe state/teardown_report.json con el resultado y el tiempo de
+      cada recurso, también cuando el borrado falla a medias.
+    """
+
+    def __init__(
+        self,
+        repo_root: Path,
+        backend: Optional[OpenStackBackend] = None,
+        state_dir: Optional[Path] = None,
+        max_workers: int = 8,
+        retries: int = 5,
+        retry_delay: float = 2.0,
+        delete_timeout: float = 120.0,
+        watcher: Optional[ServerStatusWatcher] = None,
+    ) -> None:
+        self.repo_root = repo_root
+        self.backend = backend or open_openstack_backend()
+        self.state_dir = state_dir or repo_root / "scenario" / "state"
+        self.max_workers = max_workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.delete_timeout = delete_timeout
+        self.watcher = watcher or ServerStatusWatcher(self.backend.list_servers)
+
+    # ------------------------------------------------------------------
+    # Plan de borrado
+    # ------------------------------------------------------------------
+
+    def _read_summary(self, summary_path: Path) -> List[Dict]:
+        if not summary_path.is_file():
+            return []
+        with summary_path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else data.get("instances", [])
+
+    @staticmethod
+    def plan(nodes: List[Dict]) -> Dict[str, List[ResourceTeardown]]:
+        """Recursos de cada grupo a partir de las entradas de summary.json."""
+        groups: Dict[str, List[ResourceTeardown]] = {kind: [] for kind in TEARDOWN_GROUPS}
+        for node in nodes:
+            name = str(node.get("name") or node.get("id"))
+            if node.get("floating_ip"):
+                groups["floating_ip"].append(ResourceTeardown("floating_ip", str(node["floating_ip"]), name))
+            server = node.get("server_id") or node.get("name")
+            if server:
+                groups["server"].append(ResourceTeardown("server", str(server), name))
+            if node.get("port_name"):
+                groups["port"].append(ResourceTeardown("port", str(node["port_name"]), name))
+        return groups
+
+    # ------------------------------------------------------------------
+    # Borrado
+    # ------------------------------------------------------------------
+
+    def _deleter(self, kind: str) -> Callable[[str], None]:
+        return {
+            "floating_ip": self.backend.delete_floating_ip,
+            "server": self.backend.delete_server,
+            "port": self.backend.delete_port,
+        }[kind]
+
+    def _delete(self, item: ResourceTeardown) -> None:
+        """Borra un recurso reintentando los conflictos transitorios."""
+        delete = self._deleter(item.kind)
+        started = time.monotonic()
+        delay = self.retry_delay
+        while True:
+            item.attempts += 1
+            try:
+                delete(item.ref)
+                item.status = "deleted"
+                break
+            except ResourceNotFound:
+                item.status = "already_gone"
+                break
+            except ResourceConflict as e:
+                if item.attempts > self.retries:
+                    item.status = "failed"
+                    item.error = str(e)
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            except Exception as e:
+                item.status = "failed"
+                item.error = error_text(e)
+                break
+        item.seconds = round(time.monotonic() - started, 3)
+
+    def _wait_servers_gone(self, servers: List[ResourceTeardown]) -> None:
+        """Espera al lote completo de servidores borrados; seconds pasa a incluir la espera."""
+        pending = {s.ref: s for s in servers if s.status == "deleted"}
+        if not pending:
+            return
+        results = self.watcher.wait(pending, until=("DELETED",), fail=(), timeout=self.delete_timeout)
+        for ref, item in pending.items():
+            result = results[ref]
+            if result.reached:
+                item.seconds = round((item.seconds or 0.0) + result.seconds, 3)
+            else:
+                item.status = "failed"
+                item.error = f"sigue existiendo tras {int(self.delete_timeout)}s (estado {result.status})"
+
+    # ------------------------------------------------------------------
+    # Informe
+    # ------------------------------------------------------------------
+
+    def _write_report(self, report: Dict) -> Path:
+        path = self.state_dir / "teardown_report.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".teardown_report.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return path
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def teardown(
+        self,
+        summary_path: Optional[Path] = None,
+        on_event: Optional[TeardownCallback] = None,
+    ) -> Dict:
+        """
+        Borra todos los recursos del escenario y devuelve (y guarda en
+        state/teardown_report.json) el informe:
+
+          {"status": "completed" | "partial_failure", "seconds": ...,
+           "groups": {"floating_ip": s, "server": s, "port": s},
+           "resources": [...], "failed": [...]}
+        """
+        summary_path = summary_path or self.state_dir / "summary.json"
+        report = self.teardown_nodes(self._read_summary(summary_path), on_event)
+        report["summary"] = str(summary_path)
+        self._write_report(report)
+        return report
+
+    def teardown_nodes(
+        self,
+        nodes: List[Dict],
+        on_event: Optional[TeardownCallback] = None,
+    ) -> Dict:
+        """
+        Borra los recursos de nodes (entradas con el formato de summary.json)
+        y devuelve el informe, sin escribirlo en disco.
+        """
+        notify = on_event or (lambda event: None)
+        groups = self.plan(nodes)
+        started_at = time.time()
+        started = time.monotonic()
+        group_seconds: Dict[str, float] = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            for kind in TEARDOWN_GROUPS:
+                items = groups[kind]
+                group_started = time.monotonic()
+                notify({"event": "group_started", "group": kind, "count": len(items)})
+                list(pool.map(self._delete, items))
+                if kind == "server":
+                    self._wait_servers_gone(items)
+                group_seconds[kind] = round(time.monotonic() - group_started, 3)
+                for item in items:
+                    if item.status == "failed":
+                        notify({"event": "resource_failed", "kind": kind, "ref": item.ref, "error": item.error})
+                    else:
+                        notify({"event": "resource_deleted", "kind": kind, "ref": item.ref,
+                                "status": item.status, "seconds": item.seconds})
+
+        resources = [asdict(item) for kind in TEARDOWN_GROUPS for item in groups[kind]]
+        failed = [r for r in resources if r["status"] == "failed"]
+        return {
+            "status": "partial_failure" if failed else "completed",
+            "started_at": started_at,
+            "finished_at": time.time(),
+            "seconds": round(time.monotonic() - started, 3),
+            "groups": group_seconds,
+            "resources": resources,
+            "failed": failed,
+        }
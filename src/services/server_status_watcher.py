@@ -0,0 +1,117 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.models.scenario import ServerWaitResult
+
+# list_servers() -> [{"id", "name", "status"}], normalmente OpenStackBackend.list_servers
+ServerLister = Callable[[], List[Dict[str, str]]]
+
+# on_change(server, old_status, new_status)
+StatusCallback = Callable[[str, Optional[str], str], None]
+
+# Estado que se asigna a los servidores que no aparecen en el listado.
+MISSING_STATUS = "DELETED"
+
+
+class ServerStatusWatcher:
+    """
+    Espera a que un lote de servidores cambie de estado con un único listado
+    de servidores por iteración, en lugar de un `openstack server show` por
+    servidor y por iteración.
+
+    El intervalo entre listados es adaptativo: vuelve a min_interval cuando
+    algún servidor cambia de estado y crece (x backoff) hasta max_interval
+    mientras no cambia nada. Cada cambio de estado se notifica a on_change.
+
+    Los servidores se identifican por id o por nombre.
+    """
+
+    def __init__(
+        self,
+        list_servers: ServerLister,
+        min_interval: float = 1.0,
+        max_interval: float = 10.0,
+        backoff: float = 1.5,
+    ) -> None:
+        self._list_servers = list_servers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.list_calls = 0
+        self._lock = threading.Lock()
+
+    def _snapshot(self) -> Optional[Dict[str, str]]:
+        """Estado por id y por nombre, o None si el listado ha fallado."""
+        try:
+            servers = self._list_servers()
+        except Exception:
+            return None
+        finally:
+            with self._lock:
+                self.list_calls += 1
+        statuses: Dict[str, str] = {}
+        for server in servers:
+            statuses[server["name"]] = server["status"]
+        # el id tiene prioridad si coincide con el nombre de otro servidor
+        for server in servers:
+            statuses[server["id"]] = server["status"]
+        return statuses
+
+    def wait(
+        self,
+        servers: Iterable[str],
+        until: Iterable[str] = ("ACTIVE",),
+        fail: Iterable[str] = ("ERROR",),
+        timeout: float = 240.0,
+        on_change: Optional[StatusCallback] = None,
+    ) -> Dict[str, ServerWaitResult]:
+        """
+        Espera hasta que todos los servidores estén en un estado de until
+        (reached=True) o de fail (reached=False), o hasta timeout. Devuelve
+        un resultado por servidor con el tiempo que ha tardado cada uno.
+        """
+        until = set(until)
+        fail = set(fail)
+        notify = on_change or (lambda server, old, new: None)
+        pending = list(dict.fromkeys(servers))
+        last: Dict[str, Optional[str]] = {s: None for s in pending}
+        results: Dict[str, ServerWaitResult] = {}
+        started = time.monotonic()
+        interval = self.min_interval
+
+        while pending:
+            snapshot = self._snapshot()
+            elapsed = time.monotonic() - started
+            changed = False
+            if snapshot is not None:
+                still_pending: List[str] = []
+                for server in pending:
+                    status = snapshot.get(server, MISSING_STATUS)
+                    if status != last[server]:
+                        notify(server, last[server], status)
+                        last[server] = status
+                        changed = True
+                    if status in until or status in fail:
+                        results[server] = ServerWaitResult(
+                            server=server,
+                            status=status,
+                            reached=status in until,
+                            seconds=round(elapsed, 3),
+                        )
+                    else:
+                        still_pending.append(server)
+                pending = still_pending
+
+            if not pending:
+                break
+            if elapsed >= timeout:
+                for server in pending:
+                    results[server] = ServerWaitResult(
+                        server=server, status=last[server] or "UNKNOWN", reached=False, seconds=None)
+                break
+
+            interval = self.min_interval if changed else min(self.max_interval, interval * self.backoff)
+            time.sleep(min(interval, max(0.0, timeout - elapsed)))
+
+        return results
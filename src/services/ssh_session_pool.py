@@ -0,0 +1,154 @@
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Firma compatible con subprocess.run: runner(cmd, **kwargs) -> CompletedProcess.
+# Permite sustituir el transporte real por un fake en proceso.
+Runner = Callable[..., subprocess.CompletedProcess]
+
+
+class SshSession:
+    """
+    Sesión SSH autenticada contra (user, ip).
+
+    Se apoya en el multiplexado de OpenSSH (ControlMaster): la primera orden
+    abre la conexión maestra y las siguientes (ssh y scp) viajan por el mismo
+    socket, sin repetir TCP ni intercambio de claves.
+    """
+
+    def __init__(
+        self,
+        user: str,
+        ip: str,
+        ssh_key: Path,
+        control_path: str,
+        persist_seconds: int,
+        runner: Runner,
+    ) -> None:
+        self.user = user
+        self.ip = ip
+        self.ssh_key = ssh_key
+        self.control_path = control_path
+        self.persist_seconds = persist_seconds
+        self._runner = runner
+
+    @property
+    def target(self) -> str:
+        return f"{self.user}@{self.ip}"
+
+    def _options(self) -> List[str]:
+        return [
+            "-o", "StrictHostKeyChecking=no",
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={self.control_path}",
+            "-o", f"ControlPersist={self.persist_seconds}",
+            "-i", str(self.ssh_key),
+        ]
+
+    def ssh_command(self, remote_command: str, batch_mode: bool = False) -> List[str]:
+        """Construye la línea ssh que ejecuta remote_command en la sesión."""
+        cmd = ["ssh"] + self._options()
+        if batch_mode:
+            cmd += ["-o", "BatchMode=yes"]
+        return cmd + [self.target, remote_command]
+
+    def scp_command(self, local_path: Path, remote_path: str) -> List[str]:
+        """Construye la línea scp que copia local_path a remote_path por la sesión."""
+        return ["scp"] + self._options() + [str(local_path), f"{self.target}:{remote_path}"]
+
+    def run(self, remote_command: str, check: bool = True, batch_mode: bool = False, **kwargs: Any) -> subprocess.CompletedProcess:
+        """
+        Ejecuta un comando remoto. Por defecto captura stdout/stderr como texto
+        y lanza CalledProcessError si falla (igual que ToolsInstallerService._run).
+        """
+        kwargs.setdefault("stdout", subprocess.PIPE)
+        kwargs.setdefault("stderr", subprocess.PIPE)
+        kwargs.setdefault("text", True)
+        return self._runner(self.ssh_command(remote_command, batch_mode=batch_mode), check=check, **kwargs)
+
+    def upload(self, local_path: Path, remote_path: str) -> subprocess.CompletedProcess:
+        """Copia un fichero al remoto (lanza CalledProcessError si falla)."""
+        return self._runner(
+            self.scp_command(local_path, remote_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+
+    def close(self) -> None:
+        """Cierra la conexión maestra (si existe). Nunca lanza excepción."""
+        cmd = ["ssh", "-o", f"ControlPath={self.control_path}", "-O", "exit", self.target]
+        try:
+            self._runner(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        except OSError:
+            pass
+
+
+class SshSessionPool:
+    """
+    Pool de sesiones SSH: una sesión por (user, ip), compartida por todas las
+    fases (copia, ejecución, validación) y cerrada al terminar la ejecución.
+
+    Es seguro usarlo desde varios hilos (ver run_plans_concurrently).
+    """
+
+    def __init__(
+        self,
+        ssh_key: Path,
+        persist_seconds: int = 600,
+        control_dir: Optional[Path] = None,
+        runner: Optional[Runner] = None,
+    ) -> None:
+        self.ssh_key = ssh_key
+        self.persist_seconds = persist_seconds
+        self._owns_control_dir = control_dir is None
+        # El socket de control debe tener una ruta corta (límite de sockets unix);
+        # %C lo sustituye ssh por un hash de (host local, host, puerto, usuario).
+        self.control_dir = control_dir or Path(tempfile.mkdtemp(prefix="nics-ssh-"))
+        self._runner: Runner = runner or subprocess.run
+        self._sessions: Dict[Tuple[str, str], SshSession] = {}
+        self._lock = threading.Lock()
+
+    def session(self, user: str, ip: str) -> SshSession:
+        """Devuelve (creándola si hace falta) la sesión para (user, ip)."""
+        key = (user, ip)
+        with self._lock:
+            sess = self._sessions.get(key)
+            if sess is None:
+                sess = SshSession(
+                    user=user,
+                    ip=ip,
+                    ssh_key=self.ssh_key,
+                    control_path=str(self.control_dir / "%C"),
+                    persist_seconds=self.persist_seconds,
+                    runner=self._runner,
+                )
+                self._sessions[key] = sess
+            return sess
+
+    def discard(self, user: str, ip: str) -> None:
+        """Cierra y olvida la sesión (user, ip), p. ej. tras un fallo de autenticación."""
+        with self._lock:
+            sess = self._sessions.pop((user, ip), None)
+        if sess is not None:
+            sess.close()
+
+    def close_all(self) -> None:
+        """Cierra todas las sesiones abiertas y elimina el directorio de sockets."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for sess in sessions:
+            sess.close()
+        if self._owns_control_dir:
+            shutil.rmtree(self.control_dir, ignore_errors=True)
+
+    def __enter__(self) -> "SshSessionPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close_all()
@@ -0,0 +1,183 @@
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.models.tools import ToolInstallPlan, ToolManifest, ToolNode
+
+# Estados con los que una herramienta cuenta como disponible para sus dependientes
+SATISFIED_STATUSES = ("ok", "already_installed")
+
+# Holgura (segundos) al decidir qué nodo terminó justo antes de que otro empezara
+_CRITICAL_SLACK = 0.05
+
+RunNode = Callable[[ToolNode], Dict]
+# skip_node(nodo, dependencia fallida, resultado de la dependencia) -> resultado
+SkipNode = Callable[[ToolNode, ToolNode, Dict], Dict]
+# fail_node(nodo, excepción de run_node) -> resultado
+FailNode = Callable[[ToolNode, Exception], Dict]
+
+
+def load_manifest(installers_dir: Path, tool: str) -> ToolManifest:
+    """Manifest de una herramienta; si no tiene manifest.json, el de por defecto (sin dependencias, exclusiva)."""
+    path = installers_dir / tool.lower() / "manifest.json"
+    if not path.is_file():
+        return ToolManifest(tool=tool.lower())
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return ToolManifest.from_dict(tool, json.load(f))
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"manifest inválido en {path}: {e}") from e
+
+
+class ToolGraph:
+    """
+    Grafo de instalación de una ejecución: un nodo por (instancia, herramienta)
+    de los planes y una arista por cada dependencia de los manifests.
+
+    Las dependencias sobre herramientas que no forman parte de la ejecución se
+    ignoran (se asume que ya están instaladas). Lanza ValueError si hay ciclos.
+    """
+
+    def __init__(self, plans: List[ToolInstallPlan], manifests: Dict[str, ToolManifest]) -> None:
+        self.plans: Dict[str, ToolInstallPlan] = {p.instance.name: p for p in plans}
+        self.manifests = manifests
+        self.nodes: List[ToolNode] = []
+        for plan in plans:
+            for tool in dict.fromkeys(plan.tools):
+                self.nodes.append(ToolNode(plan.instance.name, tool))
+
+        by_tool: Dict[str, List[ToolNode]] = {}
+        for node in self.nodes:
+            by_tool.setdefault(node.tool.lower(), []).append(node)
+
+        self.deps: Dict[ToolNode, List[ToolNode]] = {}
+        for node in self.nodes:
+            deps: List[ToolNode] = []
+            for dep in self.manifest(node).depends_on:
+                for other in by_tool.get(dep.tool, []):
+                    if dep.instance is None:
+                        wanted = other.instance == node.instance
+                    elif dep.instance == "*":
+                        wanted = other.instance != node.instance
+                    else:
+                        wanted = other.instance == dep.instance
+                    if wanted and other != node and other not in deps:
+                        deps.append(other)
+            self.deps[node] = deps
+        self._check_acyclic()
+
+    @classmethod
+    def from_plans(cls, plans: List[ToolInstallPlan], installers_dir: Path) -> "ToolGraph":
+        tools = {t.lower() for plan in plans for t in plan.tools}
+        return cls(plans, {t: load_manifest(installers_dir, t) for t in sorted(tools)})
+
+    def manifest(self, node: ToolNode) -> ToolManifest:
+        return self.manifests.get(node.tool.lower()) or ToolManifest(tool=node.tool.lower())
+
+    def conflicts(self, a: ToolNode, b: ToolNode) -> bool:
+        """Dos nodos que no pueden ejecutarse a la vez (misma instancia y alguno exclusivo o en conflicto)."""
+        if a.instance != b.instance or a == b:
+            return False
+        ma, mb = self.manifest(a), self.manifest(b)
+        return ma.exclusive or mb.exclusive or mb.tool in ma.conflicts or ma.tool in mb.conflicts
+
+    def _check_acyclic(self) -> None:
+        state: Dict[ToolNode, int] = {}  # 1 = en la pila, 2 = visitado
+
+        def visit(node: ToolNode, stack: List[ToolNode]) -> None:
+            state[node] = 1
+            stack.append(node)
+            for dep in self.deps[node]:
+                if state.get(dep) == 1:
+                    cycle = stack[stack.index(dep):] + [dep]
+                    raise ValueError("ciclo de dependencias: " + " -> ".join(str(n) for n in cycle))
+                if dep not in state:
+                    visit(dep, stack)
+            stack.pop()
+            state[node] = 2
+
+        for node in self.nodes:
+            if node not in state:
+                visit(node, [])
+
+
+def run_graph(
+    graph: ToolGraph,
+    run_node: RunNode,
+    skip_node: SkipNode,
+    max_workers: int = 1,
+    fail_node: Optional[FailNode] = None,
+) -> Dict[ToolNode, Dict]:
+    """
+    Ejecuta los nodos del grafo con un pool de max_workers hilos, tan en
+    paralelo como permiten las dependencias y los conflictos por instancia.
+    Entre los nodos listos se respeta el orden de los planes.
+
+    Un nodo cuya dependencia no termina en SATISFIED_STATUSES no se ejecuta:
+    su resultado es el de skip_node. Si run_node lanza una excepción, el
+    resultado del nodo es fail_node(nodo, excepción) (sus dependientes pasan
+    por skip_node y el resto sigue); sin fail_node la excepción se propaga.
+    """
+    pending = list(graph.nodes)
+    done: Dict[ToolNode, Dict] = {}
+    running: Dict = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for node in list(pending):
+                    deps = graph.deps[node]
+                    failed = [d for d in deps if d in done and done[d].get("status") not in SATISFIED_STATUSES]
+                    if failed:
+                        done[node] = skip_node(node, failed[0], done[failed[0]])
+                        pending.remove(node)
+                        progressed = True
+                        continue
+                    if len(running) >= max(1, max_workers):
+                        break
+                    if any(d not in done for d in deps):
+                        continue
+                    if any(graph.conflicts(node, other) for other in running.values()):
+                        continue
+                    running[pool.submit(run_node, node)] = node
+                    pending.remove(node)
+            if not running:
+                break
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = running.pop(future)
+                try:
+                    done[node] = future.result()
+                except Exception as e:
+                    if fail_node is None:
+                        raise
+                    done[node] = fail_node(node, e)
+    return done
+
+
+def critical_path(graph: ToolGraph, results: Dict[ToolNode, Dict]) -> List[ToolNode]:
+    """
+    Camino crítico real de una ejecución: desde el último nodo en terminar,
+    se retrocede por el nodo (dependencia o conflicto en la misma instancia)
+    que terminó más tarde antes de que empezara. Los nodos no ejecutados no
+    forman parte del camino.
+    """
+    timed = {n: r for n, r in results.items() if r.get("started_at") and r.get("finished_at")}
+    if not timed:
+        return []
+    node: Optional[ToolNode] = max(timed, key=lambda n: timed[n]["finished_at"])
+    path: List[ToolNode] = []
+    while node is not None:
+        path.append(node)
+        started = timed[node]["started_at"]
+        candidates = [d for d in graph.deps[node] if d in timed]
+        candidates += [o for o in timed if graph.conflicts(node, o)]
+        candidates = [
+            c for c in candidates
+            if c not in path and timed[c]["finished_at"] <= started + _CRITICAL_SLACK
+        ]
+        node = max(candidates, key=lambda c: timed[c]["finished_at"]) if candidates else None
+    path.reverse()
+    return path
@@ -1,11 +1,55 @@
+import asyncio
+import hashlib
 import json
 import os
 import subprocess
-from dataclasses import asdict
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, replace
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Callable, List, Optional, Dict, Tuple
 
-from src.models.tools import InstanceTarget, ToolInstallPlan
+from src.models.tools import InstallerOptions, InstanceTarget, ToolInstallPlan, ToolNode
+from src.services.async_orchestrator import (
+    AsyncOrchestrator,
+    AsyncRunner,
+    PhaseTimeout,
+    run_sync,
+    subprocess_runner,
+    threaded_runner,
+)
+from src.services.golden_image_cache import (
+    GoldenImageCache,
+    golden_images_enabled,
+    golden_key,
+    installer_fingerprints,
+    normalize_tools,
+)
+from src.services.installer_bundle import (
+    InstallerBundleBuilder,
+    build_remote_check_command,
+    build_remote_run_command,
+    remote_bundle_path,
+    split_bundle_output,
+)
+from src.services.instance_metadata import InstanceMetadataResolver
+from src.services.metrics import observe_tool_result
+from src.services.openstack_backend import error_text, load_openrc_env, open_openstack_backend, use_api_transport
+from src.services.phase_timer import PhaseTimer, TimingsLog
+from src.services.remote_pipeline import (
+    PIPELINE_REMOTE_COMMAND,
+    build_pipeline_script,
+    build_precheck_command,
+    build_write_marker_command,
+    marker_path_for,
+    read_trailer_from_log,
+)
+from src.services.ssh_session_pool import Runner, SshSession, SshSessionPool
+from src.services.tool_scheduler import ToolGraph, critical_path, run_graph
+
+# Recibe eventos de progreso: {"event": "tool_started" | "tool_finished", ...}
+ProgressCallback = Callable[[Dict], None]
 
 
 class ToolsInstallerService:
@@ -15,25 +59,58 @@ class ToolsInstallerService:
     Orquesta:
       - lectura de JSONs desde tools-installer-tmp
       - resolución de instancia y herramientas
-      - conexión SSH
+      - conexión SSH (una sesión multiplexada por instancia, ver SshSessionPool)
       - ejecución de instaladores bash
       - validación básica posterior
       - logging local
+      - golden images: snapshot de las instancias que terminan bien (ver
+        GoldenImageCache y _golden_after_install)
     """
 
     def __init__(
         self,
         repo_root: Path,
-        tools_json_dir: Optional[Path] = None,
-        installers_dir: Optional[Path] = None,
-        logs_dir: Optional[Path] = None,
-        admin_openrc: Optional[Path] = None,
+        options: Optional[InstallerOptions] = None,
+        ssh_runner: Optional[Runner] = None,
+        async_ssh_runner: Optional[AsyncRunner] = None,
+        golden_images: Optional[GoldenImageCache] = None,
+        **settings,
     ) -> None:
+        """
+        options reúne las rutas y ajustes del servicio (ver InstallerOptions);
+        los ajustes sueltos como argumentos con nombre (p. ej.
+        parallel_ssh_probe=True) se siguen aceptando y tienen prioridad.
+        ssh_runner, async_ssh_runner y golden_images son dependencias
+        sustituibles por fakes.
+        """
+        self.options = replace(options or InstallerOptions(), **settings)
         self.repo_root = repo_root
-        self.tools_json_dir = tools_json_dir or repo_root / "tools-installer-tmp"
-        self.installers_dir = installers_dir or repo_root / "tools-installer" / "installers"
-        self.logs_dir = logs_dir or repo_root / "tools-installer" / "logs"
-        self.admin_openrc = admin_openrc or repo_root / "admin-openrc.sh"
+        self.tools_json_dir = self.options.tools_json_dir or repo_root / "tools-installer-tmp"
+        self.installers_dir = self.options.installers_dir or repo_root / "tools-installer" / "installers"
+        self.logs_dir = self.options.logs_dir or repo_root / "tools-installer" / "logs"
+        self.admin_openrc = self.options.admin_openrc or repo_root / "admin-openrc.sh"
+        # transporte de las sesiones SSH (subprocess.run por defecto; sustituible por un fake)
+        self.ssh_runner = ssh_runner
+        # transporte del motor asíncrono (engine="async")
+        self.async_ssh_runner = async_ssh_runner
+        # imagen/IPs/usuario SSH de las instancias, con caché en disco compartida
+        self.metadata = InstanceMetadataResolver(
+            cache_path=self.options.metadata_cache_path or repo_root / "state" / "instance_metadata.json",
+            run=self._run,
+            summary_path=repo_root / "scenario" / "state" / "summary.json",
+            server_rows=self._api_server_rows,
+        )
+        # tiempos por fase de cada ejecución (JSON Lines, ver TimingsLog)
+        self.timings_log = TimingsLog(self.options.timings_path or repo_root / "state" / "timings.jsonl")
+        # caché de golden images; si está activada (use_golden_images, o
+        # NICS_GOLDEN_IMAGES=1 cuando es None) se crea en run_all_plans
+        self.golden_images = golden_images
+        # paquetes tar.gz de instaladores por conjunto de herramientas (modo bundled)
+        self.bundles = InstallerBundleBuilder(
+            self.installers_dir,
+            self.options.bundles_dir or repo_root / "state" / "bundles",
+            self._validation_command_for,
+        )
 
         self.logs_dir.mkdir(parents=True, exist_ok=True)
 
@@ -53,29 +130,20 @@ class ToolsInstallerService:
         )
         return result.stdout
 
+    def _api_server_rows(self, env: Dict[str, str]) -> List[Dict]:
+        """Listado de servidores por la API (sesión compartida); sin credenciales, el resolver usa el CLI."""
+        if not use_api_transport(env):
+            raise RuntimeError("transporte API desactivado")
+        from src.services.openstack_client import server_listing_rows, shared_client
+
+        return server_listing_rows(shared_client(env))
+
     def _load_openstack_env(self) -> Dict[str, str]:
         """
         Carga las variables OS_* desde admin-openrc.sh en un dict de entorno.
         No ejecuta 'source', sino que parsea las líneas export OS_*=...
         """
-        env = os.environ.copy()
-        if not self.admin_openrc.is_file():
-            raise FileNotFoundError(f"No se encontró admin-openrc.sh en {self.admin_openrc}")
-
-        with self.admin_openrc.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line.startswith("export "):
-                    continue
-                # ejemplo: export OS_AUTH_URL=http://...
-                try:
-                    _, rest = line.split("export ", 1)
-                    key, value = rest.split("=", 1)
-                    env[key.strip()] = value.strip()
-                except ValueError:
-                    # línea no estándar, se ignora
-                    continue
-        return env
+        return load_openrc_env(self.admin_openrc)
 
     def _detect_ssh_key(self) -> Path:
         """Busca una clave privada SSH usable en ~/.ssh."""
@@ -98,14 +166,12 @@ class ToolsInstallerService:
         raise RuntimeError("No se encontró ninguna clave privada válida en ~/.ssh")
 
     def _openstack_get_image_name(self, env: Dict[str, str], instance_name_or_id: str) -> str:
-        """Obtiene el nombre de la imagen desde openstack server show."""
-        cmd = ["openstack", "server", "show", instance_name_or_id, "-f", "json"]
-        out = self._run(cmd, env=env)
-        data = json.loads(out)
-        image_field = data.get("image")
-        if isinstance(image_field, dict):
-            return image_field.get("name", "")
-        return str(image_field) if image_field is not None else ""
+        """
+        Obtiene el nombre de la imagen de la instancia.
+        Usa la caché de metadatos: un único `openstack server list` para todas
+        las instancias en lugar de un `openstack server show` por plan.
+        """
+        return self.metadata.image_name_for(instance_name_or_id, env)
 
     def _guess_ssh_user(self, image_name: str) -> List[str]:
         """Devuelve una lista ordenada de usuarios candidatos según la imagen."""
@@ -123,24 +189,99 @@ class ToolsInstallerService:
         # fallback genérico
         return ["ubuntu", "debian", "root"]
 
-    def _probe_ssh_user(self, ssh_key: Path, ip: str, candidates: List[str]) -> str:
-        """Prueba usuarios por SSH hasta encontrar uno válido."""
-        for user in candidates:
-            cmd = [
-                "ssh",
-                "-o", "StrictHostKeyChecking=no",
-                "-o", "BatchMode=yes",
-                "-i", str(ssh_key),
-                f"{user}@{ip}",
-                "echo", "ok",
-            ]
+    def _probe_ssh_user(self, pool: SshSessionPool, ip: str, candidates: List[str], parallel: bool = False) -> str:
+        """
+        Prueba usuarios por SSH hasta encontrar uno válido.
+        La sesión del usuario que responde queda abierta en el pool y se reutiliza.
+
+        Con parallel=True se prueban todos los candidatos a la vez y se toma el
+        primero que responda; las sesiones sobrantes se cierran.
+        """
+        def probe(user: str) -> bool:
             try:
-                out = self._run(cmd)
+                out = pool.session(user, ip).run("echo ok", batch_mode=True).stdout
                 if "ok" in out:
-                    return user
+                    return True
             except subprocess.CalledProcessError:
-                continue
-        raise RuntimeError(f"No fue posible conectar por SSH a {ip} con usuarios candidatos {candidates}")
+                pass
+            pool.discard(user, ip)
+            return False
+
+        if not parallel or len(candidates) <= 1:
+            for user in candidates:
+                if probe(user):
+                    return user
+            raise ssh_probe_failed(ip, candidates)
+
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        futures = {executor.submit(probe, user): user for user in candidates}
+        winner: Optional[str] = None
+        pending = set(futures)
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.result() and winner is None:
+                        winner = futures[future]
+        finally:
+            executor.shutdown(wait=False)
+
+        if winner is None:
+            raise ssh_probe_failed(ip, candidates)
+
+        def close_extra(future, user: str) -> None:
+            if user != winner and not future.exception() and future.result():
+                pool.discard(user, ip)
+
+        # otros candidatos que también respondieron (en la misma tanda que el
+        # ganador o más tarde): el callback se ejecuta al momento si ya terminó
+        for future, user in futures.items():
+            future.add_done_callback(lambda f, u=user: close_extra(f, u))
+        return winner
+
+    def _resolve_ssh_user(
+        self,
+        pool: SshSessionPool,
+        env: Dict[str, str],
+        instance: InstanceTarget,
+        timer: Optional[PhaseTimer] = None,
+    ) -> str:
+        """
+        Determina el usuario SSH de una instancia.
+
+        El usuario que funcionó en ejecuciones anteriores (o el que declara
+        summary.json) se prueba primero; si falla se invalida y se prueban el
+        resto de candidatos según la imagen. timer recibe las fases probe e
+        image_lookup.
+        """
+        timer = timer or PhaseTimer()
+        ip = instance.ip
+        known = self.metadata.known_ssh_user(instance.id, ip)
+        if known:
+            try:
+                with timer.phase("probe"):
+                    return self._probe_ssh_user(pool, ip, [known])
+            except RuntimeError:
+                self.metadata.forget_ssh_user(instance.id, ip)
+
+        with timer.phase("image_lookup"):
+            candidates = self._ssh_user_candidates(env, instance, known)
+        with timer.phase("probe"):
+            ssh_user = self._probe_ssh_user(pool, ip, candidates, parallel=self.options.parallel_ssh_probe)
+        self.metadata.remember_ssh_user(instance.id, ip, ssh_user)
+        return ssh_user
+
+    def _ssh_user_candidates(self, env: Dict[str, str], instance: InstanceTarget, known: Optional[str]) -> List[str]:
+        """
+        Usuarios a probar según la imagen de la instancia, sin el ya conocido
+        (que falló) y con el invalidado en otra ejecución al final.
+        """
+        image_name = self._openstack_get_image_name(env, instance.name)
+        rejected = self.metadata.rejected_ssh_user(instance.id, instance.ip)
+        return sorted((u for u in self._guess_ssh_user(image_name) if u != known), key=lambda u: u == rejected)
+
+    def _new_ssh_pool(self, ssh_key: Path) -> SshSessionPool:
+        return SshSessionPool(ssh_key, runner=self.ssh_runner)
 
     def _load_tool_plans(self) -> List[ToolInstallPlan]:
         """Lee todos los *_tools.json en tools-installer-tmp y construye los planes."""
@@ -167,6 +308,54 @@ class ToolsInstallerService:
 
         return plans
 
+    def build_plan(self, instance_name: str, tools: List[str], hints: Optional[Dict] = None) -> ToolInstallPlan:
+        """
+        Construye el plan de una instancia concreta (p. ej. desde el dashboard).
+
+        Los datos de la instancia salen, por orden, de su *_tools.json en
+        tools-installer-tmp, de hints (campos enviados por el cliente) y de
+        scenario/state/summary.json.
+        """
+        raw: Dict = {}
+        source_json = self.tools_json_dir / f"{instance_name}_tools.json"
+        if self.tools_json_dir.is_dir():
+            for json_file in sorted(self.tools_json_dir.glob("*_tools.json")):
+                with json_file.open("r", encoding="utf-8") as f:
+                    candidate = json.load(f)
+                if candidate.get("name") == instance_name or candidate.get("instance") == instance_name:
+                    raw, source_json = candidate, json_file
+                    break
+
+        for key, value in (hints or {}).items():
+            if value is not None and raw.get(key) in (None, "", "None"):
+                raw[key] = value
+
+        if not raw.get("ip"):
+            summary_path = self.repo_root / "scenario" / "state" / "summary.json"
+            if summary_path.is_file():
+                with summary_path.open("r", encoding="utf-8") as f:
+                    summary = json.load(f)
+                for node in summary if isinstance(summary, list) else summary.get("instances", []):
+                    if node.get("name") == instance_name:
+                        raw.setdefault("id", node.get("server_id") or node.get("id"))
+                        raw.setdefault("ip_floating", node.get("floating_ip"))
+                        break
+            raw["ip"] = raw.get("ip_floating") or raw.get("ip_private")
+
+        if not raw.get("ip"):
+            raise ValueError(f"No se conoce la IP de la instancia '{instance_name}'")
+
+        inst = InstanceTarget(
+            id=str(raw.get("id") or instance_name),
+            name=instance_name,
+            type=str(raw.get("type")),
+            ip_private=str(raw.get("ip_private")),
+            ip_floating=raw.get("ip_floating"),
+            ip=str(raw.get("ip")),
+            status=str(raw.get("status")),
+        )
+        return ToolInstallPlan(instance=inst, tools=list(tools), source_json=source_json)
+
     def _installer_path_for(self, tool_name: str) -> Path:
         """Determina el path del instalador bash para una herramienta concreta."""
         # Normalizamos en minúsculas
@@ -177,11 +366,19 @@ class ToolsInstallerService:
             raise FileNotFoundError(f"No se encontró instalador para '{tool_name}' en {installer}")
         return installer
 
+    def _installer_fingerprint(self, tool_name: str) -> str:
+        """sha256 del instalador local; se guarda en el remoto tras instalar bien."""
+        return hashlib.sha256(self._installer_path_for(tool_name).read_bytes()).hexdigest()
+
     def _log_path_for(self, instance_name: str, tool_name: str) -> Path:
         safe_instance = instance_name.replace(" ", "_")
         safe_tool = tool_name.replace(" ", "_")
         return self.logs_dir / f"{safe_instance}_{safe_tool}_install.log"
 
+    def _bundle_log_path_for(self, instance_name: str) -> Path:
+        """Salida completa del driver de una instancia (modo bundled)."""
+        return self.logs_dir / f"{instance_name.replace(' ', '_')}_bundle_install.log"
+
     def _validation_command_for(self, tool_name: str) -> str:
         """Comando remoto básico de validación por herramienta."""
         t = tool_name.lower()
@@ -200,117 +397,953 @@ class ToolsInstallerService:
         return f"which {t}"
 
     # ------------------------------------------------------------------
-    # API pública del servicio
+    # Ejecución por instancia
     # ------------------------------------------------------------------
 
-    def run_all_plans(self) -> List[Dict]:
+    def _run_plan(
+        self,
+        plan: ToolInstallPlan,
+        env: Dict[str, str],
+        pool: SshSessionPool,
+        pipelined: bool = False,
+        on_event: Optional[ProgressCallback] = None,
+        force: bool = False,
+        run_timings: Optional[Dict[str, float]] = None,
+        golden: Optional[GoldenImageCache] = None,
+        bundled: bool = False,
+    ) -> List[Dict]:
         """
-        Ejecuta la instalación de todas las herramientas definidas en tools-installer-tmp.
-        Devuelve una lista de resultados por plan/herramienta.
+        Instala, en orden, todas las herramientas de un plan (una instancia).
+        Devuelve los resultados de ese plan.
+
+        Salvo con force=True, las herramientas que ya validan bien y cuyo
+        marcador remoto coincide con el instalador local no se reinstalan
+        (estado "already_installed").
+
+        Cada resultado lleva en "timings" los tiempos por fase de la ejecución
+        (run_timings), de la instancia y de la herramienta. Con golden, cada
+        resultado lleva además "golden_image" (ver _golden_after_install).
+
+        Con bundled=True toda la instancia se instala con un único paquete
+        (ver _install_bundled).
         """
-        env = self._load_openstack_env()
-        ssh_key = self._detect_ssh_key()
-        plans = self._load_tool_plans()
+        notify = on_event or (lambda event: None)
+        instance = plan.instance
+        instance_timer = PhaseTimer()
+        ssh_user = self._resolve_ssh_user(pool, env, instance, instance_timer)
+        session = pool.session(ssh_user, instance.ip)
 
-        results: List[Dict] = []
+        if bundled:
+            results = self._install_bundled(session, instance, plan.tools, force, instance_timer, notify, run_timings)
+        else:
+            results = self._install_tools(session, instance, plan.tools, pipelined, force, instance_timer, notify,
+                                          run_timings)
 
-        for plan in plans:
-            instance = plan.instance
-            ip = instance.ip
-            image_name = self._openstack_get_image_name(env, instance.name)
-            ssh_candidates = self._guess_ssh_user(image_name)
-            ssh_user = self._probe_ssh_user(ssh_key, ip, ssh_candidates)
+        if golden is not None:
+            with instance_timer.phase("golden"):
+                decision = self._golden_after_install(golden, env, session, plan, results)
+            apply_golden_decision(results, decision, instance_timer)
+        return results
 
-            for tool in plan.tools:
-                installer_path = self._installer_path_for(tool)
+    def _install_bundled(
+        self,
+        session: SshSession,
+        instance: InstanceTarget,
+        tools: List[str],
+        force: bool,
+        instance_timer: PhaseTimer,
+        notify: ProgressCallback,
+        run_timings: Optional[Dict[str, float]],
+    ) -> List[Dict]:
+        """
+        Instala todas las herramientas de una instancia con un solo paquete
+        (ver InstallerBundleBuilder): una comprobación de si el remoto ya tiene
+        ese paquete, como mucho una copia y una única ejecución del driver, que
+        hace la pre-comprobación, instalación, validación y marcador de cada
+        herramienta y devuelve un trailer por herramienta.
+
+        Los estados son los mismos que en el modo clásico. La salida del driver
+        queda en <instancia>_bundle_install.log y la de cada herramienta en su
+        log habitual. Los eventos tool_finished llegan al terminar el driver;
+        este modo no transmite la salida en directo: los logs por herramienta
+        se escriben (y se leen en InstallStream) cuando el driver ha terminado.
+        """
+        with instance_timer.phase("bundle"):
+            bundle = self.bundles.build(tools)
+        for tool in tools:
+            notify_tool_started(notify, instance.name, tool, self._log_path_for(instance.name, tool))
+
+        started_at = time.time()
+        sections: Dict[str, Dict] = {}
+        upload_error: Optional[subprocess.CalledProcessError] = None
+        try:
+            with instance_timer.phase("upload"):
+                present = session.run(
+                    build_remote_check_command(bundle.digest),
+                    check=False,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                ).returncode == 0
+                if not present:
+                    session.upload(bundle.path, remote_bundle_path(bundle.digest))
+        except subprocess.CalledProcessError as e:
+            upload_error = e
+        else:
+            started_at = time.time()
+            log_path = self._bundle_log_path_for(instance.name)
+            with log_path.open("w", encoding="utf-8") as log_file, instance_timer.phase("exec"):
+                session.run(
+                    build_remote_run_command(bundle.digest, instance.ip, force),
+                    check=False,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                )
+            sections = split_bundle_output(log_path.read_text(encoding="utf-8", errors="replace"))
+
+        results: List[Dict] = []
+        for tool in tools:
+            tool_timer = PhaseTimer()
+            section = sections.get(tool.lower())
+            trailer = section["trailer"] if section else None
+            if upload_error is not None:
+                result = upload_failed_result(instance, tool, upload_error)
+            elif trailer is None:
+                result = tool_result(instance, tool, "install_failed", error=NO_TRAILER_ERROR)
+            elif trailer["current"]:
+                result = tool_result(instance, tool, "already_installed")
+            else:
                 log_path = self._log_path_for(instance.name, tool)
+                log_path.write_text(section["output"], encoding="utf-8")
+                result = trailer_result("install", instance, tool, log_path, trailer)
+            # el driver instala en orden: cada herramienta empieza cuando acaba la anterior
+            seconds = trailer["ms"] / 1000.0 if trailer else 0.0
+            tool_timer.add("exec", seconds)
+            results.append(finish_tool_result(
+                "install", result, started_at, run_timings, instance_timer, tool_timer, notify,
+                finished_at=started_at + seconds if trailer else None))
+            started_at = result["finished_at"]
+        return results
+
+    def _install_tools(
+        self,
+        session: SshSession,
+        instance: InstanceTarget,
+        tools: List[str],
+        pipelined: bool,
+        force: bool,
+        instance_timer: PhaseTimer,
+        notify: ProgressCallback,
+        run_timings: Optional[Dict[str, float]],
+    ) -> List[Dict]:
+        """
+        Instala las herramientas una a una (modo clásico o pipelined). Un error
+        de una herramienta (p. ej. sin install.sh) queda en su resultado (ver
+        tool_error_result) y se sigue con la siguiente.
+        """
+        install = self._install_tool_pipelined if pipelined else self._install_tool
+        results: List[Dict] = []
+        for tool in tools:
+            started_at = time.time()
+            tool_timer = PhaseTimer()
+            try:
+                with tool_timer.phase("precheck"):
+                    current = not force and self._is_current(session, tool)
+                result = start_tool(notify, instance, tool, self._log_path_for(instance.name, tool), current)
+                if result is None:
+                    result = install(session, instance, tool, tool_timer)
+            except Exception as e:
+                result = tool_error_result("install", instance, tool, e)
+            results.append(finish_tool_result(
+                "install", result, started_at, run_timings, instance_timer, tool_timer, notify))
+        return results
 
-                # 1) copiar instalador al remoto
-                scp_cmd = [
-                    "scp",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    str(installer_path),
-                    f"{ssh_user}@{ip}:/tmp/install_{tool}.sh",
-                ]
+    # ------------------------------------------------------------------
+    # Ejecución por grafo de dependencias
+    # ------------------------------------------------------------------
 
-                try:
-                    self._run(scp_cmd)
-                except subprocess.CalledProcessError as e:
-                    results.append({
-                        "instance": asdict(instance),
-                        "tool": tool,
-                        "status": "scp_failed",
-                        "error": e.stderr if hasattr(e, "stderr") else str(e),
-                    })
+    def _run_graph(
+        self,
+        graph: ToolGraph,
+        env: Dict[str, str],
+        pool: SshSessionPool,
+        pipelined: bool,
+        notify: ProgressCallback,
+        force: bool,
+        run_timings: Dict[str, float],
+        golden: Optional[GoldenImageCache],
+        max_workers: int,
+    ) -> List[Dict]:
+        """
+        Instala todos los nodos (instancia, herramienta) del grafo con
+        run_graph: hasta max_workers herramientas a la vez entre todas las
+        instancias, siguiendo las dependencias de los manifests y sin juntar en
+        una instancia herramientas exclusivas o en conflicto.
+
+        Cada resultado lleva "schedule": {"depends_on": [...], "critical": bool}.
+        Al terminar se emite {"event": "critical_path", "path": [...], "seconds",
+        "makespan"}. Las herramientas cuya dependencia falla quedan en
+        "dependency_failed" sin ejecutarse. Si una instancia falla (p. ej. SSH
+        inalcanzable), cada herramienta suya queda como en failed_plan_results
+        y el resto de instancias sigue.
+        """
+        sessions: Dict[str, Tuple[SshSession, PhaseTimer]] = {}
+        unreachable: Dict[str, Exception] = {}
+        locks = {name: threading.Lock() for name in graph.plans}
+
+        def session_for(instance: InstanceTarget) -> Tuple[SshSession, PhaseTimer]:
+            # el usuario SSH se resuelve una sola vez por instancia aunque varios
+            # nodos empiecen a la vez; un fallo tampoco se vuelve a probar
+            with locks[instance.name]:
+                if instance.name in unreachable:
+                    raise unreachable[instance.name]
+                if instance.name not in sessions:
+                    timer = PhaseTimer()
+                    try:
+                        ssh_user = self._resolve_ssh_user(pool, env, instance, timer)
+                    except Exception as e:
+                        unreachable[instance.name] = e
+                        raise
+                    sessions[instance.name] = (pool.session(ssh_user, instance.ip), timer)
+                return sessions[instance.name]
+
+        def run_node(node: ToolNode) -> Dict:
+            instance = graph.plans[node.instance].instance
+            session, instance_timer = session_for(instance)
+            return self._install_tools(
+                session, instance, [node.tool], pipelined, force, instance_timer, notify, run_timings)[0]
+
+        def skip_node(node: ToolNode, dep: ToolNode, dep_result: Dict) -> Dict:
+            result = tool_result(
+                graph.plans[node.instance].instance, node.tool, "dependency_failed",
+                error=f"depende de {dep} ({dep_result.get('status')})",
+            )
+            observe_tool_result("install", result)
+            notify({"event": "tool_finished", "instance": node.instance, "tool": node.tool, "result": result})
+            return result
+
+        def fail_node(node: ToolNode, exc: Exception) -> Dict:
+            plan = replace(graph.plans[node.instance], tools=[node.tool])
+            return failed_plan_results(plan, exc, "install", run_timings, notify)[0]
+
+        by_node = run_graph(graph, run_node, skip_node, max_workers, fail_node)
+        path = critical_path(graph, by_node)
+        for node, result in by_node.items():
+            result["schedule"] = {"depends_on": [str(d) for d in graph.deps[node]], "critical": node in path}
+
+        if golden is not None:
+            for name, plan in graph.plans.items():
+                if name not in sessions:
                     continue
+                session, instance_timer = sessions[name]
+                plan_results = [by_node[n] for n in graph.nodes if n.instance == name]
+                with instance_timer.phase("golden"):
+                    decision = self._golden_after_install(golden, env, session, plan, plan_results)
+                apply_golden_decision(plan_results, decision, instance_timer)
 
-                # 2) ajustar permisos remotos
-                chmod_cmd = [
-                    "ssh",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    f"{ssh_user}@{ip}",
-                    "chmod +x /tmp/install_{tool}.sh".format(tool=tool),
-                ]
-                try:
-                    self._run(chmod_cmd)
-                except subprocess.CalledProcessError:
-                    # se intentará ejecutar igualmente; el shell remoto puede manejarlo
-                    pass
-
-                # 3) ejecutar instalador remoto y capturar log local
-                ssh_install_cmd = [
-                    "ssh",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    f"{ssh_user}@{ip}",
-                    f"sudo bash /tmp/install_{tool}.sh '{ip}'",
-                ]
-                with log_path.open("w", encoding="utf-8") as log_file:
-                    proc = subprocess.run(
-                        ssh_install_cmd,
-                        stdout=log_file,
-                        stderr=subprocess.STDOUT,
-                        text=True,
-                    )
-                if proc.returncode != 0:
-                    results.append({
-                        "instance": asdict(instance),
-                        "tool": tool,
-                        "status": "install_failed",
-                        "log_file": str(log_path),
-                    })
+        steps = [
+            {"instance": n.instance, "tool": n.tool,
+             "seconds": round(by_node[n]["finished_at"] - by_node[n]["started_at"], 4)}
+            for n in path
+        ]
+        timed = [r for r in by_node.values() if r.get("started_at")]
+        notify({
+            "event": "critical_path",
+            "path": steps,
+            "seconds": round(sum(s["seconds"] for s in steps), 4),
+            "makespan": round(max(r["finished_at"] for r in timed) - min(r["started_at"] for r in timed), 4)
+            if timed else 0.0,
+        })
+        return [by_node[n] for n in graph.nodes]
+
+    # ------------------------------------------------------------------
+    # Golden images
+    # ------------------------------------------------------------------
+
+    def _golden_cache(self, env: Dict[str, str]) -> Optional[GoldenImageCache]:
+        enabled = golden_images_enabled() if self.options.use_golden_images is None else self.options.use_golden_images
+        if self.golden_images is None and enabled:
+            self.golden_images = GoldenImageCache.for_repo(self.repo_root, open_openstack_backend(env))
+        return self.golden_images
+
+    def _golden_after_install(
+        self,
+        golden: GoldenImageCache,
+        env: Dict[str, str],
+        session: SshSession,
+        plan: ToolInstallPlan,
+        results: List[Dict],
+    ) -> Dict:
+        """
+        Decisión de golden image de una instancia, igual para todos sus resultados:
+
+          decision  "hit" si arrancó de la golden image de esta combinación
+                    (imagen base + herramientas + instaladores), "miss" si no
+          action    "none" (hit), "captured" (snapshot pedido), "exists" (la
+                    combinación ya tenía imagen), "skipped" (alguna herramienta
+                    no ha terminado bien) o "failed"
+
+        La combinación incluye las herramientas que ya traía la golden image de
+        la que arrancó la instancia, si es el caso.
+        """
+        meta = self.metadata.resolve(plan.instance.name, env)
+        image_name = meta.image_name if meta is not None else ""
+        booted_from = golden.find_by_image(image_name)
+        base_image = booted_from.base_image if booted_from else image_name
+        tools = normalize_tools(list(booted_from.tools if booted_from else []) + list(plan.tools))
+        decision = {"decision": "miss", "action": "none", "key": None, "image_id": None, "base_image": base_image}
+        try:
+            installers = installer_fingerprints(self.installers_dir, tools)
+        except FileNotFoundError as e:
+            decision.update(action="skipped", error=str(e))
+            return decision
+        key = golden_key(base_image, tools, installers)
+        decision["key"] = key
+        if booted_from is not None and booted_from.key == key:
+            decision.update(decision="hit", image_id=booted_from.image_id)
+            return decision
+        if meta is None or not base_image or any(r["status"] not in ("ok", "already_installed") for r in results):
+            decision["action"] = "skipped"
+            return decision
+
+        try:
+            # que el snapshot vea en disco todo lo que acaban de escribir los instaladores
+            session.run("sync", check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            entry, created = golden.capture(meta.id, base_image, tools, installers)
+        except Exception as e:
+            decision.update(action="failed", error=str(e))
+            return decision
+        decision.update(action="captured" if created else "exists", image_id=entry.image_id)
+        return decision
+
+    def _is_current(self, session: SshSession, tool: str) -> bool:
+        """
+        Pre-comprobación en un round-trip: la validación de la herramienta
+        pasa y el marcador remoto tiene la huella del instalador local.
+        """
+        proc = session.run(
+            self._precheck_command(tool), check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return proc.returncode == 0
+
+    def _precheck_command(self, tool: str) -> str:
+        return build_precheck_command(
+            self._validation_command_for(tool),
+            marker_path_for(tool),
+            self._installer_fingerprint(tool),
+        )
+
+    def _marker_command(self, tool: str) -> str:
+        """Escribe en el remoto el marcador con la huella del instalador aplicado."""
+        return build_write_marker_command(marker_path_for(tool), self._installer_fingerprint(tool))
+
+    def _pipeline_script(self, instance: InstanceTarget, tool: str) -> str:
+        """Instalador, validación y marcador en un único script (ver build_pipeline_script)."""
+        return build_pipeline_script(
+            self._installer_path_for(tool).read_text(encoding="utf-8"),
+            [instance.ip],
+            self._validation_command_for(tool),
+            on_success=self._marker_command(tool),
+        )
+
+    def _install_tool(
+        self,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Dict:
+        """Instalación clásica: copia, chmod, ejecución y validación por separado."""
+        timer = timer or PhaseTimer()
+        installer_path = self._installer_path_for(tool)
+        log_path = self._log_path_for(instance.name, tool)
+
+        # 1) copiar instalador al remoto
+        try:
+            with timer.phase("upload"):
+                session.upload(installer_path, f"/tmp/install_{tool}.sh")
+        except subprocess.CalledProcessError as e:
+            return upload_failed_result(instance, tool, e)
+
+        # 2) ajustar permisos remotos (si falla se intenta ejecutar igualmente)
+        with timer.phase("upload"):
+            session.run(f"chmod +x /tmp/install_{tool}.sh", check=False)
+
+        # 3) ejecutar instalador remoto y capturar log local
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            proc = session.run(
+                f"sudo bash /tmp/install_{tool}.sh '{instance.ip}'",
+                check=False,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+        if proc.returncode != 0:
+            return tool_result(instance, tool, exit_status("install", proc.returncode), log_file=str(log_path))
+
+        # 4) validación remota
+        with timer.phase("validate"):
+            check = session.run(
+                self._validation_command_for(tool),
+                check=False,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        status = exit_status("install", 0, check.returncode)
+
+        # 5) marcador con la huella del instalador aplicado
+        if status == "ok":
+            with timer.phase("marker"):
+                session.run(
+                    self._marker_command(tool),
+                    check=False,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+        return tool_result(instance, tool, status, log_file=str(log_path))
+
+    def _install_tool_pipelined(
+        self,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Dict:
+        """
+        Instalación en un único round-trip: el instalador viaja por stdin de
+        `bash -s`, se ejecuta y se valida en la misma orden remota. Los códigos
+        de salida se leen del trailer que queda al final del log (la fase
+        "exec" cubre por tanto subida, ejecución y validación).
+        """
+        timer = timer or PhaseTimer()
+        log_path = self._log_path_for(instance.name, tool)
+        script = self._pipeline_script(instance, tool)
+
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            session.run(
+                PIPELINE_REMOTE_COMMAND,
+                check=False,
+                input=script,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+
+        return trailer_result("install", instance, tool, log_path, read_trailer_from_log(log_path))
+
+    # ------------------------------------------------------------------
+    # Motor asíncrono (engine="async")
+    # ------------------------------------------------------------------
+
+    def _new_orchestrator(self) -> AsyncOrchestrator:
+        """Orquestador con los límites de options (independientes de max_workers del motor threads)."""
+        if self.async_ssh_runner is not None:
+            runner = self.async_ssh_runner
+        elif self.ssh_runner is not None:
+            runner = threaded_runner(self.ssh_runner)
+        else:
+            runner = subprocess_runner
+        return AsyncOrchestrator(
+            runner,
+            max_concurrency=self.options.max_concurrency,
+            per_host=self.options.max_per_host,
+            timeouts=self.options.phase_timeouts,
+        )
+
+    async def _probe_ssh_user_async(
+        self,
+        orch: AsyncOrchestrator,
+        pool: SshSessionPool,
+        ip: str,
+        candidates: List[str],
+        parallel: bool = False,
+    ) -> str:
+        """Versión asíncrona de _probe_ssh_user (con parallel=True, el primer candidato que responda)."""
+        async def probe(user: str) -> bool:
+            try:
+                proc = await orch.run(pool.session(user, ip), "probe", "echo ok", batch_mode=True)
+                if proc.returncode == 0 and "ok" in (proc.stdout or ""):
+                    return True
+            except PhaseTimeout:
+                pass
+            await asyncio.to_thread(pool.discard, user, ip)
+            return False
+
+        if not parallel or len(candidates) <= 1:
+            for user in candidates:
+                if await probe(user):
+                    return user
+            raise ssh_probe_failed(ip, candidates)
+
+        tasks = {asyncio.create_task(probe(user)): user for user in candidates}
+        winner: Optional[str] = None
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() and winner is None:
+                        winner = tasks[task]
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            # se cierran las sesiones de los pendientes y de cualquier otro
+            # candidato que también respondiera
+            for task, user in tasks.items():
+                if user == winner:
                     continue
+                answered = not task.cancelled() and task.exception() is None and task.result()
+                if task in pending or answered:
+                    await asyncio.to_thread(pool.discard, user, ip)
+        if winner is None:
+            raise ssh_probe_failed(ip, candidates)
+        return winner
+
+    async def _resolve_ssh_user_async(
+        self,
+        orch: AsyncOrchestrator,
+        pool: SshSessionPool,
+        env: Dict[str, str],
+        instance: InstanceTarget,
+        timer: PhaseTimer,
+    ) -> str:
+        """Versión asíncrona de _resolve_ssh_user; la consulta de la imagen va a un hilo."""
+        ip = instance.ip
+        known = self.metadata.known_ssh_user(instance.id, ip)
+        if known:
+            try:
+                with timer.phase("probe"):
+                    return await self._probe_ssh_user_async(orch, pool, ip, [known])
+            except RuntimeError:
+                self.metadata.forget_ssh_user(instance.id, ip)
+
+        with timer.phase("image_lookup"):
+            candidates = await asyncio.to_thread(self._ssh_user_candidates, env, instance, known)
+        with timer.phase("probe"):
+            ssh_user = await self._probe_ssh_user_async(
+                orch, pool, ip, candidates, parallel=self.options.parallel_ssh_probe)
+        # la caché se escribe una vez al final de la ejecución (ver run_all_plans)
+        self.metadata.remember_ssh_user(instance.id, ip, ssh_user, save=False)
+        return ssh_user
+
+    async def _is_current_async(self, orch: AsyncOrchestrator, session: SshSession, tool: str) -> bool:
+        proc = await orch.run(
+            session, "precheck", self._precheck_command(tool), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return proc.returncode == 0
+
+    async def _install_tool_async(
+        self,
+        orch: AsyncOrchestrator,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: PhaseTimer,
+    ) -> Dict:
+        """Versión asíncrona de _install_tool (mismas fases y estados)."""
+        installer_path = self._installer_path_for(tool)
+        log_path = self._log_path_for(instance.name, tool)
+
+        try:
+            with timer.phase("upload"):
+                await orch.upload(session, installer_path, f"/tmp/install_{tool}.sh")
+        except subprocess.CalledProcessError as e:
+            return upload_failed_result(instance, tool, e)
+        with timer.phase("upload"):
+            await orch.run(session, "upload", f"chmod +x /tmp/install_{tool}.sh")
+
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            proc = await orch.run(
+                session, "exec", f"sudo bash /tmp/install_{tool}.sh '{instance.ip}'",
+                stdout=log_file, stderr=subprocess.STDOUT,
+            )
+        if proc.returncode != 0:
+            return tool_result(instance, tool, exit_status("install", proc.returncode), log_file=str(log_path))
+
+        with timer.phase("validate"):
+            check = await orch.run(
+                session, "validate", self._validation_command_for(tool),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        status = exit_status("install", 0, check.returncode)
+        if status == "ok":
+            with timer.phase("marker"):
+                await orch.run(
+                    session, "marker", self._marker_command(tool),
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+        return tool_result(instance, tool, status, log_file=str(log_path))
+
+    async def _install_tool_pipelined_async(
+        self,
+        orch: AsyncOrchestrator,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: PhaseTimer,
+    ) -> Dict:
+        """Versión asíncrona de _install_tool_pipelined (un round-trip, fase "exec")."""
+        log_path = self._log_path_for(instance.name, tool)
+        script = self._pipeline_script(instance, tool)
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            await orch.run(
+                session, "exec", PIPELINE_REMOTE_COMMAND,
+                input=script, stdout=log_file, stderr=subprocess.STDOUT,
+            )
+        return trailer_result("install", instance, tool, log_path, read_trailer_from_log(log_path))
+
+    async def _run_plan_async(
+        self,
+        plan: ToolInstallPlan,
+        results: List[Dict],
+        env: Dict[str, str],
+        orch: AsyncOrchestrator,
+        pool: SshSessionPool,
+        pipelined: bool,
+        notify: ProgressCallback,
+        force: bool,
+        run_timings: Dict[str, float],
+        golden: Optional[GoldenImageCache],
+    ) -> None:
+        """
+        Versión asíncrona de _run_plan. Los resultados se añaden a results a
+        medida que terminan; una herramienta cuya orden supera el límite de su
+        fase queda en "timeout" (con "phase") y se sigue con la siguiente.
+
+        El error de una herramienta queda en su resultado (tool_error_result).
+        Un error de la instancia (p. ej. SSH inalcanzable) deja sus herramientas
+        pendientes con el resultado de failed_plan_results sin afectar al resto
+        de instancias; solo la cancelación (deadline) se propaga.
+        """
+        instance = plan.instance
+        instance_timer = PhaseTimer()
+        install = self._install_tool_pipelined_async if pipelined else self._install_tool_async
+        try:
+            ssh_user = await self._resolve_ssh_user_async(orch, pool, env, instance, instance_timer)
+            session = pool.session(ssh_user, instance.ip)
+            for tool in plan.tools:
+                started_at = time.time()
+                tool_timer = PhaseTimer()
+                try:
+                    with tool_timer.phase("precheck"):
+                        current = not force and await self._is_current_async(orch, session, tool)
+                    result = start_tool(notify, instance, tool, self._log_path_for(instance.name, tool), current)
+                    if result is None:
+                        result = await install(orch, session, instance, tool, tool_timer)
+                except PhaseTimeout as e:
+                    result = timeout_result(instance, tool, e)
+                except Exception as e:
+                    result = tool_error_result("install", instance, tool, e)
+                results.append(finish_tool_result(
+                    "install", result, started_at, run_timings, instance_timer, tool_timer, notify))
+        except Exception as e:
+            results.extend(failed_plan_results(plan, e, "install", run_timings, notify, results, instance_timer))
+            return
+
+        if golden is not None:
+            with instance_timer.phase("golden"):
+                decision = await asyncio.to_thread(self._golden_after_install, golden, env, session, plan, results)
+            apply_golden_decision(results, decision, instance_timer)
+
+    # ------------------------------------------------------------------
+    # API pública del servicio
+    # ------------------------------------------------------------------
+
+    def run_all_plans(
+        self,
+        max_workers: int = 1,
+        pipelined: bool = False,
+        plans: Optional[List[ToolInstallPlan]] = None,
+        on_event: Optional[ProgressCallback] = None,
+        force: bool = False,
+        bundled: bool = False,
+        dag: bool = False,
+        engine: str = "threads",
+        deadline: Optional[float] = None,
+    ) -> List[Dict]:
+        """
+        Ejecuta la instalación de todas las herramientas definidas en tools-installer-tmp.
+        Devuelve una lista de resultados por plan/herramienta.
+
+        Con max_workers > 1 las instancias se procesan en paralelo (como máximo
+        max_workers a la vez); las herramientas de una misma instancia se siguen
+        instalando en orden. Los resultados conservan el orden de los planes.
+
+        Cada instancia usa una única sesión SSH (copia, ejecución y validación)
+        que se cierra al terminar la ejecución. Con pipelined=True cada herramienta
+        cuesta un solo round-trip (ver _install_tool_pipelined). Con bundled=True
+        cada instancia recibe un único paquete con todos sus instaladores y sus
+        ficheros auxiliares, que se ejecuta en una sola orden remota (ver
+        _install_bundled); el paquete se reutiliza entre instancias con las
+        mismas herramientas y no se vuelve a copiar si el remoto ya lo tiene.
 
-                # 4) validación remota
-                validate_cmd = [
-                    "ssh",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    f"{ssh_user}@{ip}",
-                    self._validation_command_for(tool),
-                ]
+        Con dag=True el orden lo deciden los manifest.json de los instaladores
+        (dependencias, también entre instancias, y herramientas exclusivas o en
+        conflicto): max_workers pasa a ser el número de herramientas a la vez
+        entre todas las instancias y se informa del camino crítico (ver
+        _run_graph). No se combina con bundled.
+
+        Con engine="async" las órdenes remotas son subprocesos asíncronos de un
+        único bucle asyncio (ver AsyncOrchestrator) en lugar de un hilo por
+        instancia: todas las instancias avanzan a la vez (max_workers no se
+        usa), max_concurrency (InstallerOptions) limita las órdenes en vuelo en
+        total y max_per_host las de cada instancia. Cada orden tiene el límite de su fase (phase_timeouts) y
+        deadline (segundos) acota la ejecución completa: lo que no ha terminado
+        se cancela y queda como "cancelled". Admite los modos clásico y
+        pipelined (no bundled ni dag).
+
+        plans permite ejecutar planes concretos (ver build_plan) en lugar de los
+        de tools-installer-tmp; on_event recibe el inicio y el fin de cada
+        herramienta a medida que ocurren (puede llamarse desde varios hilos).
+
+        Si una instancia falla (p. ej. ningún usuario responde por SSH), sus
+        herramientas quedan en "ssh_unreachable" (o "install_failed" con el
+        error) y el resto de instancias sigue (ver failed_plan_results); el
+        error de una sola herramienta queda en la suya (ver tool_error_result).
+
+        Las herramientas ya instaladas con el instalador actual se saltan
+        ("already_installed"); force=True las reinstala igualmente.
+
+        Los tiempos por fase de cada resultado ("timings") se añaden también
+        a state/timings.jsonl (ver TimingsLog.summary para p50/p95).
+
+        Con golden images activadas (NICS_GOLDEN_IMAGES=1, use_golden_images o
+        golden_images en el constructor), cada instancia que termina bien se guarda como
+        snapshot y cada resultado indica si hubo acierto o fallo de caché.
+        """
+        run_timer = PhaseTimer()
+        with run_timer.phase("env_load"):
+            env = self._load_openstack_env()
+        with run_timer.phase("key_detection"):
+            ssh_key = self._detect_ssh_key()
+        with run_timer.phase("plan_load"):
+            if plans is None:
+                plans = self._load_tool_plans()
+
+        if dag and bundled:
+            raise ValueError("dag y bundled no se pueden combinar: el paquete instala cada instancia en una sola orden")
+        if engine not in ("threads", "async"):
+            raise ValueError(f"motor desconocido: {engine} (threads o async)")
+        if engine == "async" and (dag or bundled):
+            raise ValueError("el motor async solo admite los modos clásico y pipelined")
+        graph = ToolGraph.from_plans(plans, self.installers_dir) if dag else None
+
+        golden = self._golden_cache(env)
+        with self._new_ssh_pool(ssh_key) as pool:
+            if engine == "async":
+                orch = self._new_orchestrator()
+                notify = on_event or (lambda event: None)
                 try:
-                    subprocess.run(
-                        validate_cmd,
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL,
-                        text=True,
-                        check=True,
-                    )
-                    results.append({
-                        "instance": asdict(instance),
-                        "tool": tool,
-                        "status": "ok",
-                        "log_file": str(log_path),
-                    })
-                except subprocess.CalledProcessError:
-                    results.append({
-                        "instance": asdict(instance),
-                        "tool": tool,
-                        "status": "validation_failed",
-                        "log_file": str(log_path),
-                    })
+                    results = run_sync(orch.run_plans(
+                        plans,
+                        lambda plan, out: self._run_plan_async(
+                            plan, out, env, orch, pool, pipelined, notify, force, run_timer.as_dict(), golden),
+                        lambda plan, tool: cancelled_result(plan, tool, "install", run_timer.as_dict(), notify),
+                        deadline,
+                    ))
+                finally:
+                    self.metadata.flush()
+            elif graph is not None:
+                results = self._run_graph(
+                    graph, env, pool, pipelined, on_event or (lambda event: None), force, run_timer.as_dict(),
+                    golden, max_workers)
+            else:
+                results = run_plans_concurrently(
+                    plans,
+                    lambda plan: self._run_plan(
+                        plan, env, pool, pipelined, on_event, force, run_timer.as_dict(), golden, bundled),
+                    max_workers,
+                    lambda plan, exc: failed_plan_results(
+                        plan, exc, "install", run_timer.as_dict(), on_event or (lambda event: None)),
+                )
+        self.timings_log.append("install", results)
+        return results
+
+
+# estado de una herramienta según los códigos de salida remotos (script y comprobación posterior)
+RUN_FAILED_STATUS = {"install": "install_failed", "uninstall": "uninstall_failed"}
+CHECK_FAILED_STATUS = {"install": "validation_failed", "uninstall": "validation_unclear"}
+NO_TRAILER_ERROR = "la ejecución remota terminó sin trailer de resultado"
+
+
+class SshUnreachableError(RuntimeError):
+    """Ningún usuario candidato responde por SSH en la instancia."""
+
+
+def ssh_probe_failed(ip: str, candidates: List[str]) -> SshUnreachableError:
+    return SshUnreachableError(f"No fue posible conectar por SSH a {ip} con usuarios candidatos {candidates}")
+
+
+def tool_result(instance: InstanceTarget, tool: str, status: str, **fields) -> Dict:
+    """Resultado de una herramienta; fields añade log_file, error, phase..."""
+    return {"instance": asdict(instance), "tool": tool, "status": status, **fields}
+
+
+def upload_failed_result(instance: InstanceTarget, tool: str, exc: subprocess.CalledProcessError) -> Dict:
+    return tool_result(instance, tool, "scp_failed", error=error_text(exc))
+
+
+def timeout_result(instance: InstanceTarget, tool: str, exc: PhaseTimeout) -> Dict:
+    """Herramienta cuya orden remota superó el límite de su fase (motor async)."""
+    return tool_result(instance, tool, "timeout", phase=exc.phase, error=str(exc))
+
+
+def tool_error_result(kind: str, instance: InstanceTarget, tool: str, exc: Exception) -> Dict:
+    """Herramienta cuya ejecución lanzó una excepción local (p. ej. instalador inexistente)."""
+    return tool_result(instance, tool, RUN_FAILED_STATUS[kind], error=error_text(exc))
+
+
+def exit_status(kind: str, run_rc: int, check_rc: int = 0) -> str:
+    """ok, o el fallo del script (run_rc) o de su comprobación (check_rc) para kind."""
+    if run_rc != 0:
+        return RUN_FAILED_STATUS[kind]
+    if check_rc != 0:
+        return CHECK_FAILED_STATUS[kind]
+    return "ok"
+
+
+def trailer_result(kind: str, instance: InstanceTarget, tool: str, log_path: Path, trailer: Optional[Dict]) -> Dict:
+    """Resultado de una ejecución en un round-trip a partir de su trailer (None si no llegó)."""
+    if trailer is None:
+        return tool_result(instance, tool, RUN_FAILED_STATUS[kind], log_file=str(log_path), error=NO_TRAILER_ERROR)
+    return tool_result(
+        instance, tool, exit_status(kind, trailer["run_rc"], trailer["check_rc"]), log_file=str(log_path))
 
+
+def start_tool(
+    notify: ProgressCallback,
+    instance: InstanceTarget,
+    tool: str,
+    log_path: Path,
+    current: bool,
+) -> Optional[Dict]:
+    """
+    Inicio de una herramienta tras su pre-comprobación. Si ya está al día
+    emite tool_started sin log y devuelve su resultado "already_installed";
+    si no, emite tool_started con su log (ver notify_tool_started) y devuelve
+    None: hay que instalarla.
+    """
+    if current:
+        notify({"event": "tool_started", "instance": instance.name, "tool": tool})
+        return tool_result(instance, tool, "already_installed")
+    notify_tool_started(notify, instance.name, tool, log_path)
+    return None
+
+
+def apply_golden_decision(results: List[Dict], decision: Dict, instance_timer: PhaseTimer) -> None:
+    """Anota la decisión de golden image de una instancia y sus tiempos finales en sus resultados."""
+    for result in results:
+        result["golden_image"] = decision
+        if "timings" in result:
+            result["timings"]["instance"] = instance_timer.as_dict()
+
+
+def notify_tool_started(notify: ProgressCallback, instance_name: str, tool: str, log_path: Path) -> None:
+    """
+    Emite tool_started con el log que va a escribir la herramienta. El log de
+    una ejecución anterior se borra antes, para que quien lo sigue (p. ej.
+    InstallStream) no reenvíe la salida antigua.
+    """
+    try:
+        log_path.unlink()
+    except FileNotFoundError:
+        pass
+    notify({"event": "tool_started", "instance": instance_name, "tool": tool, "log_file": str(log_path)})
+
+
+def finish_tool_result(
+    kind: str,
+    result: Dict,
+    started_at: float,
+    run_timings: Dict[str, float],
+    instance_timer: PhaseTimer,
+    tool_timer: PhaseTimer,
+    notify: ProgressCallback,
+    finished_at: Optional[float] = None,
+) -> Dict:
+    """
+    Completa un resultado (tiempos y timings), lo registra en métricas y emite
+    tool_finished. finished_at por defecto es el momento de la llamada.
+    """
+    result["started_at"] = started_at
+    result["finished_at"] = time.time() if finished_at is None else finished_at
+    result["timings"] = {
+        "run": dict(run_timings or {}),
+        "instance": instance_timer.as_dict(),
+        "tool": tool_timer.as_dict(),
+    }
+    observe_tool_result(kind, result)
+    notify({"event": "tool_finished", "instance": result["instance"]["name"], "tool": result["tool"], "result": result})
+    return result
+
+
+def cancelled_result(
+    plan: ToolInstallPlan,
+    tool: str,
+    kind: str,
+    run_timings: Dict[str, float],
+    notify: ProgressCallback,
+) -> Dict:
+    """Resultado de una herramienta que no llegó a terminar antes del deadline del motor async."""
+    now = time.time()
+    result = tool_result(plan.instance, tool, "cancelled", error="cancelada al agotarse el deadline de la ejecución")
+    return finish_tool_result(kind, result, now, run_timings, PhaseTimer(), PhaseTimer(), notify)
+
+
+def failed_plan_results(
+    plan: ToolInstallPlan,
+    exc: Exception,
+    kind: str,
+    run_timings: Dict[str, float],
+    notify: ProgressCallback,
+    finished: Optional[List[Dict]] = None,
+    instance_timer: Optional[PhaseTimer] = None,
+) -> List[Dict]:
+    """
+    Resultados de las herramientas de un plan que no llegaron a terminar porque
+    su instancia falló: "ssh_unreachable" si no hubo conexión SSH y, para
+    cualquier otro error, el fallo de kind; ambos con el texto del error. Las
+    herramientas que ya están en finished no se repiten.
+    """
+    status = "ssh_unreachable" if isinstance(exc, SshUnreachableError) else RUN_FAILED_STATUS[kind]
+    done = {r["tool"] for r in finished or []}
+    now = time.time()
+    return [
+        finish_tool_result(
+            kind, tool_result(plan.instance, tool, status, error=error_text(exc)), now, run_timings,
+            instance_timer or PhaseTimer(), PhaseTimer(), notify)
+        for tool in plan.tools if tool not in done
+    ]
+
+
+def run_plans_concurrently(
+    plans: List[ToolInstallPlan],
+    run_plan: Callable[[ToolInstallPlan], List[Dict]],
+    max_workers: int = 1,
+    on_error: Optional[Callable[[ToolInstallPlan, Exception], List[Dict]]] = None,
+) -> List[Dict]:
+    """
+    Ejecuta run_plan(plan) para cada plan con un pool acotado de hilos y
+    concatena los resultados en el orden original de los planes.
+    Con max_workers <= 1 la ejecución es secuencial.
+
+    Si run_plan lanza una excepción, los resultados de ese plan son los de
+    on_error(plan, excepción) y el resto de planes sigue; sin on_error la
+    excepción se propaga.
+    """
+    def plan_results(plan: ToolInstallPlan, run: Callable[[], List[Dict]]) -> List[Dict]:
+        try:
+            return run()
+        except Exception as e:
+            if on_error is None:
+                raise
+            return on_error(plan, e)
+
+    if max_workers <= 1 or len(plans) <= 1:
+        results: List[Dict] = []
+        for plan in plans:
+            results.extend(plan_results(plan, lambda: run_plan(plan)))
         return results
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(plans))) as pool:
+        futures = [pool.submit(run_plan, plan) for plan in plans]
+        results = []
+        for plan, future in zip(plans, futures):
+            results.extend(plan_results(plan, future.result))
+    return results
@@ -0,0 +1,334 @@
+import copy
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.services.metrics import TOOLS_STORE_OPERATIONS
+
+
+def run_record(result: Dict) -> Dict:
+    """Campos de un resultado de instalación que se guardan en el almacén."""
+    return {
+        "status": result.get("status"),
+        "started_at": result.get("started_at"),
+        "finished_at": result.get("finished_at"),
+        "log_file": result.get("log_file"),
+    }
+
+
+# estados con los que una herramienta queda instalada tras una ejecución
+INSTALLED_STATUSES = ("ok", "already_installed")
+
+
+def apply_run_results(data: Dict[str, Dict], results: List[Dict], kind: Optional[str] = None) -> None:
+    """
+    Aplica los resultados de una ejecución sobre {instancia: entrada}: el
+    último resultado por herramienta va a entry["last_run"] y, según kind,
+    las herramientas instaladas ("install") se añaden a tools/installed o las
+    desinstaladas con éxito ("uninstall") se retiran de ambas listas.
+    """
+    for result in results:
+        name = (result.get("instance") or {}).get("name")
+        tool = result.get("tool")
+        if not name or not tool:
+            continue
+        entry = data.setdefault(name, {})
+        entry.setdefault("last_run", {})[tool] = run_record(result)
+        status = result.get("status")
+        if kind == "install" and status in INSTALLED_STATUSES:
+            for key in ("tools", "installed"):
+                tools = entry.setdefault(key, [])
+                if tool not in tools:
+                    tools.append(tool)
+        elif kind == "uninstall" and status == "ok":
+            for key in ("tools", "installed"):
+                entry[key] = [t for t in entry.get(key, []) if t != tool]
+
+
+def open_tools_store(state_dir: Path, backend: Optional[str] = None):
+    """
+    Abre el almacén de herramientas configurado.
+
+    backend (o la variable NICS_TOOLS_STORE_BACKEND) puede ser "json" (por
+    defecto, state/tools_store.json) o "sqlite" (state/tools_store.db). Al
+    abrir por primera vez el backend SQLite se migra el JSON existente.
+
+    El almacén devuelto mide sus lecturas y escrituras (InstrumentedToolsStore).
+    """
+    backend = (backend or os.environ.get("NICS_TOOLS_STORE_BACKEND", "json")).lower()
+    json_path = Path(state_dir) / "tools_store.json"
+    if backend == "json":
+        return InstrumentedToolsStore(ToolsStore(json_path))
+    if backend == "sqlite":
+        from src.services.tools_store_sqlite import SqliteToolsStore
+
+        store = SqliteToolsStore(Path(state_dir) / "tools_store.db")
+        store.migrate_from_json(json_path, only_once=True)
+        return InstrumentedToolsStore(store)
+    raise ValueError(f"Backend de tools store desconocido: {backend}")
+
+
+class InstrumentedToolsStore:
+    """
+    Envoltorio de un almacén (JSON o SQLite) que registra número y duración
+    de lecturas y escrituras en nics_tools_store_operation_duration_seconds.
+    El resto de métodos (consultas de SQLite, version...) se delegan tal cual.
+    """
+
+    def __init__(self, store) -> None:
+        self.store = store
+
+    def __getattr__(self, name: str):
+        return getattr(self.store, name)
+
+    def read_all(self) -> Dict[str, Dict]:
+        with TOOLS_STORE_OPERATIONS.time(operation="read_all", mode="read"):
+            return self.store.read_all()
+
+    def get_instance(self, instance: str) -> Dict:
+        with TOOLS_STORE_OPERATIONS.time(operation="get_instance", mode="read"):
+            return self.store.get_instance(instance)
+
+    def update_instance(self, instance: str, mutate: Callable[[Dict], None]) -> Dict:
+        with TOOLS_STORE_OPERATIONS.time(operation="update_instance", mode="write"):
+            return self.store.update_instance(instance, mutate)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Dict]]:
+        with TOOLS_STORE_OPERATIONS.time(operation="transaction", mode="write"):
+            with self.store.transaction() as data:
+                yield data
+
+    def record_results(self, results: List[Dict], kind: Optional[str] = None) -> None:
+        with TOOLS_STORE_OPERATIONS.time(operation="record_results", mode="write"):
+            self.store.record_results(results, kind)
+
+
+class ToolsStore:
+    """
+    Almacén de herramientas por instancia (state/tools_store.json).
+
+    - Mantiene los datos en memoria y solo vuelve a leer disco cuando el
+      fichero ha cambiado (mtime/tamaño/inode).
+    - Las actualizaciones de una instancia no reescriben el fichero completo:
+      se añaden como líneas JSON a un journal (<store>.journal) que se aplica
+      sobre el snapshot al leer.
+    - Cada compact_every actualizaciones el journal se compacta en un nuevo
+      snapshot escrito de forma atómica (fichero temporal + rename).
+    - Lecturas y escrituras se protegen con un flock sobre <store>.lock, de
+      modo que varios workers (gunicorn) no pierden actualizaciones.
+
+    El snapshot conserva el formato histórico: {instancia: {"tools": [...], ...}}.
+    """
+
+    def __init__(self, path: Path, compact_every: int = 200) -> None:
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.compact_every = compact_every
+
+        self._data: Dict[str, Dict] = {}
+        self._snapshot_sig: Optional[Tuple[int, int, int]] = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._loaded = False
+        self._mutex = threading.RLock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Bloqueo entre procesos
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._mutex:
+            with open(self.lock_path, "a+") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Lectura incremental
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load_snapshot(self) -> None:
+        data: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    loaded = json.load(f)
+                if isinstance(loaded, dict):
+                    data = loaded
+            except (OSError, ValueError):
+                data = {}
+        self._data = data
+        self._snapshot_sig = self._signature(self.path)
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    def _apply_journal(self) -> None:
+        """Aplica las líneas del journal que aún no se han leído."""
+        try:
+            size = self.journal_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size < self._journal_offset:
+            # el journal se ha truncado (compactación en otro proceso)
+            self._load_snapshot()
+        if size == self._journal_offset:
+            return
+        with self.journal_path.open("rb") as f:
+            f.seek(self._journal_offset)
+            chunk = f.read(size - self._journal_offset)
+        # una línea incompleta (escritura en curso) se deja para la siguiente lectura
+        complete = chunk.rfind(b"\n") + 1
+        for raw in chunk[:complete].splitlines():
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                continue
+            self._apply_record(record)
+            self._journal_entries += 1
+        self._journal_offset += complete
+
+    def _apply_record(self, record: Dict) -> None:
+        instance = record.get("instance")
+        if instance is None:
+            return
+        if record.get("deleted"):
+            self._data.pop(instance, None)
+        else:
+            self._data[instance] = record.get("entry") or {}
+
+    def _refresh(self) -> None:
+        if not self._loaded or self._signature(self.path) != self._snapshot_sig:
+            self._load_snapshot()
+            self._loaded = True
+        self._apply_journal()
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def _append(self, records) -> None:
+        lines = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        if not lines:
+            return
+        with self.journal_path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        for record in records:
+            self._apply_record(record)
+        self._journal_entries += len(records)
+        self._journal_offset = self.journal_path.stat().st_size
+        if self._journal_entries >= self.compact_every:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Escribe un snapshot nuevo (temporal + rename) y vacía el journal."""
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        # si se interrumpe aquí, el journal se vuelve a aplicar sobre el
+        # snapshot nuevo: los registros son upserts completos (idempotentes)
+        with self.journal_path.open("w", encoding="utf-8"):
+            pass
+        self._snapshot_sig = self._signature(self.path)
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def read_all(self) -> Dict[str, Dict]:
+        """Copia de todo el almacén."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            return copy.deepcopy(self._data)
+
+    def get_instance(self, instance: str) -> Dict:
+        """Copia de la entrada de una instancia ({} si no existe)."""
+        with self._locked(exclusive=False):
+            self._refresh()
+            return copy.deepcopy(self._data.get(instance, {}))
+
+    def update_instance(self, instance: str, mutate: Callable[[Dict], None]) -> Dict:
+        """
+        Lectura-modificación-escritura atómica de una instancia: mutate recibe
+        una copia de la entrada y la modifica in situ. Devuelve la entrada nueva.
+        """
+        with self._locked(exclusive=True):
+            self._refresh()
+            entry = copy.deepcopy(self._data.get(instance, {}))
+            mutate(entry)
+            if entry != self._data.get(instance):
+                self._append([{"instance": instance, "entry": entry}])
+            return copy.deepcopy(entry)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Dict]]:
+        """
+        Transacción sobre todo el almacén: se entrega una copia mutable y, al
+        salir sin excepción, se registran solo las instancias que han cambiado.
+        """
+        with self._locked(exclusive=True):
+            self._refresh()
+            working = copy.deepcopy(self._data)
+            yield working
+            records = []
+            for instance, entry in working.items():
+                if self._data.get(instance) != entry:
+                    records.append({"instance": instance, "entry": entry})
+            for instance in self._data:
+                if instance not in working:
+                    records.append({"instance": instance, "deleted": True})
+            self._append(records)
+
+    def record_results(self, results: List[Dict], kind: Optional[str] = None) -> None:
+        """
+        Registra el último resultado por herramienta (estado, tiempos y log)
+        de una ejecución de ToolsInstallerService en entry["last_run"] y, con
+        kind="install"/"uninstall", marca o retira las herramientas (ver
+        apply_run_results). Todo en una única escritura.
+        """
+        with self.transaction() as data:
+            apply_run_results(data, results, kind)
+
+    def version(self) -> str:
+        """
+        Identificador barato del contenido actual (solo stat de snapshot y
+        journal, sin leerlos): cambia con cada escritura de cualquier proceso.
+        """
+        return repr((self._signature(self.path), self._signature(self.journal_path)))
+
+    def compact(self) -> None:
+        """Fuerza la compactación del journal en el snapshot."""
+        with self._locked(exclusive=True):
+            self._refresh()
+            self._compact()
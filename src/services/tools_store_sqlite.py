@@ -0,0 +1,274 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.services.tools_store import ToolsStore, apply_run_results, run_record
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    name  TEXT PRIMARY KEY,
+    entry TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS instance_tools (
+    instance  TEXT NOT NULL,
+    tool      TEXT NOT NULL,
+    assigned  INTEGER NOT NULL DEFAULT 0,
+    installed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (instance, tool)
+);
+CREATE INDEX IF NOT EXISTS idx_instance_tools_tool ON instance_tools (tool, installed);
+
+CREATE TABLE IF NOT EXISTS tool_status (
+    instance    TEXT NOT NULL,
+    tool        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    started_at  REAL,
+    finished_at REAL,
+    log_file    TEXT,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (instance, tool)
+);
+CREATE INDEX IF NOT EXISTS idx_tool_status_tool_status ON tool_status (tool, status);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteToolsStore:
+    """
+    Backend SQLite del almacén de herramientas (state/tools_store.db).
+
+    Ofrece la misma API que ToolsStore (read_all, get_instance,
+    update_instance, transaction, record_results) y además:
+
+      - tablas indexadas por instancia y herramienta (instance_tools)
+      - último estado de instalación por (instancia, herramienta) con
+        tiempos y log (tool_status), consultable por índice
+      - migración única desde state/tools_store.json
+
+    Usa modo WAL: los lectores no bloquean a los escritores y varios procesos
+    pueden compartir la base de datos.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Conexiones
+    # ------------------------------------------------------------------
+
+    def _conn(self) -> sqlite3.Connection:
+        """Una conexión por hilo."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura (BEGIN IMMEDIATE: bloquea a otros escritores)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # Utilidades internas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _put_instance(conn: sqlite3.Connection, name: str, entry: Dict) -> None:
+        conn.execute(
+            "INSERT INTO instances (name, entry) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET entry = excluded.entry",
+            (name, json.dumps(entry, separators=(",", ":"))),
+        )
+        conn.execute("DELETE FROM instance_tools WHERE instance = ?", (name,))
+        assigned = set(entry.get("tools") or [])
+        installed = set(entry.get("installed") or [])
+        conn.executemany(
+            "INSERT INTO instance_tools (instance, tool, assigned, installed) VALUES (?, ?, ?, ?)",
+            [(name, tool, int(tool in assigned), int(tool in installed)) for tool in sorted(assigned | installed)],
+        )
+
+    @staticmethod
+    def _delete_instance(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute("DELETE FROM instances WHERE name = ?", (name,))
+        conn.execute("DELETE FROM instance_tools WHERE instance = ?", (name,))
+
+    @staticmethod
+    def _get_entry(conn: sqlite3.Connection, name: str) -> Optional[Dict]:
+        row = conn.execute("SELECT entry FROM instances WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _all_entries(self, conn: sqlite3.Connection) -> Dict[str, Dict]:
+        return {name: json.loads(entry) for name, entry in conn.execute("SELECT name, entry FROM instances")}
+
+    # ------------------------------------------------------------------
+    # API compatible con ToolsStore
+    # ------------------------------------------------------------------
+
+    def read_all(self) -> Dict[str, Dict]:
+        return self._all_entries(self._conn())
+
+    def get_instance(self, instance: str) -> Dict:
+        return self._get_entry(self._conn(), instance) or {}
+
+    def update_instance(self, instance: str, mutate: Callable[[Dict], None]) -> Dict:
+        with self._write() as conn:
+            current = self._get_entry(conn, instance) or {}
+            entry = copy.deepcopy(current)
+            mutate(entry)
+            if entry != current:
+                self._put_instance(conn, instance, entry)
+            return entry
+
+    @contextmanager
+    def transaction(self) -> Iterator[Dict[str, Dict]]:
+        with self._write() as conn:
+            current = self._all_entries(conn)
+            working = copy.deepcopy(current)
+            yield working
+            for name, entry in working.items():
+                if current.get(name) != entry:
+                    self._put_instance(conn, name, entry)
+            for name in current:
+                if name not in working:
+                    self._delete_instance(conn, name)
+
+    def record_results(self, results: List[Dict], kind: Optional[str] = None) -> None:
+        """
+        Registra el resultado de cada herramienta (estado, tiempos y log) en
+        tool_status y, como en ToolsStore, en entry["last_run"] y (según kind)
+        en tools/installed, en una sola transacción.
+        """
+        now = time.time()
+        with self._write() as conn:
+            names = set()
+            for result in results:
+                name = (result.get("instance") or {}).get("name")
+                tool = result.get("tool")
+                if not name or not tool:
+                    continue
+                record = run_record(result)
+                conn.execute(
+                    "INSERT INTO tool_status (instance, tool, status, started_at, finished_at, log_file, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(instance, tool) DO UPDATE SET status = excluded.status, "
+                    "started_at = excluded.started_at, finished_at = excluded.finished_at, "
+                    "log_file = excluded.log_file, updated_at = excluded.updated_at",
+                    (name, tool, record["status"] or "unknown", record["started_at"],
+                     record["finished_at"], record["log_file"], now),
+                )
+                names.add(name)
+            current = {name: self._get_entry(conn, name) or {} for name in names}
+            working = copy.deepcopy(current)
+            apply_run_results(working, results, kind)
+            for name, entry in working.items():
+                if entry != current[name]:
+                    self._put_instance(conn, name, entry)
+
+    def version(self) -> str:
+        """
+        Identificador barato del contenido actual: stat de la base de datos y
+        de su WAL, que cambian con cada COMMIT de cualquier proceso.
+        """
+        sigs = []
+        for path in (self.path, self.path.with_name(self.path.name + "-wal")):
+            try:
+                st = path.stat()
+                sigs.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sigs.append(None)
+        return repr(sigs)
+
+    def compact(self) -> None:
+        """Vuelca el WAL en la base de datos principal."""
+        self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # ------------------------------------------------------------------
+    # Consultas indexadas
+    # ------------------------------------------------------------------
+
+    def instances_with_tool(self, tool: str, installed: Optional[bool] = None) -> List[str]:
+        """Instancias que tienen asignada (o instalada, si installed=True) una herramienta."""
+        if installed is None:
+            rows = self._conn().execute(
+                "SELECT instance FROM instance_tools WHERE tool = ? ORDER BY instance", (tool,))
+        else:
+            rows = self._conn().execute(
+                "SELECT instance FROM instance_tools WHERE tool = ? AND installed = ? ORDER BY instance",
+                (tool, int(installed)))
+        return [r[0] for r in rows]
+
+    def instances_with_tool_status(self, tool: str, status: str) -> List[str]:
+        """P. ej. instances_with_tool_status("suricata", "install_failed")."""
+        rows = self._conn().execute(
+            "SELECT instance FROM tool_status WHERE tool = ? AND status = ? ORDER BY instance",
+            (tool, status))
+        return [r[0] for r in rows]
+
+    def tool_status_for(self, instance: str) -> Dict[str, Dict]:
+        """Último estado de cada herramienta de una instancia."""
+        rows = self._conn().execute(
+            "SELECT tool, status, started_at, finished_at, log_file FROM tool_status WHERE instance = ?",
+            (instance,))
+        return {
+            tool: {"status": status, "started_at": started, "finished_at": finished, "log_file": log_file}
+            for tool, status, started, finished, log_file in rows
+        }
+
+    # ------------------------------------------------------------------
+    # Migración
+    # ------------------------------------------------------------------
+
+    def migrate_from_json(self, json_path: Path, only_once: bool = False) -> int:
+        """
+        Importa state/tools_store.json (incluido su journal) en la base de datos.
+        Con only_once=True no hace nada si ya se migró antes. Devuelve el número
+        de instancias importadas.
+        """
+        json_path = Path(json_path)
+        with self._write() as conn:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+            if only_once and done:
+                return 0
+            imported = 0
+            if json_path.exists():
+                for name, entry in ToolsStore(json_path).read_all().items():
+                    if not isinstance(entry, dict):
+                        entry = {}
+                    self._put_instance(conn, name, entry)
+                    for tool, record in (entry.get("last_run") or {}).items():
+                        conn.execute(
+                            "INSERT OR REPLACE INTO tool_status "
+                            "(instance, tool, status, started_at, finished_at, log_file, updated_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (name, tool, record.get("status") or "unknown", record.get("started_at"),
+                             record.get("finished_at"), record.get("log_file"), time.time()),
+                        )
+                    imported += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (str(json_path),),
+            )
+            return imported
@@ -1,12 +1,35 @@
 import json
-import os
 import subprocess
-from dataclasses import asdict
+import time
 from pathlib import Path
 from typing import List, Optional, Dict
 
-from src.models.tools import InstanceTarget, ToolInstallPlan
-from src.services.tools_installer_service import ToolsInstallerService
+from src.models.tools import InstallerOptions, InstanceTarget, ToolInstallPlan
+from src.services.async_orchestrator import AsyncOrchestrator, AsyncRunner, PhaseTimeout, run_sync
+from src.services.phase_timer import PhaseTimer
+from src.services.remote_pipeline import (
+    PIPELINE_REMOTE_COMMAND,
+    build_pipeline_script,
+    build_remove_marker_command,
+    marker_path_for,
+    read_trailer_from_log,
+)
+from src.services.ssh_session_pool import Runner, SshSession, SshSessionPool
+from src.services.tools_installer_service import (
+    ProgressCallback,
+    ToolsInstallerService,
+    cancelled_result,
+    exit_status,
+    failed_plan_results,
+    finish_tool_result,
+    notify_tool_started,
+    run_plans_concurrently,
+    timeout_result,
+    tool_error_result,
+    tool_result,
+    trailer_result,
+    upload_failed_result,
+)
 
 
 class ToolsUninstallerService:
@@ -23,27 +46,25 @@ class ToolsUninstallerService:
     def __init__(
         self,
         repo_root: Path,
-        tools_json_dir: Optional[Path] = None,
-        installers_dir: Optional[Path] = None,
-        logs_dir: Optional[Path] = None,
-        admin_openrc: Optional[Path] = None,
+        options: Optional[InstallerOptions] = None,
+        ssh_runner: Optional[Runner] = None,
+        async_ssh_runner: Optional[AsyncRunner] = None,
+        **settings,
     ) -> None:
-        self.repo_root = repo_root
-        self.tools_json_dir = tools_json_dir or repo_root / "tools-installer-tmp"
-        self.installers_dir = installers_dir or repo_root / "tools-installer" / "installers"
-        self.logs_dir = logs_dir or repo_root / "tools-installer" / "logs"
-        self.admin_openrc = admin_openrc or repo_root / "admin-openrc.sh"
-
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
-
+        """Mismos argumentos que ToolsInstallerService (sin golden images)."""
         # Reutilizamos funciones auxiliares del instalador
         self.installer_service = ToolsInstallerService(
-            repo_root=repo_root,
-            tools_json_dir=self.tools_json_dir,
-            installers_dir=self.installers_dir,
-            logs_dir=self.logs_dir,
-            admin_openrc=self.admin_openrc,
+            repo_root,
+            options,
+            ssh_runner=ssh_runner,
+            async_ssh_runner=async_ssh_runner,
+            **settings,
         )
+        self.repo_root = repo_root
+        self.tools_json_dir = self.installer_service.tools_json_dir
+        self.installers_dir = self.installer_service.installers_dir
+        self.logs_dir = self.installer_service.logs_dir
+        self.admin_openrc = self.installer_service.admin_openrc
 
     # ------------------------------------------------------------------
     # Utilidades internas (envoltorios sobre ToolsInstallerService)
@@ -64,8 +85,20 @@ class ToolsUninstallerService:
     def _guess_ssh_user(self, image_name: str):
         return self.installer_service._guess_ssh_user(image_name)
 
-    def _probe_ssh_user(self, ssh_key: Path, ip: str, candidates: List[str]) -> str:
-        return self.installer_service._probe_ssh_user(ssh_key, ip, candidates)
+    def _probe_ssh_user(self, pool: SshSessionPool, ip: str, candidates: List[str], parallel: bool = False) -> str:
+        return self.installer_service._probe_ssh_user(pool, ip, candidates, parallel)
+
+    def _resolve_ssh_user(
+        self,
+        pool: SshSessionPool,
+        env: Dict[str, str],
+        instance: InstanceTarget,
+        timer: Optional[PhaseTimer] = None,
+    ) -> str:
+        return self.installer_service._resolve_ssh_user(pool, env, instance, timer)
+
+    def _new_ssh_pool(self, ssh_key: Path) -> SshSessionPool:
+        return self.installer_service._new_ssh_pool(ssh_key)
 
     # ------------------------------------------------------------------
     # Carga de planes desde JSON (misma lógica que instalación)
@@ -95,6 +128,9 @@ class ToolsUninstallerService:
 
         return plans
 
+    def build_plan(self, instance_name: str, tools: List[str], hints: Optional[Dict] = None) -> ToolInstallPlan:
+        return self.installer_service.build_plan(instance_name, tools, hints)
+
     # ------------------------------------------------------------------
     # Resolución de rutas y logs
     # ------------------------------------------------------------------
@@ -113,120 +149,294 @@ class ToolsUninstallerService:
         return self.logs_dir / f"{safe_instance}_{safe_tool}_uninstall.log"
 
     # ------------------------------------------------------------------
-    # API pública
+    # Ejecución por instancia
     # ------------------------------------------------------------------
 
-    def run_all_uninstall_plans(self) -> List[Dict]:
+    def _run_uninstall_plan(
+        self,
+        plan: ToolInstallPlan,
+        env: Dict[str, str],
+        pool: SshSessionPool,
+        pipelined: bool = False,
+        on_event: Optional[ProgressCallback] = None,
+        run_timings: Optional[Dict[str, float]] = None,
+    ) -> List[Dict]:
         """
-        Ejecuta la desinstalación de todas las herramientas definidas en tools-installer-tmp.
-        Devuelve una lista de resultados por plan/herramienta.
+        Desinstala, en orden, todas las herramientas de un plan (una instancia).
+        Los resultados llevan "timings" como en ToolsInstallerService._run_plan
+        y el error de una herramienta queda en su resultado, como en
+        ToolsInstallerService._install_tools.
         """
-        env = self._load_openstack_env()
-        ssh_key = self._detect_ssh_key()
-        plans = self._load_tool_plans()
+        notify = on_event or (lambda event: None)
+        instance = plan.instance
+        instance_timer = PhaseTimer()
+        ssh_user = self._resolve_ssh_user(pool, env, instance, instance_timer)
+        session = pool.session(ssh_user, instance.ip)
 
+        uninstall = self._uninstall_tool_pipelined if pipelined else self._uninstall_tool
         results: List[Dict] = []
+        for tool in plan.tools:
+            started_at = time.time()
+            notify_tool_started(notify, instance.name, tool, self._log_path_for(instance.name, tool))
+            tool_timer = PhaseTimer()
+            try:
+                result = uninstall(session, instance, tool, tool_timer)
+            except Exception as e:
+                result = tool_error_result("uninstall", instance, tool, e)
+            results.append(finish_tool_result(
+                "uninstall", result, started_at, run_timings, instance_timer, tool_timer, notify))
+        return results
 
-        for plan in plans:
-            instance = plan.instance
-            ip = instance.ip
-            image_name = self._openstack_get_image_name(env, instance.name)
-            ssh_candidates = self._guess_ssh_user(image_name)
-            ssh_user = self._probe_ssh_user(ssh_key, ip, ssh_candidates)
+    @staticmethod
+    def _removal_check_command(tool: str) -> str:
+        """Imprime 'removed' si el binario de la herramienta ya no existe."""
+        return f"command -v {tool} >/dev/null 2>&1 || echo 'removed'"
 
-            for tool in plan.tools:
-                uninstaller_path = self._uninstaller_path_for(tool)
-                log_path = self._log_path_for(instance.name, tool)
-
-                # 1) copiar uninstaller
-                scp_cmd = [
-                    "scp",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    str(uninstaller_path),
-                    f"{ssh_user}@{ip}:/tmp/uninstall_{tool}.sh",
-                ]
+    @staticmethod
+    def _removal_status(check: subprocess.CompletedProcess) -> str:
+        """
+        En desinstalación no siempre hay validación clara: ok si el binario ya
+        no existe, validation_unclear si sigue ahí y check_failed si la propia
+        comprobación falló.
+        """
+        if check.returncode != 0:
+            return "check_failed"
+        return "ok" if "removed" in (check.stdout or "") else "validation_unclear"
+
+    def _pipeline_script(self, instance: InstanceTarget, tool: str) -> str:
+        """Desinstalador, comprobación y borrado del marcador en un único script."""
+        return build_pipeline_script(
+            self._uninstaller_path_for(tool).read_text(encoding="utf-8"),
+            [instance.ip],
+            # éxito si el binario ya no existe
+            f"! command -v {tool} >/dev/null 2>&1",
+            on_success=build_remove_marker_command(marker_path_for(tool)),
+        )
 
+    def _uninstall_tool(
+        self,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Dict:
+        timer = timer or PhaseTimer()
+        uninstaller_path = self._uninstaller_path_for(tool)
+        log_path = self._log_path_for(instance.name, tool)
+
+        # 1) copiar uninstaller
+        try:
+            with timer.phase("upload"):
+                session.upload(uninstaller_path, f"/tmp/uninstall_{tool}.sh")
+        except subprocess.CalledProcessError as e:
+            return upload_failed_result(instance, tool, e)
+
+        # 2) permisos remotos
+        with timer.phase("upload"):
+            session.run(f"chmod +x /tmp/uninstall_{tool}.sh", check=False)
+
+        # 3) ejecutar uninstaller y loguear
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            proc = session.run(
+                f"sudo bash /tmp/uninstall_{tool}.sh '{instance.ip}'",
+                check=False,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+        if proc.returncode != 0:
+            return tool_result(instance, tool, exit_status("uninstall", proc.returncode), log_file=str(log_path))
+
+        # 4) comprobar que el binario ya no existe
+        with timer.phase("validate"):
+            status = self._removal_status(session.run(self._removal_check_command(tool), check=False))
+
+        # sin marcador, una reinstalación posterior no se salta
+        if status == "ok":
+            with timer.phase("marker"):
+                session.run(
+                    build_remove_marker_command(marker_path_for(tool)),
+                    check=False,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+        return tool_result(instance, tool, status, log_file=str(log_path))
+
+    def _uninstall_tool_pipelined(
+        self,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: Optional[PhaseTimer] = None,
+    ) -> Dict:
+        """Desinstalación en un único round-trip (ver ToolsInstallerService._install_tool_pipelined)."""
+        timer = timer or PhaseTimer()
+        log_path = self._log_path_for(instance.name, tool)
+        script = self._pipeline_script(instance, tool)
+
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            session.run(
+                PIPELINE_REMOTE_COMMAND,
+                check=False,
+                input=script,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+            )
+
+        return trailer_result("uninstall", instance, tool, log_path, read_trailer_from_log(log_path))
+
+    # ------------------------------------------------------------------
+    # Motor asíncrono (engine="async", ver ToolsInstallerService)
+    # ------------------------------------------------------------------
+
+    async def _uninstall_tool_async(
+        self,
+        orch: AsyncOrchestrator,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: PhaseTimer,
+    ) -> Dict:
+        """Versión asíncrona de _uninstall_tool (mismas fases y estados)."""
+        uninstaller_path = self._uninstaller_path_for(tool)
+        log_path = self._log_path_for(instance.name, tool)
+
+        try:
+            with timer.phase("upload"):
+                await orch.upload(session, uninstaller_path, f"/tmp/uninstall_{tool}.sh")
+        except subprocess.CalledProcessError as e:
+            return upload_failed_result(instance, tool, e)
+        with timer.phase("upload"):
+            await orch.run(session, "upload", f"chmod +x /tmp/uninstall_{tool}.sh")
+
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            proc = await orch.run(
+                session, "exec", f"sudo bash /tmp/uninstall_{tool}.sh '{instance.ip}'",
+                stdout=log_file, stderr=subprocess.STDOUT,
+            )
+        if proc.returncode != 0:
+            return tool_result(instance, tool, exit_status("uninstall", proc.returncode), log_file=str(log_path))
+
+        with timer.phase("validate"):
+            status = self._removal_status(await orch.run(session, "validate", self._removal_check_command(tool)))
+
+        if status == "ok":
+            with timer.phase("marker"):
+                await orch.run(
+                    session, "marker", build_remove_marker_command(marker_path_for(tool)),
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+        return tool_result(instance, tool, status, log_file=str(log_path))
+
+    async def _uninstall_tool_pipelined_async(
+        self,
+        orch: AsyncOrchestrator,
+        session: SshSession,
+        instance: InstanceTarget,
+        tool: str,
+        timer: PhaseTimer,
+    ) -> Dict:
+        """Versión asíncrona de _uninstall_tool_pipelined."""
+        log_path = self._log_path_for(instance.name, tool)
+        script = self._pipeline_script(instance, tool)
+        with log_path.open("w", encoding="utf-8") as log_file, timer.phase("exec"):
+            await orch.run(
+                session, "exec", PIPELINE_REMOTE_COMMAND,
+                input=script, stdout=log_file, stderr=subprocess.STDOUT,
+            )
+        return trailer_result("uninstall", instance, tool, log_path, read_trailer_from_log(log_path))
+
+    async def _run_uninstall_plan_async(
+        self,
+        plan: ToolInstallPlan,
+        results: List[Dict],
+        env: Dict[str, str],
+        orch: AsyncOrchestrator,
+        pool: SshSessionPool,
+        pipelined: bool,
+        notify: ProgressCallback,
+        run_timings: Dict[str, float],
+    ) -> None:
+        """
+        Versión asíncrona de _run_uninstall_plan (timeouts de fase y errores
+        de la instancia como en ToolsInstallerService._run_plan_async).
+        """
+        instance = plan.instance
+        instance_timer = PhaseTimer()
+        uninstall = self._uninstall_tool_pipelined_async if pipelined else self._uninstall_tool_async
+        try:
+            ssh_user = await self.installer_service._resolve_ssh_user_async(orch, pool, env, instance, instance_timer)
+            session = pool.session(ssh_user, instance.ip)
+            for tool in plan.tools:
+                started_at = time.time()
+                notify_tool_started(notify, instance.name, tool, self._log_path_for(instance.name, tool))
+                tool_timer = PhaseTimer()
                 try:
-                    self._run(scp_cmd)
-                except subprocess.CalledProcessError as e:
-                    results.append({
-                        "instance": asdict(instance),
-                        "tool": tool,
-                        "status": "scp_failed",
-                        "error": e.stderr if hasattr(e, "stderr") else str(e),
-                    })
-                    continue
-
-                # 2) permisos remotos
-                chmod_cmd = [
-                    "ssh",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    f"{ssh_user}@{ip}",
-                    "chmod +x /tmp/uninstall_{tool}.sh".format(tool=tool),
-                ]
-                try:
-                    self._run(chmod_cmd)
-                except subprocess.CalledProcessError:
-                    pass
-
-                # 3) ejecutar uninstaller y loguear
-                ssh_uninstall_cmd = [
-                    "ssh",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    f"{ssh_user}@{ip}",
-                    f"sudo bash /tmp/uninstall_{tool}.sh '{ip}'",
-                ]
-                with log_path.open("w", encoding="utf-8") as log_file:
-                    proc = subprocess.run(
-                        ssh_uninstall_cmd,
-                        stdout=log_file,
-                        stderr=subprocess.STDOUT,
-                        text=True,
-                    )
-
-                if proc.returncode != 0:
-                    results.append({
-                        "instance": asdict(instance),
-                        "tool": tool,
-                        "status": "uninstall_failed",
-                        "log_file": str(log_path),
-                    })
-                    continue
-
-                # En desinstalación no siempre hay validación clara.
-                # Comprobamos, por ejemplo, que el binario ya no existe.
-                check_cmd = [
-                    "ssh",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-i", str(ssh_key),
-                    f"{ssh_user}@{ip}",
-                    f"command -v {tool} >/dev/null 2>&1 || echo 'removed'",
-                ]
-                try:
-                    out = self._run(check_cmd)
-                    if "removed" in out:
-                        results.append({
-                            "instance": asdict(instance),
-                            "tool": tool,
-                            "status": "ok",
-                            "log_file": str(log_path),
-                        })
-                    else:
-                        results.append({
-                            "instance": asdict(instance),
-                            "tool": tool,
-                            "status": "validation_unclear",
-                            "log_file": str(log_path),
-                        })
-                except subprocess.CalledProcessError:
-                    results.append({
-                        "instance": asdict(instance),
-                        "tool": tool,
-                        "status": "check_failed",
-                        "log_file": str(log_path),
-                    })
+                    result = await uninstall(orch, session, instance, tool, tool_timer)
+                except PhaseTimeout as e:
+                    result = timeout_result(instance, tool, e)
+                except Exception as e:
+                    result = tool_error_result("uninstall", instance, tool, e)
+                results.append(finish_tool_result(
+                    "uninstall", result, started_at, run_timings, instance_timer, tool_timer, notify))
+        except Exception as e:
+            results.extend(failed_plan_results(plan, e, "uninstall", run_timings, notify, results, instance_timer))
 
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def run_all_uninstall_plans(
+        self,
+        max_workers: int = 1,
+        pipelined: bool = False,
+        plans: Optional[List[ToolInstallPlan]] = None,
+        on_event: Optional[ProgressCallback] = None,
+        engine: str = "threads",
+        deadline: Optional[float] = None,
+    ) -> List[Dict]:
+        """
+        Ejecuta la desinstalación de todas las herramientas definidas en tools-installer-tmp.
+        Devuelve una lista de resultados por plan/herramienta.
+
+        max_workers funciona igual que en ToolsInstallerService.run_all_plans:
+        instancias en paralelo, herramientas de cada instancia en orden.
+        Cada instancia usa una única sesión SSH durante toda la ejecución y,
+        con pipelined=True, un solo round-trip por herramienta. plans, on_event
+        y los tiempos por fase funcionan como en ToolsInstallerService.run_all_plans,
+        igual que engine="async", deadline y los fallos de una instancia.
+        """
+        if engine not in ("threads", "async"):
+            raise ValueError(f"motor desconocido: {engine} (threads o async)")
+        run_timer = PhaseTimer()
+        with run_timer.phase("env_load"):
+            env = self._load_openstack_env()
+        with run_timer.phase("key_detection"):
+            ssh_key = self._detect_ssh_key()
+        with run_timer.phase("plan_load"):
+            if plans is None:
+                plans = self._load_tool_plans()
+
+        with self._new_ssh_pool(ssh_key) as pool:
+            if engine == "async":
+                orch = self.installer_service._new_orchestrator()
+                notify = on_event or (lambda event: None)
+                try:
+                    results = run_sync(orch.run_plans(
+                        plans,
+                        lambda plan, out: self._run_uninstall_plan_async(
+                            plan, out, env, orch, pool, pipelined, notify, run_timer.as_dict()),
+                        lambda plan, tool: cancelled_result(plan, tool, "uninstall", run_timer.as_dict(), notify),
+                        deadline,
+                    ))
+                finally:
+                    self.installer_service.metadata.flush()
+            else:
+                results = run_plans_concurrently(
+                    plans,
+                    lambda plan: self._run_uninstall_plan(plan, env, pool, pipelined, on_event, run_timer.as_dict()),
+                    max_workers,
+                    lambda plan, exc: failed_plan_results(
+                        plan, exc, "uninstall", run_timer.as_dict(), on_event or (lambda event: None)),
+                )
+        self.installer_service.timings_log.append("uninstall", results)
         return results
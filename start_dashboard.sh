@@ -3,6 +3,8 @@ set -euo pipefail
 
 PORT=5001
 TIMEOUT=20000
+# threaded workers: long-lived SSE install streams only hold one thread each
+THREADS=8
 APP_PATH="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd -P)"
 
 echo "============================================="
@@ -33,4 +35,4 @@ fi
 
 cd "$APP_PATH" || exit 1
 
-exec gunicorn -w 4 -b "localhost:$PORT" --timeout "$TIMEOUT" app:app
+exec gunicorn -c "$APP_PATH/gunicorn.conf.py" -w 4 --worker-class gthread --threads "$THREADS" -b "localhost:$PORT" --timeout "$TIMEOUT" app:app
@@ -8,12 +8,15 @@ export const ENDPOINTS = {
   DESTROY_SCENARIO: "/api/destroy_scenario",
 
   OPENSTACK_INSTANCES: "/api/openstack/instances",
+  DASHBOARD_SNAPSHOT:  "/api/dashboard/snapshot",
 
   ADD_TOOL:        "/api/add_tool_to_instance",
   READ_TOOLS_CFG:  "/api/read_tools_configs",
   INSTALL_TOOLS:   "/api/install_tools",
   GET_TOOLS_FOR_INSTANCE: "/api/get_tools_for_instance",
   UNINSTALL_TOOL:  "/api/uninstall_tool_from_instance",
+  BULK_ASSIGN_TOOLS:    "/api/bulk/assign_tools",
+  BULK_UNINSTALL_TOOLS: "/api/bulk/uninstall_tools",
 
   CONSOLE_URL: "/api/console_url",
 
@@ -3,8 +3,13 @@
  * Basado en index-tools.js original
  */
 
+import { getDashboardSnapshot } from '../services/tools_service.js';
+
 let cy = null;
 let selectedInstance = null;
+// Último snapshot de /api/dashboard/snapshot y su ETag (If-None-Match -> 304)
+let dashboardSnapshot = null;
+let dashboardEtag = null;
 
 document.addEventListener("DOMContentLoaded", () => {
     loadExistingScenario();
@@ -45,11 +50,24 @@ function ensureCy() {
     return true;
 }
 
+// Instancias + herramientas asignadas/instaladas + última ejecución en una sola petición
+async function fetchDashboardSnapshot() {
+    const res = await getDashboardSnapshot(dashboardSnapshot ? dashboardEtag : null);
+    if (res.status === 304 && dashboardSnapshot) return dashboardSnapshot;
+    if (!res.ok || !res.data) throw new Error(`HTTP ${res.status}`);
+    dashboardSnapshot = res.data;
+    dashboardEtag = res.etag;
+    return dashboardSnapshot;
+}
+
+function snapshotEntry(instanceName) {
+    const instances = (dashboardSnapshot && dashboardSnapshot.instances) || [];
+    return instances.find(vm => vm.name === instanceName) || null;
+}
+
 async function loadExistingScenario() {
     try {
-        const res = await fetch("/api/openstack/instances");
-        const raw = await res.text();
-        let data = JSON.parse(raw);
+        const data = await fetchDashboardSnapshot();
 
         if (!data.instances || data.instances.length === 0) {
             showNoScenario();
@@ -67,7 +85,9 @@ async function loadExistingScenario() {
                 image: vm.image_name,
                 flavor: vm.flavor_name,
                 status: vm.status,
-                tools: [],
+                tools: vm.tools || [],
+                installed: vm.installed || [],
+                last_run: vm.last_run || {},
                 position: { x: 200 + i * 200, y: 150 }
             })),
             edges: []
@@ -127,10 +147,12 @@ async function selectInstanceFromScenario(node) {
 
     let tools = [];
     try {
-        const res = await fetch(`/api/get_tools_for_instance?instance=${instanceName}`);
-        const data = await res.json();
-        tools = data.tools || [];
+        await fetchDashboardSnapshot();
+        const entry = snapshotEntry(instanceName);
+        tools = (entry && entry.tools) || [];
         node.tools = tools;
+        node.installed = (entry && entry.installed) || [];
+        node.last_run = (entry && entry.last_run) || {};
     } catch (err) {
         console.log("Error:", err);
     }
@@ -183,23 +205,23 @@ async function addTool() {
 
 async function loadToolsConfig() {
     const terminal = document.getElementById("tools-terminal");
-    terminal.innerHTML += "🔍 Leyendo archivos...\n";
+    appendToTerminal(terminal, "🔍 Leyendo archivos...\n");
     try {
         const res = await fetch("/api/read_tools_configs");
         const data = await res.json();
-        terminal.innerHTML += "📂 Detectados:\n";
+        appendToTerminal(terminal, "📂 Detectados:\n");
         data.files.forEach(file => {
-            terminal.innerHTML += `➡ ${file.instance}: ${JSON.stringify(file.tools)}\n`;
+            appendToTerminal(terminal, `➡ ${file.instance}: ${JSON.stringify(file.tools)}\n`);
         });
-        terminal.innerHTML += "✅ Lectura completada.\n";
+        appendToTerminal(terminal, "✅ Lectura completada.\n");
     } catch (err) {
-        terminal.innerHTML += `❌ Error: ${err}\n`;
+        appendToTerminal(terminal, `❌ Error: ${err}\n`);
     }
 }
 
 async function installTools() {
     const terminal = document.getElementById("tools-terminal");
-    terminal.innerHTML += "\n🚀 Iniciando...\n";
+    appendToTerminal(terminal, "\n🚀 Iniciando...\n");
     // Determine which tools actually need installation (idempotency)
     const select = document.getElementById('available-tools');
     const selectedTool = select ? select.value : null;
@@ -213,7 +235,7 @@ async function installTools() {
         toInstall = backendTools.filter(t => !(selectedInstance.installed && selectedInstance.installed.includes(t)));
     }
     if (toInstall.length === 0) {
-        terminal.innerHTML += "✔ No hay herramientas nuevas para instalar en la instancia.\n";
+        appendToTerminal(terminal, "✔ No hay herramientas nuevas para instalar en la instancia.\n");
         return;
     }
     freezeUI();
@@ -221,33 +243,61 @@ async function installTools() {
         const payload = { instance: selectedInstance.name, tools: toInstall };
         const res = await fetch("/api/install_tools", { method: "POST", headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
         if (!res.ok) {
-            terminal.innerHTML += `❌ Error: ${res.status}\n`;
+            appendToTerminal(terminal, `❌ Error: ${res.status}\n`);
             unfreezeUI();
             return;
         }
         const reader = res.body.getReader();
         const decoder = new TextDecoder("utf-8");
+        let buffer = "";
+        const installedNow = [];
         while (true) {
             const { value, done } = await reader.read();
             if (done) break;
-            const text = decoder.decode(value, { stream: true });
-            text.split("\n").forEach(line => {
-                if (line.startsWith("data:")) {
-                    terminal.innerHTML += line.replace("data: ", "") + "\n";
-                }
+            buffer += decoder.decode(value, { stream: true });
+            // SSE messages are separated by a blank line; keep the partial tail
+            const messages = buffer.split("\n\n");
+            buffer = messages.pop();
+            messages.forEach(msg => {
+                const dataLine = msg.split("\n").find(line => line.startsWith("data:"));
+                if (!dataLine) return;
+                const evt = JSON.parse(dataLine.slice(5));
+                appendToTerminal(terminal, formatInstallEvent(evt));
+                if (evt.event === "tool_finished" && isInstalledStatus(evt.result.status)) installedNow.push(evt.tool);
             });
+            terminal.scrollTop = terminal.scrollHeight;
         }
-        terminal.innerHTML += "🎉 Finalizado.\n";
+        appendToTerminal(terminal, "🎉 Finalizado.\n");
         // Update local view: mark installed tools as present
-        selectedInstance.installed = selectedInstance.installed ? selectedInstance.installed.concat(toInstall) : toInstall.slice();
+        selectedInstance.installed = selectedInstance.installed ? selectedInstance.installed.concat(installedNow) : installedNow;
         // Sync backend info
         await updateToolsBackend(selectedInstance);
     } catch (err) {
-        terminal.innerHTML += `❌ Error: ${err}\n`;
+        appendToTerminal(terminal, `❌ Error: ${err}\n`);
     }
     unfreezeUI();
 }
 
+function appendToTerminal(terminal, text) {
+    // Always a text node, never markup: the lines carry raw remote installer
+    // output, errors and instance/tool names.
+    terminal.appendChild(document.createTextNode(text));
+}
+
+function isInstalledStatus(status) {
+    return status === "ok" || status === "already_installed";
+}
+
+function formatInstallEvent(evt) {
+    switch (evt.event) {
+        case "tool_started": return `▶ ${evt.instance}: instalando ${evt.tool}...\n`;
+        case "log": return `  ${evt.line}\n`;
+        case "tool_finished": return `${isInstalledStatus(evt.result.status) ? "✅" : "❌"} ${evt.instance}: ${evt.tool} → ${evt.result.status}\n`;
+        case "error": return `❌ Error: ${evt.error}\n`;
+        default: return "";
+    }
+}
+
 async function removeToolFromScenario(tool) {
     if (!selectedInstance) return;
     selectedInstance.tools = selectedInstance.tools.filter(t => t !== tool);
@@ -260,19 +310,19 @@ async function removeToolFromScenario(tool) {
 async function uninstallTool(tool) {
     if (!selectedInstance) return;
     const terminal = document.getElementById("tools-terminal");
-    terminal.innerHTML += `\n⛔ Desinstalando ${tool}...\n`;
+    appendToTerminal(terminal, `\n⛔ Desinstalando ${tool}...\n`);
     try {
         const payload = { instance: selectedInstance.name, ip_private: selectedInstance.ip_private, ip_floating: selectedInstance.ip_floating, tool: tool };
         const res = await fetch("/api/uninstall_tool_from_instance", { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(payload) });
         const data = await res.json();
-        terminal.innerHTML += `➡ ${JSON.stringify(data)}\n`;
+        appendToTerminal(terminal, `➡ ${JSON.stringify(data)}\n`);
         if (data.status === "success" && data.exit_code === 0) {
             selectedInstance.tools = selectedInstance.tools.filter(t => t !== tool);
             renderToolsList(selectedInstance.tools);
             updateToolsBackend(selectedInstance);
         }
     } catch (err) {
-        terminal.innerHTML += `❌ Error: ${err}\n`;
+        appendToTerminal(terminal, `❌ Error: ${err}\n`);
     }
 }
 
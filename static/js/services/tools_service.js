@@ -7,6 +7,13 @@ export async function getOpenstackInstances() {
   return { ok: res.ok, status: res.status, data };
 }
 
+export async function getDashboardSnapshot(etag = null) {
+  const headers = etag ? { "If-None-Match": etag } : {};
+  const res = await fetch(API_BASE + ENDPOINTS.DASHBOARD_SNAPSHOT, { headers, cache: "no-store" });
+  const data = res.status === 304 ? null : await res.json().catch(() => ({ instances: [] }));
+  return { ok: res.ok || res.status === 304, status: res.status, etag: res.headers.get("ETag"), data };
+}
+
 export async function addToolConfig(payload) {
   const res = await fetch(API_BASE + ENDPOINTS.ADD_TOOL, {
     method: "POST",
@@ -62,3 +69,24 @@ export async function uninstallToolFromInstance(payload) {
   const data = await res.json().catch(() => ({}));
   return { ok: res.ok, status: res.status, data };
 }
+
+// operations: [{ instance, tools: [...] }]; options: { mode, install | run, options }
+export async function bulkAssignTools(operations, options = {}) {
+  const res = await fetch(API_BASE + ENDPOINTS.BULK_ASSIGN_TOOLS, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ operations, ...options })
+  });
+  const data = await res.json().catch(() => ({}));
+  return { ok: res.ok, status: res.status, data };
+}
+
+export async function bulkUninstallTools(operations, options = {}) {
+  const res = await fetch(API_BASE + ENDPOINTS.BULK_UNINSTALL_TOOLS, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ operations, ...options })
+  });
+  const data = await res.json().catch(() => ({}));
+  return { ok: res.ok, status: res.status, data };
+}
@@ -0,0 +1,81 @@
+"""
+Shared helpers for the benchmark scripts: latency statistics, environment
+metadata and JSON reports under state/benchmarks/ that compare_reports.py
+can diff across commits.
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_REPORT_DIR = REPO_ROOT / "state" / "benchmarks"
+
+
+def percentile_ms(sorted_latencies: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted latencies (seconds), in milliseconds."""
+    if not sorted_latencies:
+        return 0.0
+    index = min(len(sorted_latencies) - 1, max(0, int(round(q / 100.0 * len(sorted_latencies))) - 1))
+    return round(sorted_latencies[index] * 1000, 3)
+
+
+def latency_stats(latencies: List[float], elapsed: float, unit: str = "requests") -> Dict:
+    """Throughput and p50/p99 for a batch of operations run in elapsed seconds."""
+    ordered = sorted(latencies)
+    return {
+        unit: len(ordered),
+        "elapsed_s": round(elapsed, 3),
+        f"{unit}_per_s": round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": percentile_ms(ordered, 50),
+        "p99_ms": percentile_ms(ordered, 99),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def new_report(benchmark: str, params: Dict) -> Dict:
+    return {
+        "benchmark": benchmark,
+        "git_commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": environment(),
+        "params": params,
+        "results": {},
+    }
+
+
+def write_report(report: Dict, output: Optional[str]) -> Optional[Path]:
+    """
+    Print the report and, if output is given, save it there. output may be a
+    file or a directory (then <benchmark>_<commit>_<timestamp>.json inside it).
+    """
+    print(json.dumps(report, indent=2))
+    if not output:
+        return None
+    path = Path(output)
+    if path.suffix != ".json":
+        stamp = report["created_at"].replace(":", "").replace("-", "")
+        path = path / f"{report['benchmark']}_{report.get('git_commit') or 'nogit'}_{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return path
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Load benchmark of the dashboard routes in app.py.
+
+For each store size (instances in tools_store.json and summary.json) the
+routes are driven from concurrent client threads through the Flask test
+client, and throughput plus p50/p99 latency are recorded per route:
+
+  get_tools      GET  /api/get_tools_for_instance
+  add_tool       POST /api/add_tool_to_instance
+  mixed          80% get_tools / 20% add_tool
+  snapshot       GET  /api/dashboard/snapshot (no If-None-Match)
+  snapshot_304   GET  /api/dashboard/snapshot with the current ETag
+  bulk_assign    POST /api/bulk/assign_tools (50 operations per request)
+
+Results are keyed "<route>@<size>" so compare_reports.py can diff reports
+from different commits.
+
+Usage:
+  python3 tests/benchmarks/bench_dashboard.py [--sizes 10,100,1000,10000]
+          [--requests N] [--clients N] [--backend json|sqlite] [--output DIR|FILE]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import app as dashboard  # noqa: E402
+from bench_common import latency_stats, new_report, write_report  # noqa: E402
+from src.services.dashboard_snapshot import DashboardSnapshot  # noqa: E402
+from src.services.tools_store import open_tools_store  # noqa: E402
+
+TOOLS = ["suricata", "wazuh", "snort", "caldera", "nmap"]
+
+# request(http, rnd, size) -> response
+RequestFunction = Callable[[object, random.Random, int], object]
+
+
+def seed_state(state_dir: Path, instances: int) -> None:
+    rnd = random.Random(instances)
+    store = {f"vm-{i}": {"tools": rnd.sample(TOOLS, 2), "installed": []} for i in range(instances)}
+    (state_dir / "tools_store.json").write_text(json.dumps(store))
+    summary = [
+        {
+            "id": f"vm-{i}",
+            "name": f"vm-{i}",
+            "server_id": f"00000000-0000-0000-0000-{i:012d}",
+            "floating_ip": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "ssh_user": "ubuntu",
+            "port_name": f"vm_{i}_-port",
+            "created_at": "2025-12-06T17:30:00Z",
+        }
+        for i in range(instances)
+    ]
+    (state_dir / "summary.json").write_text(json.dumps(summary))
+
+
+def get_tools(http, rnd, size):
+    return http.get(f"/api/get_tools_for_instance?instance=vm-{rnd.randrange(size)}")
+
+
+def add_tool(http, rnd, size):
+    return http.post("/api/add_tool_to_instance",
+                     json={"instance": f"vm-{rnd.randrange(size)}", "tools": rnd.sample(TOOLS, 3)})
+
+
+def mixed(http, rnd, size):
+    return add_tool(http, rnd, size) if rnd.random() < 0.2 else get_tools(http, rnd, size)
+
+
+def snapshot(http, rnd, size):
+    return http.get("/api/dashboard/snapshot")
+
+
+def snapshot_304(http, rnd, size):
+    return http.get("/api/dashboard/snapshot", headers={"If-None-Match": dashboard.dashboard_snapshot.etag()})
+
+
+def bulk_assign(http, rnd, size):
+    operations = [{"instance": f"vm-{rnd.randrange(size)}", "tools": rnd.sample(TOOLS, 2)} for _ in range(50)]
+    return http.post("/api/bulk/assign_tools", json={"operations": operations})
+
+
+ROUTES: Dict[str, RequestFunction] = {
+    "get_tools": get_tools,
+    "add_tool": add_tool,
+    "mixed": mixed,
+    "snapshot": snapshot,
+    "snapshot_304": snapshot_304,
+    "bulk_assign": bulk_assign,
+}
+
+
+def run_route(request: RequestFunction, size: int, total_requests: int, clients: int) -> Dict:
+    per_client = max(1, total_requests // clients)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client(seed: int) -> None:
+        rnd = random.Random(seed)
+        http = dashboard.app.test_client()
+        local = []
+        for _ in range(per_client):
+            start = time.perf_counter()
+            resp = request(http, rnd, size)
+            local.append(time.perf_counter() - start)
+            if resp.status_code not in (200, 304):
+                with lock:
+                    errors.append(resp.status_code)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = latency_stats(latencies, time.perf_counter() - start)
+    stats["errors"] = len(errors)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma-separated store sizes")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per route and size")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--routes", default=",".join(ROUTES), help="comma-separated subset of routes")
+    parser.add_argument("--backend", default="json", choices=("json", "sqlite"))
+    parser.add_argument("--output", help="report file or directory (e.g. state/benchmarks)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    routes = [r for r in args.routes.split(",") if r]
+    report = new_report("dashboard_routes", {
+        "sizes": sizes, "requests": args.requests, "clients": args.clients,
+        "routes": routes, "backend": args.backend,
+    })
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            state_dir = Path(tmp)
+            seed_state(state_dir, size)
+            dashboard.tools_store = open_tools_store(state_dir, backend=args.backend)
+            dashboard.dashboard_snapshot = DashboardSnapshot(state_dir / "summary.json", dashboard.tools_store)
+            for route in routes:
+                report["results"][f"{route}@{size}"] = run_route(ROUTES[route], size, args.requests, args.clients)
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the dashboard tools store under mixed read/write load.
+
+Drives the real Flask routes (/api/get_tools_for_instance and
+/api/add_tool_to_instance) from concurrent client threads against a
+temporary store and prints requests/sec as JSON. With --processes it also
+runs concurrent writers in separate processes and checks that no update
+was lost.
+
+Usage:
+  python3 tests/benchmarks/bench_tools_store.py [--instances N] [--requests N]
+          [--clients N] [--write-ratio R] [--processes N]
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+import app as dashboard  # noqa: E402
+from src.services.tools_store import ToolsStore  # noqa: E402
+
+TOOLS = ["suricata", "wazuh", "snort", "caldera", "nmap"]
+
+
+def seed_store(path: Path, instances: int) -> None:
+    data = {f"vm-{i}": {"tools": random.sample(TOOLS, 2), "installed": []} for i in range(instances)}
+    path.write_text(json.dumps(data))
+
+
+def run_http_load(store_path: Path, instances: int, total_requests: int, clients: int, write_ratio: float) -> dict:
+    dashboard.tools_store = ToolsStore(store_path)
+    per_client = total_requests // clients
+    latencies = []
+    lock = threading.Lock()
+
+    def client(seed: int) -> None:
+        rnd = random.Random(seed)
+        http = dashboard.app.test_client()
+        local = []
+        for _ in range(per_client):
+            instance = f"vm-{rnd.randrange(instances)}"
+            start = time.perf_counter()
+            if rnd.random() < write_ratio:
+                resp = http.post("/api/add_tool_to_instance", json={"instance": instance, "tools": rnd.sample(TOOLS, 3)})
+            else:
+                resp = http.get(f"/api/get_tools_for_instance?instance={instance}")
+            local.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.status_code
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def _writer(store_path: str, worker: int, updates: int) -> None:
+    store = ToolsStore(Path(store_path), compact_every=50)
+    for i in range(updates):
+        store.update_instance("shared", lambda e, tag=f"w{worker}-{i}": e.setdefault("tools", []).append(tag))
+
+
+def check_lost_updates(store_path: Path, processes: int, updates: int) -> dict:
+    procs = [multiprocessing.Process(target=_writer, args=(str(store_path), w, updates)) for w in range(processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    final = ToolsStore(store_path).get_instance("shared").get("tools", [])
+    expected = processes * updates
+    return {"expected": expected, "found": len(final), "lost_updates": expected - len(final)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--processes", type=int, default=0, help="concurrent writer processes for the lost-update check")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = Path(tmp) / "tools_store.json"
+        seed_store(store_path, args.instances)
+        report = {
+            "benchmark": "tools_store_mixed_load",
+            "instances": args.instances,
+            "clients": args.clients,
+            "write_ratio": args.write_ratio,
+            "http": run_http_load(store_path, args.instances, args.requests, args.clients, args.write_ratio),
+        }
+        if args.processes:
+            report["lost_update_check"] = check_lost_updates(Path(tmp) / "shared_store.json", args.processes, 100)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare benchmark reports written by bench_dashboard.py / bench_installer.py.
+
+Each argument is a report file or a directory (then the newest report of
+every benchmark in it is used). Entries present in both baseline and
+candidate are compared metric by metric:
+
+  *_per_s           regression if it drops by more than --threshold
+  p50_ms / p99_ms   regression if it grows by more than --threshold
+
+Exit status is 1 when any regression is found, so the script can gate CI.
+
+Usage:
+  python3 tests/benchmarks/compare_reports.py BASELINE CANDIDATE [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+LATENCY_METRICS = ("p50_ms", "p99_ms")
+
+
+def load_reports(path: Path) -> Dict[str, Dict]:
+    """Reports by benchmark name; for a directory, the newest one of each benchmark."""
+    files = [path] if path.is_file() else sorted(path.glob("*.json"))
+    reports: Dict[str, Dict] = {}
+    for file in files:
+        try:
+            report = json.loads(file.read_text())
+        except ValueError:
+            continue
+        name = report.get("benchmark")
+        if name and (name not in reports or report.get("created_at", "") >= reports[name].get("created_at", "")):
+            reports[name] = report
+    return reports
+
+
+def change_pct(old: float, new: float) -> Optional[float]:
+    if not old:
+        return None
+    return (new - old) / old * 100.0
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> List[Dict]:
+    rows = []
+    for key, old in sorted(baseline.get("results", {}).items()):
+        new = candidate.get("results", {}).get(key)
+        if new is None:
+            continue
+        for metric, old_value in old.items():
+            if not isinstance(old_value, (int, float)) or metric not in new:
+                continue
+            higher_is_better = metric.endswith("_per_s")
+            if not higher_is_better and metric not in LATENCY_METRICS:
+                continue
+            pct = change_pct(old_value, new[metric])
+            if pct is None:
+                continue
+            regressed = -pct > threshold if higher_is_better else pct > threshold
+            rows.append({
+                "entry": key, "metric": metric, "baseline": old_value,
+                "candidate": new[metric], "change_pct": round(pct, 1), "regression": regressed,
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    parser.add_argument("--json", action="store_true", help="print the comparison as JSON")
+    args = parser.parse_args()
+
+    baseline = load_reports(args.baseline)
+    candidate = load_reports(args.candidate)
+    comparison = {}
+    for name in sorted(set(baseline) & set(candidate)):
+        comparison[name] = {
+            "baseline_commit": baseline[name].get("git_commit"),
+            "candidate_commit": candidate[name].get("git_commit"),
+            "rows": compare(baseline[name], candidate[name], args.threshold),
+        }
+
+    if not comparison:
+        print("[ERROR] No benchmark in common between both reports", file=sys.stderr)
+        sys.exit(2)
+
+    regressions = sum(r["regression"] for c in comparison.values() for r in c["rows"])
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        for name, c in comparison.items():
+            print(f"== {name}: {c['baseline_commit']} -> {c['candidate_commit']}")
+            for r in c["rows"]:
+                flag = "  REGRESSION" if r["regression"] else ""
+                print(f"  {r['entry']:<28} {r['metric']:<16} {r['baseline']:>12} -> {r['candidate']:>12} "
+                      f"({r['change_pct']:+.1f}%){flag}")
+    print(f"[INFO] {regressions} regression(s) (threshold {args.threshold}%)", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
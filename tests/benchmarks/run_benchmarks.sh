@@ -0,0 +1,63 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd -P)"
+REPO_ROOT="$(cd "$SCRIPT_DIR/../.." && pwd -P)"
+OUTPUT_DIR="$REPO_ROOT/state/benchmarks"
+
+# Defaults
+QUICK=0
+BASELINE=""
+THRESHOLD=10
+PYTHON="${PYTHON:-python3}"
+
+usage() {
+    cat <<EOF
+Usage: $(basename "$0") [OPTIONS]
+
+Run the dashboard and installer benchmarks and store their JSON reports.
+
+Options:
+  -h, --help          Show this help and exit
+  --quick             Small sizes and short runs (smoke check, not for comparisons)
+  --output DIR        Report directory (default: state/benchmarks)
+  --baseline PATH     Compare the new reports against PATH (report file or directory)
+  --threshold PCT     Allowed change before flagging a regression (default: $THRESHOLD)
+
+Examples:
+  bash tests/benchmarks/run_benchmarks.sh
+  git stash; bash tests/benchmarks/run_benchmarks.sh --output /tmp/base; git stash pop
+  bash tests/benchmarks/run_benchmarks.sh --output /tmp/new --baseline /tmp/base
+EOF
+}
+
+while [[ $# -gt 0 ]]; do
+    case "$1" in
+        -h|--help) usage; exit 0 ;;
+        --quick) QUICK=1; shift ;;
+        --output) OUTPUT_DIR="$2"; shift 2 ;;
+        --baseline) BASELINE="$2"; shift 2 ;;
+        --threshold) THRESHOLD="$2"; shift 2 ;;
+        *) echo "[ERROR] Unknown option: $1" >&2; usage; exit 1 ;;
+    esac
+done
+
+mkdir -p "$OUTPUT_DIR"
+
+if [[ "$QUICK" -eq 1 ]]; then
+    DASHBOARD_ARGS=(--sizes 10,100 --requests 200 --clients 4)
+    INSTALLER_ARGS=(--instances 1,10 --rtt-ms 2 --connect-ms 5 --exec-ms 10 --api-ms 2)
+else
+    DASHBOARD_ARGS=()
+    INSTALLER_ARGS=()
+fi
+
+cd "$REPO_ROOT"
+echo "[INFO] Dashboard routes -> $OUTPUT_DIR" >&2
+"$PYTHON" tests/benchmarks/bench_dashboard.py "${DASHBOARD_ARGS[@]}" --output "$OUTPUT_DIR" >/dev/null
+echo "[INFO] Installer orchestration -> $OUTPUT_DIR" >&2
+"$PYTHON" tests/benchmarks/bench_installer.py "${INSTALLER_ARGS[@]}" --output "$OUTPUT_DIR" >/dev/null
+
+if [[ -n "$BASELINE" ]]; then
+    "$PYTHON" tests/benchmarks/compare_reports.py "$BASELINE" "$OUTPUT_DIR" --threshold "$THRESHOLD"
+fi
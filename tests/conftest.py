@@ -0,0 +1,38 @@
+"""
+Shared pytest setup: make the repository root importable (src.*) and
+provide helpers for the unit tests under tests/.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture
+def dashboard(tmp_path, monkeypatch):
+    """
+    The Flask app module (app.py) with its tools store, dashboard snapshot
+    and job queue moved under tmp_path, so tests never touch the repository's
+    state/. The queue is not started: submitted jobs stay queued.
+    """
+    import app as dashboard_app
+    from src.services.dashboard_snapshot import DashboardSnapshot
+    from src.services.job_queue import JobQueue
+    from src.services.tools_store import open_tools_store
+
+    store = open_tools_store(tmp_path, backend="json")
+    monkeypatch.setattr(dashboard_app, "tools_store", store)
+    monkeypatch.setitem(dashboard_app.app.config, "TOOLS_STORE", store)
+    monkeypatch.setattr(dashboard_app, "dashboard_snapshot", DashboardSnapshot(tmp_path / "summary.json", store))
+    queue = JobQueue(
+        tmp_path / "jobs.json",
+        executor=lambda job, on_event: [],
+        instances_for=lambda kind, targets: sorted({t.instance for t in targets or []}),
+    )
+    monkeypatch.setattr(dashboard_app, "job_queue", queue)
+    monkeypatch.setitem(dashboard_app.app.config, "JOB_QUEUE", queue)
+    return dashboard_app
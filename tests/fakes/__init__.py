@@ -0,0 +1 @@
+"""Test doubles shared by the pytest suite and the benchmarks."""
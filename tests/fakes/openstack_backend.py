@@ -0,0 +1,164 @@
+"""
+In-memory OpenStack backend for tests and benchmarks (no cloud needed).
+"""
+import itertools
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from src.services.openstack_backend import OpenStackBackend, ResourceConflict, ResourceNotFound
+
+
+class InMemoryOpenStackBackend(OpenStackBackend):
+    """
+    In-memory OpenStackBackend: servers go from BUILD to ACTIVE after
+    boot_seconds (or to ERROR if their name is in fail_servers) and vanish
+    delete_seconds after their deletion is requested; until then their
+    ports cannot be deleted (409). calls records every operation.
+    """
+
+    def __init__(
+        self,
+        boot_seconds: float = 0.0,
+        fail_servers: Iterable[str] = (),
+        api_latency: float = 0.0,
+        delete_seconds: float = 0.0,
+        snapshot_seconds: float = 0.0,
+        snapshot_size: int = 2 * 1024 ** 3,
+    ) -> None:
+        self.boot_seconds = boot_seconds
+        self.snapshot_seconds = snapshot_seconds
+        self.snapshot_size = snapshot_size
+        self.delete_seconds = delete_seconds
+        self.fail_servers = set(fail_servers)
+        self.api_latency = api_latency
+        self.calls: List[str] = []
+        self.ports: Dict[str, Dict] = {}
+        self.servers: Dict[str, Dict] = {}
+        self.floating_ips: Dict[str, Optional[str]] = {}
+        self.images: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._fip_counter = itertools.count(10)
+
+    def _call(self, name: str) -> None:
+        if self.api_latency:
+            time.sleep(self.api_latency)
+        with self._lock:
+            self.calls.append(name)
+
+    def create_port(self, name: str, network: str, security_group: str) -> str:
+        self._call("port_create")
+        port_id = str(uuid.uuid4())
+        with self._lock:
+            self.ports[port_id] = {"name": name, "network": network, "security_group": security_group}
+        return port_id
+
+    def create_server(self, name: str, image: str, flavor: str, key_name: str, port_id: str) -> str:
+        self._call("server_create")
+        server_id = str(uuid.uuid4())
+        with self._lock:
+            self.servers[server_id] = {
+                "name": name,
+                "image": image,
+                "flavor": flavor,
+                "port_id": port_id,
+                "created": time.monotonic(),
+            }
+        return server_id
+
+    def _reap(self) -> None:
+        """Drop the servers whose deletion has finished (lock held)."""
+        now = time.monotonic()
+        for server_id in [sid for sid, s in self.servers.items()
+                          if s.get("deleted_at") is not None and now - s["deleted_at"] >= self.delete_seconds]:
+            del self.servers[server_id]
+
+    def _status_of(self, server: Dict) -> str:
+        if server.get("deleted_at") is not None:
+            return "DELETING"
+        if server["name"] in self.fail_servers:
+            return "ERROR"
+        if time.monotonic() - server["created"] >= self.boot_seconds:
+            return "ACTIVE"
+        return "BUILD"
+
+    def list_servers(self) -> List[Dict[str, str]]:
+        self._call("server_list")
+        with self._lock:
+            self._reap()
+            return [
+                {"id": server_id, "name": server["name"], "status": self._status_of(server)}
+                for server_id, server in self.servers.items()
+            ]
+
+    def create_floating_ip(self, external_network: str) -> str:
+        self._call("floating_ip_create")
+        n = next(self._fip_counter)
+        address = f"203.0.{n // 250}.{n % 250 + 1}"
+        with self._lock:
+            self.floating_ips[address] = None
+        return address
+
+    def add_floating_ip(self, server_id: str, address: str) -> None:
+        self._call("floating_ip_add")
+        with self._lock:
+            self.floating_ips[address] = server_id
+
+    def delete_floating_ip(self, address: str) -> None:
+        self._call("floating_ip_delete")
+        with self._lock:
+            if address not in self.floating_ips:
+                raise ResourceNotFound(f"No Floating IP found for {address}")
+            del self.floating_ips[address]
+
+    def delete_server(self, name_or_id: str) -> None:
+        self._call("server_delete")
+        with self._lock:
+            self._reap()
+            for server_id, server in self.servers.items():
+                if name_or_id in (server_id, server["name"]):
+                    server.setdefault("deleted_at", time.monotonic())
+                    return
+        raise ResourceNotFound(f"No server with a name or ID of '{name_or_id}' exists.")
+
+    def delete_port(self, name_or_id: str) -> None:
+        self._call("port_delete")
+        with self._lock:
+            self._reap()
+            for port_id, port in self.ports.items():
+                if name_or_id in (port_id, port["name"]):
+                    if any(s["port_id"] == port_id for s in self.servers.values()):
+                        raise ResourceConflict(f"Port {port_id} is in use")
+                    del self.ports[port_id]
+                    return
+        raise ResourceNotFound(f"No Port found for {name_or_id}")
+
+    def snapshot_server(self, server_id: str, image_name: str, metadata: Dict[str, str]) -> str:
+        self._call("server_image_create")
+        image_id = str(uuid.uuid4())
+        with self._lock:
+            if server_id not in self.servers:
+                raise ResourceNotFound(f"No server with a name or ID of '{server_id}' exists.")
+            self.images[image_id] = {"name": image_name, "metadata": dict(metadata), "created": time.monotonic()}
+        return image_id
+
+    def image_info(self, image_id: str) -> Dict:
+        self._call("image_show")
+        with self._lock:
+            image = self.images.get(image_id)
+            if image is None:
+                raise ResourceNotFound(f"Could not find image {image_id}")
+            active = time.monotonic() - image["created"] >= self.snapshot_seconds
+            return {
+                "id": image_id,
+                "name": image["name"],
+                "status": "active" if active else "saving",
+                "size": self.snapshot_size if active else None,
+            }
+
+    def delete_image(self, image_id: str) -> None:
+        self._call("image_delete")
+        with self._lock:
+            if self.images.pop(image_id, None) is None:
+                raise ResourceNotFound(f"Could not find image {image_id}")
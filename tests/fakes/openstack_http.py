@@ -0,0 +1,263 @@
+"""
+Fake Keystone + Nova + Glance (plus a plain file mirror) on a local
+http.server, for exercising OpenStackClient and the services built on it
+over real HTTP.
+"""
+import hashlib
+import itertools
+import json
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeOpenStack:
+    """
+    Minimal OpenStack endpoints served from memory:
+
+      - POST /v3/auth/tokens issues tokens; revoke_tokens() makes the issued
+        ones answer 401 so clients have to authenticate again
+      - /compute/v2.1/servers/detail pages `servers` by page_size
+      - /image/v2/images lists, creates, uploads (checksum = md5) and deletes
+      - /files/<name> serves `files` without authentication, with ETag and
+        Range/If-Range; drops[name] cuts that many downloads halfway through
+        and ranges[name] records the offset of every resumed download
+
+    auth_requests and requests count what the clients sent.
+    """
+
+    def __init__(self, page_size: int = 50) -> None:
+        self.page_size = page_size
+        self.servers: List[Dict] = []
+        self.images: Dict[str, Dict] = {}
+        self.files: Dict[str, bytes] = {}
+        self.drops: Dict[str, int] = {}
+        self.ranges: Dict[str, List[int]] = {}
+        self.auth_requests = 0
+        self.requests: List[str] = []
+        self._tokens = set()
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def file_url(self, name: str) -> str:
+        return f"{self.url}/files/{name}"
+
+    @property
+    def env(self) -> Dict[str, str]:
+        return {"OS_AUTH_URL": f"{self.url}/v3", "OS_USERNAME": "admin", "OS_PASSWORD": "secret",
+                "OS_PROJECT_NAME": "admin"}
+
+    def start(self) -> "FakeOpenStack":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def revoke_tokens(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+
+    def add_servers(self, count: int, image_id: str = "img-base") -> None:
+        self.servers.extend(
+            {"id": f"srv-{i}", "name": f"vm{i}", "status": "ACTIVE", "image": {"id": image_id},
+             "addresses": {"net": [{"addr": f"10.0.0.{i + 10}"}]}}
+            for i in range(len(self.servers), len(self.servers) + count)
+        )
+
+    # ------------------------------------------------------------------
+
+    def _catalog(self) -> List[Dict]:
+        return [
+            {"type": "compute", "endpoints": [{"interface": "public", "region_id": "RegionOne",
+                                               "url": f"{self.url}/compute/v2.1"}]},
+            {"type": "image", "endpoints": [{"interface": "public", "region_id": "RegionOne",
+                                             "url": f"{self.url}/image"}]},
+        ]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send(self, code: int, body=None, headers: Optional[Dict[str, str]] = None) -> None:
+                data = b"" if body is None else json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> bytes:
+                length = self.headers.get("Content-Length")
+                if length is not None:
+                    return self.rfile.read(int(length))
+                data = b""
+                while True:  # chunked upload (requests streaming a file)
+                    size = int(self.rfile.readline().strip(), 16)
+                    if not size:
+                        self.rfile.readline()
+                        return data
+                    data += self.rfile.read(size)
+                    self.rfile.readline()
+
+            def _authorized(self) -> bool:
+                with fake._lock:
+                    ok = self.headers.get("X-Auth-Token") in fake._tokens
+                if not ok:
+                    self._send(401, {"error": "unauthorized"})
+                return ok
+
+            def _route(self, method: str) -> None:
+                parts = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                with fake._lock:
+                    fake.requests.append(f"{method} {parts.path}")
+                if parts.path.startswith("/files/"):
+                    fake._serve_file(self, parts.path[len("/files/"):], head=method == "HEAD")
+                    return
+                if method == "POST" and parts.path == "/v3/auth/tokens":
+                    self._body()
+                    with fake._lock:
+                        fake.auth_requests += 1
+                        token = f"tok-{next(fake._counter)}"
+                        fake._tokens.add(token)
+                    self._send(201, {"token": {"catalog": fake._catalog()}}, {"X-Subject-Token": token})
+                    return
+                if not self._authorized():
+                    return
+                handler = fake._routes(method, parts.path)
+                if handler is None:
+                    self._send(404, {"error": "not found"})
+                    return
+                handler(self, query)
+
+            def do_HEAD(self) -> None:
+                self._route("HEAD")
+
+            def do_GET(self) -> None:
+                self._route("GET")
+
+            def do_POST(self) -> None:
+                self._route("POST")
+
+            def do_PUT(self) -> None:
+                self._route("PUT")
+
+            def do_DELETE(self) -> None:
+                self._route("DELETE")
+
+        return Handler
+
+    def _routes(self, method: str, path: str):
+        if method == "GET" and path == "/compute/v2.1/servers/detail":
+            return self._list_servers
+        match = re.fullmatch(r"/compute/v2\.1/servers/([^/]+)", path)
+        if method == "GET" and match:
+            return lambda h, q: self._show(h, {s["id"]: s for s in self.servers}.get(match.group(1)), "server")
+        if path == "/image/v2/images":
+            return {"GET": self._find_images, "POST": self._create_image}.get(method)
+        match = re.fullmatch(r"/image/v2/images/([^/]+)(/file)?", path)
+        if match and match.group(2) and method == "PUT":
+            return lambda h, q: self._upload(h, match.group(1))
+        if match and method == "GET":
+            return lambda h, q: self._show(h, self.images.get(match.group(1)))
+        if match and method == "DELETE":
+            return lambda h, q: self._delete_image(h, match.group(1))
+        return None
+
+    def _serve_file(self, h, name: str, head: bool) -> None:
+        data = self.files.get(name)
+        if data is None:
+            h._send(404, {"error": "not found"})
+            return
+        etag = '"' + hashlib.md5(data).hexdigest() + '"'
+        start, code = 0, 200
+        range_header = h.headers.get("Range")
+        if range_header and h.headers.get("If-Range") in (None, etag):
+            start, code = int(range_header.split("=")[1].split("-")[0]), 206
+            if start >= len(data):
+                h.send_response(416)
+                h.send_header("Content-Range", f"bytes */{len(data)}")
+                h.send_header("Content-Length", "0")
+                h.end_headers()
+                return
+        body = data[start:]
+        h.send_response(code)
+        h.send_header("ETag", etag)
+        h.send_header("Content-Length", str(len(body)))
+        if code == 206:
+            h.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        h.end_headers()
+        if head:
+            return
+        with self._lock:
+            if code == 206:
+                self.ranges.setdefault(name, []).append(start)
+            drop = self.drops.get(name, 0) > 0
+            if drop:
+                self.drops[name] -= 1
+        if drop:
+            h.wfile.write(body[:len(body) // 2])
+            h.wfile.flush()
+            h.close_connection = True
+            return
+        h.wfile.write(body)
+
+    def _list_servers(self, h, query: Dict[str, str]) -> None:
+        ids = [s["id"] for s in self.servers]
+        start = ids.index(query["marker"]) + 1 if query.get("marker") in ids else 0
+        batch = self.servers[start:start + self.page_size]
+        body = {"servers": batch}
+        if start + self.page_size < len(self.servers):
+            body["servers_links"] = [{"rel": "next", "href": f"?marker={batch[-1]['id']}"}]
+        h._send(200, body)
+
+    @staticmethod
+    def _show(h, item: Optional[Dict], key: Optional[str] = None) -> None:
+        if item is None:
+            h._send(404, {"error": "not found"})
+        else:
+            h._send(200, {key: item} if key else item)
+
+    def _find_images(self, h, query: Dict[str, str]) -> None:
+        h._send(200, {"images": [i for i in self.images.values() if i["name"] == query.get("name")]})
+
+    def _create_image(self, h, query: Dict[str, str]) -> None:
+        image = json.loads(h._body())
+        image.update(id=uuid.uuid4().hex, status="queued", checksum=None, size=None)
+        with self._lock:
+            self.images[image["id"]] = image
+        h._send(201, image)
+
+    def _upload(self, h, image_id: str) -> None:
+        data = h._body()
+        with self._lock:
+            image = self.images.get(image_id)
+            if image is not None:
+                image.update(status="active", checksum=hashlib.md5(data).hexdigest(), size=len(data))
+        h._send(204 if image is not None else 404)
+
+    def _delete_image(self, h, image_id: str) -> None:
+        with self._lock:
+            found = self.images.pop(image_id, None) is not None
+        h._send(204 if found else 404)
@@ -0,0 +1,112 @@
+from src.models.jobs import Job
+
+
+def _seed(dashboard):
+    dashboard.tools_store.update_instance("vm1", lambda e: e.update(tools=["snort"], installed=["snort"]))
+    dashboard.tools_store.update_instance("vm2", lambda e: e.update(tools=["zeek", "nmap"], installed=["zeek"]))
+
+
+def test_assign_tools_adds_to_or_replaces_the_current_tools(dashboard):
+    _seed(dashboard)
+    client = dashboard.app.test_client()
+    operations = [
+        {"instance": "vm1", "tools": ["zeek", "snort"]},
+        {"instance": "vm2", "tools": ["wazuh"]},
+        {"instance": "vm1", "tools": ["nmap"]},
+    ]
+
+    added = client.post("/api/bulk/assign_tools", json={"operations": operations})
+    assert added.status_code == 200
+    assert added.get_json() == {"status": "ok", "instances": 2, "job_id": None}
+    assert dashboard.tools_store.get_instance("vm1")["tools"] == ["snort", "zeek", "nmap"]
+    assert dashboard.tools_store.get_instance("vm2")["tools"] == ["zeek", "nmap", "wazuh"]
+
+    replaced = client.post("/api/bulk/assign_tools", json={"operations": operations, "mode": "set"})
+    assert replaced.status_code == 200
+    assert dashboard.tools_store.get_instance("vm1")["tools"] == ["zeek", "snort", "nmap"]
+    assert dashboard.tools_store.get_instance("vm2") == {"tools": ["wazuh"], "installed": ["zeek"]}
+
+
+def test_assign_tools_rejects_bad_requests(dashboard):
+    client = dashboard.app.test_client()
+
+    assert client.post("/api/bulk/assign_tools", json={"operations": []}).status_code == 400
+    assert client.post("/api/bulk/assign_tools", json={
+        "operations": [{"instance": "vm1", "tools": ["snort"]}], "mode": "merge",
+    }).status_code == 400
+    assert client.post("/api/bulk/assign_tools", json={"operations": [{"tools": ["snort"]}]}).status_code == 400
+    assert dashboard.tools_store.read_all() == {}
+
+
+def test_assign_and_install_submits_one_job(dashboard):
+    client = dashboard.app.test_client()
+
+    response = client.post("/api/bulk/assign_tools", json={
+        "operations": [{"instance": "vm1", "tools": ["snort"], "hints": {"ip": "10.0.0.5"}},
+                       {"instance": "vm2", "tools": ["zeek"]}],
+        "install": True,
+        "options": {"pipelined": True, "max_workers": 2},
+    })
+
+    assert response.status_code == 202
+    job = dashboard.job_queue.get(response.get_json()["job_id"])
+    assert job["kind"] == "install"
+    assert job["status"] == "queued"
+    assert job["instances"] == ["vm1", "vm2"]
+    assert [(t["instance"], t["tools"], t["hints"]) for t in job["targets"]] == [
+        ("vm1", ["snort"], {"ip": "10.0.0.5"}),
+        ("vm2", ["zeek"], {}),
+    ]
+    assert job["options"] == {"pipelined": True, "max_workers": 2}
+
+
+def test_bulk_requests_without_tools_to_run_are_a_noop(dashboard):
+    _seed(dashboard)
+    client = dashboard.app.test_client()
+    operations = [{"instance": "vm1", "tools": []}, {"instance": "vm2"}]
+
+    install = client.post("/api/bulk/assign_tools", json={"operations": operations, "install": True})
+    uninstall = client.post("/api/bulk/uninstall_tools", json={"operations": operations, "run": True})
+
+    assert install.status_code == 200
+    assert install.get_json() == {"status": "noop", "instances": 2, "msg": "no tools to install"}
+    assert uninstall.status_code == 200
+    assert uninstall.get_json() == {"status": "noop", "instances": 2, "msg": "no tools to uninstall"}
+    assert dashboard.job_queue.list() == []
+
+
+def test_bulk_uninstall_runs_a_job_or_only_updates_the_store(dashboard):
+    _seed(dashboard)
+    client = dashboard.app.test_client()
+    operations = [{"instance": "vm1", "tools": ["snort"]}, {"instance": "vm2", "tools": ["zeek"]}]
+
+    queued = client.post("/api/bulk/uninstall_tools", json={"operations": operations, "run": True})
+    assert queued.status_code == 202
+    assert queued.get_json()["status"] == "queued"
+    assert dashboard.job_queue.get(queued.get_json()["job_id"])["kind"] == "uninstall"
+    # with run, the store only changes once the job has really removed the tools
+    assert dashboard.tools_store.get_instance("vm1")["installed"] == ["snort"]
+
+    removed = client.post("/api/bulk/uninstall_tools", json={"operations": operations})
+    assert removed.get_json() == {"status": "success", "instances": 2}
+    assert dashboard.tools_store.get_instance("vm1") == {"tools": [], "installed": []}
+    assert dashboard.tools_store.get_instance("vm2") == {"tools": ["nmap"], "installed": []}
+
+
+def test_finished_jobs_update_the_store(dashboard):
+    _seed(dashboard)
+    vm2 = {"name": "vm2"}
+    install = Job(id="j1", kind="install", targets=None, instances=["vm2"], options={}, results=[
+        {"instance": vm2, "tool": "nmap", "status": "ok"},
+    ])
+    uninstall = Job(id="j2", kind="uninstall", targets=None, instances=["vm2"], options={}, results=[
+        {"instance": vm2, "tool": "zeek", "status": "ok"},
+    ])
+
+    dashboard._job_finished(install)
+    dashboard._job_finished(uninstall)
+
+    entry = dashboard.tools_store.get_instance("vm2")
+    assert entry["tools"] == ["nmap"]
+    assert entry["installed"] == ["nmap"]
+    assert {tool: run["status"] for tool, run in entry["last_run"].items()} == {"nmap": "ok", "zeek": "ok"}
@@ -0,0 +1,44 @@
+import json
+
+
+def _summary(tmp_path):
+    (tmp_path / "summary.json").write_text(json.dumps([
+        {"name": "vm1", "floating_ip": "10.0.0.5", "ssh_user": "ubuntu"},
+        {"name": "vm2", "floating_ip": "10.0.0.6", "ssh_user": "debian"},
+    ]))
+
+
+def test_snapshot_answers_304_while_nothing_changes(dashboard, tmp_path):
+    _summary(tmp_path)
+    dashboard.tools_store.update_instance("vm1", lambda e: e.update(tools=["snort"]))
+    client = dashboard.app.test_client()
+
+    first = client.get("/api/dashboard/snapshot")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert "snapshot;dur=" in first.headers["Server-Timing"]
+    body = first.get_json()
+    assert [(i["name"], i["tools"], i["ip_floating"]) for i in body["instances"]] == [
+        ("vm1", ["snort"], "10.0.0.5"),
+        ("vm2", [], "10.0.0.6"),
+    ]
+
+    etag = first.headers["ETag"]
+    cached = client.get("/api/dashboard/snapshot", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+
+def test_snapshot_etag_changes_after_a_store_write(dashboard, tmp_path):
+    _summary(tmp_path)
+    client = dashboard.app.test_client()
+    etag = client.get("/api/dashboard/snapshot").headers["ETag"]
+
+    client.post("/api/add_tool_to_instance", json={"instance": "vm2", "tools": ["zeek"]})
+    response = client.get("/api/dashboard/snapshot", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["instances"][1]["tools"] == ["zeek"]
+    assert client.get("/api/dashboard/snapshot", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
@@ -0,0 +1,87 @@
+import json
+import threading
+
+from src.services.golden_image_cache import GOLDEN_PREFIX, GoldenImageCache, golden_key
+from tests.fakes.openstack_backend import InMemoryOpenStackBackend
+
+GIB = 1024 ** 3
+INSTALLERS = {"snort": "a" * 64, "zeek": "b" * 64, "nmap": "c" * 64}
+
+
+def _cache(tmp_path, backend, **kwargs):
+    return GoldenImageCache(
+        tmp_path / "golden_images.json",
+        backend,
+        summary_path=tmp_path / "summary.json",
+        **kwargs,
+    )
+
+
+def _server(backend, name="vm1"):
+    return backend.create_server(name, "ubuntu-22.04", "m1.small", "key", backend.create_port(name, "net", "sg"))
+
+
+def test_golden_key_depends_only_on_base_image_tools_and_installers():
+    key = golden_key("ubuntu-22.04", ["snort", "zeek"], INSTALLERS)
+
+    assert golden_key("ubuntu-22.04", ["ZEEK", "snort", "zeek"], INSTALLERS) == key
+    assert golden_key("ubuntu-22.04", ["snort", "zeek"], {**INSTALLERS, "wazuh": "d" * 64}) == key
+    assert golden_key("debian-12", ["snort", "zeek"], INSTALLERS) != key
+    assert golden_key("ubuntu-22.04", ["snort"], INSTALLERS) != key
+    assert golden_key("ubuntu-22.04", ["snort", "zeek"], {**INSTALLERS, "zeek": "e" * 64}) != key
+
+
+def test_capture_snapshots_each_combination_once(tmp_path):
+    backend = InMemoryOpenStackBackend(snapshot_size=GIB)
+    cache = _cache(tmp_path, backend, budget_bytes=100 * GIB)
+    servers = [_server(backend, f"vm{i}") for i in range(4)]
+    outcomes = []
+
+    def capture(server_id):
+        outcomes.append(cache.capture(server_id, "ubuntu-22.04", ["zeek", "snort"], INSTALLERS))
+
+    threads = [threading.Thread(target=capture, args=(sid,)) for sid in servers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert backend.calls.count("server_image_create") == 1
+    assert sorted(created for _, created in outcomes) == [False, False, False, True]
+    assert len({entry.image_id for entry, _ in outcomes}) == 1
+    entry = outcomes[0][0]
+    assert entry.image_name == f"{GOLDEN_PREFIX}-ubuntu-22.04-{entry.key}"
+    assert cache.lookup("ubuntu-22.04", ["snort", "zeek"], INSTALLERS).image_id == entry.image_id
+
+
+def test_evict_removes_least_recently_used_images_but_not_those_in_use(tmp_path):
+    backend = InMemoryOpenStackBackend(snapshot_size=GIB)
+    cache = _cache(tmp_path, backend, budget_bytes=100 * GIB)
+    server = _server(backend)
+    oldest, _ = cache.capture(server, "ubuntu-22.04", ["snort"], INSTALLERS)
+    middle, _ = cache.capture(server, "ubuntu-22.04", ["zeek"], INSTALLERS)
+    in_use, _ = cache.capture(server, "ubuntu-22.04", ["nmap"], INSTALLERS)
+    newest, _ = cache.capture(server, "ubuntu-22.04", ["snort", "zeek"], INSTALLERS)
+    # using an image makes it the most recent one
+    cache.lookup("ubuntu-22.04", ["snort"], INSTALLERS)
+    # the current scenario booted from the nmap image: it stays whatever its age
+    (tmp_path / "summary.json").write_text(json.dumps([{"name": "vm1", "image": in_use.image_name}]))
+    cache.lookup("ubuntu-22.04", ["nmap"], INSTALLERS)
+    with cache._locked() as catalog:
+        catalog["images"][in_use.key]["last_used_at"] = 0.0
+
+    evicted = cache.evict(budget_bytes=2 * GIB)
+
+    assert [e.key for e in evicted] == [middle.key, newest.key]
+    assert sorted(e.key for e in cache.entries()) == sorted([oldest.key, in_use.key])
+    assert set(backend.images) == {oldest.image_id, in_use.image_id}
+
+
+def test_images_still_saving_are_not_evicted(tmp_path):
+    backend = InMemoryOpenStackBackend(snapshot_size=GIB, snapshot_seconds=60)
+    cache = _cache(tmp_path, backend, budget_bytes=100 * GIB)
+    entry, _ = cache.capture(_server(backend), "ubuntu-22.04", ["snort"], INSTALLERS)
+
+    assert cache.evict(budget_bytes=0) == []
+    assert cache.lookup("ubuntu-22.04", ["snort"], INSTALLERS) is None
+    assert [e.key for e in cache.entries()] == [entry.key]
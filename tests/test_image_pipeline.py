@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from src.models.images import ImageSource
+from src.services.image_pipeline import CHUNK_SIZE, ImagePipelineService
+from src.services.openstack_client import OpenStackClient
+from tests.fakes.openstack_http import FakeOpenStack
+
+
+@pytest.fixture
+def cloud():
+    fake = FakeOpenStack().start()
+    yield fake
+    fake.stop()
+
+
+def _service(tmp_path, cloud, **kwargs):
+    kwargs.setdefault("retry_delay", 0.0)
+    return ImagePipelineService(tmp_path / "images", glance=OpenStackClient(cloud.env), **kwargs)
+
+
+def _downloads(cloud, name):
+    return [r for r in cloud.requests if r == f"GET /files/{name}"]
+
+
+def test_interrupted_download_resumes_within_the_run(tmp_path, cloud):
+    data = os.urandom(12 * CHUNK_SIZE)
+    cloud.files["cirros"] = data
+    cloud.drops["cirros"] = 1
+
+    report = _service(tmp_path, cloud).run([ImageSource("cirros", cloud.file_url("cirros"))])
+
+    [image] = report["images"]
+    assert (report["status"], image["status"], image["download"]) == ("completed", "uploaded", "resumed")
+    assert image["sha256"] == hashlib.sha256(data).hexdigest()
+    assert cloud.images[image["glance_id"]]["checksum"] == hashlib.md5(data).hexdigest()
+    assert (tmp_path / "images" / "cirros.qcow2").read_bytes() == data
+    [offset] = cloud.ranges["cirros"]
+    assert 0 < offset <= len(data) // 2
+    assert not (tmp_path / "images" / "cirros.qcow2.part").exists()
+
+
+def test_partial_file_is_resumed_by_the_next_run(tmp_path, cloud):
+    data = os.urandom(12 * CHUNK_SIZE)
+    cloud.files["ubuntu"] = data
+    cloud.drops["ubuntu"] = 1
+    source = ImageSource("ubuntu", cloud.file_url("ubuntu"))
+
+    first = _service(tmp_path, cloud, retries=0).run([source])
+    part = tmp_path / "images" / "ubuntu.qcow2.part"
+    assert first["failed"] == ["ubuntu"] and first["images"][0]["status"] == "download_failed"
+    assert 0 < part.stat().st_size < len(data)
+    kept = part.stat().st_size
+
+    second = _service(tmp_path, cloud, retries=0).run([source])
+
+    [image] = second["images"]
+    assert (image["status"], image["download"]) == ("uploaded", "resumed")
+    assert image["size"] == len(data) and image["sha256"] == hashlib.sha256(data).hexdigest()
+    assert not part.exists()
+    # the second run only asked for the bytes that were missing
+    assert cloud.ranges["ubuntu"] == [kept]
+
+
+def test_checksum_mismatch_keeps_nothing_and_uploads_nothing(tmp_path, cloud):
+    cloud.files["debian"] = os.urandom(100_000)
+    source = ImageSource("debian", cloud.file_url("debian"), sha256="0" * 64)
+
+    report = _service(tmp_path, cloud).run([source])
+
+    [image] = report["images"]
+    assert report["status"] == "partial_failure" and report["failed"] == ["debian"]
+    assert (image["status"], image["download"], image["upload"]) == ("checksum_mismatch", "failed", "pending")
+    assert [p.name for p in (tmp_path / "images").iterdir() if p.name != "manifest.json"] == []
+    assert cloud.images == {}
+
+
+def test_second_run_skips_download_and_upload(tmp_path, cloud):
+    data = os.urandom(50_000)
+    cloud.files["alpine"] = data
+    source = ImageSource("alpine", cloud.file_url("alpine"), sha256=hashlib.sha256(data).hexdigest())
+    _service(tmp_path, cloud).run([source])
+    downloads = len(_downloads(cloud, "alpine"))
+
+    report = _service(tmp_path, cloud).run([source])
+
+    [image] = report["images"]
+    assert (image["status"], image["download"], image["upload"]) == ("already_present", "skipped", "present")
+    assert len(_downloads(cloud, "alpine")) == downloads
+    assert len(cloud.images) == 1
+    manifest = json.loads((tmp_path / "images" / "manifest.json").read_text())
+    assert manifest["alpine"]["glance_id"] == image["glance_id"]
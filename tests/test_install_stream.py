@@ -0,0 +1,50 @@
+import time
+
+from src.services.install_stream import InstallStream
+from src.services.tools_installer_service import notify_tool_started
+
+
+def test_read_new_lines_returns_only_complete_lines(tmp_path):
+    log = tmp_path / "vm_snort_install.log"
+    log.write_text("one\ntwo\npart", encoding="utf-8")
+
+    lines, offset = InstallStream._read_new_lines(log, 0)
+
+    assert lines == ["one", "two"]
+    assert offset == len("one\ntwo\n")
+
+
+def test_read_new_lines_restarts_after_truncation(tmp_path):
+    log = tmp_path / "vm_snort_install.log"
+    log.write_text("old run line 1\nold run line 2\n", encoding="utf-8")
+    _, offset = InstallStream._read_new_lines(log, 0)
+
+    log.write_text("new\n", encoding="utf-8")  # the installer reopens the log with "w"
+    lines, offset = InstallStream._read_new_lines(log, offset)
+
+    assert lines == ["new"]
+    assert offset == len("new\n")
+
+
+def test_read_new_lines_missing_file(tmp_path):
+    assert InstallStream._read_new_lines(tmp_path / "missing.log", 7) == ([], 7)
+
+
+def test_rerun_streams_new_output_only(tmp_path):
+    log = tmp_path / "vm_snort_install.log"
+    log.write_text("previous run\n" * 50, encoding="utf-8")
+
+    def run(notify):
+        notify_tool_started(notify, "vm", "snort", log)
+        with log.open("w", encoding="utf-8") as f:
+            f.write("fresh output\n")
+        time.sleep(0.05)
+        result = {"instance": {"name": "vm"}, "tool": "snort", "status": "ok"}
+        notify({"event": "tool_finished", "instance": "vm", "tool": "snort", "result": result})
+        return [result]
+
+    events = list(InstallStream(run, poll_interval=0.01).start().events())
+
+    lines = [e["line"] for e in events if e["event"] == "log"]
+    assert lines == ["fresh output"]
+    assert [e["event"] for e in events if e["event"] != "log"] == ["tool_started", "tool_finished", "completed"]
@@ -0,0 +1,85 @@
+import os
+import tarfile
+
+from src.services.installer_bundle import DRIVER_NAME, TOOL_MARKER, InstallerBundleBuilder, split_bundle_output
+from src.services.remote_pipeline import TRAILER_MARKER
+
+
+def _installers(root):
+    for tool, files in {
+        "snort": {"install.sh": "echo snort\n", "rules/local.rules": "alert any\n"},
+        "zeek": {"install.sh": "echo zeek\n"},
+    }.items():
+        for name, text in files.items():
+            path = root / tool / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+    os.chmod(root / "snort" / "install.sh", 0o755)
+    return root
+
+
+def _builder(installers_dir, cache_dir):
+    return InstallerBundleBuilder(installers_dir, cache_dir, check_command_for=lambda tool: f"command -v {tool}")
+
+
+def test_same_tool_set_builds_a_byte_identical_bundle(tmp_path):
+    installers = _installers(tmp_path / "installers")
+
+    first = _builder(installers, tmp_path / "cache-a").build(["snort", "zeek"])
+    # new mtimes and a fresh builder/cache: only the content may decide the digest
+    for path in installers.rglob("*"):
+        os.utime(path, (1_000_000, 1_000_000))
+    second = _builder(installers, tmp_path / "cache-b").build(["snort", "zeek"])
+
+    assert first.digest == second.digest
+    assert first.path.read_bytes() == second.path.read_bytes()
+    assert first.path.name == f"{first.digest}.tar.gz"
+
+    other = _builder(installers, tmp_path / "cache-b").build(["zeek"])
+    assert other.digest != first.digest
+
+
+def test_bundle_contains_the_driver_and_every_installer_file(tmp_path):
+    installers = _installers(tmp_path / "installers")
+
+    bundle = _builder(installers, tmp_path / "cache").build(["SNORT", "zeek"])
+
+    with tarfile.open(bundle.path, "r:gz") as tar:
+        members = {m.name: m for m in tar.getmembers()}
+    assert list(members) == [DRIVER_NAME, "snort/install.sh", "snort/rules/local.rules", "zeek/install.sh"]
+    assert members[DRIVER_NAME].mode == 0o755
+    assert members["snort/install.sh"].mode == 0o755
+    assert members["zeek/install.sh"].mode == 0o644
+    assert all(m.mtime == 0 and m.uid == 0 for m in members.values())
+    assert bundle.tools == ["snort", "zeek"]
+
+
+def test_split_output_handles_interleaved_lines_and_a_missing_trailer():
+    output = (
+        "Warning: Permanently added '10.0.0.5' to the list of known hosts.\n"
+        f"{TOOL_MARKER} snort\n"
+        "installing snort\n"
+        "snort done\n"
+        f'\n{TRAILER_MARKER} {{"tool": "snort", "current": 0, "run_rc": 0, "check_rc": 0, "ms": 1200}}\n'
+        "stray line between tools\n"
+        f"{TOOL_MARKER} zeek\n"
+        "installing zeek\n"
+        f"{TRAILER_MARKER} not json\n"
+        f"{TOOL_MARKER} nmap\n"
+        "installing nmap\n"
+        "connection reset by peer\n"
+    )
+
+    sections = split_bundle_output(output)
+
+    assert list(sections) == ["snort", "zeek", "nmap"]
+    assert sections["snort"]["output"] == "installing snort\nsnort done\n\n"
+    assert sections["snort"]["trailer"] == {"current": 0, "run_rc": 0, "check_rc": 0, "ms": 1200}
+    # a malformed trailer closes the section without a result
+    assert sections["zeek"] == {"output": "installing zeek\n", "trailer": None}
+    # the driver was cut off: no trailer, output kept for the log
+    assert sections["nmap"] == {"output": "installing nmap\nconnection reset by peer\n", "trailer": None}
+
+
+def test_split_output_without_any_marker_is_empty():
+    assert split_bundle_output("bash: driver.sh: No such file or directory\n") == {}
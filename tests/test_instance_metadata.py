@@ -0,0 +1,161 @@
+import json
+import time
+
+from src.services.instance_metadata import InstanceMetadataResolver
+
+
+class ServerListing:
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+        self.fail = False
+
+    def add(self, server_id, name, image="ubuntu-22.04", ip="10.0.0.1"):
+        self.rows.append({
+            "ID": server_id,
+            "Name": name,
+            "Image Name": image,
+            "Networks": {"net": [ip]},
+        })
+
+    def __call__(self, env):
+        self.calls += 1
+        if self.fail:
+            raise OSError("openstack unavailable")
+        return [dict(row) for row in self.rows]
+
+
+def _no_cli(cmd, env):
+    raise OSError("no openstack CLI")
+
+
+def _resolver(tmp_path, listing, **kwargs):
+    return InstanceMetadataResolver(
+        tmp_path / "instance_metadata.json",
+        run=_no_cli,
+        server_rows=listing,
+        **kwargs,
+    )
+
+
+def test_server_created_after_first_lookup_is_found(tmp_path):
+    listing = ServerListing()
+    listing.add("id-1", "vm1")
+    resolver = _resolver(tmp_path, listing, min_refresh_interval=0)
+
+    assert resolver.resolve("vm1", {}).id == "id-1"
+    listing.add("id-2", "vm2", ip="10.0.0.2")
+
+    meta = resolver.resolve("vm2", {})
+
+    assert meta is not None and meta.id == "id-2"
+    assert listing.calls == 2
+
+
+def test_missing_server_refreshes_at_most_once_per_interval(tmp_path):
+    listing = ServerListing()
+    listing.add("id-1", "vm1")
+    resolver = _resolver(tmp_path, listing, min_refresh_interval=3600)
+
+    resolver.resolve("vm1", {})
+    listing.add("id-2", "vm2", ip="10.0.0.2")
+
+    assert resolver.resolve("vm2", {}) is None
+    assert resolver.resolve("vm2", {}) is None
+    assert listing.calls == 1
+
+
+def test_stale_entry_is_refreshed_after_ttl(tmp_path):
+    listing = ServerListing()
+    listing.add("id-1", "vm1", image="ubuntu-22.04")
+    resolver = _resolver(tmp_path, listing, ttl_seconds=60, min_refresh_interval=0)
+
+    assert resolver.image_name_for("vm1", {}) == "ubuntu-22.04"
+    assert resolver.image_name_for("vm1", {}) == "ubuntu-22.04"
+    assert listing.calls == 1
+
+    listing.rows[0]["Image Name"] = "debian-12"
+    resolver._entries["id-1"].fetched_at = time.time() - 120
+
+    assert resolver.image_name_for("vm1", {}) == "debian-12"
+    assert listing.calls == 2
+
+
+def test_failed_listing_does_not_count_as_refresh(tmp_path):
+    listing = ServerListing()
+    listing.add("id-1", "vm1")
+    listing.fail = True
+    resolver = _resolver(tmp_path, listing, min_refresh_interval=3600)
+
+    assert resolver.resolve("vm1", {}) is None
+
+    listing.fail = False
+    meta = resolver.resolve("vm1", {})
+
+    assert meta is not None and meta.id == "id-1"
+    assert listing.calls == 2
+
+
+def test_forgotten_ssh_user_stays_forgotten_in_a_new_process(tmp_path):
+    summary = tmp_path / "summary.json"
+    summary.write_text(json.dumps([{"server_id": "id-1", "name": "vm1", "ssh_user": "ubuntu"}]))
+    listing = ServerListing()
+    listing.add("id-1", "vm1", image="debian-12")
+    resolver = _resolver(tmp_path, listing, summary_path=summary, min_refresh_interval=0)
+    resolver.resolve("vm1", {})
+    assert resolver.known_ssh_user("id-1", "10.0.0.1") == "ubuntu"
+
+    resolver.forget_ssh_user("id-1", "10.0.0.1")
+
+    restarted = _resolver(tmp_path, listing, summary_path=summary, min_refresh_interval=0, ttl_seconds=0)
+    restarted.resolve("vm1", {})  # the refresh reads summary.json again
+    assert restarted.known_ssh_user("id-1", "10.0.0.1") is None
+    assert restarted.rejected_ssh_user("id-1", "10.0.0.1") == "ubuntu"
+
+    restarted.remember_ssh_user("id-1", "10.0.0.1", "debian")
+    again = _resolver(tmp_path, listing, summary_path=summary)
+    assert again.known_ssh_user("id-1", "10.0.0.1") == "debian"
+    assert again.rejected_ssh_user("id-1", "10.0.0.1") is None
+
+
+def test_concurrent_processes_keep_each_others_ssh_users(tmp_path):
+    listing = ServerListing()
+    listing.add("id-1", "vm1", ip="10.0.0.1")
+    listing.add("id-2", "vm2", ip="10.0.0.2")
+    listing.add("id-3", "vm3", ip="10.0.0.3")
+    _resolver(tmp_path, listing).resolve("vm1", {})
+    # both processes load the cache before either of them writes
+    first = _resolver(tmp_path, listing)
+    second = _resolver(tmp_path, listing)
+    first.known_ssh_user("id-1", "10.0.0.1")
+    second.known_ssh_user("id-2", "10.0.0.2")
+
+    first.remember_ssh_user("id-1", "10.0.0.1", "ubuntu")
+    second.remember_ssh_user("id-2", "10.0.0.2", "debian")
+    second.forget_ssh_user("id-2", "10.0.0.2")
+    second.remember_ssh_user("id-3", "10.0.0.3", "rocky")
+    first.remember_ssh_user("id-2", "10.0.0.2", "admin", save=False)
+    first.forget_ssh_user("id-1", "10.0.0.1")
+    first.flush()
+
+    restarted = _resolver(tmp_path, listing)
+    assert restarted.known_ssh_user("id-1", "10.0.0.1") is None
+    assert restarted.rejected_ssh_user("id-1", "10.0.0.1") == "ubuntu"
+    # first remembered admin after second forgot debian: the later change wins
+    assert restarted.known_ssh_user("id-2", "10.0.0.2") == "admin"
+    assert restarted.rejected_ssh_user("id-2", "10.0.0.2") is None
+    assert restarted.resolve("vm2", {}).ssh_user == "admin"
+    assert restarted.known_ssh_user("id-3", "10.0.0.3") == "rocky"
+
+
+def test_refresh_in_one_process_keeps_the_user_another_process_remembered(tmp_path):
+    listing = ServerListing()
+    listing.add("id-1", "vm1")
+    stale = _resolver(tmp_path, listing, min_refresh_interval=0, ttl_seconds=0)
+    stale.resolve("vm1", {})
+
+    _resolver(tmp_path, listing).remember_ssh_user("id-1", "10.0.0.1", "ubuntu")
+    stale.resolve("vm1", {})  # refreshes with its own (userless) view of vm1
+
+    assert stale.known_ssh_user("id-1", "10.0.0.1") == "ubuntu"
+    assert _resolver(tmp_path, listing).resolve("vm1", {}).ssh_user == "ubuntu"
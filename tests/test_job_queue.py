@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src.models.jobs import JobTarget
+from src.services.install_stream import InstallStream
+from src.services.job_queue import JobQueue
+from src.services.metrics import JOBS_IN_FLIGHT
+
+
+def _queue(tmp_path, executed):
+    def execute(job, on_event):
+        executed.append(job.id)
+        return []
+
+    return JobQueue(
+        tmp_path / "jobs.json",
+        executor=execute,
+        instances_for=lambda kind, targets: sorted({t.instance for t in targets or []}),
+        poll_interval=0.01,
+    )
+
+
+def test_running_job_from_previous_process_with_same_pid_is_requeued(tmp_path):
+    queue = _queue(tmp_path, [])
+    job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort"])])
+    with queue._locked_jobs(write=True) as jobs:
+        # claimed by a previous process that had the same pid (container restart)
+        jobs[job_id].status = "running"
+        jobs[job_id].owner_pid = os.getpid()
+        jobs[job_id].owner_token = f"{os.getpid()}:stale"
+
+    claimed = queue._claim_jobs()
+
+    assert [j.id for j in claimed] == [job_id]
+    assert claimed[0].owner_token == queue.owner_token
+    assert claimed[0].attempts == 1
+
+
+def test_running_job_of_this_process_is_not_claimed_twice(tmp_path):
+    queue = _queue(tmp_path, [])
+    job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort"])])
+
+    assert [j.id for j in queue._claim_jobs()] == [job_id]
+    assert queue._claim_jobs() == []
+    assert queue.get(job_id)["status"] == "running"
+
+
+def test_submitted_job_runs_to_completion(tmp_path):
+    executed = []
+    queue = _queue(tmp_path, executed).start()
+    try:
+        job_id = queue.submit("uninstall", [JobTarget(instance="vm1", tools=["snort"])])
+        deadline = time.time() + 5
+        while queue.get(job_id)["status"] != "completed" and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.stop()
+
+    assert executed == [job_id]
+    assert queue.get(job_id)["status"] == "completed"
+
+
+def test_on_complete_failure_keeps_job_completed(tmp_path):
+    def on_complete(job):
+        raise RuntimeError("store unavailable")
+
+    queue = JobQueue(
+        tmp_path / "jobs.json",
+        executor=lambda job, on_event: [{"tool": "snort", "status": "success"}],
+        instances_for=lambda kind, targets: ["vm1"],
+        on_complete=on_complete,
+    )
+    job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort"])])
+    (job,) = queue._claim_jobs()
+
+    queue._run_job(job)
+
+    stored = queue.get(job_id)
+    assert stored["status"] == "completed"
+    assert stored["error"] is None
+    assert stored["on_complete_error"] == "store unavailable"
+    assert stored["results"] == [{"tool": "snort", "status": "success"}]
+
+
+def test_failed_job_keeps_and_completes_the_tools_that_finished(tmp_path):
+    completed = []
+
+    def execute(job, on_event):
+        for tool in ("snort", "zeek"):
+            on_event({"event": "tool_finished", "result": {"tool": tool, "status": "ok"}})
+        raise RuntimeError("connection lost")
+
+    queue = JobQueue(
+        tmp_path / "jobs.json",
+        executor=execute,
+        instances_for=lambda kind, targets: ["vm1"],
+        on_complete=lambda job: completed.append(list(job.results)),
+    )
+    job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort", "zeek", "nmap"])])
+    (job,) = queue._claim_jobs()
+
+    queue._run_job(job)
+
+    stored = queue.get(job_id)
+    assert stored["status"] == "failed"
+    assert stored["error"] == "connection lost"
+    assert [r["tool"] for r in stored["results"]] == ["snort", "zeek"]
+    assert completed == [stored["results"]]
+
+
+def test_tool_results_are_written_at_most_once_per_flush_interval(tmp_path):
+    writes = []
+
+    def execute(job, on_event):
+        results = [{"tool": tool, "status": "ok"} for tool in ("snort", "zeek", "nmap", "wazuh")]
+        for result in results:
+            on_event({"event": "tool_finished", "result": result})
+        return results
+
+    queue = JobQueue(
+        tmp_path / "jobs.json",
+        executor=execute,
+        instances_for=lambda kind, targets: ["vm1"],
+        results_flush_interval=60.0,
+    )
+    job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort"])])
+    (job,) = queue._claim_jobs()
+    save = queue._save
+    queue._save = lambda jobs: writes.append(len(jobs[job_id].results)) or save(jobs)
+
+    queue._run_job(job)
+
+    # only the final write, not one per tool
+    assert writes == [4]
+
+
+def test_dispatcher_survives_errors_and_skips_malformed_entries(tmp_path, monkeypatch):
+    executed = []
+    queue = _queue(tmp_path, executed)
+    (tmp_path / "jobs.json").write_text(json.dumps({"jobs": [{"kind": "install"}, {"id": "old", "targets": 3}]}))
+    claims = []
+    claim = queue._claim_jobs
+
+    def flaky_claim():
+        claims.append(None)
+        if len(claims) == 1:
+            raise RuntimeError("unexpected")
+        return claim()
+
+    monkeypatch.setattr(queue, "_claim_jobs", flaky_claim)
+    queue.start()
+    try:
+        job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort"])])
+        deadline = time.time() + 5
+        while queue.get(job_id)["status"] != "completed" and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.stop()
+
+    assert executed == [job_id]
+    assert [job["id"] for job in queue.list()] == [job_id]
+
+
+def test_progress_inside_the_flush_interval_is_written_without_waiting_for_the_next_event(tmp_path):
+    release = threading.Event()
+
+    def execute(job, on_event):
+        on_event({"event": "tool_started", "instance": "vm1", "tool": "snort", "log_file": "/tmp/snort.log"})
+        on_event({"event": "tool_finished", "result": {"instance": {"name": "vm1"}, "tool": "snort", "status": "ok"}})
+        on_event({"event": "tool_started", "instance": "vm1", "tool": "zeek", "log_file": "/tmp/zeek.log"})
+        release.wait(5)  # zeek takes a long time
+        return []
+
+    queue = JobQueue(
+        tmp_path / "jobs.json",
+        executor=execute,
+        instances_for=lambda kind, targets: ["vm1"],
+        results_flush_interval=0.05,
+    )
+    job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort", "zeek"])])
+    (job,) = queue._claim_jobs()
+    runner = threading.Thread(target=queue._run_job, args=(job,))
+    runner.start()
+    try:
+        deadline = time.time() + 5
+        while len(queue.get(job_id)["started_tools"]) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        running = queue.get(job_id)
+    finally:
+        release.set()
+        runner.join()
+
+    assert running["status"] == "running"
+    assert [t["tool"] for t in running["started_tools"]] == ["snort", "zeek"]
+    assert [r["tool"] for r in running["results"]] == ["snort"]
+
+
+def test_install_stream_follows_a_queued_job_and_tails_its_logs(tmp_path):
+    in_flight = []
+
+    def execute(job, on_event):
+        log = tmp_path / "vm1_snort_install.log"
+        log.write_text("", encoding="utf-8")
+        on_event({"event": "tool_started", "instance": "vm1", "tool": "snort", "log_file": str(log)})
+        log.write_text("unpacking\ndone\n", encoding="utf-8")
+        in_flight.append(JOBS_IN_FLIGHT.value(kind="install"))
+        result = {"instance": {"name": "vm1"}, "tool": "snort", "status": "ok"}
+        on_event({"event": "tool_finished", "instance": "vm1", "tool": "snort", "result": result})
+        return [result]
+
+    queue = JobQueue(
+        tmp_path / "jobs.json",
+        executor=execute,
+        instances_for=lambda kind, targets: ["vm1"],
+        poll_interval=0.01,
+        results_flush_interval=0.01,
+    ).start()
+    try:
+        job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort"])])
+        stream = InstallStream(lambda on_event: queue.follow(job_id, on_event, poll_interval=0.01), poll_interval=0.01)
+        events = list(stream.start().events())
+    finally:
+        queue.stop()
+
+    assert [e["event"] for e in events] == ["tool_started", "log", "log", "tool_finished", "completed"]
+    assert [e["line"] for e in events if e["event"] == "log"] == ["unpacking", "done"]
+    assert events[3]["tool"] == "snort" and events[3]["instance"] == "vm1"
+    assert events[-1]["results"] == queue.get(job_id)["results"]
+    # the job is counted once, by the queue; following it adds nothing
+    assert in_flight == [JOBS_IN_FLIGHT.value(kind="install") + 1]
+
+
+def test_follow_raises_when_the_job_fails(tmp_path):
+    def execute(job, on_event):
+        raise RuntimeError("connection lost")
+
+    queue = JobQueue(
+        tmp_path / "jobs.json",
+        executor=execute,
+        instances_for=lambda kind, targets: ["vm1"],
+        poll_interval=0.01,
+    ).start()
+    try:
+        job_id = queue.submit("install", [JobTarget(instance="vm1", tools=["snort"])])
+        with pytest.raises(RuntimeError, match="connection lost"):
+            queue.follow(job_id, lambda event: None, poll_interval=0.01)
+    finally:
+        queue.stop()
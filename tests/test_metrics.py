@@ -0,0 +1,131 @@
+import json
+
+import pytest
+
+from src.services.metrics import Counter, Gauge, MetricsRegistry, _Metric
+
+
+def test_metric_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("nics_test", "abstract")
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    runs = registry.counter("nics_runs_total", "Runs by status", ("status",))
+    streams = registry.gauge("nics_streams_open", "Open streams")
+    latency = registry.histogram("nics_latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+
+    runs.inc(status="ok")
+    runs.inc(2, status='fail "quoted"\n')
+    with streams.track():
+        streams.inc()
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    latency.observe(3.0, route="/a")
+
+    assert registry.render() == "\n".join([
+        "# HELP nics_runs_total Runs by status",
+        "# TYPE nics_runs_total counter",
+        'nics_runs_total{status="fail \\"quoted\\"\\n"} 2',
+        'nics_runs_total{status="ok"} 1',
+        "# HELP nics_streams_open Open streams",
+        "# TYPE nics_streams_open gauge",
+        "nics_streams_open 1",
+        "# HELP nics_latency_seconds Latency",
+        "# TYPE nics_latency_seconds histogram",
+        'nics_latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'nics_latency_seconds_bucket{route="/a",le="1"} 2',
+        'nics_latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'nics_latency_seconds_sum{route="/a"} 3.55',
+        'nics_latency_seconds_count{route="/a"} 3',
+    ]) + "\n"
+
+
+def test_labels_must_match_the_definition():
+    counter = Counter("nics_c_total", "c", ("kind",))
+
+    with pytest.raises(ValueError):
+        counter.inc(tool="snort")
+    with pytest.raises(ValueError):
+        Gauge("nics_g", "g").set(1, kind="install")
+
+
+def test_registering_a_name_twice_returns_the_same_metric_or_fails():
+    registry = MetricsRegistry()
+    counter = registry.counter("nics_c_total", "c", ("kind",))
+
+    assert registry.counter("nics_c_total", "c", ("kind",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("nics_c_total", "c", ("kind",))
+    with pytest.raises(ValueError):
+        registry.counter("nics_c_total", "c", ("tool",))
+
+
+def _worker_registry():
+    registry = MetricsRegistry()
+    runs = registry.counter("nics_runs_total", "Runs by status", ("status",))
+    streams = registry.gauge("nics_streams_open", "Open streams")
+    latency = registry.histogram("nics_latency_seconds", "Latency", buckets=(1.0,))
+    return registry, runs, streams, latency
+
+
+def test_shared_registries_render_the_total_of_every_process(tmp_path):
+    first, first_runs, first_streams, first_latency = _worker_registry()
+    second, second_runs, second_streams, second_latency = _worker_registry()
+    first.share(tmp_path, interval=60)
+    second.share(tmp_path, interval=60)
+
+    first_runs.inc(status="ok")
+    second_runs.inc(2, status="ok")
+    first_streams.inc()
+    second_streams.inc(3)
+    first_latency.observe(0.5)
+    second_latency.observe(2.0)
+    second.write_snapshot()
+
+    rendered = first.render()
+
+    assert 'nics_runs_total{status="ok"} 3' in rendered
+    assert "nics_streams_open 4" in rendered
+    assert 'nics_latency_seconds_bucket{le="1"} 1' in rendered
+    assert "nics_latency_seconds_count 2" in rendered
+    # the other worker's totals are the same, whichever one is scraped
+    assert second.render() == rendered
+
+
+def test_finished_workers_keep_their_counters_but_not_their_gauges(tmp_path):
+    live, live_runs, live_streams, _ = _worker_registry()
+    gone, gone_runs, gone_streams, _ = _worker_registry()
+    stale, stale_runs, stale_streams, _ = _worker_registry()
+    for registry in (live, gone, stale):
+        registry.share(tmp_path, interval=60)
+    live_runs.inc(status="ok")
+    live_streams.inc()
+    gone_runs.inc(status="ok")
+    gone_streams.inc()
+    stale_runs.inc(status="ok")
+    stale_streams.inc()
+
+    gone.stop_sharing()
+    # a worker killed without worker_exit: its last dump is older than 3 intervals
+    stale.write_snapshot()
+    payload = json.loads(stale._shared_path.read_text())
+    payload["written_at"] -= 3600
+    stale._shared_path.write_text(json.dumps(payload))
+
+    rendered = live.render()
+
+    assert 'nics_runs_total{status="ok"} 3' in rendered
+    assert "nics_streams_open 1" in rendered
+
+
+def test_clear_shared_removes_the_previous_dumps(tmp_path):
+    registry, runs, _, _ = _worker_registry()
+    registry.share(tmp_path, interval=60)
+    runs.inc(status="ok")
+    registry.write_snapshot()
+
+    MetricsRegistry.clear_shared(tmp_path)
+
+    assert list(tmp_path.glob("*.json")) == []
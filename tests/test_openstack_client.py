@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.openstack_client import OpenStackApiError, OpenStackClient, server_listing_rows
+from tests.fakes.openstack_http import FakeOpenStack
+
+
+@pytest.fixture
+def cloud():
+    fake = FakeOpenStack(page_size=2).start()
+    yield fake
+    fake.stop()
+
+
+def test_one_token_for_many_requests_across_threads(cloud):
+    cloud.add_servers(3)
+    client = OpenStackClient(cloud.env)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        listings = list(pool.map(lambda _: client.list_servers(), range(16)))
+
+    assert all(len(servers) == 3 for servers in listings)
+    assert cloud.auth_requests == client.auth_requests == 1
+
+
+def test_list_servers_follows_pagination(cloud):
+    cloud.add_servers(5)
+    client = OpenStackClient(cloud.env)
+
+    assert [s["name"] for s in client.list_servers()] == ["vm0", "vm1", "vm2", "vm3", "vm4"]
+    assert cloud.requests.count("GET /compute/v2.1/servers/detail") == 3
+
+
+def test_expired_token_is_renewed_once(cloud):
+    cloud.add_servers(1)
+    client = OpenStackClient(cloud.env)
+    client.list_servers()
+
+    cloud.revoke_tokens()
+
+    assert len(client.list_servers()) == 1
+    assert cloud.auth_requests == 2
+
+
+def test_server_listing_rows_match_the_cli_columns(cloud):
+    cloud.add_servers(2)
+    cloud.images["img-base"] = {"id": "img-base", "name": "ubuntu-22.04"}
+    client = OpenStackClient(cloud.env)
+
+    rows = server_listing_rows(client)
+
+    assert rows[0] == {"ID": "srv-0", "Name": "vm0", "Status": "ACTIVE", "Image Name": "ubuntu-22.04",
+                       "Networks": {"net": ["10.0.0.10"]}}
+    # the image name is looked up once and cached
+    assert cloud.requests.count("GET /image/v2/images/img-base") == 1
+
+
+def test_errors_carry_the_status_code(cloud):
+    client = OpenStackClient(cloud.env)
+
+    with pytest.raises(OpenStackApiError) as err:
+        client.get_image("missing")
+
+    assert err.value.status_code == 404
+
+
+def test_image_upload_round_trip(cloud, tmp_path):
+    client = OpenStackClient(cloud.env)
+    path = tmp_path / "disk.qcow2"
+    path.write_bytes(b"qcow" * 1000)
+
+    image_id = client.create_image("disk")
+    client.upload_image_data(image_id, path)
+
+    image = client.get_image(image_id)
+    assert (image["status"], image["size"]) == ("active", 4000)
+    assert [i["id"] for i in client.find_images("disk")] == [image_id]
+    client.delete_image(image_id)
+    assert client.find_images("disk") == []
@@ -0,0 +1,75 @@
+import json
+
+from src.services.phase_timer import TimingsLog, percentile
+
+
+def _result(instance, tool, seconds, tool_phases=None, instance_phases=None, run_phases=None, status="ok"):
+    return {
+        "instance": {"name": instance},
+        "tool": tool,
+        "status": status,
+        "started_at": 1000.0,
+        "finished_at": 1000.0 + seconds,
+        "timings": {"tool": tool_phases or {}, "instance": instance_phases or {}, "run": run_phases or {}},
+    }
+
+
+def test_percentile_interpolates_between_samples():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert percentile([float(v) for v in range(1, 21)], 95) == 19.05
+
+
+def test_log_rotates_once_it_exceeds_max_bytes(tmp_path):
+    log = TimingsLog(tmp_path / "timings.jsonl", max_bytes=200)
+    log.append("install", [_result("vm1", "snort", 10.0), _result("vm1", "zeek", 20.0)])
+    first_run = (tmp_path / "timings.jsonl").read_text()
+    assert len(first_run) > 200
+
+    log.append("install", [_result("vm2", "nmap", 5.0)])
+
+    rotated = tmp_path / "timings.jsonl.1"
+    assert rotated.read_text() == first_run
+    assert [r["tool"] for r in log.read()] == ["nmap"]
+    # rotation keeps a single old generation
+    log.append("install", [_result("vm3", "wazuh", 1.0)])
+    assert [r["tool"] for r in log.read()] == ["nmap", "wazuh"]
+    assert rotated.read_text() == first_run
+
+
+def test_read_filters_by_kind_and_skips_broken_lines(tmp_path):
+    log = TimingsLog(tmp_path / "timings.jsonl")
+    log.append("install", [_result("vm1", "snort", 10.0)])
+    with (tmp_path / "timings.jsonl").open("a") as f:
+        f.write('{"kind": "install", "tool"\n')
+    log.append("uninstall", [_result("vm1", "snort", 2.0)])
+
+    assert [r["kind"] for r in log.read()] == ["install", "uninstall"]
+    assert [r["seconds"] for r in log.read("uninstall")] == [2.0]
+    assert log.read(last=1)[0]["kind"] == "uninstall"
+
+
+def test_summary_reports_p50_and_p95_per_tool_and_phase(tmp_path):
+    log = TimingsLog(tmp_path / "timings.jsonl")
+    for run, seconds in enumerate([10.0, 20.0, 30.0, 40.0]):
+        log.append("install", [
+            _result("vm1", "snort", seconds, tool_phases={"exec": seconds - 1}, instance_phases={"probe": 1.0 + run},
+                    run_phases={"plan": 0.5}),
+            _result("vm1", "zeek", 5.0, tool_phases={"exec": 4.0}, instance_phases={"probe": 1.0 + run},
+                    run_phases={"plan": 0.5}),
+        ])
+    log.append("uninstall", [_result("vm1", "snort", 99.0)])
+
+    summary = log.summary("install")
+
+    assert summary["records"] == 8
+    assert summary["runs"] == 4
+    snort = summary["tools"]["snort"]
+    assert snort["total"] == {"count": 4, "p50": 25.0, "p95": 38.5}
+    assert snort["phases"]["exec"] == {"count": 4, "p50": 24.0, "p95": 37.5}
+    assert summary["tools"]["zeek"]["total"] == {"count": 4, "p50": 5.0, "p95": 5.0}
+    # one sample per instance and run, and one per run, not one per tool
+    assert summary["instance_phases"]["probe"] == {"count": 4, "p50": 2.5, "p95": 3.85}
+    assert summary["run_phases"]["plan"]["count"] == 4
+    assert json.loads(json.dumps(summary)) == summary
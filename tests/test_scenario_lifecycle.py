@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from src.services.scenario_provisioning_service import ScenarioProvisioningError, ScenarioProvisioningService
+from src.services.scenario_reconcile_service import ScenarioReconcileService, plan_counts
+from src.services.scenario_teardown_service import ScenarioTeardownService
+from src.services.server_status_watcher import ServerStatusWatcher
+from tests.fakes.openstack_backend import InMemoryOpenStackBackend
+
+
+def _node(i, flavor="small"):
+    return {
+        "id": f"n{i}",
+        "name": f"node{i}",
+        "properties": {"os": "ubuntu", "image": "ubuntu-22", "flavor": flavor, "network": "net",
+                       "securityGroup": "sg", "sshKey": "key"},
+    }
+
+
+def _watcher(backend):
+    return ServerStatusWatcher(backend.list_servers, min_interval=0.01, max_interval=0.05)
+
+
+@pytest.fixture
+def scenario(tmp_path, monkeypatch):
+    monkeypatch.delenv("NICS_GOLDEN_IMAGES", raising=False)
+    path = tmp_path / "scenario.json"
+
+    def write(nodes):
+        path.write_text(json.dumps({"nodes": nodes}), encoding="utf-8")
+        return path
+
+    return write
+
+
+def _provision(tmp_path, backend, scenario_path):
+    service = ScenarioProvisioningService(
+        tmp_path, backend=backend, scenario_path=scenario_path, state_dir=tmp_path, watcher=_watcher(backend))
+    return service.provision()
+
+
+def _summary(tmp_path):
+    return json.loads((tmp_path / "summary.json").read_text(encoding="utf-8"))
+
+
+def test_provision_creates_every_node_and_writes_summary(tmp_path, scenario):
+    backend = InMemoryOpenStackBackend(boot_seconds=0.02)
+    items = _provision(tmp_path, backend, scenario([_node(i) for i in range(4)]))
+
+    assert [i.status for i in items] == ["ready"] * 4
+    assert len(backend.servers) == len(backend.ports) == len(backend.floating_ips) == 4
+    summary = _summary(tmp_path)
+    assert sorted(e["id"] for e in summary) == ["n0", "n1", "n2", "n3"]
+    assert all(e["floating_ip"] for e in summary)
+
+
+def test_provision_failure_still_writes_created_nodes(tmp_path, scenario):
+    backend = InMemoryOpenStackBackend(fail_servers=["node1"])
+
+    with pytest.raises(ScenarioProvisioningError) as err:
+        _provision(tmp_path, backend, scenario([_node(0), _node(1)]))
+
+    assert {i.node.name: i.status for i in err.value.nodes} == {"node0": "ready", "node1": "failed"}
+    by_id = {e["id"]: e for e in _summary(tmp_path)}
+    assert by_id["n0"]["floating_ip"] and by_id["n1"]["floating_ip"] is None
+
+
+def test_teardown_removes_everything_and_tolerates_missing_resources(tmp_path, scenario):
+    backend = InMemoryOpenStackBackend(delete_seconds=0.05)
+    _provision(tmp_path, backend, scenario([_node(i) for i in range(3)]))
+    summary = _summary(tmp_path)
+    summary.append({"id": "gone", "name": "gone", "server_id": "x", "floating_ip": "198.51.100.9",
+                    "port_name": "gone-port"})
+    (tmp_path / "summary.json").write_text(json.dumps(summary), encoding="utf-8")
+
+    report = ScenarioTeardownService(
+        tmp_path, backend=backend, state_dir=tmp_path, retry_delay=0.02, watcher=_watcher(backend)).teardown()
+
+    assert report["status"] == "completed"
+    assert report["failed"] == []
+    assert {r["status"] for r in report["resources"]} == {"deleted", "already_gone"}
+    assert backend.servers == {} and backend.ports == {} and backend.floating_ips == {}
+
+
+def test_reconcile_only_touches_changed_nodes(tmp_path, scenario):
+    backend = InMemoryOpenStackBackend()
+    _provision(tmp_path, backend, scenario([_node(i) for i in range(4)]))
+
+    def reconcile():
+        return ScenarioReconcileService(
+            tmp_path, backend=backend, scenario_path=tmp_path / "scenario.json", state_dir=tmp_path)
+
+    assert plan_counts(reconcile().plan()) == {"create": 0, "delete": 0, "replace": 0, "unchanged": 4}
+
+    # n0 is dropped, n1 changes flavor, n9 is new and n2's server has disappeared
+    scenario([_node(1, flavor="large"), _node(2), _node(3), _node(9)])
+    gone = next(e["server_id"] for e in _summary(tmp_path) if e["id"] == "n2")
+    del backend.servers[gone]
+
+    actions = reconcile().plan()
+    assert {a.node_id: a.action for a in actions} == {
+        "n0": "delete", "n1": "replace", "n2": "replace", "n3": "unchanged", "n9": "create"}
+
+    report = reconcile().apply(actions)
+    assert report["status"] == "completed"
+    assert sorted(e["id"] for e in _summary(tmp_path)) == ["n1", "n2", "n3", "n9"]
+    assert plan_counts(reconcile().plan())["unchanged"] == 4
+    assert len(backend.servers) == len(backend.ports) == 4
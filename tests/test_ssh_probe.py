@@ -0,0 +1,69 @@
+import asyncio
+import subprocess
+import threading
+import time
+
+from src.services.tools_installer_service import ToolsInstallerService
+
+
+class FakeSession:
+    def __init__(self, user, answers, barrier):
+        self.user = user
+        self.answers = answers
+        self.barrier = barrier
+
+    def run(self, command, batch_mode=False):
+        # every candidate answers at the same time, so they land in one `done` batch
+        self.barrier.wait(timeout=5)
+        return subprocess.CompletedProcess(command, 0, "ok\n" if self.user in self.answers else "", "")
+
+
+class FakePool:
+    def __init__(self, candidates, answers):
+        self.answers = set(answers)
+        self.barrier = threading.Barrier(len(candidates))
+        self.discarded = []
+
+    def session(self, user, ip):
+        return FakeSession(user, self.answers, self.barrier)
+
+    def discard(self, user, ip):
+        self.discarded.append(user)
+
+
+class FakeOrchestrator:
+    def __init__(self, answers):
+        self.answers = set(answers)
+
+    async def run(self, session, phase, command, batch_mode=False):
+        await asyncio.sleep(0)
+        ok = session.user in self.answers
+        return subprocess.CompletedProcess(command, 0 if ok else 255, "ok\n" if ok else "", "")
+
+
+def test_parallel_probe_closes_every_other_answering_session(tmp_path):
+    candidates = ["ubuntu", "debian", "root"]
+    pool = FakePool(candidates, answers=candidates)
+    service = ToolsInstallerService(repo_root=tmp_path)
+
+    winner = service._probe_ssh_user(pool, "10.0.0.5", candidates, parallel=True)
+
+    # probes still finishing when the winner is picked are closed as they complete
+    deadline = time.time() + 5
+    while len(pool.discarded) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert winner in candidates
+    assert sorted(pool.discarded) == sorted(u for u in candidates if u != winner)
+
+
+def test_async_parallel_probe_closes_every_other_answering_session(tmp_path):
+    candidates = ["ubuntu", "debian", "root"]
+    pool = FakePool(candidates, answers=["ubuntu", "root"])
+    service = ToolsInstallerService(repo_root=tmp_path)
+
+    winner = asyncio.run(service._probe_ssh_user_async(
+        FakeOrchestrator(["ubuntu", "root"]), pool, "10.0.0.5", candidates, parallel=True,
+    ))
+
+    assert winner in ("ubuntu", "root")
+    assert set(pool.discarded) == {u for u in candidates if u != winner}
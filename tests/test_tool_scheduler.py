@@ -0,0 +1,167 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.models.tools import InstanceTarget, ToolInstallPlan, ToolManifest, ToolNode
+from src.services.tool_scheduler import ToolGraph, critical_path, run_graph
+
+
+def _plan(name, tools):
+    instance = InstanceTarget(id=f"id-{name}", name=name, type="test", ip_private="10.0.0.5",
+                              ip_floating=None, ip="10.0.0.5", status="ACTIVE")
+    return ToolInstallPlan(instance=instance, tools=tools, source_json=Path(f"{name}_tools.json"))
+
+
+def _manifests(**raw):
+    return {tool: ToolManifest.from_dict(tool, spec) for tool, spec in raw.items()}
+
+
+class Recorder:
+    """run_node stub: records start/finish per node and fails the tools in `failing`."""
+
+    def __init__(self, failing=(), seconds=0.0):
+        self.failing = set(failing)
+        self.seconds = seconds
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, node):
+        started = time.monotonic()
+        time.sleep(self.seconds)
+        finished = time.monotonic()
+        with self.lock:
+            self.runs[node] = (started, finished)
+        status = "install_failed" if node.tool in self.failing else "ok"
+        return {"tool": node.tool, "status": status, "started_at": started, "finished_at": finished}
+
+
+def _skip(node, dep, dep_result):
+    return {"tool": node.tool, "status": "dependency_failed", "dependency": str(dep)}
+
+
+def test_dependency_cycle_is_rejected():
+    manifests = _manifests(
+        snort={"depends_on": ["zeek"]},
+        zeek={"depends_on": ["suricata"]},
+        suricata={"depends_on": ["snort"]},
+    )
+
+    with pytest.raises(ValueError, match="ciclo de dependencias"):
+        ToolGraph([_plan("vm1", ["snort", "zeek", "suricata"])], manifests)
+
+
+def test_star_dependency_waits_for_the_tool_on_every_other_instance():
+    manifests = _manifests(**{
+        "wazuh-agent": {"depends_on": [{"tool": "wazuh-manager", "instance": "*"}]},
+        "wazuh-manager": {},
+    })
+    plans = [_plan("siem", ["wazuh-manager"]), _plan("vm1", ["wazuh-agent"]), _plan("vm2", ["wazuh-agent", "wazuh-manager"])]
+    graph = ToolGraph(plans, manifests)
+    manager = ToolNode("siem", "wazuh-manager")
+
+    # "*" means the other instances only, never the node's own instance
+    assert graph.deps[ToolNode("vm1", "wazuh-agent")] == [manager, ToolNode("vm2", "wazuh-manager")]
+    assert graph.deps[ToolNode("vm2", "wazuh-agent")] == [manager]
+
+    recorder = Recorder(seconds=0.02)
+    results = run_graph(graph, recorder, _skip, max_workers=4)
+
+    assert all(r["status"] == "ok" for r in results.values())
+    agent_started = recorder.runs[ToolNode("vm1", "wazuh-agent")][0]
+    assert recorder.runs[manager][1] <= agent_started
+    assert recorder.runs[ToolNode("vm2", "wazuh-manager")][1] <= agent_started
+
+
+def test_conflicting_tools_never_run_at_the_same_time():
+    manifests = _manifests(
+        snort={"exclusive": False, "conflicts": ["suricata"]},
+        suricata={"exclusive": False},
+        zeek={"exclusive": False},
+    )
+    graph = ToolGraph([_plan("vm1", ["snort", "suricata", "zeek"])], manifests)
+    recorder = Recorder(seconds=0.05)
+
+    run_graph(graph, recorder, _skip, max_workers=3)
+
+    snort = recorder.runs[ToolNode("vm1", "snort")]
+    suricata = recorder.runs[ToolNode("vm1", "suricata")]
+    zeek = recorder.runs[ToolNode("vm1", "zeek")]
+    assert snort[1] <= suricata[0]
+    # zeek conflicts with neither, so it runs alongside snort
+    assert zeek[0] < snort[1]
+
+
+def test_failed_dependency_skips_its_dependents_transitively():
+    manifests = _manifests(
+        suricata={},
+        snort={"depends_on": ["suricata"]},
+        zeek={"depends_on": ["snort"]},
+        nmap={},
+    )
+    graph = ToolGraph([_plan("vm1", ["suricata", "snort", "zeek", "nmap"])], manifests)
+    recorder = Recorder(failing={"suricata"})
+
+    results = run_graph(graph, recorder, _skip, max_workers=2)
+
+    assert {n.tool: r["status"] for n, r in results.items()} == {
+        "suricata": "install_failed",
+        "snort": "dependency_failed",
+        "zeek": "dependency_failed",
+        "nmap": "ok",
+    }
+    assert results[ToolNode("vm1", "zeek")]["dependency"] == "vm1/snort"
+    assert set(recorder.runs) == {ToolNode("vm1", "suricata"), ToolNode("vm1", "nmap")}
+
+
+def test_failing_node_becomes_a_result_and_the_rest_keeps_running():
+    manifests = _manifests(suricata={}, snort={"depends_on": ["suricata"]}, nmap={})
+    graph = ToolGraph([_plan("vm1", ["suricata", "snort"]), _plan("vm2", ["nmap"])], manifests)
+    recorder = Recorder()
+
+    def run_node(node):
+        if node.instance == "vm1":
+            raise RuntimeError("No fue posible conectar por SSH")
+        return recorder(node)
+
+    def fail_node(node, exc):
+        return {"tool": node.tool, "status": "ssh_unreachable", "error": str(exc)}
+
+    results = run_graph(graph, run_node, _skip, max_workers=2, fail_node=fail_node)
+
+    assert {str(n): r["status"] for n, r in results.items()} == {
+        "vm1/suricata": "ssh_unreachable",
+        "vm1/snort": "dependency_failed",
+        "vm2/nmap": "ok",
+    }
+    with pytest.raises(RuntimeError):
+        run_graph(graph, run_node, _skip, max_workers=2)
+
+
+def test_critical_path_follows_the_latest_finishing_predecessor():
+    manifests = _manifests(
+        suricata={},
+        snort={"depends_on": ["suricata"]},
+        zeek={"exclusive": False},
+        nmap={},
+    )
+    graph = ToolGraph([_plan("vm1", ["suricata", "snort", "zeek"]), _plan("vm2", ["nmap"])], manifests)
+    timings = {
+        ToolNode("vm1", "suricata"): (0.0, 2.0),
+        ToolNode("vm1", "zeek"): (2.0, 3.0),   # exclusive suricata blocked it until 2.0
+        ToolNode("vm1", "snort"): (3.0, 6.0),  # waited for suricata and for zeek (conflict)
+        ToolNode("vm2", "nmap"): (0.0, 5.0),
+    }
+    base = time.time()
+    results = {n: {"status": "ok", "started_at": base + s, "finished_at": base + f} for n, (s, f) in timings.items()}
+
+    path = critical_path(graph, results)
+
+    assert path == [ToolNode("vm1", "suricata"), ToolNode("vm1", "zeek"), ToolNode("vm1", "snort")]
+
+
+def test_critical_path_ignores_nodes_that_did_not_run():
+    graph = ToolGraph([_plan("vm1", ["snort"])], _manifests(snort={}))
+
+    assert critical_path(graph, {ToolNode("vm1", "snort"): {"status": "dependency_failed"}}) == []
@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+
+from src.services.tools_store import ToolsStore
+
+
+def _add_tool(tool):
+    def mutate(entry):
+        entry.setdefault("tools", []).append(tool)
+    return mutate
+
+
+def test_updates_are_replayed_from_the_journal_on_reopen(tmp_path):
+    path = tmp_path / "tools_store.json"
+    store = ToolsStore(path)
+    store.update_instance("vm1", _add_tool("snort"))
+    store.update_instance("vm1", _add_tool("zeek"))
+    store.update_instance("vm2", _add_tool("nmap"))
+
+    # nothing compacted yet: the snapshot does not exist, the journal has one line per update
+    assert not path.exists()
+    assert len(store.journal_path.read_text().splitlines()) == 3
+
+    reopened = ToolsStore(path)
+    assert reopened.read_all() == {"vm1": {"tools": ["snort", "zeek"]}, "vm2": {"tools": ["nmap"]}}
+
+
+def test_incomplete_journal_line_is_ignored_until_it_is_finished(tmp_path):
+    path = tmp_path / "tools_store.json"
+    store = ToolsStore(path)
+    store.update_instance("vm1", _add_tool("snort"))
+    line = json.dumps({"instance": "vm2", "entry": {"tools": ["zeek"]}})
+    with store.journal_path.open("a") as f:
+        f.write(line[:10])
+
+    assert ToolsStore(path).read_all() == {"vm1": {"tools": ["snort"]}}
+
+    with store.journal_path.open("a") as f:
+        f.write(line[10:] + "\n")
+    assert store.read_all() == {"vm1": {"tools": ["snort"]}, "vm2": {"tools": ["zeek"]}}
+
+
+def test_journal_is_compacted_every_compact_every_updates(tmp_path):
+    path = tmp_path / "tools_store.json"
+    store = ToolsStore(path, compact_every=3)
+    store.update_instance("vm1", _add_tool("snort"))
+    store.update_instance("vm2", _add_tool("zeek"))
+    assert not path.exists()
+
+    store.update_instance("vm3", _add_tool("nmap"))
+
+    expected = {"vm1": {"tools": ["snort"]}, "vm2": {"tools": ["zeek"]}, "vm3": {"tools": ["nmap"]}}
+    assert json.loads(path.read_text()) == expected
+    assert store.journal_path.read_text() == ""
+
+    store.update_instance("vm1", _add_tool("wazuh"))
+    expected["vm1"]["tools"].append("wazuh")
+    assert ToolsStore(path).read_all() == expected
+
+
+def _bump(entry):
+    entry["count"] = entry.get("count", 0) + 1
+
+
+def _bump_many(path, times):
+    store = ToolsStore(path, compact_every=7)
+    for _ in range(times):
+        store.update_instance("vm1", _bump)
+
+
+def test_two_processes_on_one_path_do_not_lose_updates(tmp_path):
+    path = tmp_path / "tools_store.json"
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_bump_many, args=(path, 50)) for _ in range(2)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=30)
+
+    assert [w.exitcode for w in workers] == [0, 0]
+    assert ToolsStore(path).read_all() == {"vm1": {"count": 100}}
+
+
+def test_store_sees_writes_from_another_store_on_the_same_path(tmp_path):
+    path = tmp_path / "tools_store.json"
+    reader, writer = ToolsStore(path, compact_every=2), ToolsStore(path, compact_every=2)
+    assert reader.read_all() == {}
+
+    for _ in range(5):
+        writer.update_instance("vm1", _bump)
+        assert reader.get_instance("vm1") == writer.get_instance("vm1")
+
+    assert reader.get_instance("vm1") == {"count": 5}
@@ -0,0 +1,64 @@
+import pytest
+
+from src.services.tools_store import ToolsStore, open_tools_store
+from src.services.tools_store_sqlite import SqliteToolsStore
+
+
+def _seed_json(state_dir):
+    store = ToolsStore(state_dir / "tools_store.json", compact_every=2)
+    store.update_instance("vm1", lambda e: e.update(tools=["snort", "zeek"], installed=["snort"]))
+    store.update_instance("vm2", lambda e: e.update(tools=["nmap"]))
+    # left in the journal, not yet compacted into the snapshot
+    store.update_instance("vm3", lambda e: e.update(
+        tools=["wazuh"],
+        last_run={"wazuh": {"status": "install_failed", "started_at": 1.0, "finished_at": 2.0, "log_file": "w.log"}},
+    ))
+    return store.read_all()
+
+
+def test_sqlite_backend_opens_with_the_migrated_json_data(tmp_path, monkeypatch):
+    expected = _seed_json(tmp_path)
+    monkeypatch.setenv("NICS_TOOLS_STORE_BACKEND", "sqlite")
+
+    store = open_tools_store(tmp_path)
+
+    assert isinstance(store.store, SqliteToolsStore)
+    assert store.read_all() == expected
+    assert store.instances_with_tool("snort", installed=True) == ["vm1"]
+    assert store.instances_with_tool_status("wazuh", "install_failed") == ["vm3"]
+    assert store.tool_status_for("vm3")["wazuh"]["log_file"] == "w.log"
+
+
+def test_explicit_migration_matches_the_json_store(tmp_path):
+    expected = _seed_json(tmp_path)
+    sqlite_store = SqliteToolsStore(tmp_path / "tools_store.db")
+
+    assert sqlite_store.migrate_from_json(tmp_path / "tools_store.json", only_once=True) == 3
+    # already migrated: later JSON changes are not imported again
+    ToolsStore(tmp_path / "tools_store.json").update_instance("vm4", lambda e: e.update(tools=["suricata"]))
+    assert sqlite_store.migrate_from_json(tmp_path / "tools_store.json", only_once=True) == 0
+
+    assert sqlite_store.read_all() == expected
+    assert open_tools_store(tmp_path, backend="sqlite").read_all() == expected
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_record_results_marks_tools_in_one_write(tmp_path, backend):
+    store = open_tools_store(tmp_path, backend=backend)
+    store.update_instance("vm1", lambda e: e.update(tools=["zeek"]))
+    vm1 = {"name": "vm1"}
+
+    store.record_results([
+        {"instance": vm1, "tool": "snort", "status": "ok"},
+        {"instance": vm1, "tool": "zeek", "status": "already_installed"},
+        {"instance": vm1, "tool": "nmap", "status": "install_failed"},
+    ], kind="install")
+    entry = store.get_instance("vm1")
+    assert entry["tools"] == ["zeek", "snort"]
+    assert sorted(entry["installed"]) == ["snort", "zeek"]
+    assert entry["last_run"]["nmap"]["status"] == "install_failed"
+
+    store.record_results([{"instance": vm1, "tool": "snort", "status": "ok"}], kind="uninstall")
+    entry = store.get_instance("vm1")
+    assert entry["tools"] == ["zeek"]
+    assert entry["installed"] == ["zeek"]